@@ -0,0 +1,82 @@
+"""
+Benchmark de exportación de ``FuenteDatosVector``.
+
+Compara tamaño del resultado y tiempo de escritura de los perfiles
+FlatGeobuf (con índice espacial) y GeoParquet frente a las rutas actuales
+GeoJSON (dict y archivo) y Shapefile (ZIP).
+
+Uso:
+    python benchmarks/bench_exportar_vector.py [n_objetos]
+
+Requiere GDAL/OGR; los perfiles cuyo driver no esté disponible se omiten.
+"""
+import os
+import sys
+import json
+import time
+import random
+
+RAIZ_REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if RAIZ_REPO not in sys.path:
+    sys.path.insert(0, RAIZ_REPO)
+
+from osgeo import ogr, osr  # noqa: E402
+
+from conex.Vector_conex import FuenteDatosVector  # noqa: E402
+
+
+def crear_fuente(n_objetos, n_campos=10, semilla=0):
+    """FuenteDatosVector en memoria con n_objetos polígonos en EPSG:4326."""
+    random.seed(semilla)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+
+    ds = ogr.GetDriverByName("MEMORY").CreateDataSource("bench")
+    layer = ds.CreateLayer("bench", srs, ogr.wkbPolygon)
+    for j in range(n_campos):
+        layer.CreateField(ogr.FieldDefn(f"campo_{j}", ogr.OFTReal))
+    defn = layer.GetLayerDefn()
+
+    for _ in range(n_objetos):
+        x, y = random.uniform(-10, 4), random.uniform(36, 44)
+        d = random.uniform(0.001, 0.05)
+        wkt = f"POLYGON (({x} {y},{x} {y + d},{x + d} {y + d},{x + d} {y},{x} {y}))"
+        feat = ogr.Feature(defn)
+        feat.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        for j in range(n_campos):
+            feat.SetField(j, random.random())
+        layer.CreateFeature(feat)
+        feat = None
+
+    fuente = FuenteDatosVector("bench")
+    fuente.datasource = ds
+    return fuente
+
+
+def medir(fuente, outputFormat):
+    inicio = time.perf_counter()
+    resultado = fuente.exportar(EPSG_Salida=4326, outputFormat=outputFormat)
+    segundos = time.perf_counter() - inicio
+    if isinstance(resultado, dict):
+        resultado = json.dumps(resultado).encode("utf-8")
+    return len(resultado), segundos
+
+
+def main():
+    n_objetos = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    fuente = crear_fuente(n_objetos)
+
+    formatos = ["application/json", "GeoJSON", "ESRI Shapefile", "FlatGeobuf", "GeoParquet"]
+    print(f"Exportación de {n_objetos} polígonos")
+    print(f"{'formato':<18}{'bytes':>14}{'segundos':>12}")
+    for formato in formatos:
+        try:
+            tamaño, segundos = medir(fuente, formato)
+        except RuntimeError as e:
+            print(f"{formato:<18}{'omitido':>14}  ({e})")
+            continue
+        print(f"{formato:<18}{tamaño:>14}{segundos:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
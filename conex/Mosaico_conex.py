@@ -0,0 +1,339 @@
+# Documentación de referencia:
+# https://gdal.org/en/stable/programs/gdalbuildvrt.html
+
+import os
+import glob
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Intenta importar GDAL/OGR. El fallo se difiere hasta que realmente se use
+# GDAL (ver _asegurar_gdal), de modo que importar este módulo no aborte el
+# proceso cuando GDAL no está instalado.
+try:
+    from osgeo import osr, gdal
+except Exception:  # pragma: no cover - depende del entorno
+    # El error concreto se gestiona de forma centralizada en gdal_utils.
+    osr = gdal = None
+
+from .gdal_utils import asegurar_gdal, normalizar_epsg, borrar_vsimem, transformar_MRE
+from .indice_utils import IndiceHuellas
+from .Raster_conex import FuenteDatosRaster, INTERPOLACIONES_MUESTREO, _coordenadas_puntos
+
+# Nombre del índice de huellas que se crea en el directorio del mosaico
+NOMBRE_INDICE = '.mosaico.sqlite'
+
+
+def _asegurar_gdal():
+    """Lanza un error claro si GDAL/OGR no está disponible (para FuenteDatosMosaico)."""
+    asegurar_gdal("FuenteDatosMosaico")
+
+
+class FuenteDatosMosaico(FuenteDatosRaster):
+    """
+    Fuente ráster formada por muchos archivos (un directorio, un patrón glob
+    o una lista de rutas) expuestos como un único mosaico VRT.
+
+    Las huellas (bbox) de los archivos se guardan en un índice R-tree de
+    SQLite (``IndiceHuellas``) que se actualiza de forma incremental: solo se
+    abren con GDAL los archivos nuevos o modificados. ``MRE_datos`` y
+    ``muestrear`` consultan el índice y construyen un VRT solo con los
+    archivos que intersecan la petición; ``exportar``, ``tesela``, etc.
+    trabajan sobre ese recorte o sobre el VRT completo, que GDAL lee de forma
+    perezosa (solo abre los archivos de las ventanas leídas).
+
+    Atributos:
+    ----------
+    dato : str o list[str]
+        Directorio, patrón glob o lista de rutas de los archivos ráster.
+    indice : IndiceHuellas
+        Catálogo de archivos y huellas.
+    ruta_vrt : str
+        Ruta del VRT del mosaico completo (cacheado junto al índice).
+    """
+
+    def __init__(self, dato, patron='*.tif', ruta_indice=None, recursivo=False, EPSG_Mosaico=None):
+        """
+        Parámetros
+        ----------
+        dato : str o list[str]
+            Directorio, patrón glob (p. ej. '/datos/mdt/*.tif') o lista de rutas.
+        patron : str, opcional
+            Patrón de nombres cuando dato es un directorio.
+        ruta_indice : str, opcional
+            Ruta del SQLite del índice. Por defecto ``<directorio>/.mosaico.sqlite``
+            si dato es un directorio y en memoria en otro caso.
+        recursivo : bool, opcional
+            Si es True, busca también en subdirectorios ('**').
+        EPSG_Mosaico : int o str, opcional
+            SRS del mosaico. Por defecto, el del primer archivo indexado. Los
+            archivos en otro SRS se indexan pero no se incluyen en el VRT.
+        """
+        super().__init__(dato)
+        self.patron = patron
+        self.recursivo = recursivo
+        self.EPSG_Mosaico = normalizar_epsg(EPSG_Mosaico) if EPSG_Mosaico is not None else None
+
+        if ruta_indice is None:
+            es_directorio = isinstance(dato, str) and os.path.isdir(dato)
+            ruta_indice = os.path.join(dato, NOMBRE_INDICE) if es_directorio else ':memory:'
+        self.indice = IndiceHuellas(ruta_indice)
+        self.ruta_vrt = (
+            f"{ruta_indice}.vrt" if ruta_indice != ':memory:'
+            else f"/vsimem/mosaico_{uuid.uuid4().hex}.vrt"
+        )
+        self._mosaico = None
+        self._ruta_subconjunto = None
+
+    def _listar_archivos(self):
+        """Rutas absolutas de los archivos del mosaico, ordenadas."""
+        if isinstance(self.dato, (list, tuple)):
+            rutas = list(self.dato)
+        elif os.path.isdir(self.dato):
+            partes = [self.dato, '**', self.patron] if self.recursivo else [self.dato, self.patron]
+            rutas = glob.glob(os.path.join(*partes), recursive=self.recursivo)
+        else:
+            rutas = glob.glob(self.dato, recursive=self.recursivo)
+        rutas = sorted(os.path.abspath(r) for r in rutas if os.path.isfile(r))
+        return [r for r in rutas if os.path.abspath(r) != os.path.abspath(self.indice.ruta)]
+
+    def _srs_mosaico(self):
+        """SRS del mosaico (del índice, de EPSG_Mosaico o None si aún no hay archivos)."""
+        wkt = self.indice.obtener_meta('srs')
+        if wkt is None and self.EPSG_Mosaico is not None:
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(self.EPSG_Mosaico)
+            wkt = srs.ExportToWkt()
+            self.indice.fijar_meta('srs', wkt)
+        if wkt is None:
+            return None
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(wkt)
+        return srs
+
+    def indexar(self, EPSG_Entrada=None):
+        """
+        Actualiza el índice de huellas: abre solo los archivos nuevos o
+        modificados desde la última indexación y quita los eliminados.
+
+        Parámetros
+        ----------
+        EPSG_Entrada : int o str, opcional
+            SRS que se asume para los archivos sin proyección.
+
+        Retorna
+        -------
+        dict
+            {'indexados': n, 'eliminados': n, 'total': n}
+        """
+        _asegurar_gdal()
+        gdal.UseExceptions()
+
+        cambiados, eliminados = self.indice.pendientes(self._listar_archivos())
+        guardar = []
+        for ruta in cambiados:
+            try:
+                ds = gdal.Open(ruta)
+            except RuntimeError:
+                ds = None
+            if ds is None:
+                logger.warning(f"No se pudo abrir el archivo ráster: {ruta}")
+                continue
+            srs = osr.SpatialReference()
+            if ds.GetProjection():
+                srs.ImportFromWkt(ds.GetProjection())
+            elif EPSG_Entrada is not None:
+                srs.ImportFromEPSG(normalizar_epsg(EPSG_Entrada))
+            else:
+                logger.warning(f"Archivo sin proyección omitido del mosaico: {ruta}")
+                continue
+
+            srs_mosaico = self._srs_mosaico()
+            if srs_mosaico is None:
+                self.indice.fijar_meta('srs', srs.ExportToWkt())
+                srs_mosaico = srs
+
+            gt = ds.GetGeoTransform()
+            xs = [gt[0], gt[0] + gt[1] * ds.RasterXSize]
+            ys = [gt[3], gt[3] + gt[5] * ds.RasterYSize]
+            MRE = transformar_MRE([min(xs), min(ys), max(xs), max(ys)], srs, srs_mosaico)
+            compatible = bool(srs.IsSame(srs_mosaico))
+            if not compatible:
+                logger.warning(f"Archivo en un SRS distinto del mosaico (no se incluye en el VRT): {ruta}")
+            guardar.append((ruta, MRE, {
+                'bandas': ds.RasterCount,
+                'ancho': ds.RasterXSize,
+                'alto': ds.RasterYSize,
+                'resolucion': [gt[1], gt[5]],
+                'compatible': compatible,
+            }))
+            ds = None
+
+        self.indice.actualizar(guardar, eliminados)
+        return {'indexados': len(guardar), 'eliminados': len(eliminados), 'total': len(self.indice)}
+
+    def archivos(self, MRE=None, EPSG_MRE=4326):
+        """
+        Rutas de los archivos del mosaico (compatibles con su SRS) cuya
+        huella interseca MRE (todos si es None).
+        """
+        if MRE is not None:
+            srs_mre = osr.SpatialReference()
+            srs_mre.ImportFromEPSG(normalizar_epsg(EPSG_MRE))
+            MRE = transformar_MRE(MRE, srs_mre, self._srs_mosaico())
+        return [ruta for ruta, _, info in self.indice.consultar(MRE) if info.get('compatible', True)]
+
+    def _construir_vrt(self, ruta, rutas, banda=None):
+        """
+        VRT con las rutas indicadas sobre la rejilla del mosaico completo, de
+        modo que los píxeles de un subconjunto coinciden con los del mosaico.
+        """
+        opciones = {'bandList': [int(banda)]} if banda else {}
+        if self._mosaico is not None:
+            gt = self._mosaico.GetGeoTransform()
+            opciones.update(
+                outputBounds=[
+                    gt[0], gt[3] + gt[5] * self._mosaico.RasterYSize,
+                    gt[0] + gt[1] * self._mosaico.RasterXSize, gt[3],
+                ],
+                xRes=gt[1], yRes=abs(gt[5]),
+            )
+        vrt = gdal.BuildVRT(ruta, rutas, **opciones)
+        if vrt is None:
+            raise RuntimeError("No se pudo construir el VRT del mosaico")
+        srs = self._srs_mosaico()
+        if not vrt.GetProjection() and srs is not None:
+            vrt.SetProjection(srs.ExportToWkt())
+        vrt.FlushCache()
+        return vrt
+
+    def leer(self, banda=None, EPSG_Entrada=None, datasetCompleto=True):
+        """
+        Indexa los archivos (de forma incremental) y abre el mosaico como VRT.
+
+        El VRT del mosaico completo se guarda junto al índice y solo se
+        reconstruye cuando cambia el catálogo de archivos.
+
+        Parámetros
+        ----------
+        banda : int, opcional
+            Número de banda a leer (por defecto, todas).
+        EPSG_Entrada : int o str, opcional
+            SRS que se asume para los archivos sin proyección.
+
+        Retorna
+        -------
+        gdal.Dataset
+            VRT del mosaico.
+        """
+        _asegurar_gdal()
+        gdal.UseExceptions()
+
+        self.indexar(EPSG_Entrada)
+        rutas = self.archivos()
+        if not rutas:
+            raise RuntimeError(f"No se han encontrado archivos ráster en: {self.dato}")
+
+        version = str(self.indice.version)
+        vrt = None
+        if self.indice.obtener_meta('vrt_version') == version and gdal.VSIStatL(self.ruta_vrt) is not None:
+            vrt = gdal.Open(self.ruta_vrt)
+        if vrt is None:
+            self._mosaico = None
+            vrt = self._construir_vrt(self.ruta_vrt, rutas)
+            self.indice.fijar_meta('vrt_version', version)
+        self._mosaico = vrt
+
+        if banda:
+            self.multiBand = False
+            self._sustituir_datasource(self._construir_vrt(f"/vsimem/mosaico_{uuid.uuid4().hex}.vrt", rutas, banda))
+        else:
+            self._sustituir_datasource(vrt)
+
+        # sembrar_teselas no puede reabrir un mosaico desde dato: un solo
+        # proceso. La versión del índice en _estado invalida las cachés de
+        # estadísticas y teselas cuando cambia algún archivo.
+        self._args_lectura = None
+        self._estado = repr(['leer', banda, EPSG_Entrada, version])
+        return self.datasource
+
+    def _ruta_cache_estadisticas(self):
+        """
+        Como en FuenteDatosRaster: solo ruta_estadisticas si se ha indicado;
+        nada se escribe junto al índice ni a los datos.
+        """
+        return self.ruta_estadisticas or None
+
+    def _es_mosaico_completo(self):
+        return self._mosaico is not None and self.datasource is self._mosaico
+
+    def _subconjunto(self, MRE_mosaico):
+        """VRT sobre la rejilla del mosaico con solo los archivos que cortan el bbox."""
+        rutas = [
+            ruta for ruta, _, info in self.indice.consultar(MRE_mosaico)
+            if info.get('compatible', True)
+        ]
+        if not rutas:
+            return None
+        if self._ruta_subconjunto is not None:
+            borrar_vsimem(self._ruta_subconjunto)
+        self._ruta_subconjunto = f"/vsimem/mosaico_{uuid.uuid4().hex}.vrt"
+        return self._construir_vrt(self._ruta_subconjunto, rutas)
+
+    def MRE_datos(self, banda=None, MRE=[-180, -90, 180, 90], EPSG_MRE=4326, arrays=True):
+        """
+        Recorta el mosaico al bbox MRE leyendo solo los archivos cuya huella
+        lo interseca (ver ``FuenteDatosRaster.MRE_datos``).
+        """
+        if self._es_mosaico_completo():
+            srs_mre = osr.SpatialReference()
+            srs_mre.ImportFromEPSG(normalizar_epsg(EPSG_MRE))
+            subconjunto = self._subconjunto(transformar_MRE(MRE, srs_mre, self._srs_mosaico()))
+            if subconjunto is None:
+                raise Exception("BBox recortado no válido")
+            self.datasource = subconjunto
+        return super().MRE_datos(banda, MRE, EPSG_MRE, arrays)
+
+    def muestrear(self, puntos, EPSG_puntos=4326, bandas=None, interpolacion='nearest', capa=None):
+        """
+        Valores del mosaico en un conjunto de puntos, leyendo solo los
+        archivos que contienen alguno (ver ``FuenteDatosRaster.muestrear``).
+        """
+        import numpy as np
+
+        if not self._es_mosaico_completo():
+            return super().muestrear(puntos, EPSG_puntos, bandas, interpolacion, capa)
+        if interpolacion not in INTERPOLACIONES_MUESTREO:
+            raise ValueError(f"Interpolación no soportada: {interpolacion}. Usa una de {INTERPOLACIONES_MUESTREO}")
+
+        coords, srs_puntos = _coordenadas_puntos(puntos, capa)
+        if srs_puntos is None:
+            srs_puntos = osr.SpatialReference()
+            srs_puntos.ImportFromEPSG(normalizar_epsg(EPSG_puntos))
+        xy = self._transformar_puntos(np.array(coords, dtype=np.float64).reshape(-1, 2), srs_puntos)
+
+        validos = np.isfinite(xy).all(axis=1)
+        if not validos.any():
+            return self._muestrear_xy(xy, bandas, interpolacion)
+        x, y = xy[validos, 0], xy[validos, 1]
+        MRE = [x.min(), y.min(), x.max(), y.max()]
+
+        # Archivos del bbox de los puntos que contienen al menos uno
+        rutas = []
+        for ruta, (minx, miny, maxx, maxy), info in self.indice.consultar(MRE):
+            if info.get('compatible', True) and ((x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)).any():
+                rutas.append(ruta)
+        if not rutas:
+            bandas = bandas or range(1, self.datasource.RasterCount + 1)
+            return np.full((xy.shape[0], len(list(bandas))), np.nan)
+
+        if self._ruta_subconjunto is not None:
+            borrar_vsimem(self._ruta_subconjunto)
+        self._ruta_subconjunto = f"/vsimem/mosaico_{uuid.uuid4().hex}.vrt"
+        mosaico = self.datasource
+        self.datasource = self._construir_vrt(self._ruta_subconjunto, rutas)
+        try:
+            return self._muestrear_xy(xy, bandas, interpolacion)
+        finally:
+            self.datasource = mosaico
@@ -0,0 +1,198 @@
+#  Importación de librerías
+import asyncio
+import logging
+
+from .PG_conex import cargar_conexion
+
+logger = logging.getLogger(__name__)
+
+# asyncpg es opcional: solo se necesita para ConexPGAsync
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - depende del entorno
+    asyncpg = None
+
+"""
+PGAsync_conex.py
+
+Módulo para consultar PostgreSQL desde asyncio con asyncpg, sin bloquear el
+bucle de eventos.
+
+Clases:
+    - ConexPGAsync: Pool de conexiones asíncrono, consultas con await e
+      iteración asíncrona de resultados por lotes (cursor en el servidor).
+
+Uso:
+    1. Instanciar ConexPGAsync con la misma configuración que ConexPG
+       (``./conex/PGconex.json`` o el parámetro dataJSONcon).
+    2. Abrir el pool con ``await pg.abrir()`` o ``async with pg:`` (se abre
+       solo en la primera consulta si no).
+    3. Usar ``await pg.query(...)`` o ``async for fila in pg.iterar(...)``.
+
+Los parámetros de las consultas usan la sintaxis de asyncpg ($1, $2...).
+Si la tarea que espera una consulta se cancela (o vence su timeout), asyncpg
+cancela también la consulta en el servidor y la conexión vuelve al pool.
+
+Ejemplo:
+    import asyncio
+    from conex.PGAsync_conex import ConexPGAsync
+
+    async def main():
+        async with ConexPGAsync(dataJSONcon=parametros) as pg:
+            print(await pg.query("SELECT NOW();"))
+
+            async for fila in pg.iterar("SELECT id FROM tabla WHERE id > $1", 100, timeout=5):
+                print(fila)
+
+    asyncio.run(main())
+"""
+
+
+def _asegurar_asyncpg():
+    """Lanza un error claro si asyncpg no está instalado."""
+    if asyncpg is None:
+        raise ImportError(
+            "ConexPGAsync requiere asyncpg. Instálalo con: pip install asyncpg"
+        )
+
+
+class ConexPGAsync:
+
+    # Se define la función init con los parámetros de construcción de la clase
+    def __init__(self, dataJSONcon=None, min_conexiones=1, max_conexiones=10, timeout=None):
+        """
+        Parámetros
+        ----------
+        dataJSONcon : dict, opcional
+            Parámetros de conexión (IP, port, user, pass, db). Si es None, se
+            leen de ``./conex/PGconex.json`` (como en ConexPG).
+        min_conexiones, max_conexiones : int, opcional
+            Tamaño mínimo y máximo del pool.
+        timeout : float, opcional
+            Timeout por defecto (segundos) de cada consulta; None = sin límite.
+        """
+        self.conexFile = "./conex/PGconex.json"
+        self.conexJSON = cargar_conexion(dataJSONcon, self.conexFile)
+        self.min_conexiones = min_conexiones
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self._pool = None
+        self._lock = None
+
+    def __str__(self):
+        return f"archivo de conexión: {self.conexFile} (asyncio)"
+
+    async def __aenter__(self):
+        await self.abrir()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.cerrar()
+
+    def _parametros(self):
+        port = self.conexJSON["port"]
+        return {
+            "host": self.conexJSON["IP"],
+            "database": self.conexJSON["db"],
+            "user": self.conexJSON["user"],
+            "password": self.conexJSON["pass"],
+            "port": int(port) if port else None,
+        }
+
+    async def abrir(self):
+        """Crea el pool de conexiones (si no existe) y lo devuelve."""
+        _asegurar_asyncpg()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._pool is None:
+                try:
+                    self._pool = await asyncpg.create_pool(
+                        min_size=self.min_conexiones,
+                        max_size=self.max_conexiones,
+                        **self._parametros(),
+                    )
+                except Exception as error:
+                    logger.error(f"Error al conectar a la base de datos: {error}")
+                    raise Exception(f"Error al conectar a la base de datos: {error}")
+        return self._pool
+
+    async def cerrar(self):
+        """Cierra el pool esperando a que se liberen las conexiones en uso."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    async def conex2PG(self, check=False):
+        """
+        Comprueba la conexión o devuelve el pool.
+
+        Parámetros
+        ----------
+        check : bool, opcional
+            Si es True, toma una conexión del pool, ejecuta ``SELECT 1`` y la
+            devuelve al pool; retorna un mensaje de confirmación. Si es False,
+            retorna el ``asyncpg.Pool``.
+        """
+        pool = await self.abrir()
+        if not check:
+            return pool
+        async with pool.acquire(timeout=self.timeout) as connection:
+            await connection.fetchval("SELECT 1", timeout=self.timeout)
+        logger.info("[v]  Conexión asíncrona a la base de datos comprobada.")
+        return "[v]  Conexión asíncrona a la base de datos comprobada."
+
+    async def query(self, query, *args, timeout=None):
+        """
+        Ejecuta la consulta con una conexión del pool y devuelve todas las
+        filas como lista de tuplas (como ``ConexPG.queryPG``).
+
+        Parámetros
+        ----------
+        query : str
+            Sentencia SQL (parámetros $1, $2...).
+        *args
+            Valores de los parámetros.
+        timeout : float, opcional
+            Segundos antes de cancelar la consulta (por defecto, self.timeout).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        pool = await self.abrir()
+        async with pool.acquire(timeout=timeout) as connection:
+            filas = await connection.fetch(query, *args, timeout=timeout)
+        return [tuple(fila) for fila in filas]
+
+    async def iterar(self, query, *args, lote=500, timeout=None):
+        """
+        Itera asíncronamente las filas (tuplas) de la consulta, leyéndolas
+        del servidor por lotes con un cursor, sin cargar el resultado entero.
+
+        La conexión se mantiene ocupada hasta que termina la iteración. Si el
+        consumidor la abandona antes (break o error), la transacción del
+        cursor se deshace y la conexión vuelve al pool al cerrarse el
+        generador (``await gen.aclose()``); si se cancela la tarea, al
+        propagarse la cancelación.
+
+        Parámetros
+        ----------
+        query : str
+            Sentencia SQL (parámetros $1, $2...).
+        *args
+            Valores de los parámetros.
+        lote : int, opcional
+            Filas por viaje al servidor.
+        timeout : float, opcional
+            Segundos máximos de cada lote (por defecto, self.timeout).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        pool = await self.abrir()
+        async with pool.acquire(timeout=timeout) as connection:
+            # Los cursores de asyncpg solo existen dentro de una transacción
+            async with connection.transaction():
+                cursor = await connection.cursor(query, *args, timeout=timeout)
+                while True:
+                    filas = await cursor.fetch(lote, timeout=timeout)
+                    for fila in filas:
+                        yield tuple(fila)
+                    if len(filas) < lote:
+                        break
@@ -1,7 +1,22 @@
 #  Importación de librerías
+import re
+import sys
 import json
+import uuid
+import select
+import time
+import hashlib
 import logging
+import threading
+import weakref
+from collections import OrderedDict
 import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+
+from .cache_utils import CacheLRU
+from .columnas_utils import FORMATOS_COLUMNAS, AcumuladorColumnas, EscritorCopy, asegurar_pyarrow
+from .metricas_utils import RegistroConsultas, huella_sql, es_solo_lectura
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +31,18 @@ Clases:
 Uso:
     1. Instanciar la clase ConexPG (opcionalmente pasando un diccionario con los parámetros de conexión).
     2. Usar el método conex2PG() para comprobar la conexión o para obtener un objeto de conexión.
-    3. Usar el método queryPG() para ejecutar consultas SQL y obtener los resultados.
+    3. Usar el método queryPG() para ejecutar consultas SQL (con parámetros
+       %s y, opcionalmente, plan preparado) y obtener los resultados.
+    4. Usar ejecutar_lote() para inserciones/upserts masivos en una transacción.
+    5. Usar columnasPG()/iterar_columnasPG() para leer resultados grandes
+       como arrays NumPy por columna (o tablas Arrow), opcionalmente con COPY.
+    6. Opcionalmente, cachear consultas repetidas (queryPG(..., cache=True))
+       e invalidarlas con LISTEN/NOTIFY (escuchar()).
+    7. Opcionalmente, medir las consultas (configurar_instrumentacion() y
+       añadir_hook()) y consultar estadisticas_consultas().
+
+Con pool_max > 0 las conexiones se reutilizan (psycopg2.pool) y cada una
+guarda sus sentencias preparadas (PREPARE/EXECUTE) por texto SQL.
 
 Ejemplo:
     from lib.PG_conex import ConexPG
@@ -43,40 +69,145 @@ Ejemplo:
     pg2.conex2PG(check=True)
     resultado2 = pg2.queryPG("SELECT NOW();")
     print(resultado2)
+
+    # Parámetros, plan preparado y lotes (con pool de conexiones)
+    pg3 = ConexPG(dataJSONcon=parametros, pool_max=4)
+    pg3.queryPG("SELECT * FROM estados WHERE id = %s", (7,), preparar=True)
+    pg3.ejecutar_lote(
+        "INSERT INTO estados (id, valor) VALUES %s ON CONFLICT (id) DO UPDATE SET valor = EXCLUDED.valor",
+        [(1, 'on'), (2, 'off')],
+    )
+
+    # Resultado analítico en columnas NumPy (o pyarrow.Table con formato='arrow')
+    columnas = pg3.columnasPG("SELECT id, valor, fecha FROM medidas WHERE fecha > %s", ('2024-01-01',), copy=True)
+    columnas['valor'].mean()
+
+    # Caché de resultados invalidada por NOTIFY en el canal 'estados'
+    # (p. ej. desde un trigger: PERFORM pg_notify('estados', NEW.id::text))
+    pg3.escuchar('estados')
+    pg3.queryPG("SELECT * FROM estados WHERE id = %s", (7,), cache=True, ttl=30, canales=['estados'])
+
+    # Tiempos por consulta y registro de las lentas (> 0.5 s) con su plan
+    pg3.configurar_instrumentacion(umbral_lento=0.5, explicar=True)
+    pg3.estadisticas_consultas()['consultas']
 """
+
+# Sentencias preparadas que se mantienen por conexión (las menos usadas se liberan)
+MAX_PREPARADAS = 100
+
+# Marcadores de parámetro de psycopg2 (se interpretan también dentro de literales)
+_PATRON_MARCADORES = re.compile(r"%%|%s|%\(")
+
+# "VALUES %s" de las sentencias que se ejecutan con execute_values
+_PATRON_VALUES = re.compile(r"\bVALUES\s+%s", re.IGNORECASE)
+
+# Nombres de canal admitidos en LISTEN (identificadores simples)
+_PATRON_CANAL = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+
+def _tamaño_fila(fila):
+    """Estimación en bytes de una fila (tupla) en memoria."""
+    return sys.getsizeof(fila) + sum(sys.getsizeof(v) for v in fila)
+
+
+def _tamaño_filas(filas):
+    """Estimación en bytes de una lista de filas (tuplas) cacheada."""
+    return sys.getsizeof(filas) + sum(_tamaño_fila(fila) for fila in filas)
+
+
+def _marcar(medicion, fase):
+    """Suma a la fase de la medición el tiempo desde la marca anterior."""
+    ahora = time.perf_counter()
+    medicion[fase] += ahora - medicion['_marca']
+    medicion['_marca'] = ahora
+
+
+def _marcadores_a_posicionales(sql):
+    """
+    Convierte los marcadores %s de psycopg2 en $1, $2... (sintaxis de
+    PREPARE) y devuelve (sql, número de parámetros). No admite %(nombre)s.
+    """
+    contador = [0]
+
+    def _sustituir(m):
+        token = m.group(0)
+        if token == '%s':
+            contador[0] += 1
+            return f'${contador[0]}'
+        if token == '%%':
+            return '%'
+        if token == '%(':
+            raise Exception("Las sentencias preparadas solo admiten parámetros posicionales (%s)")
+        return token
+
+    return _PATRON_MARCADORES.sub(_sustituir, sql), contador[0]
+
+def cargar_conexion(dataJSONcon=None, conexFile="./conex/PGconex.json"):
+    """
+    Devuelve el diccionario de conexión (IP, port, user, pass, db): el que se
+    pasa o, si es None, el leído de conexFile. Si el archivo no existe, lo
+    crea con valores vacíos y lanza una excepción.
+    """
+    if dataJSONcon != None:
+        # Si se pasa un json, se carga directamente
+        return dataJSONcon
+
+    # Opening JSON file
+    try:
+        f = open(conexFile)
+    except Exception as e:
+        logger.error(e)
+        #  Si no existe, se crea el json de configuración
+        if "No such file or directory:" in str(e):
+            datajson = {
+                'IP':'',
+                'port':'',
+                'user':'',
+                'pass':'',
+                'db':''
+            }
+
+            with open(conexFile, 'w') as f:
+                json.dump(datajson, f)
+            raise Exception('No existe el archivo de conexión, se crea en el directorio')
+        raise
+
+    dataJSONcon = json.load(f)
+    f.close()
+    return dataJSONcon
+
+
 class ConexPG:
 
     # Se define la función init con los parámetros de construcción de la clase
-    def __init__(self,dataJSONcon=None):
+    def __init__(self,dataJSONcon=None, pool_max=0, timeout_pool=None):
         self.conexFile = "./conex/PGconex.json"
-        
-        if dataJSONcon == None:
+        self.conexJSON = cargar_conexion(dataJSONcon, self.conexFile)
+        # Pool de conexiones (pool_max > 0) y sentencias preparadas por conexión.
+        # getconn() de psycopg2 no espera: el semáforo hace que, con todas las
+        # conexiones en uso, se espere (hasta timeout_pool s) a que se libere una.
+        self.pool_max = pool_max
+        self.timeout_pool = timeout_pool
+        self._pool = None
+        self._semaforo = threading.BoundedSemaphore(pool_max) if pool_max else None
+        self._lock = threading.Lock()
+        self._preparadas = weakref.WeakKeyDictionary()
+        # Caché de resultados (ver configurar_cache_consultas) y escucha
+        # LISTEN/NOTIFY que la invalida por canal (ver escuchar)
+        self.cache_consultas = None
+        self._lock_cache = threading.Lock()
+        self._dependencias = {}
+        self._generacion = 0
+        self._canales = set()
+        self._al_notificar = None
+        self._escucha = None
+        self.notificaciones = 0
+        # Instrumentación de consultas (ver configurar_instrumentacion y añadir_hook)
+        self.registro_consultas = None
+        self.explicar = False
+        self.intervalo_explicar = 300
+        self._hooks = []
 
-            # Opening JSON file
-            try:
-                f = open(self.conexFile)
-            except Exception as e:
-                logger.error(e)
-                #  Si no existe, se crea el json de configuración
-                if "No such file or directory:" in str(e):
-                    datajson = {
-                        'IP':'',
-                        'port':'',
-                        'user':'',
-                        'pass':'',
-                        'db':''
-                    }
-                    
-                    with open(self.conexFile, 'w') as f:
-                        json.dump(datajson, f)
-                    raise Exception('No existe el archivo de conexión, se crea en el directorio')
-
-            dataJSONcon = json.load(f)
-            f.close()
-            self.conexJSON = dataJSONcon
-        else:
-            # Si se pasa un json, se carga directamente
-            self.conexJSON = dataJSONcon
     #  Se define un string  para la clase. Esto devolverá la información del objeto BTA instanciado
     def __str__(self):
         return f"archivo de conexión: {self.conexFile}"
@@ -99,17 +230,9 @@ class ConexPG:
             Objeto de conexión (check=False) o mensaje de confirmación (check=True).
         """
 
-        db_params = {
-            "host": self.conexJSON["IP"],
-            "database": self.conexJSON["db"],
-            "user": self.conexJSON["user"],
-            "password": self.conexJSON["pass"],
-            "port": self.conexJSON["port"],
-        }
-
         try:
             # Estableciendo conexión a la base de datos
-            connection = psycopg2.connect(**db_params)
+            connection = psycopg2.connect(**self._parametros())
         except (Exception, psycopg2.Error) as error:
             logger.error(f"Error al conectar a la base de datos: {error}")
             raise Exception(f"Error al conectar a la base de datos: {error}")
@@ -122,20 +245,705 @@ class ConexPG:
 
         return connection
 
+    def _parametros(self):
+        return {
+            "host": self.conexJSON["IP"],
+            "database": self.conexJSON["db"],
+            "user": self.conexJSON["user"],
+            "password": self.conexJSON["pass"],
+            "port": self.conexJSON["port"],
+        }
+
+    def _obtener_conexion(self):
+        """
+        Conexión del pool (si pool_max > 0) o una nueva con conex2PG. Con pool,
+        si todas las conexiones están en uso espera a que se libere una (hasta
+        timeout_pool segundos; None = sin límite).
+        """
+        if not self.pool_max:
+            return self.conex2PG()
+        if not self._semaforo.acquire(timeout=self.timeout_pool):
+            raise Exception(f"No se ha liberado ninguna conexión del pool en {self.timeout_pool} s")
+        try:
+            with self._lock:
+                if self._pool is None:
+                    try:
+                        self._pool = psycopg2.pool.ThreadedConnectionPool(1, self.pool_max, **self._parametros())
+                    except (Exception, psycopg2.Error) as error:
+                        logger.error(f"Error al conectar a la base de datos: {error}")
+                        raise Exception(f"Error al conectar a la base de datos: {error}")
+                pool = self._pool
+            return pool.getconn()
+        except BaseException:
+            self._semaforo.release()
+            raise
+
+    def _liberar_conexion(self, connection, error=False):
+        """Devuelve la conexión al pool (deshaciendo la transacción si hubo error) o la cierra."""
+        if not self.pool_max:
+            connection.close()
+            return
+        if self._pool is None:
+            # El pool se cerró (cerrar()) mientras la conexión estaba en uso
+            try:
+                connection.close()
+            finally:
+                self._semaforo.release()
+            return
+        if error and not connection.closed:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                pass
+        # Una conexión rota se descarta (y con ella sus sentencias preparadas)
+        try:
+            self._pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            self._semaforo.release()
+
+    def cerrar(self):
+        """Detiene la escucha LISTEN y cierra todas las conexiones del pool."""
+        self.dejar_de_escuchar()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    def _ejecutar_preparada(self, connection, cursor, query, params):
+        """EXECUTE de la sentencia preparada de query en esta conexión (PREPARE la primera vez)."""
+        preparadas = self._preparadas.setdefault(connection, OrderedDict())
+        if query in preparadas:
+            preparadas.move_to_end(query)
+            nombre, n = preparadas[query]
+        else:
+            sql, n = _marcadores_a_posicionales(query)
+            nombre = 'pyg_' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+            cursor.execute(f"PREPARE {nombre} AS {sql}")
+            preparadas[query] = (nombre, n)
+            if len(preparadas) > MAX_PREPARADAS:
+                _, (antigua, _) = preparadas.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {antigua}")
+
+        params = tuple(params or ())
+        if len(params) != n:
+            raise Exception(f"La sentencia espera {n} parámetros y se han pasado {len(params)}")
+        marcadores = ', '.join(['%s'] * n)
+        cursor.execute(f"EXECUTE {nombre} ({marcadores})" if n else f"EXECUTE {nombre}", params)
+
     # Función para mandar las sentencias SQL
-    def queryPG(self, query):
+    def queryPG(self, query, params=None, preparar=False, cache=False, ttl=None, canales=None):
+        """
+        Ejecuta una sentencia SQL y devuelve sus filas (lista vacía si no
+        devuelve ninguna, p. ej. un INSERT sin RETURNING).
+
+        Parámetros
+        ----------
+        query : str
+            Sentencia SQL con marcadores %s o %(nombre)s de psycopg2.
+        params : tuple, list o dict, opcional
+            Valores de los marcadores (los adapta psycopg2; nunca formatees
+            los valores en el texto SQL).
+        preparar : bool, opcional
+            Si es True, la sentencia se prepara (PREPARE) una vez por conexión
+            y se reutiliza su plan (EXECUTE) en las llamadas siguientes con el
+            mismo texto. Solo marcadores %s. Tiene sentido con pool_max > 0.
+        cache : bool, opcional
+            Si es True, el resultado se guarda en la caché de consultas (clave:
+            texto SQL + parámetros) y las llamadas idénticas siguientes lo
+            devuelven sin ir al servidor. Solo para lecturas: las sentencias
+            que no son SELECT/WITH de solo lectura se ejecutan siempre.
+        ttl : float, opcional
+            Segundos de vida de esta entrada (por defecto, el ttl de la caché).
+        canales : str o list de str, opcional
+            Canales NOTIFY de los que depende el resultado: una notificación en
+            cualquiera de ellos (ver escuchar) lo expulsa de la caché.
+        """
+        if not cache:
+            return self._consulta(query, params, preparar)
+        if not es_solo_lectura(huella_sql(query)[0]):
+            logger.warning("cache=True ignorado en una sentencia que no es de solo lectura")
+            return self._consulta(query, params, preparar)
+
+        if self.cache_consultas is None:
+            self.configurar_cache_consultas()
+        clave = (query, repr(params))
+        filas = self.cache_consultas.obtener(clave)
+        if filas is not None:
+            return list(filas)
+
+        with self._lock_cache:
+            generacion = self._generacion
+        filas = self._consulta(query, params, preparar)
+        self._guardar_en_cache(clave, tuple(filas), ttl, canales, generacion)
+        return filas
 
-        # Se realiza la conexión para almacenar el contenido de las tablas en objetos python
-        connection = self.conex2PG()
+    def _consulta(self, query, params=None, preparar=False):
+        """Ejecuta la sentencia en una conexión (del pool o nueva) y devuelve sus filas."""
+        medicion = self._medicion(query, 'queryPG')
+        returnQuery = None
+        error = True
         try:
+            # Se realiza la conexión para almacenar el contenido de las tablas en objetos python
+            connection = self._obtener_conexion()
+            if medicion is not None:
+                _marcar(medicion, 'conexion')
+            try:
+                cursor = connection.cursor()
+                # Ejecuta la sentencia SQL
+                if preparar:
+                    self._ejecutar_preparada(connection, cursor, query, params)
+                elif params is not None:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                if medicion is not None:
+                    _marcar(medicion, 'ejecucion')
+                returnQuery = cursor.fetchall() if cursor.description is not None else []
+                connection.commit()
+                cursor.close()
+                error = False
+            finally:
+                self._liberar_conexion(connection, error)
+        finally:
+            if medicion is not None:
+                if returnQuery is not None:
+                    _marcar(medicion, 'lectura')
+                    medicion['filas'] = len(returnQuery)
+                    medicion['bytes'] = _tamaño_filas(returnQuery)
+                self._registrar(medicion, params, error)
+
+        return returnQuery
+
+    def configurar_instrumentacion(self, umbral_lento=None, explicar=False, ventana=1000, intervalo_explicar=300):
+        """
+        Activa (o reinicia) el registro de métricas de las consultas: tiempo
+        de conexión (espera del pool), ejecución y lectura, filas y bytes
+        estimados, agregados por huella de SQL normalizado con un histograma
+        de latencias de las últimas ventana ejecuciones.
+
+        Parámetros
+        ----------
+        umbral_lento : float, opcional
+            Segundos a partir de los que una consulta se registra como lenta
+            (y se avisa con logger.warning). None = sin registro de lentas.
+        explicar : bool, opcional
+            Si es True, de las lecturas lentas (SELECT/WITH) se captura el plan
+            con ``EXPLAIN (ANALYZE, BUFFERS)``, lo que vuelve a ejecutarlas en
+            una transacción que se deshace.
+        ventana : int, opcional
+            Muestras por huella de los histogramas.
+        intervalo_explicar : float, opcional
+            Segundos durante los que no se repite el EXPLAIN de una misma huella.
+        """
+        self.registro_consultas = RegistroConsultas(umbral_lento=umbral_lento, ventana=ventana)
+        self.explicar = explicar
+        self.intervalo_explicar = intervalo_explicar
+
+    def añadir_hook(self, funcion):
+        """
+        Registra funcion(evento), que se llama al terminar cada consulta con
+        un dict: metodo, sql (normalizado), huella, conexion, ejecucion,
+        lectura y total (segundos), filas, bytes, error y lenta.
+        """
+        self._hooks.append(funcion)
+
+    def quitar_hook(self, funcion):
+        """Elimina un hook registrado con añadir_hook."""
+        self._hooks.remove(funcion)
+
+    def estadisticas_consultas(self):
+        """
+        Métricas por huella ({'consultas': {huella: {...}}, 'lentas': [...]})
+        o dict vacío si no se ha llamado a configurar_instrumentacion.
+        """
+        if self.registro_consultas is None:
+            return {}
+        return self.registro_consultas.estadisticas()
+
+    def reiniciar_estadisticas(self):
+        """Vacía las métricas acumuladas y el registro de consultas lentas."""
+        if self.registro_consultas is not None:
+            self.registro_consultas.limpiar()
+
+    def _medicion(self, query, metodo):
+        """Medición en curso de una consulta, o None si no hay instrumentación ni hooks."""
+        if self.registro_consultas is None and not self._hooks:
+            return None
+        inicio = time.perf_counter()
+        return {
+            'metodo': metodo, '_query': query, '_inicio': inicio, '_marca': inicio,
+            'conexion': 0.0, 'ejecucion': 0.0, 'lectura': 0.0, 'filas': None, 'bytes': None,
+        }
+
+    def _registrar(self, medicion, params, error):
+        """Cierra la medición: la agrega, registra las lentas (con su plan) y llama a los hooks."""
+        sql, huella = huella_sql(medicion['_query'])
+        evento = {k: v for k, v in medicion.items() if not k.startswith('_')}
+        evento.update(sql=sql, huella=huella, error=bool(error),
+                      total=time.perf_counter() - medicion['_inicio'])
+        registro = self.registro_consultas
+        evento['lenta'] = registro.registrar(evento) if registro is not None else False
+        logger.debug(
+            f"[{huella}] {evento['metodo']}: {evento['total'] * 1000:.1f} ms "
+            f"(conexión {evento['conexion'] * 1000:.1f} ms), {evento['filas']} filas"
+        )
+
+        if evento['lenta'] and not error:
+            plan = None
+            if self.explicar and es_solo_lectura(sql) and not registro.plan_reciente(huella, self.intervalo_explicar):
+                plan = self._explicar(medicion['_query'], params)
+            registro.registrar_lenta(evento, plan)
+            logger.warning(
+                f"Consulta lenta [{huella}] {evento['total']:.3f} s, {evento['filas']} filas: {sql}"
+                + (f"\n{plan}" if plan else "")
+            )
+
+        for hook in list(self._hooks):
+            try:
+                hook(evento)
+            except Exception as error_hook:
+                logger.error(f"Error en el hook de instrumentación {hook!r}: {error_hook}")
+
+    def _explicar(self, query, params):
+        """Plan de EXPLAIN (ANALYZE, BUFFERS) de la consulta, en una transacción que se deshace."""
+        connection = None
+        try:
+            connection = self._obtener_conexion()
             cursor = connection.cursor()
-            # Ejecuta la sentencia SQL
-            cursor.execute(query)
-            returnQuery = cursor.fetchall()
-            connection.commit()
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query.strip().rstrip(';')}", params)
+            plan = "\n".join(fila[0] for fila in cursor.fetchall())
             cursor.close()
+            return plan
+        except Exception as error:
+            logger.warning(f"No se pudo obtener el plan de la consulta lenta: {error}")
+            return None
         finally:
+            if connection is not None:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    pass
+                self._liberar_conexion(connection)
+
+    def configurar_cache_consultas(self, max_bytes=64 * 1024 * 1024, max_entradas=None, ttl=60):
+        """
+        Activa (o reinicia) la caché LRU de resultados de queryPG(..., cache=True).
+
+        Parámetros
+        ----------
+        max_bytes : int, opcional
+            Presupuesto de memoria (tamaño estimado de las filas cacheadas).
+        max_entradas : int, opcional
+            Número máximo de consultas cacheadas.
+        ttl : float, opcional
+            Segundos de vida por defecto de cada resultado (None = sin caducidad;
+            solo lo expulsan la LRU y las notificaciones).
+        """
+        with self._lock_cache:
+            self.cache_consultas = CacheLRU(
+                max_bytes=max_bytes, max_entradas=max_entradas, medir=_tamaño_filas, ttl=ttl
+            )
+            self._dependencias = {}
+            self._generacion += 1
+
+    def _guardar_en_cache(self, clave, filas, ttl, canales, generacion):
+        """
+        Guarda el resultado y lo asocia a sus canales, salvo que haya llegado
+        una invalidación mientras se ejecutaba la consulta (el resultado
+        podría ser anterior a la escritura notificada).
+        """
+        canales = [canales] if isinstance(canales, str) else list(canales or ())
+        with self._lock_cache:
+            if generacion != self._generacion:
+                return
+            if not self.cache_consultas.guardar(clave, filas, ttl=ttl):
+                return
+            for canal in canales:
+                claves = self._dependencias.setdefault(canal, set())
+                claves.add(clave)
+                # Se olvidan las claves que ya expulsó la LRU o el ttl
+                if len(claves) > 2 * max(len(self.cache_consultas), 64):
+                    claves.intersection_update(
+                        [k for k in claves if k in self.cache_consultas]
+                    )
+
+    def invalidar_cache_consultas(self, canal=None):
+        """
+        Descarta los resultados cacheados: todos o, si se indica canal, solo
+        los que dependen de él. Devuelve el número de entradas eliminadas.
+        """
+        with self._lock_cache:
+            self._generacion += 1
+            if self.cache_consultas is None:
+                return 0
+            if canal is None:
+                n = len(self.cache_consultas)
+                self.cache_consultas.limpiar()
+                self._dependencias = {}
+                return n
+            return sum(self.cache_consultas.invalidar(clave) for clave in self._dependencias.pop(canal, ()))
+
+    def estadisticas_cache_consultas(self):
+        """Aciertos, fallos, ratio, entradas, bytes... de la caché, canales escuchados y notificaciones recibidas."""
+        estadisticas = self.cache_consultas.estadisticas() if self.cache_consultas is not None else {}
+        estadisticas['canales'] = sorted(self._canales)
+        estadisticas['notificaciones'] = self.notificaciones
+        return estadisticas
+
+    def escuchar(self, canales, al_notificar=None, intervalo=1.0):
+        """
+        Escucha (LISTEN) los canales indicados en un hilo con una conexión
+        propia en autocommit. Cada NOTIFY recibido expulsa de la caché los
+        resultados que dependen de ese canal, sin sondear la base de datos.
+
+        Puede llamarse varias veces para añadir canales. Si la conexión se
+        pierde, se reconecta y se vacía la caché (pudieron perderse
+        notificaciones).
+
+        Parámetros
+        ----------
+        canales : str o list de str
+            Nombres de canal (identificadores: letras, dígitos, _ y $).
+        al_notificar : callable, opcional
+            Función (canal, payload) llamada tras cada notificación, p. ej.
+            para invalidar también otras cachés.
+        intervalo : float, opcional
+            Segundos máximos de espera entre comprobaciones de parada.
+        """
+        canales = [canales] if isinstance(canales, str) else list(canales)
+        for canal in canales:
+            if not _PATRON_CANAL.match(canal):
+                raise Exception(f"Nombre de canal no válido: {canal!r}")
+        with self._lock_cache:
+            self._canales.update(canales)
+            if al_notificar is not None:
+                self._al_notificar = al_notificar
+            if self._escucha is not None and self._escucha[0].is_alive():
+                return
+            parar = threading.Event()
+            hilo = threading.Thread(
+                target=self._bucle_escucha, args=(parar, intervalo), name="ConexPG-LISTEN", daemon=True
+            )
+            self._escucha = (hilo, parar)
+        hilo.start()
+
+    def dejar_de_escuchar(self, timeout=5):
+        """Detiene el hilo de escucha y cierra su conexión."""
+        with self._lock_cache:
+            escucha, self._escucha = self._escucha, None
+            self._canales = set()
+        if escucha is not None:
+            hilo, parar = escucha
+            parar.set()
+            if hilo is not threading.current_thread():
+                hilo.join(timeout)
+
+    def _bucle_escucha(self, parar, intervalo):
+        """Hilo de escucha: LISTEN de los canales y espera de notificaciones con select."""
+        connection = None
+        escuchados = set()
+        while not parar.is_set():
+            try:
+                if connection is None:
+                    connection = self.conex2PG()
+                    connection.autocommit = True
+                    escuchados = set()
+                with self._lock_cache:
+                    nuevos = self._canales - escuchados
+                if nuevos:
+                    cursor = connection.cursor()
+                    for canal in sorted(nuevos):
+                        cursor.execute(f'LISTEN "{canal}"')
+                    cursor.close()
+                    escuchados |= nuevos
+                    # Lo cacheado antes de escuchar pudo perderse notificaciones
+                    for canal in nuevos:
+                        self.invalidar_cache_consultas(canal)
+                if select.select([connection], [], [], intervalo) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notificacion = connection.notifies.pop(0)
+                    self._notificacion(notificacion.channel, notificacion.payload)
+            except Exception as error:
+                logger.warning(f"Escucha LISTEN interrumpida: {error}; se reintenta")
+                self.invalidar_cache_consultas()
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                    connection = None
+                parar.wait(intervalo)
+        if connection is not None:
             connection.close()
 
-        return returnQuery
+    def _notificacion(self, canal, payload=''):
+        """Procesa un NOTIFY: invalida las entradas del canal y avisa a al_notificar."""
+        self.notificaciones += 1
+        n = self.invalidar_cache_consultas(canal)
+        logger.debug(f"NOTIFY {canal} ({payload!r}): {n} resultados invalidados")
+        if self._al_notificar is not None:
+            try:
+                self._al_notificar(canal, payload)
+            except Exception as error:
+                logger.error(f"Error en al_notificar({canal!r}): {error}")
+
+    def iterarPG(self, query, params=None, lote=2000):
+        """
+        Itera las filas de una consulta con un cursor con nombre (en el
+        servidor), que las envía en bloques de lote filas sin cargar el
+        resultado completo en memoria.
+
+        La conexión queda ocupada hasta que termina (o se cierra) la
+        iteración.
+        """
+        medicion = self._medicion(query, 'iterarPG')
+        error = True
+        try:
+            connection = self._obtener_conexion()
+            if medicion is not None:
+                _marcar(medicion, 'conexion')
+            try:
+                cursor = connection.cursor(name=f"pyg_{uuid.uuid4().hex}")
+                cursor.itersize = int(lote)
+                cursor.execute(query, params)
+                if medicion is None:
+                    for fila in cursor:
+                        yield fila
+                else:
+                    # Solo se mide la lectura, no el tiempo del consumidor entre filas
+                    _marcar(medicion, 'ejecucion')
+                    medicion['filas'] = medicion['bytes'] = 0
+                    filas = iter(cursor)
+                    while True:
+                        medicion['_marca'] = time.perf_counter()
+                        fila = next(filas, None)
+                        _marcar(medicion, 'lectura')
+                        if fila is None:
+                            break
+                        medicion['filas'] += 1
+                        medicion['bytes'] += _tamaño_fila(fila)
+                        yield fila
+                cursor.close()
+                connection.commit()
+                error = False
+            finally:
+                self._liberar_conexion(connection, error)
+        finally:
+            if medicion is not None:
+                self._registrar(medicion, params, error)
+
+    def _lotes_filas(self, query, params=None, lote=10000):
+        """
+        Genera (cursor.description, filas) por lotes con un cursor con
+        nombre. Solo se generan lotes con filas, salvo un único lote vacío si
+        el resultado no tiene ninguna (para conocer sus columnas).
+        """
+        medicion = self._medicion(query, 'columnasPG')
+        error = True
+        try:
+            connection = self._obtener_conexion()
+            if medicion is not None:
+                _marcar(medicion, 'conexion')
+                medicion['filas'] = medicion['bytes'] = 0
+            try:
+                cursor = connection.cursor(name=f"pyg_{uuid.uuid4().hex}")
+                cursor.execute(query, params)
+                if medicion is not None:
+                    _marcar(medicion, 'ejecucion')
+                primero = True
+                while True:
+                    filas = cursor.fetchmany(lote)
+                    if medicion is not None:
+                        _marcar(medicion, 'lectura')
+                        medicion['filas'] += len(filas)
+                        medicion['bytes'] += _tamaño_filas(filas)
+                    if filas or primero:
+                        yield cursor.description, filas
+                        if medicion is not None:
+                            medicion['_marca'] = time.perf_counter()
+                    primero = False
+                    if len(filas) < lote:
+                        break
+                cursor.close()
+                connection.commit()
+                error = False
+            finally:
+                self._liberar_conexion(connection, error)
+        finally:
+            if medicion is not None:
+                self._registrar(medicion, params, error)
+
+    def columnasPG(self, query, params=None, formato='numpy', lote=10000, copy=False):
+        """
+        Ejecuta una consulta y devuelve el resultado por columnas, volcando
+        los lotes de filas en arrays NumPy preasignados (sin construir la
+        lista completa de tuplas de queryPG).
+
+        El dtype de cada columna se deduce de su tipo en PostgreSQL (enteros,
+        reales, numeric -> float64, boolean, date, timestamp/timestamptz en UTC);
+        el resto de tipos quedan como object. Ver AcumuladorColumnas para el
+        tratamiento de nulos.
+
+        Parámetros
+        ----------
+        query : str
+            Sentencia SELECT con marcadores %s o %(nombre)s de psycopg2.
+        params : tuple, list o dict, opcional
+            Valores de los marcadores.
+        formato : str, opcional
+            'numpy' (dict nombre -> numpy.ndarray) o 'arrow' (pyarrow.Table,
+            requiere pyarrow).
+        lote : int, opcional
+            Filas por viaje al servidor (y por volcado a los arrays).
+        copy : bool, opcional
+            Si es True, el resultado se transfiere con ``COPY (...) TO STDOUT``
+            en formato de texto y se analiza por lotes: más rápido para
+            resultados muy grandes, pero las columnas object llegan como str.
+
+        Retorna
+        -------
+        dict o pyarrow.Table
+        """
+        if formato not in FORMATOS_COLUMNAS:
+            raise Exception(f"Formato no válido: {formato!r}; usa uno de {FORMATOS_COLUMNAS}")
+        if formato == 'arrow':
+            asegurar_pyarrow()
+        if copy:
+            acumulador = self._columnas_copy(query, params, lote)
+        else:
+            acumulador = None
+            for descripcion, filas in self._lotes_filas(query, params, lote):
+                if acumulador is None:
+                    acumulador = AcumuladorColumnas(descripcion, capacidad=max(len(filas), 1))
+                acumulador.añadir_filas(filas)
+        logger.debug(f"{acumulador.n} filas leídas en columnas ({formato}, copy={copy})")
+        return acumulador.resultado(formato)
+
+    def iterar_columnasPG(self, query, params=None, formato='numpy', lote=10000):
+        """
+        Itera el resultado por lotes de hasta lote filas, cada uno ya en
+        columnas: dict nombre -> numpy.ndarray ('numpy') o pyarrow.RecordBatch
+        ('arrow'). Usa un cursor con nombre, como iterarPG.
+        """
+        if formato not in FORMATOS_COLUMNAS:
+            raise Exception(f"Formato no válido: {formato!r}; usa uno de {FORMATOS_COLUMNAS}")
+        if formato == 'arrow':
+            asegurar_pyarrow()
+        for descripcion, filas in self._lotes_filas(query, params, lote):
+            if not filas:
+                continue
+            acumulador = AcumuladorColumnas(descripcion, capacidad=len(filas))
+            acumulador.añadir_filas(filas)
+            yield acumulador.a_arrow() if formato == 'arrow' else acumulador.a_numpy()
+
+    def _columnas_copy(self, query, params, lote):
+        """Lee el resultado con COPY ... TO STDOUT en un AcumuladorColumnas."""
+        medicion = self._medicion(query, 'columnasPG')
+        escritor = None
+        error = True
+        try:
+            connection = self._obtener_conexion()
+            if medicion is not None:
+                _marcar(medicion, 'conexion')
+            try:
+                cursor = connection.cursor()
+                codificacion = psycopg2.extensions.encodings.get(connection.encoding, 'utf-8')
+                sql = query
+                if params is not None:
+                    sql = cursor.mogrify(query, params)
+                    sql = sql.decode(codificacion) if isinstance(sql, bytes) else sql
+                sql = sql.strip().rstrip(';')
+                # Fechas con zona en UTC, para guardarlas sin zona como en la
+                # lectura por filas, y fechas e intervalos en formato ISO, que
+                # es el que se analiza (independiente de la configuración)
+                cursor.execute("SET LOCAL TimeZone TO 'UTC'")
+                cursor.execute("SET LOCAL DateStyle TO 'ISO, YMD'")
+                cursor.execute("SET LOCAL IntervalStyle TO 'postgres'")
+                # Tipos de las columnas sin leer filas
+                cursor.execute(f"SELECT * FROM ({sql}) AS pyg_columnas LIMIT 0")
+                acumulador = AcumuladorColumnas(cursor.description, capacidad=lote)
+                escritor = EscritorCopy(acumulador, lote=lote, codificacion=codificacion)
+                if medicion is not None:
+                    _marcar(medicion, 'ejecucion')
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT", escritor)
+                escritor.cerrar()
+                cursor.close()
+                connection.commit()
+                error = False
+            finally:
+                self._liberar_conexion(connection, error)
+        finally:
+            if medicion is not None:
+                _marcar(medicion, 'lectura')
+                if escritor is not None:
+                    medicion['filas'] = escritor.acumulador.n
+                    medicion['bytes'] = escritor.bytes
+                self._registrar(medicion, params, error)
+        return acumulador
+
+    def ejecutar_lote(self, query, filas, tamaño_pagina=1000, plantilla=None, devolver=False):
+        """
+        Ejecuta una sentencia para muchas filas en una sola transacción,
+        agrupándolas en páginas de tamaño_pagina para reducir los viajes al
+        servidor.
+
+        Si la sentencia contiene ``VALUES %s`` se usa ``execute_values`` (un
+        único INSERT multi-fila por página, ideal para inserciones y upserts
+        con ON CONFLICT); si no, ``execute_batch`` (varias sentencias por
+        viaje, p. ej. UPDATE ... WHERE id = %s).
+
+        Parámetros
+        ----------
+        query : str
+            Sentencia SQL con ``VALUES %s`` o con marcadores %s por fila.
+        filas : iterable de tuplas
+            Valores de cada fila.
+        tamaño_pagina : int, opcional
+            Filas por viaje al servidor.
+        plantilla : str, opcional
+            Plantilla de fila de execute_values (p. ej. '(%s, ST_GeomFromText(%s, 4326))').
+        devolver : bool, opcional
+            Si es True (solo con VALUES %s), devuelve las filas de RETURNING.
+
+        Retorna
+        -------
+        int o list
+            Número de filas enviadas, o las filas de RETURNING si devolver=True.
+        """
+        filas = list(filas)
+        if not filas:
+            return [] if devolver else 0
+        con_values = bool(_PATRON_VALUES.search(query))
+        if devolver and not con_values:
+            raise Exception("devolver=True requiere una sentencia con 'VALUES %s'")
+
+        medicion = self._medicion(query, 'ejecutar_lote')
+        error = True
+        try:
+            connection = self._obtener_conexion()
+            if medicion is not None:
+                _marcar(medicion, 'conexion')
+            try:
+                cursor = connection.cursor()
+                if con_values:
+                    resultado = psycopg2.extras.execute_values(
+                        cursor, query, filas, template=plantilla, page_size=tamaño_pagina, fetch=devolver
+                    )
+                else:
+                    psycopg2.extras.execute_batch(cursor, query, filas, page_size=tamaño_pagina)
+                    resultado = None
+                connection.commit()
+                cursor.close()
+                error = False
+            finally:
+                self._liberar_conexion(connection, error)
+        finally:
+            if medicion is not None:
+                _marcar(medicion, 'ejecucion')
+                medicion['filas'] = len(filas)
+                self._registrar(medicion, None, error)
 
+        logger.debug(f"Lote de {len(filas)} filas ejecutado en páginas de {tamaño_pagina}")
+        return resultado if devolver else len(filas)
@@ -0,0 +1,769 @@
+# Documentación de referencia:
+# https://postgis.net/docs/reference.html
+# https://www.psycopg.org/docs/usage.html#server-side-cursors
+
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Intenta importar GDAL/OGR. Solo se necesita para a_fuente_vector y las
+# exportaciones que no son GeoJSON (ver _asegurar_gdal); la lectura y el
+# GeoJSON se resuelven por completo en PostGIS.
+try:
+    from osgeo import ogr, osr
+except Exception:  # pragma: no cover - depende del entorno
+    # El error concreto se gestiona de forma centralizada en gdal_utils.
+    ogr = osr = None
+
+from .gdal_utils import asegurar_gdal, normalizar_epsg
+from .PG_conex import ConexPG
+from .cache_utils import CacheLRU
+from .teselas_utils import LATITUD_MAXIMA, limites_tesela_3857, lonlat_a_3857, validar_tesela
+
+
+def _asegurar_gdal():
+    """Lanza un error claro si GDAL/OGR no está disponible (para FuenteDatosPostGIS)."""
+    asegurar_gdal("FuenteDatosPostGIS")
+
+
+# Conexiones del pool de la ConexPG que se crea cuando no se pasa una
+POOL_POR_DEFECTO = 4
+
+# Tramos por lado en que se densifica el sobre antes de llevarlo a un SRID
+# distinto de 3857/4326 (sus lados dejan de ser rectos al reproyectarlos)
+TRAMOS_SOBRE = 32
+
+# Tipos de PostgreSQL (information_schema.columns.data_type) por tipo JSON simple
+_TIPOS_ENTEROS = ('smallint', 'integer', 'bigint')
+_TIPOS_REALES = ('real', 'double precision', 'numeric')
+
+# Tipos de geometry_columns.type por constante OGR (el resto, wkbUnknown)
+_TIPOS_GEOMETRIA = {
+    'POINT': 'wkbPoint',
+    'LINESTRING': 'wkbLineString',
+    'POLYGON': 'wkbPolygon',
+    'MULTIPOINT': 'wkbMultiPoint',
+    'MULTILINESTRING': 'wkbMultiLineString',
+    'MULTIPOLYGON': 'wkbMultiPolygon',
+    'GEOMETRYCOLLECTION': 'wkbGeometryCollection',
+}
+
+# Alias de las columnas auxiliares en las consultas generadas
+_ALIAS_GEOM = '__geom'
+_ALIAS_ID = '__id'
+
+
+def _identificador(nombre):
+    """Entrecomilla un identificador SQL (tabla, esquema o columna)."""
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _tipo_json(data_type):
+    """Traduce un tipo de PostgreSQL a un tipo JSON simple (como en FuenteDatosVector)."""
+    if data_type in _TIPOS_ENTEROS:
+        return 'integer'
+    if data_type in _TIPOS_REALES:
+        return 'number'
+    return 'string'
+
+
+class FuenteDatosPostGIS:
+    """
+    Tabla PostGIS servida con la misma interfaz que ``FuenteDatosVector``
+    (``leer``, ``MRE_datos``, ``obtener_objeto_porID``, ``leer_pagina``,
+    ``exportar``), pero sin copiar la tabla a memoria.
+
+    Cada capa es una consulta pendiente sobre la tabla (bbox, filtros,
+    columnas y página) que se traduce a SQL al exportar:
+
+    - el bbox se convierte en ``geom && ST_Transform(ST_MakeEnvelope(...))``,
+      de modo que PostGIS usa el índice GiST (densificado con ST_Segmentize
+      si la columna no está en 3857 ni 4326);
+    - los filtros van al WHERE (los dict, como parámetros de psycopg2);
+    - la paginación es por clave (``WHERE id > último ORDER BY id LIMIT n``);
+    - el GeoJSON se construye en el servidor con ``ST_AsGeoJSON`` y
+      ``json_build_object`` (una sola fila de texto), y el resto de formatos
+      leen las geometrías como WKB binario con un cursor en el servidor.
+
+    Atributos:
+    ----------
+    dato : str
+        Tabla, como 'tabla' o 'esquema.tabla'.
+    conexion : ConexPG
+        Conexión usada para las consultas.
+    datasource : dict
+        Metadatos de la tabla tras ``leer`` (columnas, geometría, SRID y
+        clave primaria).
+    """
+
+    def __init__(self, dato, conexion=None, campo_geometria=None, campo_id=None):
+        """
+        Parámetros
+        ----------
+        dato : str
+            Tabla, como 'tabla' o 'esquema.tabla' (por defecto, esquema public).
+        conexion : ConexPG o dict, opcional
+            Conexión o parámetros de conexión (dataJSONcon). Si es None, se lee
+            ``./conex/PGconex.json`` como en ConexPG. La conexión que se crea
+            aquí usa un pool de ``POOL_POR_DEFECTO`` conexiones.
+        campo_geometria : str, opcional
+            Columna de geometría (por defecto, la primera de geometry_columns).
+        campo_id : str, opcional
+            Columna única para ``obtener_objeto_porID`` y la paginación (por
+            defecto, la clave primaria).
+        """
+        self.dato = dato
+        if conexion is None or isinstance(conexion, dict):
+            conexion = ConexPG(dataJSONcon=conexion, pool_max=POOL_POR_DEFECTO)
+        self.conexion = conexion
+        esquema, _, tabla = dato.rpartition('.')
+        self.esquema = esquema or 'public'
+        self.tabla = tabla
+        self.campo_geometria = campo_geometria
+        self.campo_id = campo_id
+        self.datasource = None
+        self.multiLayers = False
+        self.capas = {}
+        # Caché de teselas MVT con caducidad y métricas de las consultas
+        # (ver configurar_cache_teselas y estadisticas_teselas)
+        self.cache_teselas = None
+        self._lock_metricas = threading.Lock()
+        self._metricas_teselas = {'consultas': 0, 'tiempo_total': 0.0, 'tiempo_max': 0.0, 'ultimo': None}
+
+    def leer(self, capa=None, EPSG_Entrada=None, bbox=None, filtro=None, columnas=None,
+             max_features=None, EPSG_MRE=4326):
+        """
+        Lee los metadatos de la tabla (columnas, columna de geometría, SRID y
+        clave primaria) y crea la capa con los filtros indicados. No lee
+        ningún objeto: la consulta se ejecuta al exportar.
+
+        Parámetros
+        ----------
+        capa : str, opcional
+            Nombre de la capa (por defecto, el de la tabla).
+        EPSG_Entrada : int o str, opcional
+            EPSG que se asigna a las geometrías si la columna no tiene SRID.
+        bbox : list[float], opcional
+            Bounding box [minx, miny, maxx, maxy] en EPSG_MRE.
+        filtro : str, tuple o dict, opcional
+            Cláusula WHERE en SQL (los ``%`` se escapan, p. ej. en LIKE), una
+            tupla (sql, params) con marcadores %s, o dict {columna: valor o
+            lista de valores} (se envía con parámetros).
+        columnas : list[str], opcional
+            Columnas que se leen (por defecto, todas).
+        max_features : int, opcional
+            Número máximo de objetos.
+        EPSG_MRE : int o str, opcional
+            EPSG del bbox.
+
+        Retorna
+        -------
+        dict
+            Metadatos de la tabla.
+        """
+        self.datasource = self._metadatos_tabla(EPSG_Entrada)
+
+        nombre = capa or self.tabla
+        self.capas = {nombre: self._estado_vacio()}
+        estado = self.capas[nombre]
+        if bbox is not None:
+            estado['bbox'].append((list(bbox), normalizar_epsg(EPSG_MRE)))
+        if filtro:
+            estado['filtros'].append(self._filtro(filtro))
+        if columnas is not None:
+            estado['columnas'] = self._comprobar_columnas(columnas)
+        if max_features is not None:
+            estado['limite'] = int(max_features)
+        return self.datasource
+
+    @staticmethod
+    def _estado_vacio():
+        return {'bbox': [], 'filtros': [], 'columnas': None, 'limite': None, 'offset': 0, 'despues': None}
+
+    def _metadatos_tabla(self, EPSG_Entrada=None):
+        """Consulta geometry_columns, information_schema y pg_index de la tabla."""
+        columnas = self.conexion.queryPG(
+            "SELECT column_name, data_type FROM information_schema.columns"
+            " WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position",
+            (self.esquema, self.tabla),
+        )
+        if not columnas:
+            raise Exception(f"No existe la tabla '{self.esquema}.{self.tabla}'")
+
+        geometrias = self.conexion.queryPG(
+            "SELECT f_geometry_column, srid, type FROM geometry_columns"
+            " WHERE f_table_schema = %s AND f_table_name = %s",
+            (self.esquema, self.tabla),
+        )
+        if self.campo_geometria is not None:
+            geometrias = [g for g in geometrias if g[0] == self.campo_geometria]
+        if not geometrias:
+            raise Exception(f"La tabla '{self.esquema}.{self.tabla}' no tiene columna de geometría")
+        campo_geometria, srid, tipo = geometrias[0]
+
+        campo_id = self.campo_id
+        if campo_id is None:
+            clave = self.conexion.queryPG(
+                "SELECT a.attname FROM pg_index i"
+                " JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)"
+                " WHERE i.indrelid = %s::regclass AND i.indisprimary",
+                (f"{_identificador(self.esquema)}.{_identificador(self.tabla)}",),
+            )
+            # Solo claves primarias de una columna sirven para paginar por clave
+            campo_id = clave[0][0] if len(clave) == 1 else None
+
+        srid = int(srid or 0)
+        if not srid and EPSG_Entrada is not None:
+            srid = normalizar_epsg(EPSG_Entrada)
+        return {
+            'esquema': self.esquema,
+            'tabla': self.tabla,
+            'campo_geometria': campo_geometria,
+            'srid': srid,
+            'srid_columna': int(geometrias[0][1] or 0),
+            'tipo_geometria': tipo,
+            'campo_id': campo_id,
+            'columnas': {c[0]: c[1] for c in columnas if c[0] != campo_geometria},
+        }
+
+    def _comprobar_columnas(self, columnas):
+        desconocidas = [c for c in columnas if c not in self.datasource['columnas']]
+        if desconocidas:
+            raise Exception(f"No existen las columnas: {', '.join(desconocidas)}")
+        return list(columnas)
+
+    def _filtro(self, filtro, params=None):
+        """
+        (sql, params) de un filtro str (WHERE en SQL), tupla (sql, params) o
+        dict {columna: valor}. Las consultas se envían siempre con params, así
+        que los ``%`` de un filtro str se escapan como ``%%``.
+        """
+        if isinstance(filtro, tuple):
+            filtro, params = filtro
+            return f"({filtro})", tuple(params or ())
+        if not isinstance(filtro, dict):
+            return f"({filtro.replace('%', '%%')})", tuple(params or ())
+        self._comprobar_columnas(list(filtro))
+        condiciones, valores = [], []
+        for columna, valor in filtro.items():
+            if isinstance(valor, (list, tuple, set)):
+                condiciones.append(f"{_identificador(columna)} = ANY(%s)")
+                valores.append(list(valor))
+            elif valor is None:
+                condiciones.append(f"{_identificador(columna)} IS NULL")
+            else:
+                condiciones.append(f"{_identificador(columna)} = %s")
+                valores.append(valor)
+        return ' AND '.join(condiciones), tuple(valores)
+
+    def obtener_capas(self):
+        """Devuelve los nombres de las capas (consultas) creadas sobre la tabla."""
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        return list(self.capas)
+
+    def obtener_nombreCapa(self, capa=None):
+        """Devuelve el nombre de una capa dado su nombre o índice (por defecto, la primera)."""
+        capas = self.obtener_capas()
+        if capa is None:
+            return capas[0]
+        if capa in self.capas:
+            return capa
+        try:
+            return capas[int(capa)]
+        except (ValueError, TypeError, IndexError):
+            raise Exception(f"No existe la capa '{capa}'")
+
+    def obtener_atributos(self, capa=None, propiedades=None):
+        """Atributos de la capa y sus tipos JSON: {'campo': {'type': 'string'}, ...}."""
+        estado = self.capas[self.obtener_nombreCapa(capa)]
+        columnas = estado['columnas'] or list(self.datasource['columnas'])
+        return {
+            c: {'type': _tipo_json(self.datasource['columnas'][c])}
+            for c in columnas if propiedades is None or c in propiedades
+        }
+
+    def _derivar(self, capaEntrada, capaSalida):
+        """Copia el estado de capaEntrada en capaSalida (o la propia capaEntrada si es None)."""
+        nombre = self.obtener_nombreCapa(capaEntrada)
+        estado = self.capas[nombre]
+        estado = {
+            k: list(v) if isinstance(v, list) else v for k, v in estado.items()
+        }
+        nombre_salida = capaSalida or nombre
+        self.capas[nombre_salida] = estado
+        return nombre_salida, estado
+
+    def MRE_datos(self, capaEntrada=None, capaSalida=None, MRE=[-180, -90, 180, 90], EPSG_MRE=4326):
+        """
+        Restringe la capa a los objetos cuyo bbox interseca MRE (operador
+        ``&&``, resuelto con el índice GiST) y la guarda como capaSalida
+        (por defecto, sustituye a capaEntrada). Un MRE en EPSG:4326 que
+        cubre el mundo entero no añade condición, y con una columna en
+        EPSG:3857 la latitud se acota a la máxima de WebMercator.
+
+        Retorna
+        -------
+        str
+            Nombre de la capa filtrada.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        nombre, estado = self._derivar(capaEntrada, capaSalida)
+        estado['bbox'].append((list(MRE), normalizar_epsg(EPSG_MRE)))
+        return nombre
+
+    def obtener_objeto_porID(self, capaEntrada=None, capaSalida=None, ID=None, valorID=0):
+        """
+        Restringe la capa al objeto con ID = valorID (por defecto, sobre la
+        clave primaria) y la guarda como capaSalida.
+
+        Retorna
+        -------
+        str
+            Nombre de la capa con el objeto.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        ID = ID or self.datasource['campo_id']
+        if ID is None:
+            raise Exception("La tabla no tiene clave primaria: indica ID o campo_id")
+        nombre, estado = self._derivar(capaEntrada, capaSalida)
+        estado['filtros'].append(self._filtro({ID: valorID}))
+        return nombre
+
+    def leer_pagina(self, capa=None, offset=0, limit=10, bbox=None, filtro=None, propiedades=None,
+                    EPSG_MRE=4326, despues=None):
+        """
+        Crea la capa con una página de objetos ordenados por la clave
+        primaria.
+
+        Con ``despues`` (la clave del último objeto de la página anterior,
+        el ``id`` del último Feature exportado) la página se obtiene por
+        clave: ``WHERE id > despues ORDER BY id LIMIT limit``, que recorre el
+        índice de la clave sin leer las páginas previas. ``offset`` se
+        mantiene por compatibilidad, pero PostgreSQL tiene que recorrer y
+        descartar los offset primeros objetos.
+
+        Retorna
+        -------
+        str
+            Nombre de la capa con la página.
+        """
+        if self.datasource is None:
+            self.datasource = self._metadatos_tabla()
+        if self.datasource['campo_id'] is None:
+            raise Exception("La tabla no tiene clave primaria: indica campo_id para paginar")
+        if int(offset or 0) < 0 or int(limit) < 0:
+            raise ValueError("offset y limit deben ser positivos")
+
+        nombre = capa or self.tabla
+        estado = self._estado_vacio()
+        if bbox is not None:
+            estado['bbox'].append((list(bbox), normalizar_epsg(EPSG_MRE)))
+        if filtro:
+            estado['filtros'].append(self._filtro(filtro))
+        if propiedades is not None:
+            estado['columnas'] = self._comprobar_columnas(propiedades)
+        estado['limite'] = int(limit)
+        estado['offset'] = int(offset or 0)
+        estado['despues'] = despues
+        self.capas = {nombre: estado}
+        return nombre
+
+    def _geometria_sql(self):
+        """Expresión de la columna de geometría (con el SRID de EPSG_Entrada si no tiene)."""
+        meta = self.datasource
+        columna = _identificador(meta['campo_geometria'])
+        if meta['srid'] and not meta['srid_columna']:
+            return f"ST_SetSRID({columna}, {meta['srid']})"
+        return columna
+
+    def _sobre(self, sobre, params, EPSG_sobre, lado):
+        """
+        Condición ``geom && sobre`` con el sobre (SQL con SRID EPSG_sobre)
+        llevado al SRID de la columna. Se transforma el sobre, nunca la
+        columna: así PostGIS usa el índice GiST. lado es el lado mayor del
+        sobre en unidades de EPSG_sobre; si el SRID de la columna no es 3857
+        ni 4326, el sobre se densifica (ST_Segmentize) con tramos de
+        lado / TRAMOS_SOBRE para que sus lados curvos queden dentro de la
+        caja transformada.
+        """
+        meta = self.datasource
+        params = list(params)
+        if meta['srid'] and meta['srid'] != EPSG_sobre:
+            if meta['srid'] not in (3857, 4326) and lado > 0:
+                sobre = f"ST_Segmentize({sobre}, %s::float8)"
+                params.append(lado / TRAMOS_SOBRE)
+            # SRID como literal entero: como parámetro sin tipo (sentencias
+            # preparadas) PostgreSQL elegiría ST_Transform(geometry, text)
+            sobre = f"ST_Transform({sobre}, {int(meta['srid'])})"
+        if not meta['srid_columna']:
+            sobre = f"ST_SetSRID({sobre}, 0)"
+        return f"{_identificador(meta['campo_geometria'])} && {sobre}", params
+
+    def _condiciones(self, estado):
+        """Condiciones del WHERE (bbox y filtros) de una capa y sus parámetros."""
+        condiciones, params = [], []
+        for MRE, EPSG_MRE in estado['bbox']:
+            minx, miny, maxx, maxy = [float(v) for v in MRE]
+            if EPSG_MRE == 4326:
+                if minx <= -180 and miny <= -90 and maxx >= 180 and maxy >= 90:
+                    # El mundo entero no restringe nada (y no puede llevarse a 3857)
+                    continue
+                if self.datasource['srid'] == 3857:
+                    miny, maxy = max(miny, -LATITUD_MAXIMA), min(maxy, LATITUD_MAXIMA)
+            condicion, valores = self._sobre(
+                "ST_MakeEnvelope(%s, %s, %s, %s, %s)", [minx, miny, maxx, maxy, EPSG_MRE], EPSG_MRE,
+                max(maxx - minx, maxy - miny)
+            )
+            condiciones.append(condicion)
+            params.extend(valores)
+
+        for sql, valores in estado['filtros']:
+            condiciones.append(sql)
+            params.extend(valores)
+        return condiciones, params
+
+    def _consulta(self, capa, seleccion):
+        """
+        (sql, params) de la consulta de la capa con la lista SELECT indicada:
+        bbox como ``&&``, filtros en el WHERE y página por clave.
+        """
+        meta = self.datasource
+        estado = self.capas[self.obtener_nombreCapa(capa)]
+        condiciones, params = self._condiciones(estado)
+
+        campo_id = meta['campo_id']
+        if estado['despues'] is not None:
+            condiciones.append(f"{_identificador(campo_id)} > %s")
+            params.append(estado['despues'])
+
+        sql = f"SELECT {seleccion} FROM {_identificador(meta['esquema'])}.{_identificador(meta['tabla'])}"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        if campo_id is not None:
+            sql += f" ORDER BY {_identificador(campo_id)}"
+        if estado['limite'] is not None:
+            sql += " LIMIT %s"
+            params.append(estado['limite'])
+        if estado['offset']:
+            sql += " OFFSET %s"
+            params.append(estado['offset'])
+        return sql, tuple(params)
+
+    def _columnas_capa(self, capa, propiedades=None):
+        estado = self.capas[self.obtener_nombreCapa(capa)]
+        columnas = estado['columnas'] or list(self.datasource['columnas'])
+        if propiedades is not None:
+            columnas = [c for c in columnas if c in propiedades]
+        return columnas
+
+    def exportar(self, capa=None, EPSG_Salida=None, outputFormat='application/json', ID=None,
+                 propiedades=None, sin_geometria=False, precision=None, como_bytes=False):
+        """
+        Exporta la capa. La salida JSON se construye entera en PostGIS (una
+        fila con la FeatureCollection, geometrías con ``ST_AsGeoJSON`` en
+        EPSG:4326 salvo que se indique EPSG_Salida); el resto de formatos
+        pasan por ``a_fuente_vector`` y ``FuenteDatosVector.exportar``.
+
+        Parámetros
+        ----------
+        capa : str o int, opcional
+            Capa a exportar (por defecto, la primera).
+        EPSG_Salida : int o str, opcional
+            EPSG de salida.
+        outputFormat : str, opcional
+            'application/json' / 'json' o un driver OGR (p. ej. 'GPKG').
+        ID : str, opcional
+            Columna para el miembro ``id`` de cada Feature (por defecto, la
+            clave primaria).
+        propiedades : list[str], opcional
+            Columnas a exportar.
+        sin_geometria : bool, opcional
+            Exporta los objetos sin geometría (no se lee la columna).
+        precision : int, opcional
+            Decimales de las coordenadas (por defecto, 9 como ST_AsGeoJSON).
+        como_bytes : bool, opcional
+            Devuelve el GeoJSON serializado (bytes) tal cual llega del servidor.
+
+        Retorna
+        -------
+        dict o bytes
+            GeoJSON como dict (o bytes si como_bytes) o archivo exportado como blob.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        if outputFormat not in ('application/json', 'json'):
+            EPSG_Salida = EPSG_Salida or self.datasource['srid'] or 4326
+            fuente = self.a_fuente_vector(capa, propiedades=propiedades)
+            return fuente.exportar(EPSG_Salida=normalizar_epsg(EPSG_Salida), outputFormat=outputFormat)
+
+        sql, params = self._sql_geojson(capa, EPSG_Salida, ID, propiedades, sin_geometria, precision)
+        texto = self.conexion.queryPG(sql, params)[0][0]
+        if como_bytes:
+            return texto.encode('utf-8')
+        return json.loads(texto)
+
+    def _sql_geojson(self, capa, EPSG_Salida=None, ID=None, propiedades=None, sin_geometria=False, precision=None):
+        """(sql, params) que devuelve la FeatureCollection de la capa como texto."""
+        meta = self.datasource
+        columnas = self._columnas_capa(capa, propiedades)
+        ID = ID or meta['campo_id']
+
+        seleccion = [_identificador(c) for c in columnas]
+        if ID is not None:
+            seleccion.append(f"{_identificador(ID)} AS {_ALIAS_ID}")
+        if not sin_geometria:
+            seleccion.append(f"{self._geometria_sql()} AS {_ALIAS_GEOM}")
+        sql, params = self._consulta(capa, ', '.join(seleccion) or 'NULL')
+
+        if sin_geometria:
+            geometria = "NULL"
+        else:
+            geometria = f"t.{_ALIAS_GEOM}"
+            # Sin SRID no se puede reproyectar: se exportan las coordenadas tal cual
+            if meta['srid']:
+                EPSG_Salida = normalizar_epsg(EPSG_Salida) if EPSG_Salida is not None else 4326
+                geometria = f"ST_Transform({geometria}, {EPSG_Salida})"
+            geometria = f"ST_AsGeoJSON({geometria}, {int(9 if precision is None else precision)})::json"
+        id_json = f"t.{_ALIAS_ID}" if ID is not None else "NULL"
+        objeto = (
+            "json_build_object('type', 'Feature', 'id', " + id_json + ", 'geometry', " + geometria
+            + f", 'properties', to_jsonb(t) - '{_ALIAS_GEOM}' - '{_ALIAS_ID}')"
+        )
+        orden = f" ORDER BY t.{_ALIAS_ID}" if ID is not None and ID == meta['campo_id'] else ""
+        return (
+            "SELECT json_build_object('type', 'FeatureCollection', 'features',"
+            f" COALESCE(json_agg({objeto}{orden}), '[]'::json))::text FROM ({sql}) AS t",
+            params,
+        )
+
+    def a_fuente_vector(self, capa=None, propiedades=None, lote=2000):
+        """
+        Lee la capa en una ``FuenteDatosVector`` en memoria. Las geometrías
+        llegan como WKB binario (``ST_AsBinary``) por un cursor en el
+        servidor, en bloques de lote filas.
+        """
+        _asegurar_gdal()
+        from .Vector_conex import FuenteDatosVector
+
+        meta = self.datasource
+        if meta is None:
+            raise Exception("Primero debes llamar a leer()")
+        nombre = self.obtener_nombreCapa(capa)
+        columnas = self._columnas_capa(nombre, propiedades)
+        seleccion = [_identificador(c) for c in columnas] + [f"ST_AsBinary({self._geometria_sql()})"]
+        sql, params = self._consulta(nombre, ', '.join(seleccion))
+
+        srs = None
+        if meta['srid']:
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(meta['srid'])
+            srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        datasource = ogr.GetDriverByName('MEMORY').CreateDataSource(nombre)
+        tipo = getattr(ogr, _TIPOS_GEOMETRIA.get(str(meta['tipo_geometria']).upper(), 'wkbUnknown'))
+        layer = datasource.CreateLayer(nombre, srs, tipo)
+        for c in columnas:
+            tipo_json = _tipo_json(meta['columnas'][c])
+            oft = ogr.OFTInteger64 if tipo_json == 'integer' else ogr.OFTReal if tipo_json == 'number' else ogr.OFTString
+            layer.CreateField(ogr.FieldDefn(c, oft))
+
+        defn = layer.GetLayerDefn()
+        for fila in self.conexion.iterarPG(sql, params, lote):
+            feature = ogr.Feature(defn)
+            for i, valor in enumerate(fila[:-1]):
+                if valor is None:
+                    continue
+                feature.SetField(i, valor if isinstance(valor, (int, float)) else str(valor))
+            if fila[-1] is not None:
+                feature.SetGeometry(ogr.CreateGeometryFromWkb(bytes(fila[-1])))
+            layer.CreateFeature(feature)
+        layer = None
+
+        fuente = FuenteDatosVector(f"PG:{meta['esquema']}.{meta['tabla']}")
+        fuente.datasource = datasource
+        fuente._invalidar_cache()
+        return fuente
+
+    def configurar_cache_teselas(self, max_bytes=64 * 1024 * 1024, ttl=300):
+        """
+        Configura la caché en memoria de teselas MVT: LRU acotada por bytes
+        cuyas entradas caducan a los ttl segundos (None = sin caducidad), de
+        modo que los cambios en la tabla acaban viéndose aunque nadie
+        invalide la caché.
+        """
+        self.cache_teselas = CacheLRU(max_bytes=max_bytes, ttl=ttl)
+
+    def invalidar_cache_teselas(self, MRE=None, EPSG_MRE=4326):
+        """
+        Descarta las teselas cacheadas: todas o, si se indica MRE, solo las
+        que intersecan ese bbox (p. ej. tras actualizar objetos de esa zona).
+
+        Parámetros
+        ----------
+        MRE : list[float], opcional
+            Bounding box [minx, miny, maxx, maxy] de la zona modificada.
+        EPSG_MRE : int o str, opcional
+            EPSG del bbox: 4326 o 3857.
+
+        Retorna
+        -------
+        int
+            Número de teselas descartadas.
+        """
+        if self.cache_teselas is None:
+            return 0
+        if MRE is None:
+            n = len(self.cache_teselas)
+            self.cache_teselas.limpiar()
+            return n
+
+        EPSG_MRE = normalizar_epsg(EPSG_MRE)
+        if EPSG_MRE == 4326:
+            minx, miny = lonlat_a_3857(MRE[0], MRE[1])
+            maxx, maxy = lonlat_a_3857(MRE[2], MRE[3])
+        elif EPSG_MRE == 3857:
+            minx, miny, maxx, maxy = MRE
+        else:
+            raise Exception("invalidar_cache_teselas solo admite bbox en EPSG:4326 o EPSG:3857")
+
+        def _interseca(clave):
+            tminx, tminy, tmaxx, tmaxy = limites_tesela_3857(*clave[-3:])
+            return tminx <= maxx and tmaxx >= minx and tminy <= maxy and tmaxy >= miny
+
+        return self.cache_teselas.invalidar(predicado=_interseca)
+
+    def estadisticas_teselas(self):
+        """
+        Métricas de tesela_mvt: las de la caché (aciertos, fallos,
+        ratio_aciertos, caducadas...) y el número de consultas a PostGIS con
+        sus tiempos medio, máximo y último en milisegundos.
+        """
+        with self._lock_metricas:
+            m = dict(self._metricas_teselas)
+        estadisticas = self.cache_teselas.estadisticas() if self.cache_teselas is not None else {}
+        estadisticas.update({
+            'consultas': m['consultas'],
+            'tiempo_medio_ms': 1000 * m['tiempo_total'] / m['consultas'] if m['consultas'] else 0.0,
+            'tiempo_max_ms': 1000 * m['tiempo_max'],
+            'ultimo_ms': 1000 * m['ultimo'] if m['ultimo'] is not None else None,
+        })
+        return estadisticas
+
+    def tesela_mvt(self, z, x, y, capa=None, columnas=None, extension=4096, buffer=64, nombre=None):
+        """
+        Genera la tesela vectorial (Mapbox Vector Tile) z/x/y de la capa con
+        una sola consulta: ``ST_TileEnvelope`` da los límites de la tesela,
+        ``ST_AsMVTGeom`` reproyecta, recorta y cuantiza las geometrías, y
+        ``ST_AsMVT`` codifica la tesela en el servidor. Se aplican los
+        filtros de la capa y el filtro ``&&`` de la tesela (con el buffer),
+        que usa el índice GiST.
+
+        Con una ``ConexPG`` con pool (``pool_max > 0``) la sentencia se
+        prepara una vez por conexión (solo cambian z/x/y) y se reutilizan
+        conexión y plan; sin pool cada consulta abre su conexión y preparar
+        no aporta nada, así que se ejecuta directamente.
+        El resultado se guarda en la caché de teselas (ver
+        ``configurar_cache_teselas``) y el tiempo de cada consulta se
+        registra en ``estadisticas_teselas``.
+
+        Parámetros
+        ----------
+        z, x, y : int
+            Índices de la tesela en el esquema XYZ de WebMercator.
+        capa : str o int, opcional
+            Capa (consulta) a teselar (por defecto, la primera).
+        columnas : list[str], opcional
+            Atributos que se incluyen (por defecto, los de la capa).
+        extension : int, opcional
+            Resolución interna de la tesela (extent).
+        buffer : int, opcional
+            Margen alrededor de la tesela, en unidades de la tesela.
+        nombre : str, opcional
+            Nombre de la capa dentro de la tesela (por defecto, el de la capa).
+
+        Retorna
+        -------
+        bytes
+            Tesela MVT sin comprimir (vacía si no hay objetos).
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        if not self.datasource['srid']:
+            raise Exception("La geometría no tiene SRID: indica EPSG_Entrada en leer()")
+
+        z, x, y = validar_tesela(z, x, y)
+        nombre_capa = self.obtener_nombreCapa(capa)
+        columnas = self._comprobar_columnas(columnas) if columnas is not None else self._columnas_capa(nombre_capa)
+        nombre = nombre or nombre_capa
+        estado = self.capas[nombre_capa]
+
+        if self.cache_teselas is None:
+            self.configurar_cache_teselas()
+        clave = (
+            repr((nombre_capa, estado['bbox'], estado['filtros'])),
+            tuple(columnas), nombre, int(extension), int(buffer), z, x, y,
+        )
+        datos = self.cache_teselas.obtener(clave)
+        if datos is not None:
+            return datos
+
+        sql, params = self._sql_mvt(estado, columnas, nombre, int(extension), int(buffer), z, x, y)
+        inicio = time.perf_counter()
+        preparar = getattr(self.conexion, 'pool_max', 0) > 0
+        filas = self.conexion.queryPG(sql, params, preparar=preparar)
+        tiempo = time.perf_counter() - inicio
+        datos = bytes(filas[0][0]) if filas and filas[0][0] is not None else b''
+
+        with self._lock_metricas:
+            m = self._metricas_teselas
+            m['consultas'] += 1
+            m['tiempo_total'] += tiempo
+            m['tiempo_max'] = max(m['tiempo_max'], tiempo)
+            m['ultimo'] = tiempo
+        logger.debug(f"Tesela MVT {z}/{x}/{y} de {self.dato}: {len(datos)} bytes en {1000 * tiempo:.1f} ms")
+
+        self.cache_teselas.guardar(clave, datos)
+        return datos
+
+    def _sql_mvt(self, estado, columnas, nombre, extension, buffer, z, x, y):
+        """(sql, params) de la tesela: ST_AsMVTGeom/ST_AsMVT sobre ST_TileEnvelope."""
+        meta = self.datasource
+        geometria = self._geometria_sql()
+        if meta['srid'] != 3857:
+            geometria = f"ST_Transform({geometria}, 3857)"
+
+        seleccion = [
+            f"ST_AsMVTGeom({geometria}, ST_TileEnvelope(%s, %s, %s), %s, %s, true) AS {_ALIAS_GEOM}"
+        ]
+        params = [z, x, y, extension, buffer]
+        seleccion += [_identificador(c) for c in columnas]
+        campo_id = meta['campo_id']
+        if campo_id is not None:
+            seleccion.append(f"{_identificador(campo_id)} AS {_ALIAS_ID}")
+
+        # Filtro de la tesela ampliada con el buffer (en metros de EPSG:3857)
+        minx, _, maxx, _ = limites_tesela_3857(z, x, y)
+        margen = (maxx - minx) * buffer / extension
+        condicion, valores = self._sobre(
+            "ST_Expand(ST_TileEnvelope(%s, %s, %s), %s)", [z, x, y, margen], 3857, maxx - minx + 2 * margen
+        )
+        condiciones, valores_filtros = self._condiciones(estado)
+        condiciones.append(condicion)
+        params += valores_filtros + valores
+
+        sql = (
+            f"WITH mvtgeom AS (SELECT {', '.join(seleccion)}"
+            f" FROM {_identificador(meta['esquema'])}.{_identificador(meta['tabla'])}"
+            f" WHERE {' AND '.join(condiciones)})"
+            f" SELECT ST_AsMVT(mvtgeom.*, %s, %s, '{_ALIAS_GEOM}'"
+            + (f", '{_ALIAS_ID}'" if campo_id is not None else "")
+            + ") FROM mvtgeom"
+        )
+        params += [nombre, extension]
+        return sql, tuple(params)
@@ -6,7 +6,13 @@ import sys
 import uuid
 import json
 import logging
+import hashlib
 import zipfile
+import tempfile
+import weakref
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +25,38 @@ except Exception:  # pragma: no cover - depende del entorno
     # El error concreto se gestiona de forma centralizada en gdal_utils.
     ogr = osr = gdal = None
 
-from .gdal_utils import asegurar_gdal, normalizar_epsg, probar_gdal_ogr as _probar_gdal_ogr
+from .gdal_utils import asegurar_gdal, normalizar_epsg, leer_vsimem, borrar_vsimem, probar_gdal_ogr as _probar_gdal_ogr
+from .cache_utils import CacheLRU, CacheMBTiles, huella_fuente, id_fuente
+from .teselas_utils import limites_tesela_3857, lonlat_a_3857, teselas_en_bbox, validar_tesela
+
+# Modos de cálculo de estadísticas de banda (ver FuenteDatosRaster.estadisticas)
+MODOS_ESTADISTICAS = ('exacto', 'aproximado', 'muestreo')
+
+# Entradas máximas de la caché de estadísticas (se descartan las de uso más antiguo)
+MAX_ENTRADAS_ESTADISTICAS = 256
+
+# Interpolaciones admitidas por FuenteDatosRaster.muestrear
+INTERPOLACIONES_MUESTREO = ('nearest', 'bilinear')
+
+# Almacenes de trabajo de los datasets intermedios (ver FuenteDatosRaster.configurar_almacen):
+# driver GDAL, extensión y opciones de creación. 'memoria' usa siempre el driver MEM; los
+# demás son archivos sin compresión en un directorio temporal que el SO pagina con su caché
+ALMACENES_TRABAJO = {
+    'memoria': None,
+    'gtiff': ('GTiff', '.tif', ['TILED=YES', 'COMPRESS=NONE', 'BIGTIFF=IF_SAFER', 'SPARSE_OK=TRUE']),
+    'envi': ('ENVI', '.img', ['INTERLEAVE=BSQ']),
+}
+
+# Bytes por franja al copiar bandas entre datasets de trabajo
+BYTES_FRANJA = 16 * 1024 * 1024
+
+# Formatos de tesela: driver GDAL y si admite transparencia (ver FuenteDatosRaster.tesela)
+FORMATOS_TESELA = {
+    'png': ('PNG', True),
+    'webp': ('WEBP', True),
+    'jpeg': ('JPEG', False),
+    'jpg': ('JPEG', False),
+}
 
 
 def _asegurar_gdal():
@@ -27,6 +64,120 @@ def _asegurar_gdal():
     asegurar_gdal("FuenteDatosRaster")
 
 
+def _percentiles_histograma(conteos, vmin, vmax, percentiles):
+    """
+    Aproxima percentiles a partir de un histograma de clases de igual ancho
+    entre vmin y vmax, interpolando linealmente dentro de cada clase.
+    """
+    total = sum(conteos)
+    ancho = (vmax - vmin) / len(conteos) if conteos else 0.0
+    resultado = {}
+    for q in percentiles:
+        if total == 0:
+            resultado[f'p{q:g}'] = None
+            continue
+        objetivo = total * q / 100.0
+        acumulado = 0
+        for i, c in enumerate(conteos):
+            if c and acumulado + c >= objetivo:
+                resultado[f'p{q:g}'] = vmin + (i + (objetivo - acumulado) / c) * ancho
+                break
+            acumulado += c
+        else:
+            resultado[f'p{q:g}'] = vmax
+    return resultado
+
+
+def _coordenadas_puntos(puntos, capa=None):
+    """
+    Extrae las coordenadas de una colección de puntos como lista de (x, y).
+
+    Acepta una secuencia de pares (x, y), un GeoJSON (dict o str) o un objeto
+    con atributo ``geojson`` (p. ej. ``geojsonQuery`` de los conectores IoT),
+    un ``ogr.Layer`` o una ``FuenteDatosVector``. Los objetos que no son
+    puntos o no tienen geometría se devuelven como (nan, nan) para conservar
+    el orden. Retorna (coordenadas, srs), con srs None si no viene con los datos.
+    """
+    nan = (float('nan'), float('nan'))
+
+    if hasattr(puntos, 'geojson'):
+        puntos = puntos.geojson
+    if isinstance(puntos, str):
+        puntos = json.loads(puntos)
+
+    if isinstance(puntos, dict):
+        # GeoJSON (RFC 7946): siempre lon/lat WGS84
+        features = puntos.get('features', [puntos]) if puntos.get('type') != 'Point' else [{'geometry': puntos}]
+        coords = []
+        for feature in features:
+            geom = feature.get('geometry') or {}
+            c = geom.get('coordinates') if geom.get('type') == 'Point' else None
+            coords.append((float(c[0]), float(c[1])) if c else nan)
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(4326)
+        return coords, srs
+
+    if hasattr(puntos, 'datasource') and hasattr(puntos, 'obtener_nombreCapa'):
+        if puntos.datasource is None:
+            raise Exception("Primero debes llamar a leer() en la fuente vectorial")
+        puntos = puntos.datasource.GetLayer(puntos.obtener_nombreCapa(capa))
+
+    if ogr is not None and isinstance(puntos, ogr.Layer):
+        coords = []
+        puntos.ResetReading()
+        for feature in puntos:
+            geom = feature.GetGeometryRef()
+            if geom is not None and ogr.GT_Flatten(geom.GetGeometryType()) == ogr.wkbPoint:
+                coords.append((geom.GetX(), geom.GetY()))
+            else:
+                coords.append(nan)
+        puntos.ResetReading()
+        return coords, puntos.GetSpatialRef()
+
+    return [(float(p[0]), float(p[1])) for p in puntos], None
+
+
+def _borrar_archivos_trabajo(rutas):
+    """Borra los archivos de trabajo (y sus auxiliares) que sigan en disco."""
+    for ruta in list(rutas):
+        driver = gdal.IdentifyDriver(ruta) if gdal is not None and os.path.exists(ruta) else None
+        try:
+            if driver is not None:
+                driver.Delete(ruta)
+            elif os.path.exists(ruta):
+                os.remove(ruta)
+        except Exception as e:
+            logger.warning(f"No se pudo borrar el archivo de trabajo {ruta}: {e}")
+        rutas.discard(ruta)
+
+
+def _copiar_banda(origen, destino, xoff=0, yoff=0):
+    """
+    Copia en destino la ventana de origen que empieza en (xoff, yoff), por
+    franjas de filas, sin leer la banda completa en memoria.
+    """
+    ancho, alto = destino.XSize, destino.YSize
+    bytes_fila = max(1, ancho * gdal.GetDataTypeSize(destino.DataType) // 8)
+    bloque_y = destino.GetBlockSize()[1] or 1
+    filas = max(bloque_y, BYTES_FRANJA // bytes_fila // bloque_y * bloque_y)
+    for fila in range(0, alto, filas):
+        h = min(filas, alto - fila)
+        destino.WriteArray(origen.ReadAsArray(xoff, yoff + fila, ancho, h), 0, fila)
+
+
+def _generar_teselas_proceso(dato, args_lectura, estadisticas, teselas, opciones):
+    """
+    Genera un lote de teselas en un proceso del pool de ``sembrar_teselas``:
+    vuelve a abrir la fuente con los mismos argumentos de ``leer`` (con la
+    caché de estadísticas del proceso principal) y devuelve una lista de
+    (z, x, y, bytes).
+    """
+    fuente = FuenteDatosRaster(dato)
+    fuente._estadisticas = estadisticas
+    fuente.leer(*args_lectura)
+    return [(z, x, y, fuente._generar_tesela(z, x, y, *opciones)) for z, x, y in teselas]
+
+
 class FuenteDatosRaster:
     """
     Clase para gestionar la lectura, consulta y exportación de datos ráster usando GDAL.
@@ -65,6 +216,23 @@ class FuenteDatosRaster:
         self.dato = dato
         self.datasource = None
         self.multiBand = True
+        # Caché de estadísticas: ruta del JSON (None = solo en memoria),
+        # entradas por clave y operaciones aplicadas desde la lectura
+        self.ruta_estadisticas = None
+        self._estadisticas = None
+        self._estado = None
+        self._args_lectura = None
+        # Cachés de teselas (ver configurar_cache_teselas)
+        self.cache_teselas = None
+        self.cache_teselas_disco = None
+        self._huella_teselas = None
+        # Almacén de los datasets intermedios (ver configurar_almacen); los
+        # archivos de trabajo se borran con cerrar() o al destruir la fuente
+        self.almacen = 'memoria'
+        self.directorio_trabajo = None
+        self.umbral_almacen = 0
+        self._archivos_trabajo = set()
+        weakref.finalize(self, _borrar_archivos_trabajo, self._archivos_trabajo)
 
     def leer(self, banda = None, EPSG_Entrada = None, datasetCompleto=True):
         """
@@ -115,8 +283,11 @@ class FuenteDatosRaster:
             # Asignar proyección
             inDataSource.SetProjection(srs.ExportToWkt())
 
+        self._args_lectura = (banda, EPSG_Entrada, datasetCompleto)
+        self._estado = repr(['leer', *self._args_lectura])
+
         if datasetCompleto == True and banda == None:
-            self.datasource = inDataSource
+            self._sustituir_datasource(inDataSource)
             self.multiLayers = True
             return inDataSource
         
@@ -131,18 +302,13 @@ class FuenteDatosRaster:
             if capa is None:
                 raise Exception(f"No existe la banda '{banda}'")
 
-        band_array = capa.ReadAsArray()
-
-        # Crear driver en memoria
-        driver = gdal.GetDriverByName('MEM')
-
-        # Crear dataset en memoria con una sola banda
-        mem_ds = driver.Create(
-            inDataSource.GetDescription(),
+        # Crear dataset de trabajo (en memoria o en disco) con una sola banda
+        mem_ds = self._crear_dataset_trabajo(
             inDataSource.RasterXSize,
             inDataSource.RasterYSize,
             1,  # número de bandas
-            capa.DataType  # mismo tipo de datos que la banda original
+            capa.DataType,  # mismo tipo de datos que la banda original
+            descripcion=inDataSource.GetDescription()
         )
 
         # Copiar georreferenciación y proyección
@@ -151,10 +317,10 @@ class FuenteDatosRaster:
 
         # Escribir datos en la banda
         mem_band = mem_ds.GetRasterBand(1)
-        mem_band.WriteArray(band_array)
+        _copiar_banda(capa, mem_band)
         mem_band.SetNoDataValue(capa.GetNoDataValue())
-            
-        self.datasource = mem_ds
+
+        self._sustituir_datasource(mem_ds)
         return mem_ds
 
     def exportar(self, EPSG_Salida = None, outputFormat = 'GTiff', WLD = False, PAM = False):
@@ -474,7 +640,7 @@ class FuenteDatosRaster:
                 'type': dtype2,
                 'unit': band.GetUnitType() or None,
                 'metadata': band.GetMetadata(),
-                'statistics': band.GetStatistics(True, True)  # [min, max, mean, std]
+                'statistics': self._lista_estadisticas(idx)  # [min, max, mean, std]
             }
 
         # Si se pide una banda específica
@@ -538,14 +704,9 @@ class FuenteDatosRaster:
 
             # Estadísticas
             try:
-                stats = band.GetStatistics(True, True)
-                band_info['statistics'] = {
-                    'min': stats[0],
-                    'max': stats[1],
-                    'mean': stats[2],
-                    'stddev': stats[3]
-                }
-            except:
+                stats = self.estadisticas(i, modo='aproximado')
+                band_info['statistics'] = {k: stats[k] for k in ('min', 'max', 'mean', 'stddev')}
+            except Exception:
                 band_info['statistics'] = "No disponibles"
 
             # Metadata de la banda
@@ -557,7 +718,7 @@ class FuenteDatosRaster:
 
         return info
 
-    def MRE_datos(self, banda=None, MRE=[-180, -90, 180, 90], EPSG_MRE=4326):
+    def MRE_datos(self, banda=None, MRE=[-180, -90, 180, 90], EPSG_MRE=4326, arrays=True):
         """
         Recorta self.datasource físicamente al bbox MRE, actualizando self.datasource.
         Si banda es None, recorta todas las bandas; si no, sólo la banda indicada.
@@ -565,7 +726,10 @@ class FuenteDatosRaster:
         :param banda: int, número de banda (1-based) o None para todas
         :param MRE: [minx, miny, maxx, maxy] bbox en EPSG_MRE
         :param EPSG_MRE: EPSG del bbox de entrada
-        :return: lista de arrays numpy de las bandas recortadas
+        :param arrays: True (por defecto) devuelve arrays numpy; False devuelve
+            objetos gdal.Band, para no cargar en memoria un recorte que se ha
+            llevado a un archivo de trabajo (ver configurar_almacen)
+        :return: lista de arrays numpy o de gdal.Band de las bandas recortadas
         """
 
         if self.datasource is None:
@@ -627,16 +791,14 @@ class FuenteDatosRaster:
         if xsize <= 0 or ysize <= 0:
             raise Exception("BBox recortado no válido")
 
-        # Crear dataset en memoria para recorte
-        driver = gdal.GetDriverByName('MEM')
-
         bands_to_process = range(1, self.datasource.RasterCount + 1) if banda is None else [banda]
         nbands = len(bands_to_process)
 
         # Usar tipo de dato de la primera banda para el dataset nuevo (puedes mejorarlo para multi banda con distinto tipo)
         band_type = self.datasource.GetRasterBand(bands_to_process[0]).DataType
 
-        out_ds = driver.Create('', xsize, ysize, nbands, band_type)
+        # Crear dataset de trabajo para el recorte
+        out_ds = self._crear_dataset_trabajo(xsize, ysize, nbands, band_type)
         out_ds.SetProjection(ds_srs_wkt)
 
         # Calcular nuevo geotransform para el recorte
@@ -650,8 +812,7 @@ class FuenteDatosRaster:
             in_band = self.datasource.GetRasterBand(b)
             out_band = out_ds.GetRasterBand(i)
 
-            data = in_band.ReadAsArray(px_min, py_min, xsize, ysize)
-            out_band.WriteArray(data)
+            _copiar_banda(in_band, out_band, px_min, py_min)
 
             # Copiar NoData si existe
             nodata = in_band.GetNoDataValue()
@@ -661,12 +822,13 @@ class FuenteDatosRaster:
             out_band.FlushCache()
 
         # Finalmente, asignar out_ds a self.datasource
-        self.datasource = out_ds
+        self._sustituir_datasource(out_ds)
+        self._registrar_estado('MRE_datos', banda, MRE, EPSG_MRE)
 
-        # Opcional: devolver arrays recortados para uso inmediato
-        arrays = [self.datasource.GetRasterBand(i).ReadAsArray() for i in range(1, nbands + 1)]
-
-        return arrays
+        bandas = [self.datasource.GetRasterBand(i) for i in range(1, nbands + 1)]
+        if not arrays:
+            return bandas
+        return [b.ReadAsArray() for b in bandas]
 
     def extraer_bandas(self, bandas):
         """
@@ -697,9 +859,8 @@ class FuenteDatosRaster:
         # Usar el tipo de la primera banda seleccionada
         band_type = self.datasource.GetRasterBand(bandas[0]).DataType
 
-        # Crear nuevo dataset en memoria
-        driver = gdal.GetDriverByName('MEM')
-        out_ds = driver.Create('', xsize, ysize, len(bandas), band_type)
+        # Crear nuevo dataset de trabajo
+        out_ds = self._crear_dataset_trabajo(xsize, ysize, len(bandas), band_type)
         out_ds.SetProjection(proj)
         out_ds.SetGeoTransform(geotransform)
 
@@ -709,8 +870,7 @@ class FuenteDatosRaster:
             out_band = out_ds.GetRasterBand(i)
 
             # Copiar datos
-            data = in_band.ReadAsArray()
-            out_band.WriteArray(data)
+            _copiar_banda(in_band, out_band)
 
             # Copiar nodata
             nodata = in_band.GetNoDataValue()
@@ -740,7 +900,8 @@ class FuenteDatosRaster:
             out_band.FlushCache()
 
         # Reemplazar dataset
-        self.datasource = out_ds
+        self._sustituir_datasource(out_ds)
+        self._registrar_estado('extraer_bandas', bandas)
 
         return [self.datasource.GetRasterBand(i) for i in range(1, len(bandas) + 1)]
 
@@ -772,31 +933,770 @@ class FuenteDatosRaster:
         # Tipo de dato de la primera banda
         band_type = self.datasource.GetRasterBand(1).DataType
 
-        # Crear nuevo dataset en memoria
-        driver = gdal.GetDriverByName('MEM')
-        out_ds = driver.Create('', new_width, new_height, nbands, band_type)
-        out_ds.SetProjection(proj)
-
         # Ajustar geotransformación para nuevas dimensiones
         xres = (geotransform[1] * orig_width) / new_width
         yres = (geotransform[5] * orig_height) / new_height
         new_gt = (geotransform[0], xres, geotransform[2],
                 geotransform[3], geotransform[4], yres)
-        out_ds.SetGeoTransform(new_gt)
 
-        # Remuestrear bandas
-        for i in range(1, nbands + 1):
-            in_band = self.datasource.GetRasterBand(i)
-            data = in_band.ReadAsArray(buf_xsize=new_width, buf_ysize=new_height)
-            out_band = out_ds.GetRasterBand(i)
-            out_band.WriteArray(data)
-            nodata = in_band.GetNoDataValue()
-            if nodata is not None:
-                out_band.SetNoDataValue(float(nodata))
-            out_band.FlushCache()
+        destino = self._destino_trabajo(new_width, new_height, nbands, band_type)
+        if destino is not None:
+            # En disco: gdal.Translate remuestrea por bloques (vecino más
+            # próximo, como ReadAsArray con buf_xsize/buf_ysize) sin cargar
+            # la banda completa en memoria
+            driver, ruta, opciones = destino
+            out_ds = gdal.Translate(
+                ruta, self.datasource, format=driver,
+                width=new_width, height=new_height, creationOptions=opciones
+            )
+            self._archivos_trabajo.add(ruta)
+        else:
+            # Crear nuevo dataset en memoria
+            driver = gdal.GetDriverByName('MEM')
+            out_ds = driver.Create('', new_width, new_height, nbands, band_type)
+            out_ds.SetProjection(proj)
+            out_ds.SetGeoTransform(new_gt)
+
+            # Remuestrear bandas
+            for i in range(1, nbands + 1):
+                in_band = self.datasource.GetRasterBand(i)
+                data = in_band.ReadAsArray(buf_xsize=new_width, buf_ysize=new_height)
+                out_band = out_ds.GetRasterBand(i)
+                out_band.WriteArray(data)
+                nodata = in_band.GetNoDataValue()
+                if nodata is not None:
+                    out_band.SetNoDataValue(float(nodata))
+                out_band.FlushCache()
 
         # Reemplazar dataset original
-        self.datasource = out_ds
+        self._sustituir_datasource(out_ds)
+        self._registrar_estado('redimensionar', height, width)
 
         # Devolver lista de objetos banda
         return [self.datasource.GetRasterBand(i) for i in range(1, nbands + 1)]
+
+    def configurar_almacen(self, almacen='gtiff', directorio=None, umbral_bytes=256 * 1024 * 1024):
+        """
+        Configura dónde se crean los datasets intermedios de leer(banda=...),
+        MRE_datos, extraer_bandas y redimensionar.
+
+        Con 'gtiff' o 'envi', los datasets de al menos umbral_bytes se crean
+        como archivos sin compresión en un directorio temporal, de modo que
+        el sistema operativo los pagina con su caché en lugar de tener que
+        caber en RAM; los menores siguen en memoria (driver MEM).
+
+        Parámetros
+        ----------
+        almacen : str, opcional
+            'memoria' (siempre MEM), 'gtiff' (GeoTIFF teselado) o 'envi'
+            (binario BSQ con cabecera .hdr).
+        directorio : str, opcional
+            Directorio de los archivos de trabajo (por defecto, el temporal
+            del sistema).
+        umbral_bytes : int, opcional
+            Tamaño (ancho x alto x bandas x bytes por píxel) a partir del cual
+            el dataset va a disco; 0 lo manda siempre a disco.
+        """
+        if almacen not in ALMACENES_TRABAJO:
+            raise Exception(f"Almacén '{almacen}' no soportado. Usa uno de: {', '.join(ALMACENES_TRABAJO)}")
+        if directorio is not None and not os.path.exists(directorio):
+            os.makedirs(directorio)
+        self.almacen = almacen
+        self.directorio_trabajo = directorio
+        self.umbral_almacen = max(0, int(umbral_bytes))
+
+    def _destino_trabajo(self, xsize, ysize, nbands, band_type):
+        """(driver, ruta, opciones) del archivo de trabajo, o None si el dataset va a memoria."""
+        formato = ALMACENES_TRABAJO[self.almacen]
+        if formato is None:
+            return None
+        tamaño = xsize * ysize * nbands * (gdal.GetDataTypeSize(band_type) // 8)
+        if tamaño < self.umbral_almacen:
+            return None
+        driver, extension, opciones = formato
+        directorio = self.directorio_trabajo or tempfile.gettempdir()
+        ruta = os.path.join(directorio, f"pygdal_trabajo_{uuid.uuid4().hex}{extension}")
+        return driver, ruta, list(opciones)
+
+    def _crear_dataset_trabajo(self, xsize, ysize, nbands, band_type, descripcion=''):
+        """
+        Crea un dataset intermedio vacío en el almacén configurado (ver
+        configurar_almacen). descripcion solo se usa en memoria.
+        """
+        destino = self._destino_trabajo(xsize, ysize, nbands, band_type)
+        if destino is None:
+            return gdal.GetDriverByName('MEM').Create(descripcion, xsize, ysize, nbands, band_type)
+
+        driver, ruta, opciones = destino
+        ds = gdal.GetDriverByName(driver).Create(ruta, xsize, ysize, nbands, band_type, options=opciones)
+        if ds is None:
+            raise RuntimeError(f"No se pudo crear el archivo de trabajo: {ruta}")
+        self._archivos_trabajo.add(ruta)
+        logger.debug(f"Dataset de trabajo en disco ({driver}): {ruta}")
+        return ds
+
+    def _sustituir_datasource(self, ds):
+        """
+        Asigna ds a self.datasource. El archivo de trabajo anterior no se
+        borra aquí: las bandas devueltas antes (MRE_datos(arrays=False),
+        extraer_bandas...) pueden seguir leyéndolo; se borra con cerrar() o
+        al destruir la fuente.
+        """
+        ds.FlushCache()
+        self.datasource = ds
+
+    def cerrar(self):
+        """
+        Libera self.datasource y borra los archivos de trabajo creados por la
+        fuente. Las bandas obtenidas antes dejan de ser válidas.
+        """
+        if self.datasource is not None:
+            self.datasource.FlushCache()
+        self.datasource = None
+        _borrar_archivos_trabajo(self._archivos_trabajo)
+        self._archivos_trabajo.clear()
+
+    def _registrar_estado(self, *operacion):
+        """Anota una operación que modifica self.datasource (clave de las cachés)."""
+        self._estado = (self._estado or '') + repr(list(operacion))
+
+    def _ruta_cache_estadisticas(self):
+        """
+        Ruta del JSON de estadísticas: ruta_estadisticas si se ha indicado.
+        None = solo memoria (no se escribe nada junto a los datos).
+        """
+        return self.ruta_estadisticas or None
+
+    def _cache_estadisticas(self):
+        """
+        Devuelve las entradas de la caché de estadísticas, cargándola del JSON
+        la primera vez y descartándola si la huella de la fuente ha cambiado.
+        """
+        huella = huella_fuente(self.dato)
+        if self._estadisticas is None or self._estadisticas.get('huella') != huella:
+            self._estadisticas = {'huella': huella, 'entradas': {}}
+            ruta = self._ruta_cache_estadisticas()
+            if ruta and os.path.exists(ruta):
+                try:
+                    with open(ruta, 'r', encoding='utf-8') as f:
+                        datos = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Caché de estadísticas incorrecta ({ruta}): {e}")
+                else:
+                    if datos.get('huella') == huella:
+                        self._estadisticas = datos
+        return self._estadisticas['entradas']
+
+    def _guardar_cache_estadisticas(self):
+        """Escribe la caché de estadísticas en su JSON (si tiene ruta)."""
+        ruta = self._ruta_cache_estadisticas()
+        if not ruta:
+            return
+        tmp = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._estadisticas, f)
+            os.replace(tmp, ruta)
+        except OSError as e:
+            logger.debug(f"No se pudo guardar la caché de estadísticas en {ruta}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def invalidar_estadisticas(self):
+        """Vacía la caché de estadísticas (en memoria y en su JSON)."""
+        self._estadisticas = None
+        ruta = self._ruta_cache_estadisticas()
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+
+    def estadisticas(self, banda=1, modo='aproximado', fraccion=0.01, histograma=False,
+                     bins=256, percentiles=None, cache=True):
+        """
+        Calcula (o recupera de la caché) las estadísticas de una banda.
+
+        Los resultados se guardan por huella de la fuente y operaciones
+        aplicadas (lectura, recortes...), banda y modo en una caché en memoria
+        de hasta ``MAX_ENTRADAS_ESTADISTICAS`` entradas, de modo que las
+        llamadas repetidas son O(1). Si se indica ``ruta_estadisticas`` (p.
+        ej. en un directorio de caché), la caché se guarda en ese JSON y se
+        conserva entre reinicios; nunca se escribe junto a los datos.
+
+        Parámetros
+        ----------
+        banda : int, opcional
+            Número de banda (1-indexada). Si es None, todas las bandas.
+        modo : str, opcional
+            'exacto' (recorre todos los píxeles), 'aproximado' (usa las vistas
+            generales o un submuestreo de GDAL) o 'muestreo' (lee una rejilla
+            regular con ``fraccion`` de los píxeles y calcula con NumPy).
+        fraccion : float, opcional
+            Fracción de píxeles leída en modo 'muestreo' (0 < fraccion <= 1).
+        histograma : bool, opcional
+            Si es True, incluye un histograma de ``bins`` clases entre min y max.
+        bins : int, opcional
+            Número de clases del histograma.
+        percentiles : list[float], opcional
+            Percentiles (0-100) a calcular; exactos sobre la muestra en modo
+            'muestreo', interpolados del histograma en el resto.
+        cache : bool, opcional
+            Si es False, recalcula sin consultar la caché.
+
+        Retorna
+        -------
+        dict
+            {'modo', 'min', 'max', 'mean', 'stddev'} y, si se piden,
+            'histograma' {'min', 'max', 'conteos'} y 'percentiles' {'pNN': valor}.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        if modo not in MODOS_ESTADISTICAS:
+            raise ValueError(f"Modo de estadísticas no soportado: {modo}. Usa uno de {MODOS_ESTADISTICAS}")
+
+        if banda is None:
+            return {
+                str(i): self.estadisticas(i, modo, fraccion, histograma, bins, percentiles, cache)
+                for i in range(1, self.datasource.RasterCount + 1)
+            }
+
+        band = self.datasource.GetRasterBand(int(banda))
+        if band is None:
+            raise Exception(f"No existe la banda '{banda}'")
+
+        percentiles = sorted(float(q) for q in percentiles) if percentiles else None
+        clave = json.dumps([
+            self._estado, int(banda), modo,
+            float(fraccion) if modo == 'muestreo' else None,
+            int(bins) if (histograma or percentiles) else None,
+            bool(histograma), percentiles,
+        ])
+
+        entradas = self._cache_estadisticas()
+        if cache and clave in entradas:
+            # Pasa al final: las primeras entradas son las de uso más antiguo
+            entradas[clave] = entradas.pop(clave)
+            return dict(entradas[clave])
+
+        if modo == 'muestreo':
+            resultado = self._estadisticas_muestreo(band, fraccion, histograma, bins, percentiles)
+        else:
+            aprox = modo == 'aproximado'
+            vmin, vmax, media, desv = band.ComputeStatistics(aprox)
+            resultado = {'modo': modo, 'min': vmin, 'max': vmax, 'mean': media, 'stddev': desv}
+            if histograma or percentiles:
+                conteos = list(band.GetHistogram(vmin, vmax, buckets=int(bins),
+                                                 include_out_of_range=1, approx_ok=aprox))
+                if histograma:
+                    resultado['histograma'] = {'min': vmin, 'max': vmax, 'conteos': conteos}
+                if percentiles:
+                    resultado['percentiles'] = _percentiles_histograma(conteos, vmin, vmax, percentiles)
+
+        entradas[clave] = resultado
+        while len(entradas) > MAX_ENTRADAS_ESTADISTICAS:
+            del entradas[next(iter(entradas))]
+        self._guardar_cache_estadisticas()
+        return dict(resultado)
+
+    def _estadisticas_muestreo(self, band, fraccion, histograma, bins, percentiles):
+        """Estadísticas con NumPy sobre una rejilla regular de píxeles de la banda."""
+        import numpy as np
+
+        fraccion = float(fraccion)
+        if not 0 < fraccion <= 1:
+            raise ValueError("fraccion debe estar en (0, 1]")
+
+        # Leer a un buffer reducido: GDAL toma un píxel de cada celda (o de
+        # las vistas generales si existen), sin cargar la banda completa.
+        factor = fraccion ** 0.5
+        bx = max(1, int(round(band.XSize * factor)))
+        by = max(1, int(round(band.YSize * factor)))
+        valores = band.ReadAsArray(buf_xsize=bx, buf_ysize=by).astype(np.float64).ravel()
+
+        nodata = band.GetNoDataValue()
+        validos = np.isfinite(valores)
+        if nodata is not None:
+            validos &= valores != nodata
+        valores = valores[validos]
+        if valores.size == 0:
+            raise Exception("La banda no tiene valores válidos en la muestra")
+
+        vmin, vmax = float(valores.min()), float(valores.max())
+        resultado = {
+            'modo': 'muestreo',
+            'min': vmin,
+            'max': vmax,
+            'mean': float(valores.mean()),
+            'stddev': float(valores.std()),
+            'n_muestras': int(valores.size),
+        }
+        if histograma:
+            conteos, _ = np.histogram(valores, bins=int(bins), range=(vmin, vmax))
+            resultado['histograma'] = {'min': vmin, 'max': vmax, 'conteos': conteos.tolist()}
+        if percentiles:
+            resultado['percentiles'] = {
+                f'p{q:g}': float(v) for q, v in zip(percentiles, np.percentile(valores, percentiles))
+            }
+        return resultado
+
+    def _lista_estadisticas(self, banda):
+        """[min, max, mean, stddev] aproximadas de una banda (cacheadas)."""
+        stats = self.estadisticas(banda, modo='aproximado')
+        return [stats['min'], stats['max'], stats['mean'], stats['stddev']]
+
+    def _huella(self):
+        """Huella de la fuente y de las operaciones aplicadas, clave de las cachés de teselas."""
+        return hashlib.sha1(f"{huella_fuente(self.dato)}:{self._estado}".encode('utf-8')).hexdigest()
+
+    def configurar_cache_teselas(self, max_bytes=64 * 1024 * 1024, ruta_mbtiles=None, max_teselas_disco=None):
+        """
+        Configura la caché de teselas ráster: una LRU en memoria acotada por
+        bytes y, opcionalmente, una caché en disco SQLite con esquema MBTiles.
+
+        Parámetros
+        ----------
+        max_bytes : int, opcional
+            Presupuesto en bytes de la caché en memoria.
+        ruta_mbtiles : str, opcional
+            Ruta del archivo MBTiles de la caché en disco (uno por fuente).
+        max_teselas_disco : int, opcional
+            Número máximo de teselas en disco (expulsión por último acceso).
+        """
+        self.cache_teselas = CacheLRU(max_bytes=max_bytes)
+        self.cache_teselas_disco = (
+            CacheMBTiles(ruta_mbtiles, max_teselas_disco, formato='png', fuente=id_fuente(self.dato))
+            if ruta_mbtiles else None
+        )
+        self._huella_teselas = None
+
+    def invalidar_cache_teselas(self):
+        """Vacía las cachés de teselas en memoria y en disco."""
+        if self.cache_teselas is not None:
+            self.cache_teselas.limpiar()
+        if self.cache_teselas_disco is not None:
+            self.cache_teselas_disco.invalidar()
+
+    def _preparar_cache_teselas(self):
+        """Crea la caché si no existe y descarta lo generado con otra huella."""
+        if self.cache_teselas is None:
+            self.configurar_cache_teselas()
+        huella = self._huella()
+        if huella != self._huella_teselas:
+            self.cache_teselas.invalidar(predicado=lambda k: k[0] != huella)
+            if self.cache_teselas_disco is not None:
+                self.cache_teselas_disco.invalidar(huella)
+            self._huella_teselas = huella
+        return huella
+
+    def _tesela_cacheada(self, huella, clave):
+        """Busca una tesela en memoria y después en disco (subiéndola a memoria)."""
+        datos = self.cache_teselas.obtener((huella, clave))
+        if datos is None and self.cache_teselas_disco is not None:
+            datos = self.cache_teselas_disco.obtener(clave, huella)
+            if datos is not None:
+                self.cache_teselas.guardar((huella, clave), datos)
+        return datos
+
+    def _guardar_tesela(self, huella, clave, z, x, y, datos):
+        self.cache_teselas.guardar((huella, clave), datos)
+        if self.cache_teselas_disco is not None:
+            self.cache_teselas_disco.guardar(clave, z, x, y, datos, huella)
+
+    @staticmethod
+    def _opciones_tesela(formato, tamaño, remuestreo, bandas):
+        """Normaliza y valida las opciones de tesela (tupla usada en la clave)."""
+        formato = str(formato).lower()
+        if formato not in FORMATOS_TESELA:
+            raise ValueError(f"Formato de tesela no soportado: {formato}. Usa uno de {tuple(FORMATOS_TESELA)}")
+        tamaño = int(tamaño)
+        if tamaño not in (256, 512):
+            raise ValueError("El tamaño de tesela debe ser 256 o 512 píxeles")
+        bandas = tuple(int(b) for b in bandas) if bandas else None
+        return formato, tamaño, remuestreo, bandas
+
+    def tesela(self, z, x, y, formato='png', tamaño=256, remuestreo='bilinear', bandas=None):
+        """
+        Genera la tesela z/x/y (XYZ de WebMercator) del ráster como imagen.
+
+        El ráster se reproyecta con ``gdal.Warp`` directamente a la ventana de
+        la tesela en EPSG:3857, leyendo de las vistas generales (overviews)
+        adecuadas al zoom cuando existen. Las bandas que no son Byte se
+        escalan a 0-255 con las estadísticas aproximadas de cada banda (ver
+        ``estadisticas``); las Byte se mantienen sin escalar. El resultado se guarda en la caché de teselas (ver
+        ``configurar_cache_teselas``), cuya clave incluye la huella de la
+        fuente y de las operaciones aplicadas (recortes, bandas...).
+
+        Parámetros
+        ----------
+        z, x, y : int
+            Índices de la tesela en el esquema XYZ de WebMercator.
+        formato : str, opcional
+            'png', 'webp' o 'jpeg'. PNG y WebP incluyen transparencia fuera
+            del ráster y en los píxeles NoData.
+        tamaño : int, opcional
+            Lado de la tesela en píxeles (256 o 512).
+        remuestreo : str, opcional
+            Algoritmo de remuestreo de GDAL ('near', 'bilinear', 'cubic'...).
+        bandas : list[int], opcional
+            Bandas a representar (1 o 3). Por defecto, 1-2-3 si hay al menos
+            tres bandas y la 1 en otro caso.
+
+        Retorna
+        -------
+        bytes
+            Imagen codificada de la tesela.
+        """
+        _asegurar_gdal()
+
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        z, x, y = validar_tesela(z, x, y)
+        opciones = self._opciones_tesela(formato, tamaño, remuestreo, bandas)
+
+        huella = self._preparar_cache_teselas()
+        clave = f"{':'.join(map(str, opciones))}/{z}/{x}/{y}"
+        datos = self._tesela_cacheada(huella, clave)
+        if datos is not None:
+            return datos
+
+        datos = self._generar_tesela(z, x, y, *opciones)
+        self._guardar_tesela(huella, clave, z, x, y, datos)
+        return datos
+
+    def _generar_tesela(self, z, x, y, formato, tamaño, remuestreo, bandas):
+        """Reproyecta la ventana de la tesela y la codifica en /vsimem/."""
+        gdal.UseExceptions()
+
+        driver, transparencia = FORMATOS_TESELA[formato]
+        if gdal.GetDriverByName(driver) is None:
+            raise RuntimeError(f"El driver {driver} de GDAL no está disponible.")
+
+        if bandas is None:
+            bandas = (1, 2, 3) if self.datasource.RasterCount >= 3 else (1,)
+        if driver == 'WEBP' and len(bandas) == 1:
+            # WebP solo admite RGB/RGBA: gris replicado en las tres bandas
+            bandas = bandas * 3
+
+        # Warp a la ventana exacta de la tesela; -ovr AUTO (por defecto)
+        # lee de la vista general más próxima a la resolución de salida
+        warp = gdal.Warp(
+            '', self.datasource,
+            format='MEM',
+            dstSRS='EPSG:3857',
+            outputBounds=limites_tesela_3857(z, x, y),
+            width=tamaño, height=tamaño,
+            resampleAlg=remuestreo,
+            srcBands=list(bandas),
+            dstBands=list(range(1, len(bandas) + 1)),
+            dstAlpha=transparencia,
+        )
+
+        # Escalar a Byte las bandas de otros tipos con sus estadísticas; las
+        # Byte conservan sus valores aunque se mezclen con otros tipos
+        escalas = None
+        if any(self.datasource.GetRasterBand(b).DataType != gdal.GDT_Byte for b in bandas):
+            escalas = []
+            for b in bandas:
+                if self.datasource.GetRasterBand(b).DataType == gdal.GDT_Byte:
+                    escalas.append([0, 255, 0, 255])
+                    continue
+                stats = self.estadisticas(b, modo='aproximado')
+                escalas.append([stats['min'], stats['max'], 0, 255])
+            if transparencia:
+                # El warper escribe el alfa entre 0 y 255 (DST_ALPHA_MAX)
+                escalas.append([0, 255, 0, 255])
+
+        ruta = f"/vsimem/tesela_{uuid.uuid4().hex}.{formato}"
+        try:
+            salida = gdal.Translate(
+                ruta, warp,
+                format=driver,
+                outputType=gdal.GDT_Byte,
+                scaleParams=escalas,
+                creationOptions=['QUALITY=85'] if driver != 'PNG' else [],
+            )
+            salida = None
+            datos = leer_vsimem(ruta)
+        finally:
+            borrar_vsimem(ruta)
+            borrar_vsimem(f"{ruta}.aux.xml")
+
+        return datos if datos is not None else b''
+
+    def _MRE_3857(self, MRE=None, EPSG_MRE=4326):
+        """
+        Bbox en EPSG:3857 de MRE (en EPSG_MRE) o, si es None, de la extensión
+        del ráster, acotado a la latitud máxima de WebMercator.
+        """
+        srs_geo = osr.SpatialReference()
+        srs_geo.ImportFromEPSG(4326)
+        srs_geo.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+        srs = osr.SpatialReference()
+        if MRE is None:
+            gt = self.datasource.GetGeoTransform()
+            xs = [gt[0], gt[0] + gt[1] * self.datasource.RasterXSize]
+            ys = [gt[3], gt[3] + gt[5] * self.datasource.RasterYSize]
+            srs.ImportFromWkt(self.datasource.GetProjection())
+        else:
+            xs, ys = [MRE[0], MRE[2]], [MRE[1], MRE[3]]
+            srs.ImportFromEPSG(normalizar_epsg(EPSG_MRE))
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+        transform = osr.CoordinateTransformation(srs, srs_geo)
+        puntos = [lonlat_a_3857(*transform.TransformPoint(px, py)[:2]) for px in xs for py in ys]
+        return [
+            min(p[0] for p in puntos), min(p[1] for p in puntos),
+            max(p[0] for p in puntos), max(p[1] for p in puntos),
+        ]
+
+    def sembrar_teselas(self, zooms, MRE=None, EPSG_MRE=4326, formato='png', tamaño=256,
+                        remuestreo='bilinear', bandas=None, procesos=None, lote=64):
+        """
+        Pregenera (siembra) en la caché las teselas de un rango de zooms.
+
+        Las teselas se recorren por lotes sin construir la lista completa y
+        las ya cacheadas se omiten (consultando la caché por lotes). Si el
+        dataset puede reabrirse a partir de ``dato`` (no se ha recortado ni
+        modificado tras ``leer``), las teselas se generan en un pool de
+        procesos, cada uno con su propio dataset GDAL y con un número acotado
+        de lotes en vuelo; en otro caso se generan en este proceso.
+
+        Parámetros
+        ----------
+        zooms : int o iterable[int]
+            Nivel o niveles de zoom (p. ej. ``range(0, 12)``).
+        MRE : list[float], opcional
+            Bbox [minx, miny, maxx, maxy] a sembrar (por defecto, la extensión
+            del ráster).
+        EPSG_MRE : int, opcional
+            EPSG del bbox.
+        formato, tamaño, remuestreo, bandas :
+            Como en ``tesela``.
+        procesos : int, opcional
+            Número de procesos (por defecto, los del sistema; 1 = sin pool).
+        lote : int, opcional
+            Teselas por tarea enviada al pool.
+
+        Retorna
+        -------
+        int
+            Número de teselas generadas.
+        """
+        _asegurar_gdal()
+
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        if isinstance(zooms, int):
+            zooms = [zooms]
+        opciones = self._opciones_tesela(formato, tamaño, remuestreo, bandas)
+        huella = self._preparar_cache_teselas()
+        prefijo = ':'.join(map(str, opciones))
+
+        lote = max(int(lote), 1)
+        lotes = self._teselas_pendientes(huella, prefijo, self._MRE_3857(MRE, EPSG_MRE), zooms, lote)
+        primero = next(lotes, None)
+        if primero is None:
+            return 0
+        segundo = next(lotes, None)
+        lotes = itertools.chain([primero] if segundo is None else [primero, segundo], lotes)
+
+        reabrible = (
+            self._args_lectura is not None
+            and self._estado == repr(['leer', *self._args_lectura])
+        )
+        if not reabrible and procesos != 1:
+            logger.info("El dataset se ha modificado tras leer(); se siembra en un solo proceso")
+        if procesos == 1 or not reabrible or segundo is None:
+            generadas = 0
+            for teselas in lotes:
+                for z, x, y in teselas:
+                    datos = self._generar_tesela(z, x, y, *opciones)
+                    self._guardar_tesela(huella, f"{prefijo}/{z}/{x}/{y}", z, x, y, datos)
+                generadas += len(teselas)
+            return generadas
+
+        # Calcular antes las estadísticas de escalado: los procesos reciben
+        # la caché en lugar de recalcularlas cada uno
+        for b in (opciones[3] or ((1, 2, 3) if self.datasource.RasterCount >= 3 else (1,))):
+            if self.datasource.GetRasterBand(b).DataType != gdal.GDT_Byte:
+                self.estadisticas(b, modo='aproximado')
+
+        def _guardar(futuro):
+            resultado = futuro.result()
+            for z, x, y, datos in resultado:
+                self._guardar_tesela(huella, f"{prefijo}/{z}/{x}/{y}", z, x, y, datos)
+            return len(resultado)
+
+        # Lotes en vuelo limitados para acotar la memoria de los resultados
+        limite = 2 * (procesos or os.cpu_count() or 1)
+        generadas = 0
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            en_vuelo = deque()
+            for teselas in lotes:
+                en_vuelo.append(pool.submit(_generar_teselas_proceso, self.dato, self._args_lectura,
+                                            self._estadisticas, teselas, opciones))
+                if len(en_vuelo) >= limite:
+                    generadas += _guardar(en_vuelo.popleft())
+            while en_vuelo:
+                generadas += _guardar(en_vuelo.popleft())
+        return generadas
+
+    def _teselas_pendientes(self, huella, prefijo, MRE_3857, zooms, lote):
+        """
+        Genera lotes (listas de hasta ``lote`` teselas z, x, y) de las teselas
+        de los zooms que no están en la caché, recorriéndolas sin
+        materializarlas y consultando la caché en disco una vez por lote.
+        """
+        for zoom in zooms:
+            teselas = teselas_en_bbox(MRE_3857, zoom)
+            while True:
+                bloque = list(itertools.islice(teselas, lote))
+                if not bloque:
+                    break
+                claves = [f"{prefijo}/{z}/{x}/{y}" for z, x, y in bloque]
+                cacheadas = {c for c in claves if (huella, c) in self.cache_teselas}
+                if self.cache_teselas_disco is not None:
+                    cacheadas |= self.cache_teselas_disco.existentes(
+                        [c for c in claves if c not in cacheadas], huella
+                    )
+                pendientes = [t for t, c in zip(bloque, claves) if c not in cacheadas]
+                if pendientes:
+                    yield pendientes
+
+    def muestrear(self, puntos, EPSG_puntos=4326, bandas=None, interpolacion='nearest', capa=None):
+        """
+        Obtiene los valores del ráster en un conjunto de puntos.
+
+        Todos los puntos se transforman al SRS del ráster en una sola llamada
+        a ``TransformPoints``, se agrupan por bloque nativo del ráster y solo
+        se leen los bloques que contienen algún punto, de modo que nunca se
+        carga la banda completa.
+
+        Parámetros
+        ----------
+        puntos : list[tuple], GeoJSON, ogr.Layer o FuenteDatosVector
+            Pares (x, y) en EPSG_puntos, un GeoJSON de puntos (dict, str o
+            ``geojsonQuery`` de los conectores IoT, en lon/lat WGS84) o una
+            capa de puntos (se usa su SRS).
+        EPSG_puntos : int, opcional
+            EPSG de los pares (x, y) (ignorado si los datos traen su SRS).
+        bandas : list[int], opcional
+            Bandas a muestrear (por defecto, todas).
+        interpolacion : str, opcional
+            'nearest' (píxel que contiene el punto) o 'bilinear' (media
+            ponderada de los cuatro centros de píxel más próximos).
+        capa : str o int, opcional
+            Capa de la FuenteDatosVector (por defecto, la primera).
+
+        Retorna
+        -------
+        numpy.ndarray
+            Array float64 de forma (n_puntos, n_bandas), en el orden de los
+            puntos. NaN fuera del ráster, en NoData o sin geometría de punto.
+        """
+        import numpy as np
+
+        _asegurar_gdal()
+
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        if interpolacion not in INTERPOLACIONES_MUESTREO:
+            raise ValueError(f"Interpolación no soportada: {interpolacion}. Usa una de {INTERPOLACIONES_MUESTREO}")
+
+        coords, srs_puntos = _coordenadas_puntos(puntos, capa)
+        if srs_puntos is None:
+            srs_puntos = osr.SpatialReference()
+            srs_puntos.ImportFromEPSG(normalizar_epsg(EPSG_puntos))
+        xy = self._transformar_puntos(np.array(coords, dtype=np.float64).reshape(-1, 2), srs_puntos)
+        return self._muestrear_xy(xy, bandas, interpolacion)
+
+    def _transformar_puntos(self, xy, srs_puntos):
+        """Transforma (en una sola llamada) un array (n, 2) de puntos al SRS del ráster."""
+        import numpy as np
+
+        srs_raster = osr.SpatialReference()
+        srs_raster.ImportFromWkt(self.datasource.GetProjection())
+        if xy.shape[0] == 0 or srs_puntos.IsSame(srs_raster):
+            return xy
+        srs_puntos = srs_puntos.Clone()
+        srs_puntos.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        srs_raster.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        xy = xy.copy()
+        validos = np.isfinite(xy).all(axis=1)
+        transform = osr.CoordinateTransformation(srs_puntos, srs_raster)
+        transformados = transform.TransformPoints(xy[validos].tolist())
+        xy[validos] = np.array(transformados, dtype=np.float64).reshape(-1, 3)[:, :2]
+        return xy
+
+    def _muestrear_xy(self, xy, bandas, interpolacion):
+        """Muestrea self.datasource en un array (n, 2) de puntos ya en su SRS."""
+        import numpy as np
+
+        ds = self.datasource
+        bandas = [int(b) for b in bandas] if bandas else list(range(1, ds.RasterCount + 1))
+        resultado = np.full((xy.shape[0], len(bandas)), np.nan)
+        if xy.shape[0] == 0:
+            return resultado
+
+        # Coordenadas de píxel (fraccionarias) con la geotransformación inversa
+        inv = gdal.InvGeoTransform(ds.GetGeoTransform())
+        col = inv[0] + inv[1] * xy[:, 0] + inv[2] * xy[:, 1]
+        fil = inv[3] + inv[4] * xy[:, 0] + inv[5] * xy[:, 1]
+        ancho, alto = ds.RasterXSize, ds.RasterYSize
+        dentro = np.flatnonzero((col >= 0) & (col < ancho) & (fil >= 0) & (fil < alto))
+        if dentro.size == 0:
+            return resultado
+
+        bilineal = interpolacion == 'bilinear'
+        if bilineal:
+            # Referidas a los centros de píxel; en los bordes se repite el último
+            cx = np.clip(col[dentro] - 0.5, 0, ancho - 1)
+            cy = np.clip(fil[dentro] - 0.5, 0, alto - 1)
+            c0 = np.minimum(np.floor(cx).astype(np.int64), max(ancho - 2, 0))
+            f0 = np.minimum(np.floor(cy).astype(np.int64), max(alto - 2, 0))
+            dx, dy = cx - c0, cy - f0
+        else:
+            c0 = col[dentro].astype(np.int64)
+            f0 = fil[dentro].astype(np.int64)
+
+        # Agrupar por bloque nativo y leer solo los bloques tocados
+        bx, by = ds.GetRasterBand(bandas[0]).GetBlockSize()
+        bloques_x = -(-ancho // bx)
+        bloque = (f0 // by) * bloques_x + (c0 // bx)
+        orden = np.argsort(bloque, kind='stable')
+        inicios = np.flatnonzero(np.r_[True, bloque[orden][1:] != bloque[orden][:-1]])
+        fines = np.r_[inicios[1:], orden.size]
+
+        nodata = [ds.GetRasterBand(b).GetNoDataValue() for b in bandas]
+        margen = 1 if bilineal else 0
+
+        for ini, fin in zip(inicios, fines):
+            idx = orden[ini:fin]
+            xoff = int(c0[idx[0]] // bx) * bx
+            yoff = int(f0[idx[0]] // by) * by
+            xsize = min(bx + margen, ancho - xoff)
+            ysize = min(by + margen, alto - yoff)
+            datos = ds.ReadAsArray(xoff, yoff, xsize, ysize, band_list=bandas)
+            datos = np.asarray(datos, dtype=np.float64).reshape(len(bandas), ysize, xsize)
+            for i, nd in enumerate(nodata):
+                if nd is not None:
+                    datos[i][datos[i] == nd] = np.nan
+
+            lc = c0[idx] - xoff
+            lf = f0[idx] - yoff
+            if bilineal:
+                lc1 = np.minimum(lc + 1, xsize - 1)
+                lf1 = np.minimum(lf + 1, ysize - 1)
+                wx, wy = dx[idx], dy[idx]
+                valores = (
+                    datos[:, lf, lc] * (1 - wx) * (1 - wy)
+                    + datos[:, lf, lc1] * wx * (1 - wy)
+                    + datos[:, lf1, lc] * (1 - wx) * wy
+                    + datos[:, lf1, lc1] * wx * wy
+                )
+            else:
+                valores = datos[:, lf, lc]
+            resultado[dentro[idx]] = valores.T
+
+        return resultado
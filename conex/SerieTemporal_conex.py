@@ -0,0 +1,393 @@
+# Documentación de referencia:
+# https://docs.ogc.org/cs/21-069r2/21-069r2.html (CoverageJSON)
+
+import os
+import re
+import glob
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Intenta importar GDAL/OGR. El fallo se difiere hasta que realmente se use
+# GDAL (ver _asegurar_gdal), de modo que importar este módulo no aborte el
+# proceso cuando GDAL no está instalado.
+try:
+    from osgeo import osr, gdal
+except Exception:  # pragma: no cover - depende del entorno
+    # El error concreto se gestiona de forma centralizada en gdal_utils.
+    osr = gdal = None
+
+from .gdal_utils import asegurar_gdal, normalizar_epsg, transformar_MRE
+from .Raster_conex import FuenteDatosRaster, INTERPOLACIONES_MUESTREO, _coordenadas_puntos
+
+# Expresión y formato por defecto de la fecha en el nombre de archivo (p. ej. ndvi_20240131.tif)
+PATRON_FECHA = r'(\d{8})'
+FORMATO_FECHA = '%Y%m%d'
+
+# Cortes abiertos a la vez (manejadores GDAL); los menos usados se cierran
+MAX_CORTES_ABIERTOS = 64
+
+
+def _asegurar_gdal():
+    """Lanza un error claro si GDAL/OGR no está disponible (para FuenteDatosSerieTemporal)."""
+    asegurar_gdal("FuenteDatosSerieTemporal")
+
+
+def _instante(valor):
+    """Convierte un datetime, una fecha ISO 8601 (str) o None en datetime/None."""
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(str(valor))
+
+
+class FuenteDatosSerieTemporal:
+    """
+    Serie temporal de rásteres con la misma rejilla (p. ej. un producto
+    diario), consultable por bbox, intervalo de tiempo y puntos.
+
+    Cada corte temporal es una ``FuenteDatosRaster`` que solo se abre la
+    primera vez que una consulta la necesita; como mucho quedan abiertos
+    max_abiertos cortes (LRU) y ``cerrar`` los libera todos. Las consultas leen únicamente
+    la ventana pedida de cada corte del intervalo, repartiendo los cortes
+    entre varios hilos (cada corte con su propio bloqueo, ya que un dataset
+    GDAL no puede usarse desde dos hilos a la vez).
+
+    Atributos:
+    ----------
+    dato : str, list o dict
+        Directorio, patrón glob, lista de rutas o dict {instante: ruta}.
+    cortes : list[tuple]
+        (instante, ruta) ordenados por instante (tras ``leer``).
+    """
+
+    def __init__(self, dato, patron_fecha=PATRON_FECHA, formato_fecha=FORMATO_FECHA, patron='*.tif', hilos=None,
+                 max_abiertos=MAX_CORTES_ABIERTOS):
+        """
+        Parámetros
+        ----------
+        dato : str, list o dict
+            Directorio, patrón glob o lista de rutas (la fecha se extrae del
+            nombre de archivo), o dict {instante (datetime o ISO 8601): ruta}.
+        patron_fecha : str, opcional
+            Expresión regular cuyo primer grupo captura la fecha del nombre.
+        formato_fecha : str, opcional
+            Formato de ``datetime.strptime`` de la fecha capturada.
+        patron : str, opcional
+            Patrón de nombres cuando dato es un directorio.
+        hilos : int, opcional
+            Número de hilos de lectura (por defecto, el de ThreadPoolExecutor).
+        max_abiertos : int, opcional
+            Número máximo de cortes abiertos a la vez; al superarlo se cierra
+            el menos usado recientemente (que no esté leyéndose).
+        """
+        self.dato = dato
+        self.patron_fecha = patron_fecha
+        self.formato_fecha = formato_fecha
+        self.patron = patron
+        self.hilos = hilos
+        self.max_abiertos = max(1, int(max_abiertos))
+        self.banda = 1
+        self.EPSG_Entrada = None
+        self.cortes = []
+        # Rejilla de referencia (del primer corte, ver leer)
+        self.ancho = self.alto = None
+        self.geotransform = None
+        self.proyeccion = None
+        self._fuentes = OrderedDict()
+        self._bloqueos = {}
+        self._lock_fuentes = threading.Lock()
+
+    def _listar_cortes(self):
+        """Lista (instante, ruta) de la serie, ordenada por instante."""
+        if isinstance(self.dato, dict):
+            return sorted((_instante(t), ruta) for t, ruta in self.dato.items())
+
+        if isinstance(self.dato, (list, tuple)):
+            rutas = list(self.dato)
+        elif os.path.isdir(self.dato):
+            rutas = glob.glob(os.path.join(self.dato, self.patron))
+        else:
+            rutas = glob.glob(self.dato)
+
+        cortes = []
+        expresion = re.compile(self.patron_fecha)
+        for ruta in rutas:
+            coincidencia = expresion.search(os.path.basename(ruta))
+            if coincidencia is None:
+                logger.warning(f"No se ha encontrado la fecha en el nombre, se omite: {ruta}")
+                continue
+            cortes.append((datetime.strptime(coincidencia.group(1), self.formato_fecha), ruta))
+        return sorted(cortes)
+
+    def leer(self, banda=1, EPSG_Entrada=None):
+        """
+        Localiza los cortes de la serie y abre solo el primero para obtener
+        la rejilla de referencia (tamaño, geotransformación y SRS).
+
+        Parámetros
+        ----------
+        banda : int, opcional
+            Banda que se consulta de cada corte.
+        EPSG_Entrada : int o str, opcional
+            EPSG que se asigna a los cortes sin proyección.
+
+        Retorna
+        -------
+        list[datetime]
+            Instantes de la serie.
+        """
+        _asegurar_gdal()
+
+        self.banda = int(banda)
+        self.EPSG_Entrada = EPSG_Entrada
+        self.cortes = self._listar_cortes()
+        if not self.cortes:
+            raise RuntimeError(f"No se han encontrado rásteres en la serie: {self.dato}")
+        self.cerrar()
+        self._bloqueos = {ruta: threading.Lock() for _, ruta in self.cortes}
+
+        with self._bloqueos[self.cortes[0][1]]:
+            referencia = self._fuente(self.cortes[0][1]).datasource
+        self.ancho, self.alto = referencia.RasterXSize, referencia.RasterYSize
+        self.geotransform = referencia.GetGeoTransform()
+        self.proyeccion = referencia.GetProjection()
+        return self.obtener_instantes()
+
+    def _fuente(self, ruta):
+        """
+        FuenteDatosRaster del corte, abierta la primera vez que se pide (con
+        el bloqueo del corte ya adquirido). Si hay más de max_abiertos
+        cortes abiertos, cierra los menos usados que no estén en uso.
+        """
+        with self._lock_fuentes:
+            fuente = self._fuentes.get(ruta)
+            if fuente is not None:
+                self._fuentes.move_to_end(ruta)
+                return fuente
+
+        fuente = FuenteDatosRaster(ruta)
+        fuente.leer(EPSG_Entrada=self.EPSG_Entrada)
+        with self._lock_fuentes:
+            self._fuentes[ruta] = fuente
+            for anterior in list(self._fuentes):
+                if len(self._fuentes) <= self.max_abiertos:
+                    break
+                # Un corte cuyo bloqueo está tomado se está leyendo: se salta
+                bloqueo = self._bloqueos[anterior]
+                if anterior == ruta or not bloqueo.acquire(blocking=False):
+                    continue
+                try:
+                    self._fuentes.pop(anterior).cerrar()
+                finally:
+                    bloqueo.release()
+        return fuente
+
+    def cerrar(self):
+        """Cierra los cortes abiertos (se reabren si una consulta los necesita)."""
+        with self._lock_fuentes:
+            abiertas = list(self._fuentes.items())
+            self._fuentes.clear()
+        for ruta, fuente in abiertas:
+            with self._bloqueos[ruta]:
+                fuente.cerrar()
+
+    def obtener_instantes(self, inicio=None, fin=None):
+        """Instantes de la serie en el intervalo [inicio, fin] (ambos opcionales)."""
+        return [t for t, _ in self._cortes(inicio, fin)]
+
+    def _cortes(self, inicio=None, fin=None):
+        if not self.cortes:
+            raise Exception("Primero debes llamar a leer()")
+        inicio, fin = _instante(inicio), _instante(fin)
+        return [
+            (t, ruta) for t, ruta in self.cortes
+            if (inicio is None or t >= inicio) and (fin is None or t <= fin)
+        ]
+
+    def _en_paralelo(self, funcion, cortes):
+        """Aplica funcion(fuente) a cada corte en un pool de hilos, en orden."""
+        def _tarea(corte):
+            ruta = corte[1]
+            with self._bloqueos[ruta]:
+                return funcion(self._fuente(ruta))
+
+        with ThreadPoolExecutor(max_workers=self.hilos) as ejecutor:
+            return list(ejecutor.map(_tarea, cortes))
+
+    def _ventana(self, MRE=None, EPSG_MRE=4326):
+        """Ventana (xoff, yoff, w, h) de la rejilla que cubre el bbox (todo si es None)."""
+        if MRE is None:
+            return 0, 0, self.ancho, self.alto
+
+        srs_mre = osr.SpatialReference()
+        srs_mre.ImportFromEPSG(normalizar_epsg(EPSG_MRE))
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(self.proyeccion)
+        minx, miny, maxx, maxy = transformar_MRE(MRE, srs_mre, srs)
+
+        inv = gdal.InvGeoTransform(self.geotransform)
+        cols, filas = [], []
+        for x, y in ((minx, miny), (minx, maxy), (maxx, miny), (maxx, maxy)):
+            c, f = gdal.ApplyGeoTransform(inv, x, y)
+            cols.append(c)
+            filas.append(f)
+        c0 = max(0, min(self.ancho, int(min(cols))))
+        c1 = max(0, min(self.ancho, int(-(-max(cols) // 1))))
+        f0 = max(0, min(self.alto, int(min(filas))))
+        f1 = max(0, min(self.alto, int(-(-max(filas) // 1))))
+        if c1 <= c0 or f1 <= f0:
+            raise Exception("BBox fuera de la serie")
+        return c0, f0, c1 - c0, f1 - f0
+
+    def cubo(self, MRE=None, EPSG_MRE=4326, inicio=None, fin=None):
+        """
+        Lee la ventana del bbox en todos los cortes del intervalo.
+
+        Parámetros
+        ----------
+        MRE : list[float], opcional
+            Bbox [minx, miny, maxx, maxy] (por defecto, toda la rejilla).
+        EPSG_MRE : int, opcional
+            EPSG del bbox.
+        inicio, fin : datetime o str (ISO 8601), opcional
+            Límites (incluidos) del intervalo de tiempo.
+
+        Retorna
+        -------
+        tuple(list[datetime], numpy.ndarray, tuple)
+            Instantes, cubo float64 de forma (t, y, x) con NaN en NoData y
+            geotransformación de la ventana.
+        """
+        import numpy as np
+
+        cortes = self._cortes(inicio, fin)
+        xoff, yoff, w, h = self._ventana(MRE, EPSG_MRE)
+
+        def _leer(fuente):
+            ds = fuente.datasource
+            if (ds.RasterXSize, ds.RasterYSize) != (self.ancho, self.alto):
+                raise Exception(f"El corte {fuente.dato} no comparte la rejilla de la serie")
+            band = ds.GetRasterBand(self.banda)
+            datos = band.ReadAsArray(xoff, yoff, w, h).astype(np.float64)
+            nodata = band.GetNoDataValue()
+            if nodata is not None:
+                datos[datos == nodata] = np.nan
+            return datos
+
+        capas = self._en_paralelo(_leer, cortes)
+        cubo = np.stack(capas) if capas else np.empty((0, h, w))
+        gt = self.geotransform
+        gt_ventana = (
+            gt[0] + xoff * gt[1] + yoff * gt[2], gt[1], gt[2],
+            gt[3] + xoff * gt[4] + yoff * gt[5], gt[4], gt[5],
+        )
+        return [t for t, _ in cortes], cubo, gt_ventana
+
+    def serie_puntos(self, puntos, EPSG_puntos=4326, inicio=None, fin=None, interpolacion='nearest', capa=None):
+        """
+        Valores de la serie en un conjunto de puntos (ver
+        ``FuenteDatosRaster.muestrear``): en cada corte solo se leen los
+        bloques que contienen algún punto.
+
+        Las coordenadas se extraen y transforman al SRS de la rejilla una sola
+        vez, antes de repartir los cortes entre los hilos (las capas OGR no se
+        pueden recorrer desde varios hilos y un iterable solo se consume una vez).
+
+        Retorna
+        -------
+        tuple(list[datetime], numpy.ndarray)
+            Instantes y array float64 de forma (t, n_puntos).
+        """
+        import numpy as np
+
+        if interpolacion not in INTERPOLACIONES_MUESTREO:
+            raise ValueError(f"Interpolación no soportada: {interpolacion}. Usa una de {INTERPOLACIONES_MUESTREO}")
+        cortes = self._cortes(inicio, fin)
+
+        coords, srs_puntos = _coordenadas_puntos(puntos, capa)
+        if srs_puntos is None:
+            srs_puntos = osr.SpatialReference()
+            srs_puntos.ImportFromEPSG(normalizar_epsg(EPSG_puntos))
+        xy = np.array(coords, dtype=np.float64).reshape(-1, 2)
+        if not cortes:
+            return [], np.empty((0, xy.shape[0]))
+        # Todos los cortes comparten rejilla: basta el SRS del primero
+        ruta = cortes[0][1]
+        with self._bloqueos[ruta]:
+            xy = self._fuente(ruta)._transformar_puntos(xy, srs_puntos)
+
+        valores = self._en_paralelo(
+            lambda fuente: fuente._muestrear_xy(xy, [self.banda], interpolacion)[:, 0],
+            cortes,
+        )
+        return [t for t, _ in cortes], np.array(valores).reshape(len(cortes), -1)
+
+    def exportar_coveragejson(self, MRE=None, EPSG_MRE=4326, inicio=None, fin=None):
+        """
+        Exporta el cubo del bbox e intervalo como CoverageJSON con eje
+        temporal 't' (como ``FuenteDatosRaster.exportar(outputFormat='json')``).
+
+        Retorna
+        -------
+        dict
+            Coverage con dominio Grid (x, y, t) y rango NdArray (t, y, x);
+            los NoData se representan como null.
+        """
+        import numpy as np
+
+        instantes, cubo, gt = self.cubo(MRE, EPSG_MRE, inicio, fin)
+        _, alto, ancho = cubo.shape
+
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(self.proyeccion)
+        codigo = srs.GetAuthorityCode(None)
+        sistema = {
+            'type': 'GeographicCRS' if srs.IsGeographic() else 'ProjectedCRS',
+            'id': f"http://www.opengis.net/def/crs/EPSG/0/{codigo}" if codigo else srs.ExportToWkt(),
+        }
+
+        with self._bloqueos[self.cortes[0][1]]:
+            band = self._fuente(self.cortes[0][1]).datasource.GetRasterBand(self.banda)
+            descripcion = band.GetDescription() or f'Band {self.banda}'
+            unidad = band.GetUnitType() or ''
+        nombre = f'band_{self.banda}'
+        valores = np.where(np.isnan(cubo), None, cubo).ravel().tolist()
+
+        return {
+            'type': 'Coverage',
+            'domain': {
+                'type': 'Domain',
+                'domainType': 'Grid',
+                'axes': {
+                    # Centros de píxel de la ventana
+                    'x': {'start': gt[0] + gt[1] / 2, 'stop': gt[0] + gt[1] * (ancho - 0.5), 'num': ancho},
+                    'y': {'start': gt[3] + gt[5] / 2, 'stop': gt[3] + gt[5] * (alto - 0.5), 'num': alto},
+                    't': {'values': [t.isoformat() for t in instantes]},
+                },
+                'referencing': [
+                    {'coordinates': ['x', 'y'], 'system': sistema},
+                    {'coordinates': ['t'], 'system': {'type': 'TemporalRS', 'calendar': 'Gregorian'}},
+                ],
+            },
+            'parameters': {
+                nombre: {
+                    'type': 'Parameter',
+                    'description': {'en': descripcion},
+                    'unit': {'symbol': unidad},
+                    'observedProperty': {'id': nombre, 'label': {'en': descripcion}},
+                }
+            },
+            'ranges': {
+                nombre: {
+                    'type': 'NdArray',
+                    'dataType': 'float',
+                    'axisNames': ['t', 'y', 'x'],
+                    'shape': [len(instantes), alto, ancho],
+                    'values': valores,
+                }
+            },
+        }
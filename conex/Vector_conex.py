@@ -3,10 +3,13 @@
 # https://gdal.org/en/stable/api/python/index.html
 
 import os
+import re
 import sys
 import json
+import uuid
 import logging
 import zipfile
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +22,10 @@ except Exception:  # pragma: no cover - depende del entorno
     # El error concreto se gestiona de forma centralizada en gdal_utils.
     ogr = osr = gdal = None
 
-from .gdal_utils import asegurar_gdal, normalizar_epsg, probar_gdal_ogr as _probar_gdal_ogr
+from .gdal_utils import asegurar_gdal, normalizar_epsg, leer_vsimem, borrar_vsimem, probar_gdal_ogr as _probar_gdal_ogr
+from .cache_utils import CacheLRU, CacheMBTiles, huella_fuente, id_fuente
+from .teselas_utils import limites_tesela_3857, validar_tesela
+from .geojson_utils import redondear_geometria
 
 
 def _asegurar_gdal():
@@ -27,6 +33,257 @@ def _asegurar_gdal():
     asegurar_gdal("FuenteDatosVector")
 
 
+# Perfiles de exportación a formatos columnares/indexados: driver OGR,
+# extensión y opciones de creación de capa ajustadas para lectura por rangos.
+PERFILES_EXPORTACION = {
+    'FlatGeobuf': {
+        'driver': 'FlatGeobuf',
+        'extension': 'fgb',
+        # Índice R-tree empaquetado (Hilbert) al inicio del archivo
+        'opciones': ['SPATIAL_INDEX=YES', 'TEMPORARY_DIR=/vsimem/'],
+    },
+    'GeoParquet': {
+        'driver': 'Parquet',
+        'extension': 'parquet',
+        # Grupos de filas acotados + columna bbox "covering" (GeoParquet 1.1)
+        # para que los lectores puedan descartar grupos por estadísticas.
+        'opciones': [
+            'COMPRESSION=ZSTD',
+            'ROW_GROUP_SIZE=65536',
+            'GEOMETRY_ENCODING=WKB',
+            'WRITE_COVERING_BBOX=YES',
+        ],
+    },
+}
+
+# Alias aceptados en outputFormat para cada perfil
+_ALIAS_PERFILES = {
+    'flatgeobuf': 'FlatGeobuf',
+    'fgb': 'FlatGeobuf',
+    'application/flatgeobuf': 'FlatGeobuf',
+    'geoparquet': 'GeoParquet',
+    'parquet': 'GeoParquet',
+    'application/vnd.apache.parquet': 'GeoParquet',
+}
+
+# Escalas (denominador) de los niveles de generalización precalculados por
+# defecto; equivalen aproximadamente a los zooms 15, 13, 11, 9, 7 y 5.
+ESCALAS_GENERALIZACION = (10000, 50000, 250000, 1000000, 5000000, 25000000)
+
+# Tamaño de píxel de referencia OGC (0,28 mm) y metros por grado en el ecuador,
+# usados para convertir una escala en una tolerancia de simplificación.
+TAMAÑO_PIXEL_OGC = 0.00028
+METROS_POR_GRADO = 111320.0
+
+# Literales de cadena e identificadores (entre comillas dobles o simples) de
+# un filtro OGR-SQL, para saber qué campos usa.
+_PATRON_CADENAS_SQL = re.compile(r"'(?:[^']|'')*'")
+_PATRON_IDENTIFICADORES_SQL = re.compile(r'"((?:[^"]|"")+)"|\b([A-Za-z_]\w*)\b')
+
+
+def _es_url_wfs(dato):
+    """Indica si dato es una URL de petición a un servicio WFS."""
+    dato = dato.lower()
+    return dato.startswith('http') and 'service=wfs' in dato.replace(' ', '')
+
+
+def _url_wfs(url, max_features=None):
+    """
+    Prepara una URL WFS para el driver WFS de OGR: si se indica max_features,
+    sustituye MAXFEATURES (WFS 1.x) y COUNT (WFS 2.0) por ese valor.
+    """
+    if max_features is None:
+        return url
+
+    partes = urlsplit(url)
+    parametros = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True)
+                  if k.lower() not in ('maxfeatures', 'count')]
+    version = next((v for k, v in parametros if k.lower() == 'version'), '')
+    clave = 'COUNT' if version.startswith('2') else 'MAXFEATURES'
+    parametros.append((clave, str(int(max_features))))
+    return urlunsplit(partes._replace(query=urlencode(parametros, safe=':/,')))
+
+
+def _tolerancia_escala(escala, srs=None):
+    """
+    Convierte el denominador de escala en una tolerancia de simplificación
+    equivalente a un píxel de 0,28 mm, en las unidades de srs (grados si es
+    geográfico, metros en otro caso).
+    """
+    tolerancia = float(escala) * TAMAÑO_PIXEL_OGC
+    if srs is not None and srs.IsGeographic():
+        tolerancia /= METROS_POR_GRADO
+    return tolerancia
+
+
+def _tipo_json(field_defn):
+    """Traduce el tipo OGR de un campo a un tipo JSON simple."""
+    field_type = field_defn.GetFieldTypeName(field_defn.GetType()).lower()
+    if field_type in ['integer', 'integer64']:
+        return 'integer'
+    elif field_type in ['real', 'float', 'double']:
+        return 'number'
+    return 'string'
+
+
+def _extension_capa(layer):
+    """
+    Devuelve el MRE [minx, miny, maxx, maxy] de una capa, pidiéndolo primero
+    sin forzar el recorrido (force=0), o None si la capa no tiene geometría.
+    """
+    if layer.GetGeomType() == ogr.wkbNone:
+        return None
+    extension = layer.GetExtent(force=0, can_return_null=True)
+    if extension is None:
+        extension = layer.GetExtent(force=1, can_return_null=True)
+    if extension is None:
+        return None
+    minx, maxx, miny, maxy = extension
+    return [minx, miny, maxx, maxy]
+
+
+def _es_consulta(sql):
+    """Indica si sql es una consulta de lectura (SELECT/WITH) cacheable."""
+    return sql.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+def _estimar_bytes_capa(layer, muestra=100):
+    """
+    Estima la memoria que ocupa una capa a partir del tamaño WKB y de los
+    campos de una muestra de sus primeros objetos.
+    """
+    n = layer.GetFeatureCount()
+    if n <= 0:
+        return 0
+    total = leidos = 0
+    layer.ResetReading()
+    for feature in layer:
+        geom = feature.GetGeometryRef()
+        total += (geom.WkbSize() if geom is not None else 0) + 16 * feature.GetFieldCount()
+        leidos += 1
+        if leidos >= muestra:
+            break
+    layer.ResetReading()
+    return int(total / leidos * n) if leidos else 0
+
+
+def _campos_filtro(filtro):
+    """
+    Identificadores (en minúsculas) que aparecen en un filtro OGR-SQL, sin
+    contar los literales de cadena. Es un escaneo simple: puede incluir
+    palabras clave, lo que solo hace que se lean campos de más.
+    """
+    if not filtro:
+        return set()
+    texto = _PATRON_CADENAS_SQL.sub(' ', filtro)
+    return {(entre_comillas.replace('""', '"') or simple).lower()
+            for entre_comillas, simple in _PATRON_IDENTIFICADORES_SQL.findall(texto)}
+
+
+def _campos_ignorados(layer, propiedades=None, sin_geometria=False, filtro=None):
+    """
+    Devuelve la lista de campos a pasar a ``Layer.SetIgnoredFields`` para leer
+    solo ``propiedades`` (y, si sin_geometria, sin decodificar la geometría).
+    Los campos usados en ``filtro`` no se ignoran, para que el filtro de
+    atributos pueda evaluarse; deben descartarse después en la capa de salida.
+    """
+    ignorados = []
+    if propiedades is not None:
+        layer_defn = layer.GetLayerDefn()
+        nombres = [layer_defn.GetFieldDefn(i).GetName() for i in range(layer_defn.GetFieldCount())]
+        for p in propiedades:
+            if p not in nombres:
+                raise Exception(f"No existe el campo '{p}'")
+        usados = _campos_filtro(filtro)
+        ignorados = [n for n in nombres if n not in propiedades and n.lower() not in usados]
+    if sin_geometria:
+        ignorados.append('OGR_GEOMETRY')
+    return ignorados
+
+
+def _crear_capa_como(datasource, layer, nombre, propiedades=None, sin_geometria=False):
+    """
+    Crea en datasource una capa con el SRS, tipo geométrico y campos de layer,
+    limitando los campos a ``propiedades`` si se indica.
+    """
+    geom_type = ogr.wkbNone if sin_geometria else layer.GetGeomType()
+    salida = datasource.CreateLayer(nombre, layer.GetSpatialRef(), geom_type)
+    if salida is None:
+        raise RuntimeError(f"No se pudo crear la capa '{nombre}'")
+
+    layer_defn = layer.GetLayerDefn()
+    for i in range(layer_defn.GetFieldCount()):
+        field_defn = layer_defn.GetFieldDefn(i)
+        if propiedades is None or field_defn.GetName() in propiedades:
+            salida.CreateField(field_defn)
+    return salida
+
+
+def _copiar_objetos(layer, salida, limite=None, transform=None):
+    """
+    Copia a salida los objetos de layer desde su posición de lectura actual
+    (respetando sus filtros), hasta un máximo de ``limite`` objetos y
+    reproyectando las geometrías si se pasa ``transform``.
+    """
+    salida_defn = salida.GetLayerDefn()
+    n = 0
+    while limite is None or n < limite:
+        feature = layer.GetNextFeature()
+        if feature is None:
+            break
+        new_feature = ogr.Feature(salida_defn)
+        new_feature.SetFrom(feature)
+        if transform is not None:
+            geom = new_feature.GetGeometryRef()
+            if geom is not None:
+                geom.Transform(transform)
+        salida.CreateFeature(new_feature)
+        new_feature = None
+        n += 1
+    return n
+
+
+def _identificador_sql(nombre, con_esquema=False):
+    """Entrecomilla un identificador SQL; con_esquema, cada parte de 'esquema.tabla' por separado."""
+    partes = nombre.split('.') if con_esquema else [nombre]
+    return '.'.join('"' + parte.replace('"', '""') + '"' for parte in partes)
+
+
+def _fid_en_posicion(datasource, layer, posicion):
+    """
+    Resuelve con SQL nativo el FID del objeto situado en ``posicion`` (orden
+    por FID), usando solo el índice de la clave primaria. Devuelve None si el
+    driver no admite SQL nativo, la capa no tiene columna FID o hay filtro
+    espacial (en ese caso se recorre el índice espacial con SetNextByIndex).
+
+    Solo se usa sin filtro de atributos: el filtro es OGR-SQL y no tiene por
+    qué ser válido en el dialecto nativo del driver.
+    """
+    fid = layer.GetFIDColumn()
+    driver = datasource.GetDriver().GetName()
+    if not fid or driver not in ('GPKG', 'SQLite', 'PostgreSQL'):
+        return None
+    if layer.GetSpatialFilter() is not None:
+        return None
+
+    # En PostgreSQL el nombre de la capa es 'esquema.tabla'
+    tabla = _identificador_sql(layer.GetName(), con_esquema=driver == 'PostgreSQL')
+    columna = _identificador_sql(fid)
+    sql = f'SELECT {columna} FROM {tabla} ORDER BY {columna} LIMIT 1 OFFSET {int(posicion)}'
+    resultado = datasource.ExecuteSQL(sql)
+    if resultado is None:
+        return None
+    try:
+        feature = resultado.GetNextFeature()
+        if feature is None:
+            # Sin objeto en esa posición: la página está vacía.
+            return sys.maxsize
+        # Según el driver, la clave primaria se expone como FID o como campo.
+        return feature.GetField(0) if feature.GetFieldCount() else feature.GetFID()
+    finally:
+        datasource.ReleaseResultSet(resultado)
+
+
 class FuenteDatosVector:
     """
     Clase para gestionar la lectura, consulta y exportación de datos vectoriales usando GDAL/OGR.
@@ -63,11 +320,34 @@ class FuenteDatosVector:
         self.dato = dato
         self.datasource = None
         self.multiLayers = False
-
-    def leer(self, capa=None, EPSG_Entrada=None, datasetCompleto=False):
+        self.cache_teselas = None
+        self.cache_teselas_disco = None
+        self._huella_teselas = None
+        # Versiones del datasource y de cada capa para invalidar las cachés
+        # derivadas (ver _invalidar_cache)
+        self._version = 0
+        self._versiones = {}
+        self._generalizaciones = {}
+        # Caché de metadatos por capa (ver obtener_metadatos)
+        self._capas = None
+        self._metadatos = {}
+        self._huella_metadatos = None
+        self._lectura = None
+        self.cache_sql = None
+
+    def leer(self, capa=None, EPSG_Entrada=None, datasetCompleto=False,
+             bbox=None, filtro=None, columnas=None, max_features=None, EPSG_MRE=4326):
         """
         Lee la fuente de datos vectorial y la carga en memoria.
 
+        Los parámetros bbox, filtro, columnas y max_features se aplican en el
+        driver de origen antes de copiar la capa a memoria (filtro espacial,
+        filtro de atributos y campos ignorados), de modo que en PostGIS o GPKG
+        el filtrado ocurre en el servidor/índice y no se transfiere la capa
+        completa. Las URLs WFS se abren entonces con el driver WFS de OGR, que
+        traduce los filtros a BBOX/FILTER/PROPERTYNAME en la petición.
+        Solo se aplican al leer una capa (no con datasetCompleto).
+
         Parámetros
         ----------
         capa : str, opcional
@@ -76,6 +356,16 @@ class FuenteDatosVector:
             Código EPSG del sistema de referencia de entrada.
         datasetCompleto : bool, opcional
             Si es True, carga todas las capas.
+        bbox : list[float], opcional
+            Bounding box [minx, miny, maxx, maxy] en EPSG_MRE.
+        filtro : str, opcional
+            Cláusula WHERE en SQL OGR (p. ej. ``"valor > 10"``).
+        columnas : list[str], opcional
+            Campos a leer; el resto se ignoran en el driver.
+        max_features : int, opcional
+            Número máximo de objetos a leer.
+        EPSG_MRE : int o str, opcional
+            EPSG del bbox.
 
         Retorna
         -------
@@ -89,15 +379,13 @@ class FuenteDatosVector:
         if EPSG_Entrada != None:
             EPSG_Entrada = normalizar_epsg(EPSG_Entrada)
 
-        dato = self.dato
-        if 'http' in dato.lower() and not 'mvt:' in dato.lower():
-            dato = "/vsicurl/"+dato
+        lectura = repr(['leer', capa, EPSG_Entrada, datasetCompleto, bbox, filtro, columnas, max_features, EPSG_MRE])
 
-        if 'http' in dato.lower() and 'mvt:' in dato.lower():
-            pass
-
-        if 'zip' in dato.lower():
-            dato = "/vsizip/"+dato
+        filtrado = bbox is not None or bool(filtro) or columnas is not None or max_features is not None
+        if filtrado and _es_url_wfs(self.dato):
+            dato = "WFS:" + _url_wfs(self.dato, max_features)
+        else:
+            dato = self._ruta_origen()
 
         try:
             geom = ogr.CreateGeometryFromWkt(dato)
@@ -116,6 +404,8 @@ class FuenteDatosVector:
             if datasetCompleto == True and capa == None:
                 self.datasource = inDataSource
                 self.multiLayers = True
+                self._invalidar_cache()
+                self._lectura = lectura
                 return inDataSource
 
             if capa == None: 
@@ -131,6 +421,13 @@ class FuenteDatosVector:
                 
             lyr = inDataSource.GetLayer(capa)
 
+            # Empujar los filtros al driver de origen antes de copiar
+            if bbox is not None:
+                lyr.SetSpatialFilter(self._poligono_MRE(bbox, EPSG_MRE, lyr.GetSpatialRef()))
+            if filtro:
+                lyr.SetAttributeFilter(filtro)
+            if columnas is not None:
+                lyr.SetIgnoredFields(_campos_ignorados(lyr, columnas, filtro=filtro))
  
             # for feat in lyr:
             #     geom = feat.GetGeometryRef()
@@ -141,13 +438,20 @@ class FuenteDatosVector:
             outdriver=ogr.GetDriverByName('MEMORY')
             outDataSource=outdriver.CreateDataSource(capa)
 
-            #copy a layer to memory
-            outLayer=outDataSource.CopyLayer(inDataSource.GetLayer(capa),capa,['OVERWRITE=YES'])
+            if columnas is not None or max_features is not None:
+                # Copia solo las columnas pedidas y hasta max_features objetos
+                outLayer = _crear_capa_como(outDataSource, lyr, capa, columnas)
+                _copiar_objetos(lyr, outLayer, max_features)
+            else:
+                #copy a layer to memory
+                outLayer=outDataSource.CopyLayer(lyr,capa,['OVERWRITE=YES'])
 
             # for feat in outLayer:
             #     print(feat.ExportToJson())
             self.datasource = outDataSource
             self.multiLayers = False
+            self._invalidar_cache()
+            self._lectura = lectura
             return outDataSource
 
         elif tipoEntrada == 'wkt':
@@ -177,12 +481,162 @@ class FuenteDatosVector:
 
             self.datasource = outDataSource
             self.multiLayers = False
+            self._invalidar_cache()
+            self._lectura = lectura
             return outDataSource
 
         else:
             raise Exception('Valor de entrada no permitido')
 
-    def exportar(self, capa = None, EPSG_Salida=None, outputFormat='application/json', ID=None):
+    def _ruta_origen(self):
+        """
+        Devuelve la ruta de self.dato con los prefijos VSI que necesita GDAL.
+
+        Para URLs HTTP (salvo MVT) antepone ``/vsicurl/`` y para ZIP ``/vsizip/``.
+        """
+        dato = self.dato
+        if 'http' in dato.lower() and not 'mvt:' in dato.lower():
+            dato = "/vsicurl/"+dato
+
+        if 'zip' in dato.lower():
+            dato = "/vsizip/"+dato
+
+        return dato
+
+    @staticmethod
+    def _poligono_MRE(MRE, EPSG_MRE=4326, srs_destino=None):
+        """
+        Construye el polígono de un bbox [minx, miny, maxx, maxy] en EPSG_MRE y,
+        si se indica srs_destino, lo transforma a ese sistema de referencia.
+
+        Retorna
+        -------
+        ogr.Geometry
+            Polígono del bbox.
+        """
+        srs_bbox = osr.SpatialReference()
+        EPSG_MRE = normalizar_epsg(EPSG_MRE)
+        srs_bbox.ImportFromEPSG(EPSG_MRE)
+
+        # Crear el polígono del bbox en EPSG_MRE    
+        if srs_bbox.EPSGTreatsAsLatLong() or srs_bbox.EPSGTreatsAsNorthingEasting():
+            miny, minx, maxy, maxx = [float(b) for b in MRE]
+        else:
+            minx, miny, maxx, maxy = [float(b) for b in MRE]
+
+        pol_wkt = f"POLYGON (({minx} {miny},{minx} {maxy},{maxx} {maxy},{maxx} {miny},{minx} {miny}))"
+        
+        polygon = ogr.CreateGeometryFromWkt(pol_wkt,srs_bbox)
+        
+        # Asignar SRS solo si el polígono no lo tiene
+        polygon.AssignSpatialReference(srs_bbox)
+
+        # Transformar si es necesario
+        if srs_destino is not None and not srs_destino.IsSame(srs_bbox):
+            transform = osr.CoordinateTransformation(srs_bbox, srs_destino)
+            polygon.Transform(transform)
+
+        return polygon
+
+    def leer_pagina(self, capa=None, offset=0, limit=10, bbox=None, filtro=None, propiedades=None, EPSG_MRE=4326):
+        """
+        Lee solo una página de objetos de la fuente y la carga en memoria.
+
+        El filtro espacial, el filtro de atributos y los campos ignorados se
+        aplican sobre la capa de origen, de modo que el driver solo decodifica
+        los objetos de la página. El salto hasta ``offset`` usa
+        ``SetNextByIndex`` si el driver tiene acceso aleatorio rápido o, en
+        fuentes SQL (GPKG, SQLite, PostgreSQL), un rango de FID resuelto sobre
+        el índice de la clave primaria.
+
+        Parámetros
+        ----------
+        capa : str o int, opcional
+            Nombre o índice de la capa (por defecto, la primera).
+        offset : int, opcional
+            Número de objetos a saltar.
+        limit : int, opcional
+            Número máximo de objetos de la página.
+        bbox : list[float], opcional
+            Bounding box [minx, miny, maxx, maxy] en EPSG_MRE.
+        filtro : str, opcional
+            Cláusula WHERE en SQL OGR (p. ej. ``"valor > 10"``).
+        propiedades : list[str], opcional
+            Campos a leer; el resto se ignoran en el driver.
+        EPSG_MRE : int o str, opcional
+            EPSG del bbox.
+
+        Retorna
+        -------
+        ogr.DataSource
+            Datasource en memoria con la página leída.
+        """
+        _asegurar_gdal()
+
+        ogr.UseExceptions()
+
+        offset = int(offset or 0)
+        limit = int(limit)
+        if offset < 0 or limit < 0:
+            raise ValueError("offset y limit no pueden ser negativos")
+
+        inDataSource = ogr.Open(self._ruta_origen())
+        if inDataSource is None:
+            raise RuntimeError(f"No se pudo abrir la fuente de datos: {self.dato}")
+
+        if capa is None:
+            lyr = inDataSource.GetLayerByIndex(0)
+        else:
+            try:
+                lyr = inDataSource.GetLayerByIndex(int(capa))
+            except (ValueError, TypeError):
+                lyr = inDataSource.GetLayer(capa)
+        if lyr is None:
+            raise Exception(f"No existe la capa '{capa}'")
+        nombreCapa = lyr.GetName()
+
+        if bbox is not None:
+            lyr.SetSpatialFilter(self._poligono_MRE(bbox, EPSG_MRE, lyr.GetSpatialRef()))
+        if filtro:
+            lyr.SetAttributeFilter(filtro)
+        # La capa de salida solo lleva propiedades (sin los campos del filtro)
+        lyr.SetIgnoredFields(_campos_ignorados(lyr, propiedades, filtro=filtro))
+
+        if offset > 0:
+            fid_inicio = None
+            if not filtro and not lyr.TestCapability(ogr.OLCFastSetNextByIndex):
+                fid_inicio = _fid_en_posicion(inDataSource, lyr, offset)
+
+            if fid_inicio is None:
+                lyr.ResetReading()
+                lyr.SetNextByIndex(offset)
+            else:
+                # Rango de FID acotado por los dos extremos: el driver no tiene
+                # por qué devolver los objetos en orden de FID (PostgreSQL no
+                # añade ORDER BY), pero el rango contiene justo los de la página
+                columna = _identificador_sql(lyr.GetFIDColumn())
+                rango = f'{columna} >= {fid_inicio}'
+                if fid_inicio != sys.maxsize:
+                    fid_fin = _fid_en_posicion(inDataSource, lyr, offset + limit)
+                    if fid_fin is not None and fid_fin != sys.maxsize:
+                        rango += f' AND {columna} < {fid_fin}'
+                lyr.SetAttributeFilter(rango)
+                lyr.ResetReading()
+
+        outdriver = ogr.GetDriverByName('MEMORY')
+        outDataSource = outdriver.CreateDataSource(nombreCapa)
+        outLayer = _crear_capa_como(outDataSource, lyr, nombreCapa, propiedades)
+        _copiar_objetos(lyr, outLayer, limit)
+
+        self.datasource = outDataSource
+        self.multiLayers = False
+        self._invalidar_cache()
+        self._lectura = repr(['leer_pagina', capa, offset, limit, bbox, filtro, propiedades, EPSG_MRE])
+        return outDataSource
+
+    def exportar(self, capa = None, EPSG_Salida=None, outputFormat='application/json', ID=None,
+                 propiedades=None, sin_geometria=False, tolerancia=None, escala=None,
+                 precision=None, como_bytes=False):
         """
         Exporta la capa vectorial a un formato especificado (GeoJSON, Shapefile, etc).
 
@@ -192,11 +646,33 @@ class FuenteDatosVector:
             Código EPSG del sistema de referencia de salida.
         outputFormat : str, opcional
             Formato de salida (por ejemplo, 'application/json', 'GeoJSON', 'ESRI Shapefile').
+            'FlatGeobuf' y 'GeoParquet' usan los perfiles de PERFILES_EXPORTACION
+            (ver ``_exportar_perfil``).
+        propiedades : list[str], opcional
+            Solo para salida JSON: campos a exportar. Los objetos se limitan a
+            estos campos; además, en los drivers que lo admiten, el resto se
+            ignoran en la lectura (``Layer.SetIgnoredFields``) y no se decodifican.
+        sin_geometria : bool, opcional
+            Solo para salida JSON: exporta objetos sin geometría, sin
+            decodificarla ni modificar el datasource (a diferencia de
+            ``borrar_geometria``).
+        tolerancia : float, opcional
+            Solo para salida JSON y perfiles: exporta el nivel de
+            generalización precalculado más próximo a esta tolerancia (en
+            unidades de la capa), ver ``generalizar``.
+        escala : int, opcional
+            Como tolerancia, pero indicando el denominador de escala.
+        precision : int, opcional
+            Solo para salida JSON: número de decimales de las coordenadas.
+        como_bytes : bool, opcional
+            Solo para salida JSON: devuelve el GeoJSON ya serializado (bytes),
+            escrito por el driver GeoJSON de GDAL con RFC7946=YES sin pasar
+            por diccionarios Python (ver ``_exportar_geojson_bytes``).
 
         Retorna
         -------
-        str o bytes
-            GeoJSON como string o archivo exportado como blob.
+        dict o bytes
+            GeoJSON como dict (o bytes si como_bytes) o archivo exportado como blob.
         """
         
         ogr.UseExceptions()
@@ -206,9 +682,16 @@ class FuenteDatosVector:
 
         dato = self.datasource
 
+        perfil = _ALIAS_PERFILES.get(str(outputFormat).lower())
+        if perfil is not None:
+            return self._exportar_perfil(perfil, capa, EPSG_Salida, tolerancia, escala)
+
         if outputFormat == 'application/json'  or outputFormat == 'json':
-            # Seleccionar la capa de entrada
-            capa = self.datasource.GetLayer(self.obtener_nombreCapa(capa))
+            # Seleccionar la capa de entrada (o su nivel de generalización)
+            capa = self._capa_generalizada(self.obtener_nombreCapa(capa), tolerancia, escala)
+
+            if como_bytes:
+                return self._exportar_geojson_bytes(capa, ID, propiedades, sin_geometria, precision)
         
             srs_original = capa.GetSpatialRef()
             srs = osr.SpatialReference()
@@ -221,6 +704,14 @@ class FuenteDatosVector:
                 idx = layer_defn.GetFieldIndex(ID)
                 if idx == -1:
                     ID = None
+
+            # Proyección de columnas: el campo ID se lee aunque no se exporte.
+            # SetIgnoredFields solo ahorra lectura: los drivers sin
+            # OLCIgnoreFields (p. ej. las capas MEMORY de leer()) devuelven
+            # todos los campos, así que la salida se filtra igualmente.
+            ignorados = _campos_ignorados(capa, propiedades, sin_geometria)
+            if ID in ignorados:
+                ignorados.remove(ID)
             
             geojson = {
                 "type": "FeatureCollection",
@@ -228,29 +719,37 @@ class FuenteDatosVector:
             }
 
             necesita_reproyeccion = (
-                srs_original is not None
+                not sin_geometria
+                and srs_original is not None
                 and not srs.IsSame(srs_original)
                 and srs_original.GetAttrValue("AUTHORITY", 1) != srs.GetAttrValue("AUTHORITY", 1)
             )
+            transform = osr.CoordinateTransformation(srs_original, srs) if necesita_reproyeccion else None
 
-            if necesita_reproyeccion:
-                transform = osr.CoordinateTransformation(srs_original, srs)
-                for feat in capa:
-                    geom = feat.GetGeometryRef()
-                    if geom is not None:
-                        geom.Transform(transform)
-                    feat.SetGeometry(geom)
-                    obj = feat.ExportToJson(as_object=True)
-                    if ID:
-                        obj['id'] = feat.GetField(ID)
-                    geojson["features"].append(obj)
-
-            else:
+            capa.SetIgnoredFields(ignorados)
+            try:
+                capa.ResetReading()
                 for feat in capa:
+                    if transform is not None:
+                        geom = feat.GetGeometryRef()
+                        if geom is not None:
+                            geom.Transform(transform)
+                        feat.SetGeometry(geom)
                     obj = feat.ExportToJson(as_object=True)
+                    if sin_geometria:
+                        obj['geometry'] = None
+                    elif precision is not None:
+                        obj['geometry'] = redondear_geometria(obj['geometry'], precision)
                     if ID:
                         obj['id'] = feat.GetField(ID)
+                    if propiedades is not None:
+                        valores = obj.get('properties') or {}
+                        obj['properties'] = {p: valores.get(p) for p in propiedades}
                     geojson["features"].append(obj)
+            finally:
+                # Restaurar la lectura completa de la capa
+                capa.SetIgnoredFields([])
+                capa.ResetReading()
 
             return geojson
         
@@ -414,6 +913,120 @@ class FuenteDatosVector:
                 # Cerrar el dataset de salida
                 outDataset = None
 
+    def _exportar_geojson_bytes(self, layer, ID=None, propiedades=None, sin_geometria=False, precision=None):
+        """
+        Serializa una capa como GeoJSON (bytes) con el driver GeoJSON de GDAL
+        en /vsimem/: RFC7946=YES reproyecta a WGS84 lon/lat y ajusta la
+        orientación de los anillos, COORDINATE_PRECISION redondea las
+        coordenadas e ID_FIELD escribe el miembro ``id`` de cada objeto.
+
+        Retorna
+        -------
+        bytes
+            FeatureCollection serializada.
+        """
+        driver = ogr.GetDriverByName('GeoJSON')
+        if driver is None:
+            raise RuntimeError("El driver GeoJSON de GDAL no está disponible.")
+
+        campos = propiedades
+        if ID and propiedades is not None and ID not in propiedades:
+            campos = list(propiedades) + [ID]
+
+        opciones = ['RFC7946=YES', 'WRITE_BBOX=NO']
+        if precision is not None:
+            opciones.append(f'COORDINATE_PRECISION={int(precision)}')
+        if ID and layer.GetLayerDefn().GetFieldIndex(ID) != -1:
+            opciones.append(f'ID_FIELD={ID}')
+
+        ruta = f"/vsimem/{uuid.uuid4().hex}.geojson"
+        layer.SetIgnoredFields(_campos_ignorados(layer, campos, sin_geometria))
+        try:
+            outDataSource = driver.CreateDataSource(ruta)
+            if outDataSource is None:
+                raise RuntimeError("No se pudo crear el GeoJSON de salida.")
+            geom_type = ogr.wkbNone if sin_geometria else layer.GetGeomType()
+            outLayer = outDataSource.CreateLayer(
+                layer.GetName(), layer.GetSpatialRef(), geom_type, options=opciones
+            )
+            layerDefn = layer.GetLayerDefn()
+            for j in range(layerDefn.GetFieldCount()):
+                if campos is None or layerDefn.GetFieldDefn(j).GetName() in campos:
+                    outLayer.CreateField(layerDefn.GetFieldDefn(j))
+
+            layer.ResetReading()
+            _copiar_objetos(layer, outLayer)
+
+            outLayer = None
+            outDataSource = None
+
+            blob = leer_vsimem(ruta)
+        finally:
+            layer.SetIgnoredFields([])
+            layer.ResetReading()
+            borrar_vsimem(ruta)
+
+        if blob is None:
+            raise RuntimeError("Error al serializar la capa a GeoJSON")
+        return blob
+
+    def _exportar_perfil(self, perfil, capa=None, EPSG_Salida=None, tolerancia=None, escala=None):
+        """
+        Exporta una capa con un perfil de PERFILES_EXPORTACION (FlatGeobuf con
+        índice espacial, GeoParquet con grupos de filas, compresión y columna
+        bbox). Se escribe directamente en /vsimem/, sin archivos temporales en
+        disco ni empaquetado ZIP.
+
+        Retorna
+        -------
+        bytes
+            Archivo exportado como blob.
+        """
+        config = PERFILES_EXPORTACION[perfil]
+        driver = ogr.GetDriverByName(config['driver'])
+        if driver is None:
+            raise RuntimeError(f"El driver '{config['driver']}' no está disponible en esta instalación de GDAL.")
+
+        layer = self._capa_generalizada(self.obtener_nombreCapa(capa), tolerancia, escala)
+        srs_original = layer.GetSpatialRef()
+
+        srs = srs_original
+        transform = None
+        if EPSG_Salida is not None:
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(normalizar_epsg(EPSG_Salida))
+            if srs_original is not None and not srs.IsSame(srs_original):
+                transform = osr.CoordinateTransformation(srs_original, srs)
+
+        ruta = f"/vsimem/{uuid.uuid4().hex}.{config['extension']}"
+        try:
+            outDataSource = driver.CreateDataSource(ruta)
+            if outDataSource is None:
+                raise RuntimeError(f"No se pudo crear el archivo de salida '{perfil}'.")
+            outLayer = outDataSource.CreateLayer(
+                layer.GetName(), srs, layer.GetGeomType(), options=config['opciones']
+            )
+            layerDefn = layer.GetLayerDefn()
+            for j in range(layerDefn.GetFieldCount()):
+                outLayer.CreateField(layerDefn.GetFieldDefn(j))
+
+            layer.ResetReading()
+            _copiar_objetos(layer, outLayer, transform=transform)
+            layer.ResetReading()
+
+            # Al cerrar se escribe el índice espacial / los metadatos
+            outLayer = None
+            outDataSource = None
+
+            blob = leer_vsimem(ruta)
+        finally:
+            borrar_vsimem(ruta)
+
+        if blob is None:
+            raise RuntimeError(f"Error al exportar con el perfil '{perfil}'")
+        logger.info(f"Capa '{layer.GetName()}' exportada con el perfil {perfil} ({len(blob)} bytes)")
+        return blob
+
     def obtener_capas(self):
         """
         Devuelve una lista con los nombres de todas las capas presentes en el datasource.
@@ -431,16 +1044,25 @@ class FuenteDatosVector:
         if self.datasource is None:
             raise Exception("Primero debes llamar a leer()")
 
-        capas = []
-        for i in range(self.datasource.GetLayerCount()):
-            layer = self.datasource.GetLayerByIndex(i)
-            capas.append(layer.GetName())
-        return capas
+        self._comprobar_metadatos()
+        if self._capas is None:
+            self._capas = self._nombres_capas()
+        return list(self._capas)
 
-    def ejecutar_sql(self, sql, capa, dialect='OGRSQL'):
+    def _nombres_capas(self):
+        """Recorre el datasource y devuelve los nombres de sus capas (sin caché)."""
+        return [self.datasource.GetLayerByIndex(i).GetName() for i in range(self.datasource.GetLayerCount())]
+
+    def ejecutar_sql(self, sql, capa, dialect='OGRSQL', MRE=None, EPSG_MRE=4326, cache=True):
         """
         Ejecuta una sentencia SQL sobre el datasource y retorna el resultado como un nuevo datasource en memoria.
 
+        Las consultas (SELECT/WITH) se memorizan en una caché LRU acotada por
+        memoria (ver ``configurar_cache_sql``) cuya clave incluye la fuente,
+        la versión de las capas referenciadas, el texto SQL, el dialecto y el
+        MRE; una consulta repetida solo copia el resultado cacheado. El resto
+        de sentencias (DDL) se ejecutan sin caché e invalidan el datasource.
+
         Documentación de referencia: https://gdal.org/en/stable/user/ogr_sql_dialect.html
 
         Parámetros
@@ -451,11 +1073,20 @@ class FuenteDatosVector:
             Nombre de la capa donde se guardará el resultado de la consulta.
         dialect : str, opcional
             Dialecto SQL a usar ('OGRSQL' por defecto, también puede ser 'SQLITE').
+        MRE : list[float], opcional
+            Bounding box [minx, miny, maxx, maxy] pasado como filtro espacial
+            a ``ExecuteSQL``. Con OGRSQL el driver puede usar el índice
+            espacial de la capa; con SQLITE se aplica sobre el resultado.
+        EPSG_MRE : int, opcional
+            EPSG del bbox.
+        cache : bool, opcional
+            Si es False, ejecuta la consulta sin consultar ni guardar la caché.
 
         Retorna
         -------
-        ogr.DataSource
-            Nuevo datasource en memoria con el resultado de la consulta.
+        ogr.Layer
+            Capa del datasource con el resultado de la consulta (None para
+            sentencias que no devuelven filas).
 
         Excepciones
         -----------
@@ -465,20 +1096,120 @@ class FuenteDatosVector:
         if self.datasource is None:
             raise Exception("Primero debes llamar a leer()")
 
-        # Ejecutar la consulta SQL
-        resultado = self.datasource.ExecuteSQL(sql, dialect=dialect)
+        if not _es_consulta(sql):
+            resultado = self.datasource.ExecuteSQL(sql, dialect=dialect)
+            if resultado is not None:
+                self.datasource.ReleaseResultSet(resultado)
+            self._invalidar_cache()
+            return None
+
+        # ds mantiene viva la capa aunque la caché lo descarte
+        ds, resultado = self._resultado_sql(sql, dialect, MRE, EPSG_MRE, cache)
 
         self.datasource.CopyLayer(resultado, capa)
-        self.datasource.ReleaseResultSet(resultado)
-        
+        resultado.ResetReading()
+
         # Si la capa existe, elimínala
-        if self.datasource.GetLayerByName(capa) and self.obtener_capas().count(capa) > 1:
+        if self.datasource.GetLayerByName(capa) and self._nombres_capas().count(capa) > 1:
             self.datasource.DeleteLayer(capa)
             self.datasource.SyncToDisk()
 
+        self._invalidar_cache(capa)
         return self.datasource.GetLayerByName(capa)
-    
-    def MRE_datos(self, capaEntrada=None, capaSalida=None, MRE=[-180, -90, 180, 90], EPSG_MRE=4326):
+
+    def consultar_sql(self, sql, dialect='OGRSQL', MRE=None, EPSG_MRE=4326):
+        """
+        Ejecuta una consulta (SELECT/WITH) con la misma caché que
+        ``ejecutar_sql`` pero sin copiar el resultado al datasource.
+
+        Retorna
+        -------
+        FuenteDatosVector
+            Fuente con el datasource en memoria del resultado (capa
+            'resultado'). El datasource es compartido con la caché, por lo
+            que debe tratarse como de solo lectura; la fuente lo mantiene
+            vivo aunque la caché lo descarte.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+        if not _es_consulta(sql):
+            raise Exception("consultar_sql solo admite consultas SELECT/WITH; usa ejecutar_sql")
+
+        ds, _ = self._resultado_sql(sql, dialect, MRE, EPSG_MRE)
+        fuente = FuenteDatosVector(sql)
+        fuente.datasource = ds
+        fuente._lectura = repr(['consultar_sql', sql, dialect, MRE, EPSG_MRE])
+        return fuente
+
+    def configurar_cache_sql(self, max_bytes=64 * 1024 * 1024, max_entradas=None):
+        """
+        Configura la caché de resultados SQL: una LRU en memoria acotada por
+        bytes (estimados a partir del WKB y los campos) y por entradas.
+        """
+        self.cache_sql = CacheLRU(max_bytes=max_bytes, max_entradas=max_entradas)
+
+    def invalidar_cache_sql(self):
+        """Vacía la caché de resultados SQL."""
+        if self.cache_sql is not None:
+            self.cache_sql.limpiar()
+
+    def _clave_sql(self, sql, dialect, MRE=None, EPSG_MRE=4326):
+        """
+        Clave de caché de una consulta: huella de la fuente, versiones de las
+        capas que aparecen en el SQL (todas si no se reconoce ninguna), texto
+        SQL, dialecto y MRE.
+        """
+        capas = self.obtener_capas()
+        referenciadas = [
+            c for c in capas if re.search(r'(?<![\w])' + re.escape(c) + r'(?![\w])', sql)
+        ] or capas
+        versiones = tuple((c, self._version_capa(c)) for c in referenciadas)
+        mre = None
+        if MRE is not None:
+            mre = (tuple(float(v) for v in MRE), normalizar_epsg(EPSG_MRE))
+        return (self._huella(), versiones, sql.strip(), (dialect or 'OGRSQL').upper(), mre)
+
+    def _resultado_sql(self, sql, dialect, MRE=None, EPSG_MRE=4326, cache=True):
+        """
+        Devuelve (datasource, capa) con el resultado de una consulta, desde la
+        caché si es posible. Quien use la capa debe conservar el datasource:
+        la caché puede descartarlo en cualquier momento.
+        """
+        clave = self._clave_sql(sql, dialect, MRE, EPSG_MRE)
+
+        if cache:
+            if self.cache_sql is None:
+                self.configurar_cache_sql()
+            # Descartar lo cacheado con una versión anterior del datasource
+            huella = clave[0]
+            self.cache_sql.invalidar(predicado=lambda k: k[0] != huella)
+            cacheado = self.cache_sql.obtener(clave)
+            if cacheado is not None:
+                cacheado[1].ResetReading()
+                return cacheado
+
+        spatialFilter = None
+        if MRE is not None:
+            srs = self.datasource.GetLayerByName(clave[1][0][0]).GetSpatialRef()
+            spatialFilter = self._poligono_MRE(MRE, EPSG_MRE, srs)
+
+        resultado = self.datasource.ExecuteSQL(sql, spatialFilter=spatialFilter, dialect=dialect)
+        if resultado is None:
+            raise Exception(f"La consulta SQL no ha devuelto resultados: {sql}")
+        try:
+            # Copia en un datasource propio, independiente del result set
+            ds = ogr.GetDriverByName('MEMORY').CreateDataSource('sql')
+            salida = ds.CopyLayer(resultado, 'resultado')
+        finally:
+            self.datasource.ReleaseResultSet(resultado)
+
+        if cache:
+            self.cache_sql.guardar(clave, (ds, salida), _estimar_bytes_capa(salida))
+        salida.ResetReading()
+        return ds, salida
+
+    def MRE_datos(self, capaEntrada=None, capaSalida=None, MRE=[-180, -90, 180, 90], EPSG_MRE=4326,
+                  tolerancia=None, escala=None):
         """
         Aplica un filtro espacial (bbox) a una capa y guarda la capa filtrada en el dataset con el nombre capaSalida.
 
@@ -492,6 +1223,11 @@ class FuenteDatosVector:
             Bounding box [minx, miny, maxx, maxy].
         EPSG_MRE : int
             EPSG del bbox.
+        tolerancia : float, opcional
+            Lee del nivel de generalización precalculado más próximo a esta
+            tolerancia (ver ``generalizar``).
+        escala : int, opcional
+            Como tolerancia, pero indicando el denominador de escala.
 
         Retorna
         -------
@@ -502,35 +1238,15 @@ class FuenteDatosVector:
             raise Exception("Primero debes llamar a leer()")
 
         tmpLayer = "_tmpMRE"
-        # Seleccionar la capa de entrada
-        layer = self.datasource.GetLayer(self.obtener_nombreCapa(capaEntrada))
+        # Seleccionar la capa de entrada (o su nivel de generalización)
+        layer = self._capa_generalizada(self.obtener_nombreCapa(capaEntrada), tolerancia, escala)
         
         # Obtener el SRS de la capa
         srs_capa = layer.GetSpatialRef()
         if srs_capa is None:
             raise Exception("La capa no tiene sistema de referencia espacial definido.")
 
-        srs_bbox = osr.SpatialReference()
-        EPSG_MRE = normalizar_epsg(EPSG_MRE)
-        srs_bbox.ImportFromEPSG(EPSG_MRE)
-
-        # Crear el polígono del bbox en EPSG_MRE    
-        if srs_bbox.EPSGTreatsAsLatLong() or srs_bbox.EPSGTreatsAsNorthingEasting():
-            miny, minx, maxy, maxx = [float(b) for b in MRE]
-        else:
-            minx, miny, maxx, maxy = [float(b) for b in MRE]
-
-        pol_wkt = f"POLYGON (({minx} {miny},{minx} {maxy},{maxx} {maxy},{maxx} {miny},{minx} {miny}))"
-        
-        polygon = ogr.CreateGeometryFromWkt(pol_wkt,srs_bbox)
-        
-        # Asignar SRS solo si el polígono no lo tiene
-        polygon.AssignSpatialReference(srs_bbox)
-
-        # Transformar si es necesario
-        if not srs_capa.IsSame(srs_bbox):
-            transform = osr.CoordinateTransformation(srs_bbox, srs_capa)
-            polygon.Transform(transform)
+        polygon = self._poligono_MRE(MRE, EPSG_MRE, srs_capa)
 
         layer.SetSpatialFilter(polygon)
 
@@ -573,9 +1289,10 @@ class FuenteDatosVector:
 
         layer_salida = None
 
+        self._invalidar_cache(capaSalida)
         return self.datasource.GetLayerByName(capaSalida)
 
-    def obtener_atributos(self, capa=None):
+    def obtener_atributos(self, capa=None, propiedades=None):
         """
         Devuelve los atributos y sus tipos de una capa o de todas las capas en formato:
         {
@@ -586,71 +1303,205 @@ class FuenteDatosVector:
             ...
         }
         Si se indica capa, devuelve solo el diccionario de esa capa.
+        Si se indica propiedades, limita la salida a esos campos (la misma
+        proyección que acepta ``exportar``).
         """
         if self.datasource is None:
             raise Exception("Primero debes llamar a leer()")
 
-        def atributos_layer(layer):
-            layer_defn = layer.GetLayerDefn()
-            atributos = {}
-            for i in range(layer_defn.GetFieldCount()):
-                field_defn = layer_defn.GetFieldDefn(i)
-                field_name = field_defn.GetName()
-                field_type = field_defn.GetFieldTypeName(field_defn.GetType()).lower()
-                # Mapear tipos OGR a tipos JSON simples
-                if field_type in ['integer', 'integer64']:
-                    tipo = 'integer'
-                elif field_type in ['real', 'float', 'double']:
-                    tipo = 'number'
-                else:
-                    tipo = 'string'
-                atributos[field_name] = {'type': tipo}
-            return atributos
+        def atributos_layer(nombre):
+            atributos = self._metadatos_capa(nombre, completo=False)['atributos']
+            return {
+                campo: dict(tipo) for campo, tipo in atributos.items()
+                if propiedades is None or campo in propiedades
+            }
 
         if capa:
-            layer = self.datasource.GetLayer(capa)
-            if layer is None:
-                raise Exception(f"No existe la capa '{capa}'")
-            return atributos_layer(layer)
+            return atributos_layer(self.obtener_nombreCapa(capa))
         else:
-            resultado = {}
-            for i in range(self.datasource.GetLayerCount()):
-                lyr = self.datasource.GetLayerByIndex(i)
-                resultado[lyr.GetName()] = atributos_layer(lyr)
-            return resultado
+            return {nombre: atributos_layer(nombre) for nombre in self.obtener_capas()}
 
     def obtener_nombreCapa(self, capa=None):
+        """
+        Devuelve el nombre de una capa dado su nombre o índice (por defecto,
+        la primera). Usa la lista de capas cacheada.
+        """
+        capas = self.obtener_capas()
 
         if capa is None:
-            layer = self.datasource.GetLayerByIndex(0)
-        else:
-            try:
-                idx = int(capa)
-                layer = self.datasource.GetLayerByIndex(idx)
-            except (ValueError, TypeError):
-                layer = self.datasource.GetLayer(capa)
-            if layer is None:
-                raise Exception(f"No existe la capa '{capa}'")
-            
-        return layer.GetName()
+            if not capas:
+                raise Exception("El datasource no tiene capas")
+            return capas[0]
+
+        try:
+            idx = int(capa)
+        except (ValueError, TypeError):
+            if capa in capas:
+                return capa
+            raise Exception(f"No existe la capa '{capa}'")
+
+        if not 0 <= idx < len(capas):
+            raise Exception(f"No existe la capa '{capa}'")
+        return capas[idx]
 
     def obtener_indice_capa(self, nombre_capa):
         """
         Devuelve el índice de la capa dado su nombre.
         Lanza una excepción si no existe.
         """
-        for i in range(self.datasource.GetLayerCount()):
-            layer = self.datasource.GetLayerByIndex(i)
-            if layer.GetName() == nombre_capa:
-                return i
+        capas = self.obtener_capas()
+        if nombre_capa in capas:
+            return capas.index(nombre_capa)
         raise Exception(f"No existe la capa '{nombre_capa}'")
 
+    def _comprobar_metadatos(self):
+        """Descarta la caché de metadatos si el archivo de origen ha cambiado."""
+        try:
+            st = os.stat(self.dato)
+            firma = (st.st_mtime_ns, st.st_size)
+        except (OSError, ValueError, TypeError):
+            firma = None
+        if firma != self._huella_metadatos:
+            self._capas = None
+            self._metadatos.clear()
+            self._huella_metadatos = firma
+
+    def _metadatos_capa(self, nombreCapa, completo=True):
+        """
+        Devuelve (calculándolos una sola vez) los metadatos de una capa: tipo
+        geométrico, EPSG y esquema y, si completo, número de objetos y MRE.
+        """
+        self._comprobar_metadatos()
+        meta = self._metadatos.get(nombreCapa)
+        layer = None
+
+        if meta is None:
+            layer = self.datasource.GetLayerByName(nombreCapa)
+            if layer is None:
+                raise Exception(f"No existe la capa '{nombreCapa}'")
+            srs = layer.GetSpatialRef()
+            epsg = srs.GetAuthorityCode(None) if srs is not None else None
+            layer_defn = layer.GetLayerDefn()
+            meta = {
+                'nombre': nombreCapa,
+                'tipo_geometria': ogr.GeometryTypeToName(layer.GetGeomType()),
+                'epsg': int(epsg) if epsg and epsg.isdigit() else None,
+                'atributos': {
+                    layer_defn.GetFieldDefn(i).GetName(): {'type': _tipo_json(layer_defn.GetFieldDefn(i))}
+                    for i in range(layer_defn.GetFieldCount())
+                },
+            }
+            self._metadatos[nombreCapa] = meta
+
+        if completo and 'n_objetos' not in meta:
+            layer = layer or self.datasource.GetLayerByName(nombreCapa)
+            # Primero la vía barata del driver (force=0); si no la tiene, se
+            # fuerza el recuento/recorrido una sola vez.
+            n = layer.GetFeatureCount(0)
+            meta['n_objetos'] = n if n >= 0 else layer.GetFeatureCount(1)
+            meta['MRE'] = _extension_capa(layer)
+
+        return meta
+
+    def obtener_metadatos(self, capa=None):
+        """
+        Devuelve los metadatos cacheados de una capa o de todas las capas:
+        {
+            'nombre': str,
+            'tipo_geometria': str,
+            'epsg': int o None,
+            'atributos': {'nombre_propiedad': {'type': ...}, ...},
+            'n_objetos': int,
+            'MRE': [minx, miny, maxx, maxy] o None
+        }
+
+        Se calculan una sola vez por capa (``GetFeatureCount(force=0)`` y
+        ``GetExtent(force=0)`` siempre que el driver lo permita) y se
+        descartan al modificar la capa o cambiar el archivo de origen.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        if capa is not None:
+            return dict(self._metadatos_capa(self.obtener_nombreCapa(capa)))
+        return {nombre: dict(self._metadatos_capa(nombre)) for nombre in self.obtener_capas()}
+
+    def guardar_metadatos(self, ruta=None):
+        """
+        Serializa la caché de metadatos (JSON) para reutilizarla en un
+        arranque posterior con ``cargar_metadatos``.
+
+        Parámetros
+        ----------
+        ruta : str, opcional
+            Archivo JSON donde escribirla.
+
+        Retorna
+        -------
+        dict
+            Caché serializable (huella de la fuente, lectura, capas y metadatos).
+        """
+        datos = {
+            'huella': huella_fuente(self.dato),
+            'lectura': self._lectura,
+            'capas': self._capas,
+            'metadatos': {
+                nombre: meta for nombre, meta in self._metadatos.items()
+                if self._version_capa(nombre) == 0
+            },
+        }
+        if ruta is not None:
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+        return datos
+
+    def cargar_metadatos(self, origen):
+        """
+        Carga una caché de metadatos guardada con ``guardar_metadatos``. Solo
+        se aplica si la fuente (huella) y los parámetros de lectura coinciden
+        con los actuales; las capas ya modificadas se ignoran.
+
+        Parámetros
+        ----------
+        origen : dict o str
+            Caché serializada o ruta del archivo JSON.
+
+        Retorna
+        -------
+        bool
+            True si se ha cargado la caché.
+        """
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        if isinstance(origen, dict):
+            datos = origen
+        else:
+            if not os.path.exists(origen):
+                return False
+            with open(origen, 'r', encoding='utf-8') as f:
+                try:
+                    datos = json.load(f)
+                except json.JSONDecodeError:
+                    logger.warning(f"Caché de metadatos incorrecta: {origen}")
+                    return False
+
+        if datos.get('huella') != huella_fuente(self.dato) or datos.get('lectura') != self._lectura:
+            return False
+
+        capas = self.obtener_capas()
+        for nombre, meta in datos.get('metadatos', {}).items():
+            if nombre in capas and self._version_capa(nombre) == 0:
+                self._metadatos.setdefault(nombre, meta)
+        return True
+
     def borrar_geometria(self, capa=None):
         layer = self.datasource.GetLayer(self.obtener_nombreCapa(capa))
         for feature in layer:
             feature.SetGeometry(None)
             layer.SetFeature(feature)
 
+        self._invalidar_cache(layer.GetName())
         return layer
 
     def crear_ID(self, capa=None, nombreCampo='ID_OGR'):
@@ -674,6 +1525,7 @@ class FuenteDatosVector:
 
         layer.SyncToDisk()  # asegura que se guarden los cambios
 
+        self._invalidar_cache(layer.GetName())
         return layer
     
     def obtener_objeto_porID(self, capaEntrada=None, capaSalida=None, ID='ID_OGR', valorID=0):
@@ -737,6 +1589,7 @@ class FuenteDatosVector:
             self.datasource.SyncToDisk()
             capaSalida = nombre_entrada
 
+        self._invalidar_cache(capaSalida)
         return self.datasource.GetLayerByName(capaSalida)
 
     def reproyectar_datasource(self, EPSG_salida):
@@ -797,6 +1650,8 @@ class FuenteDatosVector:
 
         # Reemplazar datasource
         self.datasource = dst_ds
+        self._invalidar_cache()
+        self._lectura = None
         return dst_ds
 
     def añadir_capa(self, src_capa):
@@ -837,5 +1692,252 @@ class FuenteDatosVector:
             new_feature = None
 
         src_capa.ResetReading()
+        self._invalidar_cache(layer_name)
         return dst_layer
 
+    def _invalidar_cache(self, capa=None):
+        """
+        Marca como modificada la capa indicada (o todo el datasource si capa
+        es None) y descarta las cachés derivadas de ella.
+        """
+        self._capas = None
+        if capa is None:
+            self._version += 1
+            self._versiones.clear()
+            self._generalizaciones.clear()
+            self._metadatos.clear()
+        else:
+            self._versiones[capa] = self._versiones.get(capa, 0) + 1
+            self._generalizaciones.pop(capa, None)
+            self._metadatos.pop(capa, None)
+
+    def _version_capa(self, capa):
+        """Versión de una capa del datasource (cambia al modificarla)."""
+        return self._versiones.get(capa, 0)
+
+    def _huella(self):
+        """Huella de la fuente de datos usada como clave de las cachés."""
+        return f"{huella_fuente(self.dato)}:{self._version}"
+
+    def generalizar(self, capa=None, tolerancias=None, escalas=None):
+        """
+        Precalcula versiones simplificadas de una capa a varios niveles de
+        tolerancia y las guarda en memoria para ``exportar`` y ``MRE_datos``.
+
+        La simplificación preserva la topología de cada geometría
+        (``SimplifyPreserveTopology``). Cada nivel se calcula una sola vez por
+        capa y se descarta al modificarse la capa o el datasource. Las capas
+        de puntos no se generalizan.
+
+        Parámetros
+        ----------
+        capa : str o int, opcional
+            Nombre o índice de la capa (por defecto, la primera).
+        tolerancias : list[float], opcional
+            Tolerancias en unidades del SRS de la capa.
+        escalas : list[int], opcional
+            Denominadores de escala, convertidos a tolerancia con un píxel de
+            0,28 mm. Por defecto, ESCALAS_GENERALIZACION.
+
+        Retorna
+        -------
+        list[float]
+            Tolerancias precalculadas para la capa, en orden creciente.
+        """
+        _asegurar_gdal()
+
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        nombreCapa = self.obtener_nombreCapa(capa)
+        layer = self.datasource.GetLayer(nombreCapa)
+
+        if ogr.GT_Flatten(layer.GetGeomType()) in (ogr.wkbPoint, ogr.wkbMultiPoint, ogr.wkbNone):
+            return []
+
+        if tolerancias is None:
+            srs = layer.GetSpatialRef()
+            tolerancias = [_tolerancia_escala(e, srs) for e in (escalas or ESCALAS_GENERALIZACION)]
+
+        niveles = self._generalizaciones.setdefault(nombreCapa, {})
+        driver = ogr.GetDriverByName('MEMORY')
+        for tolerancia in sorted(set(float(t) for t in tolerancias)):
+            if tolerancia <= 0 or tolerancia in niveles:
+                continue
+            ds = driver.CreateDataSource(f"{nombreCapa}_{tolerancia}")
+            salida = _crear_capa_como(ds, layer, nombreCapa)
+            salida_defn = salida.GetLayerDefn()
+            layer.ResetReading()
+            for feature in layer:
+                new_feature = ogr.Feature(salida_defn)
+                new_feature.SetFrom(feature)
+                geom = feature.GetGeometryRef()
+                if geom is not None:
+                    new_feature.SetGeometry(geom.SimplifyPreserveTopology(tolerancia))
+                salida.CreateFeature(new_feature)
+                new_feature = None
+            layer.ResetReading()
+            # Se guarda también el datasource para que la capa siga viva
+            niveles[tolerancia] = (ds, salida)
+            logger.debug(f"Capa '{nombreCapa}' generalizada con tolerancia {tolerancia}")
+
+        return sorted(niveles)
+
+    def _capa_generalizada(self, nombreCapa, tolerancia=None, escala=None):
+        """
+        Devuelve la capa generalizada más próxima a la tolerancia (o escala)
+        pedida sin superarla, o la capa original si no se pide ninguna o
+        todos los niveles son más gruesos. Si la capa no tiene niveles, se
+        precalculan los de ESCALAS_GENERALIZACION.
+        """
+        layer = self.datasource.GetLayer(nombreCapa)
+        if tolerancia is None and escala is None:
+            return layer
+        if tolerancia is None:
+            tolerancia = _tolerancia_escala(escala, layer.GetSpatialRef())
+
+        if nombreCapa not in self._generalizaciones:
+            self.generalizar(nombreCapa)
+        niveles = self._generalizaciones.get(nombreCapa, {})
+
+        candidatos = [t for t in niveles if t <= float(tolerancia)]
+        if not candidatos:
+            return layer
+        return niveles[max(candidatos)][1]
+
+    def configurar_cache_teselas(self, max_bytes=64 * 1024 * 1024, ruta_mbtiles=None, max_teselas_disco=None):
+        """
+        Configura la caché de teselas MVT: una LRU en memoria acotada por bytes
+        y, opcionalmente, una caché en disco SQLite con esquema MBTiles.
+
+        Parámetros
+        ----------
+        max_bytes : int, opcional
+            Presupuesto en bytes de la caché en memoria.
+        ruta_mbtiles : str, opcional
+            Ruta del archivo MBTiles de la caché en disco (uno por fuente).
+        max_teselas_disco : int, opcional
+            Número máximo de teselas en disco (expulsión por último acceso).
+        """
+        self.cache_teselas = CacheLRU(max_bytes=max_bytes)
+        self.cache_teselas_disco = (
+            CacheMBTiles(ruta_mbtiles, max_teselas_disco, fuente=id_fuente(self.dato)) if ruta_mbtiles else None
+        )
+        self._huella_teselas = None
+
+    def invalidar_cache_teselas(self):
+        """Vacía las cachés de teselas en memoria y en disco."""
+        if self.cache_teselas is not None:
+            self.cache_teselas.limpiar()
+        if self.cache_teselas_disco is not None:
+            self.cache_teselas_disco.invalidar()
+
+    def tesela_mvt(self, z, x, y, capas=None, extension=4096, buffer=80, simplificacion=1.0):
+        """
+        Genera la tesela vectorial (Mapbox Vector Tile) z/x/y del datasource.
+
+        Los objetos se recortan al ámbito de la tesela (más el buffer) con un
+        filtro espacial y se escriben con el driver MVT de GDAL, que reproyecta
+        a EPSG:3857, recorta, cuantiza y simplifica según el zoom. El resultado
+        se guarda en la caché de teselas (ver ``configurar_cache_teselas``),
+        que se invalida cuando cambia la fecha de modificación de la fuente.
+
+        Parámetros
+        ----------
+        z, x, y : int
+            Índices de la tesela en el esquema XYZ de WebMercator.
+        capas : list[str] o str, opcional
+            Capas a incluir (por defecto, todas).
+        extension : int, opcional
+            Resolución interna de la tesela (EXTENT).
+        buffer : int, opcional
+            Margen alrededor de la tesela, en unidades de la tesela.
+        simplificacion : float, opcional
+            Factor de simplificación en unidades de la tesela.
+
+        Retorna
+        -------
+        bytes
+            Tesela MVT sin comprimir (vacía si no hay objetos).
+        """
+        _asegurar_gdal()
+
+        if self.datasource is None:
+            raise Exception("Primero debes llamar a leer()")
+
+        z, x, y = validar_tesela(z, x, y)
+        if capas is None:
+            capas = self.obtener_capas()
+        elif isinstance(capas, str):
+            capas = [capas]
+
+        if self.cache_teselas is None:
+            self.configurar_cache_teselas()
+
+        # Invalidar lo cacheado con una versión anterior de la fuente
+        huella = self._huella()
+        if huella != self._huella_teselas:
+            self.cache_teselas.invalidar(predicado=lambda k: k[0] != huella)
+            if self.cache_teselas_disco is not None:
+                self.cache_teselas_disco.invalidar(huella)
+            self._huella_teselas = huella
+
+        versiones = ','.join(f"{c}@{self._version_capa(c)}" for c in capas)
+        clave = f"{versiones}:{extension}:{buffer}:{simplificacion}/{z}/{x}/{y}"
+        datos = self.cache_teselas.obtener((huella, clave))
+        if datos is not None:
+            return datos
+
+        if self.cache_teselas_disco is not None:
+            datos = self.cache_teselas_disco.obtener(clave, huella)
+            if datos is not None:
+                self.cache_teselas.guardar((huella, clave), datos)
+                return datos
+
+        datos = self._generar_tesela_mvt(z, x, y, capas, extension, buffer, simplificacion)
+
+        self.cache_teselas.guardar((huella, clave), datos)
+        if self.cache_teselas_disco is not None:
+            self.cache_teselas_disco.guardar(clave, z, x, y, datos, huella)
+        return datos
+
+    def _generar_tesela_mvt(self, z, x, y, capas, extension, buffer, simplificacion):
+        """Escribe la tesela z/x/y con el driver MVT en /vsimem/ y devuelve sus bytes."""
+        ogr.UseExceptions()
+
+        minx, miny, maxx, maxy = limites_tesela_3857(z, x, y)
+        margen = (maxx - minx) * buffer / extension
+        MRE = [minx - margen, miny - margen, maxx + margen, maxy + margen]
+
+        ruta = f"/vsimem/mvt_{uuid.uuid4().hex}"
+        driver = ogr.GetDriverByName('MVT')
+        if driver is None:
+            raise RuntimeError("El driver MVT de GDAL no está disponible.")
+
+        try:
+            ds_mvt = driver.CreateDataSource(ruta, options=[
+                f'MINZOOM={z}',
+                f'MAXZOOM={z}',
+                f'EXTENT={int(extension)}',
+                f'BUFFER={int(buffer)}',
+                f'SIMPLIFICATION={float(simplificacion)}',
+                'COMPRESS=NO',
+            ])
+            for nombre in capas:
+                layer = self.datasource.GetLayer(self.obtener_nombreCapa(nombre))
+                layer.SetSpatialFilter(self._poligono_MRE(MRE, 3857, layer.GetSpatialRef()))
+                try:
+                    salida = _crear_capa_como(ds_mvt, layer, layer.GetName())
+                    layer.ResetReading()
+                    _copiar_objetos(layer, salida)
+                finally:
+                    layer.SetSpatialFilter(None)
+                    layer.ResetReading()
+
+            # Al cerrar el datasource el driver escribe las teselas
+            ds_mvt = None
+            datos = leer_vsimem(f"{ruta}/{z}/{x}/{y}.pbf")
+        finally:
+            borrar_vsimem(ruta)
+
+        return datos if datos is not None else b''
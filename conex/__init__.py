@@ -1,13 +1,21 @@
 from .PG_conex import ConexPG
+from .PGAsync_conex import ConexPGAsync
+from .PostGIS_conex import FuenteDatosPostGIS
 from .Vector_conex import FuenteDatosVector
 from .Raster_conex import FuenteDatosRaster
+from .Mosaico_conex import FuenteDatosMosaico
+from .SerieTemporal_conex import FuenteDatosSerieTemporal
 from .sonoff_conex import infoSonoff, FuenteDatosSonoff, FuenteDatosSonoff_SQLITE, FuenteDatosSonoff_OGR
 from .tuyaSmartLife_conex import infoTuyaSmartLife, FuenteDatosTuya, FuenteDatosTuya_SQLITE, FuenteDatosTuya_OGR
 
 __all__ = [
     "ConexPG",
+    "ConexPGAsync",
+    "FuenteDatosPostGIS",
     "FuenteDatosVector",
     "FuenteDatosRaster",
+    "FuenteDatosMosaico",
+    "FuenteDatosSerieTemporal",
     "infoSonoff",
     "FuenteDatosSonoff",
     "FuenteDatosSonoff_SQLITE",
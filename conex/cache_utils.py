@@ -0,0 +1,324 @@
+# Utilidades de caché compartidas.
+#
+# Centraliza:
+#   - La huella de una fuente de datos para invalidar cachés cuando cambia
+#     (``huella_fuente``) y su identificador estable (``id_fuente``).
+#   - Una caché LRU en memoria acotada por bytes y, opcionalmente, con
+#     caducidad por entrada (``CacheLRU``).
+#   - Una caché de teselas en disco sobre SQLite con esquema MBTiles
+#     (``CacheMBTiles``).
+#
+# Es lógica pura (solo biblioteca estándar), de modo que puede usarse y
+# probarse sin GDAL.
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def huella_fuente(dato):
+    """
+    Devuelve una huella (str) que cambia cuando cambia la fuente de datos.
+
+    Para archivos locales combina ruta absoluta, fecha de modificación y
+    tamaño; para cualquier otro valor (URL, WKT, GeoJSON embebido...) es un
+    hash del propio valor.
+    """
+    dato = str(dato)
+    if os.path.exists(dato):
+        st = os.stat(dato)
+        base = f"{os.path.abspath(dato)}:{st.st_mtime_ns}:{st.st_size}"
+    else:
+        base = dato
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+
+def id_fuente(dato):
+    """
+    Identificador (str) de la fuente de datos que no cambia al modificarse:
+    hash de la ruta absoluta para archivos locales y del propio valor en el
+    resto de casos.
+    """
+    dato = str(dato)
+    if os.path.exists(dato):
+        dato = os.path.abspath(dato)
+    return hashlib.sha1(dato.encode('utf-8')).hexdigest()
+
+
+def _tamaño_valor(valor):
+    """Estimación en bytes del tamaño de un valor cacheado."""
+    if isinstance(valor, (bytes, bytearray, str)):
+        return len(valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Caché en memoria con expulsión LRU acotada por bytes y, opcionalmente,
+    por número de entradas y por tiempo de vida (ttl). Es segura entre hilos.
+
+    Atributos:
+    ----------
+    max_bytes : int
+        Presupuesto de memoria (suma de tamaños de los valores).
+    max_entradas : int o None
+        Número máximo de entradas (None = sin límite).
+    ttl : float o None
+        Segundos de vida de cada entrada (None = sin caducidad).
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entradas=None, medir=None, ttl=None, reloj=None):
+        """
+        Parámetros
+        ----------
+        max_bytes : int, opcional
+            Presupuesto de memoria en bytes.
+        max_entradas : int, opcional
+            Número máximo de entradas.
+        medir : callable, opcional
+            Función valor -> bytes usada para estimar el tamaño de cada valor.
+        ttl : float, opcional
+            Segundos de vida por defecto de cada entrada; una entrada caducada
+            cuenta como fallo y se elimina al pedirla.
+        reloj : callable, opcional
+            Función que devuelve el instante actual en segundos (por defecto,
+            time.monotonic).
+        """
+        self.max_bytes = int(max_bytes)
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._medir = medir or _tamaño_valor
+        self._reloj = reloj or time.monotonic
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.caducadas = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        entrada = self._datos.get(clave)
+        return entrada is not None and not self._caducada(entrada)
+
+    def _caducada(self, entrada):
+        return entrada[2] is not None and entrada[2] <= self._reloj()
+
+    def obtener(self, clave, defecto=None):
+        """Devuelve el valor de clave (marcándolo como reciente) o defecto."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and self._caducada(entrada):
+                self._bytes -= self._datos.pop(clave)[1]
+                self.caducadas += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor, tamaño=None, ttl=None):
+        """
+        Guarda valor en clave y expulsa las entradas menos recientes hasta
+        respetar el presupuesto. Un valor mayor que max_bytes no se guarda.
+        ttl sustituye al tiempo de vida por defecto de la caché.
+        """
+        tamaño = self._medir(valor) if tamaño is None else int(tamaño)
+        ttl = self.ttl if ttl is None else ttl
+        expira = self._reloj() + ttl if ttl is not None else None
+        with self._lock:
+            if clave in self._datos:
+                self._bytes -= self._datos.pop(clave)[1]
+            if tamaño > self.max_bytes:
+                return False
+            self._datos[clave] = (valor, tamaño, expira)
+            self._bytes += tamaño
+            while self._datos and (
+                self._bytes > self.max_bytes
+                or (self.max_entradas is not None and len(self._datos) > self.max_entradas)
+            ):
+                _, (_, t, _) = self._datos.popitem(last=False)
+                self._bytes -= t
+                self.expulsiones += 1
+            return True
+
+    def invalidar(self, clave=None, predicado=None):
+        """
+        Elimina la entrada clave o, si se pasa predicado, todas las entradas
+        cuya clave lo cumpla. Devuelve el número de entradas eliminadas.
+        """
+        with self._lock:
+            if predicado is None:
+                claves = [clave] if clave in self._datos else []
+            else:
+                claves = [k for k in self._datos if predicado(k)]
+            for k in claves:
+                self._bytes -= self._datos.pop(k)[1]
+            return len(claves)
+
+    def limpiar(self):
+        """Vacía la caché."""
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """Devuelve un dict con aciertos, fallos, ratio, entradas y bytes."""
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'ratio_aciertos': self.aciertos / total if total else 0.0,
+            'entradas': len(self._datos),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'expulsiones': self.expulsiones,
+            'caducadas': self.caducadas,
+        }
+
+
+class CacheMBTiles:
+    """
+    Caché de teselas en disco sobre SQLite, legible como MBTiles.
+
+    Las teselas se guardan en la tabla ``teselas`` con una clave libre (p. ej.
+    capas + z/x/y), la huella de la fuente que las generó y la fecha del
+    último acceso. La vista ``tiles`` expone el esquema MBTiles estándar
+    (``zoom_level``, ``tile_column``, ``tile_row`` en TMS, ``tile_data``).
+
+    Un archivo guarda las teselas de una sola fuente: la vista ``tiles`` y
+    ``invalidar`` actúan sobre todas sus teselas. Si se indica ``fuente``,
+    se anota en la tabla metadata y abrir el archivo con otra fuente es un
+    error.
+    """
+
+    def __init__(self, ruta, max_teselas=None, formato='pbf', fuente=None):
+        """
+        Parámetros
+        ----------
+        ruta : str
+            Ruta del archivo SQLite/MBTiles (se crea si no existe).
+        max_teselas : int, opcional
+            Número máximo de teselas; al superarlo se expulsan las de acceso
+            más antiguo.
+        formato : str, opcional
+            Valor de ``format`` en la tabla metadata de MBTiles.
+        fuente : str, opcional
+            Identificador de la fuente de las teselas (ver ``id_fuente``).
+        """
+        self.ruta = ruta
+        self.max_teselas = max_teselas
+        self.fuente = fuente
+        self._lock = threading.Lock()
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        if not os.path.exists(directorio):
+            os.makedirs(directorio)
+
+        with self._conectar() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS teselas ("
+                " clave TEXT PRIMARY KEY, zoom_level INTEGER, tile_column INTEGER,"
+                " tile_row INTEGER, tile_data BLOB, huella TEXT, acceso REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS teselas_acceso ON teselas (acceso)")
+            conn.execute(
+                "CREATE VIEW IF NOT EXISTS tiles AS SELECT zoom_level, tile_column,"
+                " tile_row, tile_data FROM teselas"
+            )
+            conn.execute("INSERT OR IGNORE INTO metadata VALUES ('format', ?)", (formato,))
+            if fuente is not None:
+                conn.execute("INSERT OR IGNORE INTO metadata VALUES ('fuente', ?)", (fuente,))
+                fila = conn.execute("SELECT value FROM metadata WHERE name = 'fuente'").fetchone()
+                if fila[0] != fuente:
+                    raise Exception(
+                        f"La caché MBTiles '{ruta}' contiene teselas de otra fuente; usa un archivo por fuente"
+                    )
+
+    @contextmanager
+    def _conectar(self):
+        """Abre una conexión, confirma la transacción al salir y la cierra."""
+        conn = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def obtener(self, clave, huella=None):
+        """
+        Devuelve los bytes de la tesela clave o None si no está o si se
+        generó con otra huella de la fuente.
+        """
+        with self._lock, self._conectar() as conn:
+            fila = conn.execute(
+                "SELECT tile_data, huella FROM teselas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None or (huella is not None and fila[1] != huella):
+                return None
+            conn.execute("UPDATE teselas SET acceso = ? WHERE clave = ?", (time.time(), clave))
+            return bytes(fila[0])
+
+    def existentes(self, claves, huella=None):
+        """
+        Devuelve el conjunto de claves que están en la caché (con huella, si
+        se indica), con una consulta por cada 500 claves.
+        """
+        claves = list(claves)
+        encontradas = set()
+        with self._lock, self._conectar() as conn:
+            for i in range(0, len(claves), 500):
+                parte = claves[i:i + 500]
+                sql = f"SELECT clave FROM teselas WHERE clave IN ({', '.join('?' * len(parte))})"
+                params = list(parte)
+                if huella is not None:
+                    sql += " AND huella = ?"
+                    params.append(huella)
+                encontradas.update(fila[0] for fila in conn.execute(sql, params))
+        return encontradas
+
+    def guardar(self, clave, z, x, y, datos, huella=None):
+        """Guarda la tesela z/x/y (XYZ) bajo clave y aplica la expulsión."""
+        tile_row = (2 ** int(z)) - 1 - int(y)
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO teselas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (clave, int(z), int(x), tile_row, sqlite3.Binary(datos), huella, time.time()),
+            )
+            if self.max_teselas is not None:
+                conn.execute(
+                    "DELETE FROM teselas WHERE clave IN (SELECT clave FROM teselas"
+                    " ORDER BY acceso DESC LIMIT -1 OFFSET ?)",
+                    (int(self.max_teselas),),
+                )
+
+    def invalidar(self, huella_vigente=None):
+        """
+        Elimina las teselas generadas con una huella distinta de
+        huella_vigente (o todas si es None). Devuelve el número eliminado.
+        """
+        with self._lock, self._conectar() as conn:
+            if huella_vigente is None:
+                cursor = conn.execute("DELETE FROM teselas")
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM teselas WHERE huella IS NOT ?", (huella_vigente,)
+                )
+            return cursor.rowcount
+
+    def __len__(self):
+        with self._conectar() as conn:
+            return conn.execute("SELECT COUNT(*) FROM teselas").fetchone()[0]
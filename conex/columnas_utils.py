@@ -0,0 +1,281 @@
+# Utilidades de lectura en columnas de resultados de PostgreSQL.
+#
+# Centraliza:
+#   - La inferencia del dtype de NumPy de cada columna a partir del OID de
+#     tipo de ``cursor.description`` (``dtype_columna``).
+#   - El acumulador que vuelca lotes de filas (tuplas de psycopg2 o líneas
+#     del formato de texto de ``COPY ... TO STDOUT``) en arrays NumPy
+#     preasignados, uno por columna (``AcumuladorColumnas``).
+#   - El destino de ``copy_expert`` que analiza el flujo de COPY por lotes
+#     sin guardarlo entero (``EscritorCopy``).
+#
+# NumPy se importa al usarse y pyarrow es opcional (solo para formato='arrow').
+
+import re
+import codecs
+import logging
+from datetime import timezone
+
+logger = logging.getLogger(__name__)
+
+# pyarrow es opcional: solo se necesita para los resultados en formato Arrow
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - depende del entorno
+    pyarrow = None
+
+# OID de tipo de PostgreSQL -> dtype de NumPy (el resto de tipos, object)
+TIPOS_PG = {
+    16: 'bool',             # boolean
+    20: 'int64',            # bigint
+    21: 'int16',            # smallint
+    23: 'int32',            # integer
+    26: 'int64',            # oid
+    700: 'float32',         # real
+    701: 'float64',         # double precision
+    1700: 'float64',        # numeric (con pérdida de precisión)
+    1082: 'datetime64[D]',  # date
+    1114: 'datetime64[us]', # timestamp
+    1184: 'datetime64[us]', # timestamptz (en UTC, sin zona)
+}
+
+_TIMESTAMPTZ = 1184
+
+FORMATOS_COLUMNAS = ('numpy', 'arrow')
+
+# Nulo y secuencias de escape del formato de texto de COPY
+_NULO_COPY = '\\N'
+_ESCAPES_COPY = re.compile(r'\\(.)')
+_CARACTERES_COPY = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+# Desplazamiento horario al final de un timestamptz en texto (+00, +05:30)
+_PATRON_ZONA = re.compile(r'[+-]\d\d(:\d\d)?$')
+
+
+def asegurar_pyarrow():
+    """Lanza un error claro si pyarrow no está instalado."""
+    if pyarrow is None:
+        raise ImportError(
+            "El formato 'arrow' requiere pyarrow. Instálalo con: pip install pyarrow"
+        )
+
+
+def dtype_columna(tipo):
+    """Devuelve el dtype de NumPy (str) de una columna por su OID de tipo."""
+    return TIPOS_PG.get(tipo, 'object')
+
+
+def _desescapar_copy(texto):
+    """Deshace los escapes con barra invertida del formato de texto de COPY."""
+    if '\\' not in texto:
+        return texto
+    return _ESCAPES_COPY.sub(lambda m: _CARACTERES_COPY.get(m.group(1), m.group(1)), texto)
+
+
+def _a_utc(valor):
+    """datetime con zona -> datetime en UTC sin zona (NumPy no admite zonas)."""
+    if valor is None or valor.tzinfo is None:
+        return valor
+    return valor.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class AcumuladorColumnas:
+    """
+    Acumula lotes de filas en arrays NumPy preasignados, uno por columna, con
+    el dtype deducido del tipo de cada columna. La capacidad se duplica
+    cuando se llena, de modo que cada fila se copia una sola vez.
+
+    Los nulos se registran en una máscara por columna. Al convertir a NumPy,
+    una columna entera o booleana con nulos pasa a float64 (NaN) u object
+    (None); en fechas son NaT y en reales NaN. En Arrow se conservan como
+    nulos del tipo original.
+
+    Atributos:
+    ----------
+    nombres : list de str
+        Nombres de las columnas (los repetidos llevan sufijo _1, _2...).
+    tipos : list de int
+        OID de tipo de PostgreSQL de cada columna.
+    n : int
+        Filas acumuladas.
+    """
+
+    def __init__(self, descripcion, capacidad=1024):
+        """
+        Parámetros
+        ----------
+        descripcion : sequence
+            ``cursor.description`` de psycopg2 (nombre y OID de tipo por columna).
+        capacidad : int, opcional
+            Filas preasignadas inicialmente.
+        """
+        import numpy as np
+
+        self.nombres = []
+        for columna in descripcion:
+            nombre, i = columna[0], 1
+            while nombre in self.nombres:
+                nombre, i = f"{columna[0]}_{i}", i + 1
+            self.nombres.append(nombre)
+        self.tipos = [columna[1] for columna in descripcion]
+        self.dtypes = [np.dtype(dtype_columna(tipo)) for tipo in self.tipos]
+        self.n = 0
+        capacidad = max(int(capacidad), 1)
+        self._datos = [np.empty(capacidad, dtype) for dtype in self.dtypes]
+        self._nulos = [np.zeros(capacidad, bool) for _ in self.dtypes]
+
+    def _reservar(self, n):
+        """Garantiza sitio para n filas más (duplicando la capacidad)."""
+        import numpy as np
+
+        capacidad = len(self._datos[0]) if self._datos else 0
+        if self.n + n <= capacidad:
+            return
+        capacidad = max(2 * capacidad, self.n + n)
+        for j, datos in enumerate(self._datos):
+            nuevo = np.empty(capacidad, datos.dtype)
+            nuevo[:self.n] = datos[:self.n]
+            self._datos[j] = nuevo
+            nulos = np.zeros(capacidad, bool)
+            nulos[:self.n] = self._nulos[j][:self.n]
+            self._nulos[j] = nulos
+
+    def añadir_filas(self, filas):
+        """Añade un lote de filas (tuplas con valores de Python, como las de fetchmany)."""
+        import numpy as np
+
+        n = len(filas)
+        if not n:
+            return
+        self._reservar(n)
+        i = self.n
+        for j, valores in enumerate(zip(*filas)):
+            dtype = self.dtypes[j]
+            if self.tipos[j] == _TIMESTAMPTZ:
+                valores = [_a_utc(v) for v in valores]
+            if dtype.kind in 'biu' and None in valores:
+                self._nulos[j][i:i + n] = np.fromiter((v is None for v in valores), bool, n)
+                valores = [0 if v is None else v for v in valores]
+            elif dtype.kind in 'fMO':
+                # NaN, NaT y None ya representan el nulo en el array
+                self._nulos[j][i:i + n] = np.fromiter((v is None for v in valores), bool, n)
+            if dtype.kind == 'O':
+                # Elemento a elemento: las listas (arrays de PG) no deben expandirse
+                datos = self._datos[j]
+                for k, valor in enumerate(valores, i):
+                    datos[k] = valor
+            else:
+                self._datos[j][i:i + n] = valores
+        self.n += n
+
+    def añadir_texto(self, filas):
+        """Añade un lote de filas del formato de texto de COPY (listas de str, nulo = \\N)."""
+        import numpy as np
+
+        n = len(filas)
+        if not n:
+            return
+        self._reservar(n)
+        i = self.n
+        for j, valores in enumerate(zip(*filas)):
+            dtype = self.dtypes[j]
+            nulos = np.fromiter((v == _NULO_COPY for v in valores), bool, n)
+            self._nulos[j][i:i + n] = nulos
+            hay_nulos = nulos.any()
+            if dtype.kind == 'b':
+                self._datos[j][i:i + n] = np.array(valores) == 't'
+            elif dtype.kind in 'iuf':
+                relleno = 'NaN' if dtype.kind == 'f' else '0'
+                if hay_nulos:
+                    valores = [relleno if v == _NULO_COPY else v for v in valores]
+                self._datos[j][i:i + n] = np.array(valores).astype(dtype)
+            elif dtype.kind == 'M':
+                if self.tipos[j] == _TIMESTAMPTZ:
+                    valores = [_PATRON_ZONA.sub('', v) for v in valores]
+                if hay_nulos:
+                    valores = ['NaT' if v == _NULO_COPY else v for v in valores]
+                self._datos[j][i:i + n] = np.array(valores).astype(dtype)
+            else:
+                self._datos[j][i:i + n] = [
+                    None if v == _NULO_COPY else _desescapar_copy(v) for v in valores
+                ]
+        self.n += n
+
+    def _columnas(self):
+        """(nombre, datos, nulos) de cada columna, recortados a n filas."""
+        for nombre, datos, nulos in zip(self.nombres, self._datos, self._nulos):
+            if len(datos) != self.n:
+                datos, nulos = datos[:self.n].copy(), nulos[:self.n].copy()
+            yield nombre, datos, nulos
+
+    def a_numpy(self):
+        """Devuelve un dict nombre -> numpy.ndarray con las filas acumuladas."""
+        import numpy as np
+
+        resultado = {}
+        for nombre, datos, nulos in self._columnas():
+            if nulos.any() and datos.dtype.kind in 'biu':
+                if datos.dtype.kind == 'b':
+                    datos = datos.astype(object)
+                    datos[nulos] = None
+                else:
+                    datos = datos.astype(np.float64)
+                    datos[nulos] = np.nan
+            resultado[nombre] = datos
+        return resultado
+
+    def a_arrow(self):
+        """Devuelve un pyarrow.RecordBatch con las filas acumuladas (nulos como nulos de Arrow)."""
+        asegurar_pyarrow()
+        columnas = []
+        for _, datos, nulos in self._columnas():
+            columnas.append(pyarrow.array(datos, mask=nulos if nulos.any() else None))
+        return pyarrow.RecordBatch.from_arrays(columnas, names=list(self.nombres))
+
+    def resultado(self, formato='numpy'):
+        """Resultado en el formato pedido: 'numpy' (dict de arrays) o 'arrow' (pyarrow.Table)."""
+        if formato == 'arrow':
+            return pyarrow.Table.from_batches([self.a_arrow()])
+        return self.a_numpy()
+
+
+class EscritorCopy:
+    """
+    Destino de ``cursor.copy_expert`` para ``COPY ... TO STDOUT`` en formato
+    de texto: parte el flujo en filas y las vuelca en el acumulador cada
+    ``lote`` filas, sin guardar el texto completo del resultado. En bytes
+    se cuentan los recibidos del servidor.
+    """
+
+    def __init__(self, acumulador, lote=10000, codificacion='utf-8'):
+        self.acumulador = acumulador
+        self.lote = int(lote)
+        self._decodificador = codecs.getincrementaldecoder(codificacion)()
+        self._resto = ''
+        self._filas = []
+        self.bytes = 0
+
+    def write(self, datos):
+        self.bytes += len(datos)
+        if isinstance(datos, (bytes, bytearray, memoryview)):
+            datos = self._decodificador.decode(bytes(datos))
+        # Los saltos de línea y tabuladores de los valores van escapados
+        lineas = (self._resto + datos).split('\n')
+        self._resto = lineas.pop()
+        self._filas.extend(linea.split('\t') for linea in lineas)
+        if len(self._filas) >= self.lote:
+            self._volcar()
+        return len(datos)
+
+    def _volcar(self):
+        if self._filas:
+            self.acumulador.añadir_texto(self._filas)
+            self._filas = []
+
+    def cerrar(self):
+        """Vuelca las filas pendientes (llamar al terminar copy_expert)."""
+        resto = self._resto + self._decodificador.decode(b'', final=True)
+        if resto:
+            self._filas.append(resto.split('\t'))
+            self._resto = ''
+        self._volcar()
@@ -4,6 +4,9 @@
 #   - La comprobación diferida de disponibilidad de GDAL (``asegurar_gdal``).
 #   - El diagnóstico de instalación y listado de drivers (``probar_gdal_ogr``).
 #   - La normalización de códigos EPSG (``normalizar_epsg``).
+#   - La transformación de bbox entre sistemas de referencia (``transformar_MRE``).
+#   - La lectura y borrado de archivos en memoria ``/vsimem/`` (``leer_vsimem``,
+#     ``borrar_vsimem``).
 #
 # El import de ``osgeo`` se difiere: importar este módulo NO aborta el proceso
 # cuando GDAL no está instalado (p. ej. al ejecutar tests de lógica pura). El
@@ -56,6 +59,64 @@ def normalizar_epsg(epsg):
     return int(epsg)
 
 
+def transformar_MRE(MRE, srs_origen, srs_destino):
+    """Transforma un bbox [minx, miny, maxx, maxy] por sus cuatro esquinas (orden x/y).
+
+    Parámetros
+    ----------
+    MRE : list[float]
+        Bounding box en ``srs_origen``.
+    srs_origen, srs_destino : osr.SpatialReference
+        Sistemas de referencia de origen y destino.
+    """
+    asegurar_gdal("la transformación de bbox")
+    if srs_origen.IsSame(srs_destino):
+        return list(MRE)
+    srs_origen = srs_origen.Clone()
+    srs_destino = srs_destino.Clone()
+    srs_origen.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    srs_destino.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    transform = osr.CoordinateTransformation(srs_origen, srs_destino)
+    minx, miny, maxx, maxy = MRE
+    puntos = transform.TransformPoints([(minx, miny), (minx, maxy), (maxx, miny), (maxx, maxy)])
+    xs = [p[0] for p in puntos]
+    ys = [p[1] for p in puntos]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def leer_vsimem(ruta):
+    """Devuelve el contenido (bytes) de un archivo VSI o None si no existe.
+
+    Parámetros
+    ----------
+    ruta : str
+        Ruta GDAL, normalmente bajo ``/vsimem/``.
+    """
+    asegurar_gdal("la lectura de archivos /vsimem/")
+    if gdal.VSIStatL(ruta) is None:
+        return None
+    f = gdal.VSIFOpenL(ruta, 'rb')
+    try:
+        gdal.VSIFSeekL(f, 0, 2)
+        tamaño = gdal.VSIFTellL(f)
+        gdal.VSIFSeekL(f, 0, 0)
+        return bytes(gdal.VSIFReadL(1, tamaño, f))
+    finally:
+        gdal.VSIFCloseL(f)
+
+
+def borrar_vsimem(ruta):
+    """Elimina un archivo o directorio (recursivamente) de ``/vsimem/``."""
+    asegurar_gdal("el borrado de archivos /vsimem/")
+    stat = gdal.VSIStatL(ruta)
+    if stat is None:
+        return
+    if stat.IsDirectory():
+        gdal.RmdirRecursive(ruta)
+    else:
+        gdal.Unlink(ruta)
+
+
 def probar_gdal_ogr():
     """Comprueba la instalación de GDAL/OGR y muestra los drivers disponibles.
 
@@ -0,0 +1,114 @@
+# Utilidades de serialización GeoJSON.
+#
+# Centraliza:
+#   - El redondeo de coordenadas a una precisión dada, al estilo de la opción
+#     RFC7946=YES / COORDINATE_PRECISION del driver GeoJSON de GDAL
+#     (``redondear_coordenadas``, ``redondear_geometria``).
+#   - La serialización compacta a bytes con orjson si está instalado y, si no,
+#     con el módulo json estándar (``serializar``).
+#   - Un codificador de FeatureCollection que escribe directamente bytes,
+#     objeto a objeto, sin construir el diccionario de la colección completa
+#     (``codificar_feature_collection``).
+#
+# Es lógica pura (solo biblioteca estándar + orjson opcional), de modo que
+# puede usarse y probarse sin GDAL.
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+# Backend de serialización disponible: 'orjson' o 'json'
+BACKEND_JSON = 'orjson' if orjson is not None else 'json'
+
+# Precisión por defecto de RFC 7946 en GDAL (7 decimales, ~1 cm en el ecuador)
+PRECISION_RFC7946 = 7
+
+
+def redondear_coordenadas(coords, precision):
+    """
+    Redondea recursivamente una lista (anidada) de coordenadas a
+    ``precision`` decimales (sin cambios si precision es None).
+    """
+    if precision is None:
+        return coords
+    if isinstance(coords, (list, tuple)):
+        return [redondear_coordenadas(c, precision) for c in coords]
+    if isinstance(coords, float):
+        return round(coords, precision)
+    return coords
+
+
+def redondear_geometria(geometria, precision):
+    """
+    Devuelve una copia de una geometría GeoJSON con las coordenadas
+    redondeadas a ``precision`` decimales (admite GeometryCollection).
+    """
+    if geometria is None or precision is None:
+        return geometria
+    resultado = dict(geometria)
+    if geometria.get('type') == 'GeometryCollection':
+        resultado['geometries'] = [
+            redondear_geometria(g, precision) for g in geometria.get('geometries', [])
+        ]
+    elif 'coordinates' in geometria:
+        resultado['coordinates'] = redondear_coordenadas(geometria['coordinates'], precision)
+    return resultado
+
+
+def serializar(obj, backend=None):
+    """
+    Serializa obj a JSON compacto (bytes UTF-8).
+
+    Parámetros
+    ----------
+    obj : object
+        Objeto serializable.
+    backend : str, opcional
+        'orjson' o 'json'. Por defecto, BACKEND_JSON.
+
+    Retorna
+    -------
+    bytes
+        JSON sin espacios codificado en UTF-8.
+    """
+    backend = backend or BACKEND_JSON
+    if backend == 'orjson':
+        if orjson is None:
+            raise Exception("orjson no está instalado (pip install orjson)")
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def codificar_feature_collection(features, precision=None, backend=None):
+    """
+    Codifica una secuencia de Features GeoJSON como FeatureCollection en
+    bytes, serializando cada objeto por separado (sin diccionario intermedio
+    de la colección) y redondeando las coordenadas si se indica precision.
+
+    Parámetros
+    ----------
+    features : iterable[dict]
+        Features GeoJSON (puede ser un generador).
+    precision : int, opcional
+        Número de decimales de las coordenadas.
+    backend : str, opcional
+        'orjson' o 'json'. Por defecto, BACKEND_JSON.
+
+    Retorna
+    -------
+    bytes
+        FeatureCollection serializada.
+    """
+    partes = []
+    for feature in features:
+        if precision is not None and feature.get('geometry') is not None:
+            feature = dict(feature)
+            feature['geometry'] = redondear_geometria(feature['geometry'], precision)
+        partes.append(serializar(feature, backend))
+    return b'{"type":"FeatureCollection","features":[' + b','.join(partes) + b']}'
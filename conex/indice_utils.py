@@ -0,0 +1,167 @@
+# Índice espacial de huellas de archivos sobre SQLite.
+#
+# Centraliza:
+#   - Un catálogo persistente de archivos (ruta, fecha de modificación,
+#     tamaño, bbox y metadatos libres en JSON) con un índice R-tree de sus
+#     huellas (``IndiceHuellas``).
+#   - La detección incremental de archivos nuevos, modificados y eliminados
+#     (``IndiceHuellas.pendientes``), de modo que solo se vuelven a abrir con
+#     GDAL los archivos que han cambiado.
+#
+# Es lógica pura (solo biblioteca estándar), de modo que puede usarse y
+# probarse sin GDAL.
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceHuellas:
+    """
+    Catálogo de archivos con sus huellas (bbox) indexadas en un R-tree de
+    SQLite. Es seguro entre hilos.
+
+    Atributos:
+    ----------
+    ruta : str
+        Ruta del archivo SQLite (':memory:' para un índice en memoria).
+    """
+
+    def __init__(self, ruta=':memory:'):
+        """
+        Parámetros
+        ----------
+        ruta : str, opcional
+            Ruta del archivo SQLite (se crea si no existe).
+        """
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        if ruta != ':memory:':
+            directorio = os.path.dirname(os.path.abspath(ruta))
+            if not os.path.exists(directorio):
+                os.makedirs(directorio)
+
+        # Conexión persistente (un índice ':memory:' vive lo que la conexión)
+        self._conn = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS archivos ("
+                " id INTEGER PRIMARY KEY, ruta TEXT UNIQUE, mtime_ns INTEGER,"
+                " tamaño INTEGER, info TEXT)"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS huellas USING rtree(id, minx, maxx, miny, maxy)"
+            )
+            self._conn.execute("INSERT OR IGNORE INTO metadata VALUES ('version', '0')")
+
+    def cerrar(self):
+        """Cierra la conexión con el SQLite."""
+        self._conn.close()
+
+    @property
+    def version(self):
+        """Contador que aumenta con cada cambio del catálogo."""
+        return int(self.obtener_meta('version', 0))
+
+    def obtener_meta(self, nombre, defecto=None):
+        """Devuelve el valor de la tabla metadata (o defecto si no existe)."""
+        with self._lock:
+            fila = self._conn.execute("SELECT value FROM metadata WHERE name = ?", (nombre,)).fetchone()
+        return fila[0] if fila is not None else defecto
+
+    def fijar_meta(self, nombre, valor):
+        """Guarda un valor (str) en la tabla metadata."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?)", (nombre, str(valor)))
+
+    def pendientes(self, rutas):
+        """
+        Compara las rutas con el catálogo.
+
+        Retorna
+        -------
+        tuple(list[str], list[str])
+            (rutas nuevas o modificadas según mtime/tamaño, rutas del
+            catálogo que ya no están en ``rutas``).
+        """
+        with self._lock:
+            conocidos = {
+                ruta: (mtime, tamaño)
+                for ruta, mtime, tamaño in self._conn.execute("SELECT ruta, mtime_ns, tamaño FROM archivos")
+            }
+        cambiados = []
+        for ruta in rutas:
+            st = os.stat(ruta)
+            if conocidos.get(ruta) != (st.st_mtime_ns, st.st_size):
+                cambiados.append(ruta)
+        actuales = set(rutas)
+        eliminados = [ruta for ruta in conocidos if ruta not in actuales]
+        return cambiados, eliminados
+
+    def actualizar(self, guardar=(), eliminar=()):
+        """
+        Aplica en una transacción los cambios del catálogo y aumenta la
+        versión si hay alguno.
+
+        Parámetros
+        ----------
+        guardar : iterable[tuple]
+            (ruta, [minx, miny, maxx, maxy], info) de archivos nuevos o
+            modificados; info es un dict serializable a JSON.
+        eliminar : iterable[str]
+            Rutas a quitar del catálogo.
+        """
+        guardar, eliminar = list(guardar), list(eliminar)
+        if not guardar and not eliminar:
+            return
+        with self._lock, self._conn:
+            for ruta in eliminar:
+                self._borrar(ruta)
+            for ruta, MRE, info in guardar:
+                self._borrar(ruta)
+                st = os.stat(ruta)
+                cursor = self._conn.execute(
+                    "INSERT INTO archivos (ruta, mtime_ns, tamaño, info) VALUES (?, ?, ?, ?)",
+                    (ruta, st.st_mtime_ns, st.st_size, json.dumps(info or {})),
+                )
+                minx, miny, maxx, maxy = MRE
+                self._conn.execute(
+                    "INSERT INTO huellas VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, minx, maxx, miny, maxy),
+                )
+            self._conn.execute(
+                "UPDATE metadata SET value = CAST(value AS INTEGER) + 1 WHERE name = 'version'"
+            )
+
+    def _borrar(self, ruta):
+        fila = self._conn.execute("SELECT id FROM archivos WHERE ruta = ?", (ruta,)).fetchone()
+        if fila is not None:
+            self._conn.execute("DELETE FROM huellas WHERE id = ?", fila)
+            self._conn.execute("DELETE FROM archivos WHERE id = ?", fila)
+
+    def consultar(self, MRE=None):
+        """
+        Devuelve (ruta, [minx, miny, maxx, maxy], info) de los archivos cuya
+        huella interseca MRE (todos si es None), en orden de inserción.
+        """
+        sql = (
+            "SELECT a.ruta, h.minx, h.miny, h.maxx, h.maxy, a.info"
+            " FROM archivos a JOIN huellas h ON a.id = h.id"
+        )
+        parametros = ()
+        if MRE is not None:
+            minx, miny, maxx, maxy = MRE
+            sql += " WHERE h.maxx >= ? AND h.minx <= ? AND h.maxy >= ? AND h.miny <= ?"
+            parametros = (minx, maxx, miny, maxy)
+        with self._lock:
+            filas = self._conn.execute(sql + " ORDER BY a.id", parametros).fetchall()
+        return [(f[0], list(f[1:5]), json.loads(f[5])) for f in filas]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archivos").fetchone()[0]
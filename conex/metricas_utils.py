@@ -0,0 +1,196 @@
+# Utilidades de métricas de consultas SQL.
+#
+# Centraliza:
+#   - La huella de una sentencia SQL normalizada, sin literales ni valores de
+#     parámetros, para agrupar las ejecuciones de una misma consulta
+#     (``huella_sql``).
+#   - El histograma de latencias sobre una ventana de las últimas muestras
+#     (``HistogramaLatencias``).
+#   - El registro agregado por huella y de consultas lentas que alimenta
+#     ``ConexPG.estadisticas_consultas`` (``RegistroConsultas``).
+#
+# Es lógica pura (solo biblioteca estándar), de modo que puede usarse y
+# probarse sin base de datos.
+
+import re
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de las cubetas del histograma
+CUBETAS_LATENCIA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+_PATRON_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_PATRON_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_PATRON_MARCADORES = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_PATRON_NUMEROS = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_PATRON_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PATRON_FILAS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_PATRON_ESPACIOS = re.compile(r"\s+")
+_PATRON_ESCRITURA = re.compile(r"\b(insert|update|delete|merge|truncate|create|drop|alter)\b")
+
+
+def huella_sql(sql):
+    """
+    Normaliza una sentencia SQL y devuelve (sql normalizado, huella).
+
+    Se eliminan comentarios, los literales y marcadores de parámetro pasan a
+    ``?``, las listas ``(?, ?, ...)`` y las filas de VALUES se pliegan y los
+    espacios se compactan, de modo que las ejecuciones de una consulta con
+    distintos valores comparten huella.
+    """
+    texto = _PATRON_COMENTARIOS.sub(' ', sql)
+    texto = _PATRON_CADENAS.sub('?', texto)
+    texto = _PATRON_MARCADORES.sub('?', texto)
+    texto = _PATRON_NUMEROS.sub('?', texto)
+    texto = _PATRON_LISTAS.sub('(?)', texto)
+    texto = _PATRON_FILAS.sub('(?)', texto)
+    texto = _PATRON_ESPACIOS.sub(' ', texto).strip().rstrip(';').strip().lower()
+    return texto, hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12]
+
+
+def es_solo_lectura(sql_normalizado):
+    """True si la sentencia normalizada es una lectura (SELECT/WITH sin escrituras)."""
+    if not sql_normalizado.startswith(('select', 'with')):
+        return False
+    return not _PATRON_ESCRITURA.search(sql_normalizado)
+
+
+def _percentil(ordenadas, p):
+    """Percentil p (0-100) por rango más cercano de una lista ordenada."""
+    if not ordenadas:
+        return 0.0
+    k = max(math.ceil(p / 100 * len(ordenadas)) - 1, 0)
+    return ordenadas[min(k, len(ordenadas) - 1)]
+
+
+class HistogramaLatencias:
+    """
+    Latencias de las últimas ``ventana`` ejecuciones: cubetas acumuladas por
+    límite superior y percentiles p50/p95/p99 sobre la ventana.
+    """
+
+    def __init__(self, ventana=1000, cubetas=CUBETAS_LATENCIA):
+        self.cubetas = tuple(cubetas)
+        self._muestras = deque(maxlen=int(ventana))
+
+    def __len__(self):
+        return len(self._muestras)
+
+    def añadir(self, segundos):
+        self._muestras.append(float(segundos))
+
+    def estadisticas(self):
+        """Dict con n, media, p50, p95, p99, max e histograma ({'<=0.01s': n, ...})."""
+        muestras = sorted(self._muestras)
+        histograma = {}
+        i = 0
+        for limite in self.cubetas:
+            while i < len(muestras) and muestras[i] <= limite:
+                i += 1
+            histograma[f"<={limite:g}s"] = i
+        histograma['+inf'] = len(muestras)
+        return {
+            'n': len(muestras),
+            'media': sum(muestras) / len(muestras) if muestras else 0.0,
+            'p50': _percentil(muestras, 50),
+            'p95': _percentil(muestras, 95),
+            'p99': _percentil(muestras, 99),
+            'max': muestras[-1] if muestras else 0.0,
+            'histograma': histograma,
+        }
+
+
+class RegistroConsultas:
+    """
+    Agrega las mediciones de consultas por huella de SQL normalizado y
+    guarda las últimas consultas lentas (con su plan, si se capturó).
+    Es seguro entre hilos.
+
+    Atributos:
+    ----------
+    umbral_lento : float o None
+        Segundos a partir de los que una consulta se considera lenta.
+    ventana : int
+        Muestras por huella de los histogramas.
+    """
+
+    # Tiempos por fase que se acumulan por huella
+    FASES = ('conexion', 'ejecucion', 'lectura')
+
+    def __init__(self, umbral_lento=None, ventana=1000, max_lentas=100, reloj=None):
+        self.umbral_lento = umbral_lento
+        self.ventana = ventana
+        self._reloj = reloj or time.time
+        self._consultas = {}
+        self._lentas = deque(maxlen=int(max_lentas))
+        self._lock = threading.Lock()
+
+    def registrar(self, medicion):
+        """
+        Acumula una medición (dict con huella, sql, total, fases, filas, bytes
+        y error). Devuelve True si la consulta supera el umbral de lentitud.
+        """
+        with self._lock:
+            entrada = self._consultas.get(medicion['huella'])
+            if entrada is None:
+                entrada = self._consultas[medicion['huella']] = {
+                    'sql': medicion['sql'],
+                    'llamadas': 0,
+                    'errores': 0,
+                    'filas': 0,
+                    'bytes': 0,
+                    'segundos': 0.0,
+                    **{fase: 0.0 for fase in self.FASES},
+                    '_histograma': HistogramaLatencias(self.ventana),
+                }
+            entrada['llamadas'] += 1
+            entrada['errores'] += bool(medicion.get('error'))
+            entrada['filas'] += medicion.get('filas') or 0
+            entrada['bytes'] += medicion.get('bytes') or 0
+            entrada['segundos'] += medicion['total']
+            for fase in self.FASES:
+                entrada[fase] += medicion.get(fase, 0.0)
+            entrada['_histograma'].añadir(medicion['total'])
+        return self.umbral_lento is not None and medicion['total'] >= self.umbral_lento
+
+    def registrar_lenta(self, medicion, plan=None):
+        """Guarda una consulta lenta (sin los valores de sus parámetros)."""
+        with self._lock:
+            self._lentas.append({
+                'instante': self._reloj(),
+                'huella': medicion['huella'],
+                'sql': medicion['sql'],
+                'segundos': medicion['total'],
+                'filas': medicion.get('filas'),
+                'plan': plan,
+            })
+
+    def plan_reciente(self, huella, intervalo):
+        """Plan capturado para huella hace menos de intervalo segundos (o None)."""
+        limite = self._reloj() - intervalo
+        with self._lock:
+            for lenta in reversed(self._lentas):
+                if lenta['huella'] == huella and lenta['plan'] and lenta['instante'] >= limite:
+                    return lenta['plan']
+        return None
+
+    def estadisticas(self):
+        """Dict {'consultas': {huella: {...}}, 'lentas': [...]}."""
+        with self._lock:
+            consultas = {}
+            for huella, entrada in self._consultas.items():
+                datos = {k: v for k, v in entrada.items() if not k.startswith('_')}
+                datos.update(entrada['_histograma'].estadisticas())
+                consultas[huella] = datos
+            return {'consultas': consultas, 'lentas': list(self._lentas)}
+
+    def limpiar(self):
+        with self._lock:
+            self._consultas.clear()
+            self._lentas.clear()
@@ -44,6 +44,7 @@ else:
 
 from .Vector_conex import FuenteDatosVector
 from .gdal_utils import asegurar_gdal
+from .geojson_utils import codificar_feature_collection, redondear_coordenadas
 
 
 def _asegurar_gdal():
@@ -879,6 +880,23 @@ class geojsonQuery:
         self.geojson = geojson_obj
         return geojson_obj
 
+    def geojson_bytes(self, precision=None, backend=None):
+        """
+        Serializa self.geojson como FeatureCollection compacta (bytes),
+        objeto a objeto y con orjson si está instalado.
+
+        Parámetros
+        ----------
+        precision : int, opcional
+            Número de decimales de las coordenadas.
+        backend : str, opcional
+            'orjson' o 'json' (por defecto, el más rápido disponible).
+        """
+        if not hasattr(self, "geojson") or self.geojson is None:
+            raise Exception("Primero debes cargar un geojson en self.geojson")
+
+        return codificar_feature_collection(self.geojson.get("features", []), precision, backend)
+
 class FuenteDatosSonoff(infoSonoff,geojsonQuery):
     """
     Clase para gestionar la lectura, consulta y exportación de datos provenientes de IoT Sonoff.
@@ -934,10 +952,13 @@ class FuenteDatosSonoff(infoSonoff,geojsonQuery):
             self.porTipo = self.dividir_por_tipo(tipo=capa)
             return self.porTipo 
         
-    def exportar_geojson(self, capa=None):
+    def exportar_geojson(self, capa=None, precision=None, como_bytes=False):
         """
         Exporta los dispositivos de una capa a formato GeoJSON.
         Si capa es None, usa la primera llave padre.
+        Si se indica precision, redondea las coordenadas a ese número de decimales.
+        Con como_bytes=True devuelve la FeatureCollection ya serializada
+        (bytes, con orjson si está instalado) sin construir el dict.
         """
         if not capa:
             capa = next(iter(self.porTipo.keys()))
@@ -945,7 +966,19 @@ class FuenteDatosSonoff(infoSonoff,geojsonQuery):
                 tipo = self.capas[capa]
         dispositivos = self.porTipo.get(capa, {})
 
-        features = []
+        features = self._features_geojson(dispositivos, precision)
+        if como_bytes:
+            return codificar_feature_collection(features)
+
+        geojson = {
+            "type": "FeatureCollection",
+            "features": list(features)
+        }
+        self.geojson = geojson
+        return geojson
+
+    def _features_geojson(self, dispositivos, precision=None):
+        """Genera las Features GeoJSON de los dispositivos con coordenadas."""
         for device_id, device in dispositivos.items():
             extra = device.get('extra', {})
             lon = extra.get('long')
@@ -954,11 +987,11 @@ class FuenteDatosSonoff(infoSonoff,geojsonQuery):
             if lon is None or lat is None:
                 continue  # Salta si no hay coordenadas
 
-            feature = {
+            yield {
                 "type": "Feature",
                 "geometry": {
                     "type": "Point",
-                    "coordinates": [lon, lat]
+                    "coordinates": redondear_coordenadas([lon, lat], precision)
                 },
                 "properties": {
                     "id": device_id,
@@ -967,14 +1000,6 @@ class FuenteDatosSonoff(infoSonoff,geojsonQuery):
                     "state": device.get('state', {})
                 }
             }
-            features.append(feature)
-
-        geojson = {
-            "type": "FeatureCollection",
-            "features": features
-        }
-        self.geojson = geojson
-        return geojson
     
 class FuenteDatosSonoff_SQLITE(infoSonoff,geojsonQuery):
     def __init__(self, ruta_json_params, ruta_SQLite_devices):
@@ -1043,10 +1068,14 @@ class FuenteDatosSonoff_SQLITE(infoSonoff,geojsonQuery):
         conn.close()
         return self.porTipo 
 
-    def exportar_geojson(self, capa=None):
+    def exportar_geojson(self, capa=None, precision=None, como_bytes=False):
         """
         Exporta los dispositivos de una capa a formato GeoJSON.
         Si capa es None, usa la primera llave padre.
+        Si se indica precision, redondea las coordenadas a ese número de decimales.
+        Con como_bytes=True devuelve la FeatureCollection ya serializada
+        (bytes, con orjson si está instalado), leyendo las filas del cursor
+        sin construir el dict.
         """
         if not self.ruta_SQLite_devices:
             raise Exception('No se ha especificado la ruta del archivo SQLite')
@@ -1064,35 +1093,40 @@ class FuenteDatosSonoff_SQLITE(infoSonoff,geojsonQuery):
         if isinstance(capa, int):
             capa = self.capas[capa]
         if capa not in self.capas:
+            conn.close()
             raise Exception(f'No existe la tabla {capa} en el archivo SQLite')
 
-        c.execute(f"SELECT * FROM {capa}")
-        filas = c.fetchall()
-
-        features = []
-        for fila in filas:
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [json.loads(fila[1])['long'], json.loads(fila[1])['lat']]
-                },
-                "properties": {
-                    "id": fila[0],
-                    "datetime":json.loads(fila[1])['datetime'],
-                    "ewelinkData": json.loads(fila[2]),
-                    "state": json.loads(fila[3])
-                }
-            }
-            features.append(feature)
+        features = self._features_sqlite(conn, capa, precision)
+        if como_bytes:
+            return codificar_feature_collection(features)
 
         geojson = {
             "type": "FeatureCollection",
-            "features": features
+            "features": list(features)
         }
-        conn.close()
         self.geojson = geojson
         return geojson
+
+    def _features_sqlite(self, conn, capa, precision=None):
+        """Genera las Features GeoJSON de las filas de la tabla y cierra conn al terminar."""
+        try:
+            for fila in conn.execute(f"SELECT * FROM {capa}"):
+                extra = json.loads(fila[1])
+                yield {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": redondear_coordenadas([extra['long'], extra['lat']], precision)
+                    },
+                    "properties": {
+                        "id": fila[0],
+                        "datetime":extra['datetime'],
+                        "ewelinkData": json.loads(fila[2]),
+                        "state": json.loads(fila[3])
+                    }
+                }
+        finally:
+            conn.close()
   
 class FuenteDatosSonoff_OGR(infoSonoff,FuenteDatosVector):
     """
@@ -1197,4 +1231,5 @@ class FuenteDatosSonoff_OGR(infoSonoff,FuenteDatosVector):
             self.multiLayers = False
 
         self.datasource = out_ds
+        self._invalidar_cache()
         return out_ds
\ No newline at end of file
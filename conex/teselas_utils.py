@@ -0,0 +1,75 @@
+# Utilidades de teselado WebMercator (esquema XYZ / Google, EPSG:3857).
+#
+# Centraliza:
+#   - Los límites de una tesela z/x/y en EPSG:3857 (``limites_tesela_3857``).
+#   - La validación de índices de tesela (``validar_tesela``).
+#   - El cálculo de las teselas que cubren un bbox (``teselas_en_bbox``).
+#
+# Es lógica pura (sin GDAL), de modo que puede usarse y probarse sin ``osgeo``.
+
+import math
+
+# Semilado del cuadrado de WebMercator en metros.
+ORIGEN_3857 = 20037508.342789244
+
+# Latitud máxima representable en WebMercator.
+LATITUD_MAXIMA = 85.0511287798066
+
+
+def validar_tesela(z, x, y):
+    """Normaliza z/x/y a ``int`` y lanza ValueError si están fuera de rango."""
+    z, x, y = int(z), int(x), int(y)
+    if z < 0 or z > 30:
+        raise ValueError(f"Nivel de zoom fuera de rango: {z}")
+    n = 2 ** z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"Tesela fuera de rango para z={z}: x={x}, y={y}")
+    return z, x, y
+
+
+def limites_tesela_3857(z, x, y):
+    """
+    Devuelve el bbox [minx, miny, maxx, maxy] en EPSG:3857 de la tesela z/x/y
+    (origen arriba a la izquierda, como en XYZ).
+    """
+    z, x, y = validar_tesela(z, x, y)
+    lado = 2 * ORIGEN_3857 / (2 ** z)
+    minx = -ORIGEN_3857 + x * lado
+    maxy = ORIGEN_3857 - y * lado
+    return [minx, maxy - lado, minx + lado, maxy]
+
+
+def lonlat_a_3857(lon, lat):
+    """Convierte longitud/latitud (grados) a coordenadas EPSG:3857."""
+    lat = max(-LATITUD_MAXIMA, min(LATITUD_MAXIMA, lat))
+    x = lon * ORIGEN_3857 / 180.0
+    y = math.log(math.tan((90.0 + lat) * math.pi / 360.0)) * ORIGEN_3857 / math.pi
+    return x, y
+
+
+def teselas_en_bbox(MRE_3857, z):
+    """
+    Genera las teselas (z, x, y) que intersecan un bbox en EPSG:3857.
+
+    Parámetros
+    ----------
+    MRE_3857 : list[float]
+        Bounding box [minx, miny, maxx, maxy] en EPSG:3857.
+    z : int
+        Nivel de zoom.
+    """
+    n = 2 ** int(z)
+    lado = 2 * ORIGEN_3857 / n
+    minx, miny, maxx, maxy = MRE_3857
+
+    def _indice(valor):
+        return max(0, min(n - 1, int(math.floor(valor))))
+
+    x0 = _indice((minx + ORIGEN_3857) / lado)
+    x1 = _indice((maxx + ORIGEN_3857) / lado)
+    y0 = _indice((ORIGEN_3857 - maxy) / lado)
+    y1 = _indice((ORIGEN_3857 - miny) / lado)
+
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield int(z), x, y
@@ -35,6 +35,7 @@ else:
 
 from .Vector_conex import FuenteDatosVector
 from .sonoff_conex import geojsonQuery, _asegurar_gdal
+from .geojson_utils import codificar_feature_collection, redondear_coordenadas
 
 
 def _asegurar_tinytuya():
@@ -469,24 +470,35 @@ class FuenteDatosTuya(infoTuyaSmartLife, geojsonQuery):
             self.porTipo = self.dividir_por_tipo(tipo=capa)
             return self.porTipo
 
-    def exportar_geojson(self, capa=None):
+    def exportar_geojson(self, capa=None, precision=None, como_bytes=False):
         if not capa:
             capa = next(iter(self.porTipo.keys()))
         if isinstance(capa, int):
             capa = self.capas[capa]
         dispositivos = self.porTipo.get(capa, {})
-        features = []
+        features = self._features_geojson(dispositivos, precision)
+        if como_bytes:
+            # FeatureCollection serializada objeto a objeto (orjson si está instalado)
+            return codificar_feature_collection(features)
+        geojson = {
+            "type": "FeatureCollection",
+            "features": list(features)
+        }
+        self.geojson = geojson
+        return geojson
+
+    def _features_geojson(self, dispositivos, precision=None):
         for device_id, device in dispositivos.items():
             extra = device.get('extra', {})
             lon = extra.get('long')
             lat = extra.get('lat')
             if lon is None or lat is None:
                 continue
-            feature = {
+            yield {
                 "type": "Feature",
                 "geometry": {
                     "type": "Point",
-                    "coordinates": [lon, lat]
+                    "coordinates": redondear_coordenadas([lon, lat], precision)
                 },
                 "properties": {
                     "id": device_id,
@@ -494,13 +506,6 @@ class FuenteDatosTuya(infoTuyaSmartLife, geojsonQuery):
                     "state": device.get('state', [])
                 }
             }
-            features.append(feature)
-        geojson = {
-            "type": "FeatureCollection",
-            "features": features
-        }
-        self.geojson = geojson
-        return geojson
 
 
 class FuenteDatosTuya_SQLITE(infoTuyaSmartLife, geojsonQuery):
@@ -557,7 +562,7 @@ class FuenteDatosTuya_SQLITE(infoTuyaSmartLife, geojsonQuery):
         conn.close()
         return self.porTipo
 
-    def exportar_geojson(self, capa=None):
+    def exportar_geojson(self, capa=None, precision=None, como_bytes=False):
         if not self.ruta_SQLite_devices:
             raise Exception('No se ha especificado la ruta del archivo SQLite')
         if not os.path.exists(self.ruta_SQLite_devices):
@@ -572,32 +577,38 @@ class FuenteDatosTuya_SQLITE(infoTuyaSmartLife, geojsonQuery):
         if isinstance(capa, int):
             capa = self.capas[capa]
         if capa not in self.capas:
+            conn.close()
             raise Exception(f'No existe la tabla {capa} en el archivo SQLite')
-        c.execute(f"SELECT * FROM {capa}")
-        filas = c.fetchall()
-        features = []
-        for fila in filas:
-            extra = json.loads(fila[1])
-            features.append({
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [extra['long'], extra['lat']]
-                },
-                "properties": {
-                    "id": fila[0],
-                    "tuyaSmartLife": json.loads(fila[2]),
-                    "state": json.loads(fila[3])
-                }
-            })
+        features = self._features_sqlite(conn, capa, precision)
+        if como_bytes:
+            # Filas del cursor serializadas una a una, sin lista ni dict intermedio
+            return codificar_feature_collection(features)
         geojson = {
             "type": "FeatureCollection",
-            "features": features
+            "features": list(features)
         }
-        conn.close()
         self.geojson = geojson
         return geojson
 
+    def _features_sqlite(self, conn, capa, precision=None):
+        try:
+            for fila in conn.execute(f"SELECT * FROM {capa}"):
+                extra = json.loads(fila[1])
+                yield {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": redondear_coordenadas([extra['long'], extra['lat']], precision)
+                    },
+                    "properties": {
+                        "id": fila[0],
+                        "tuyaSmartLife": json.loads(fila[2]),
+                        "state": json.loads(fila[3])
+                    }
+                }
+        finally:
+            conn.close()
+
 
 class FuenteDatosTuya_OGR(infoTuyaSmartLife, FuenteDatosVector):
     def __init__(self, ruta_json_params, ruta_SQLite_devices):
@@ -658,4 +669,5 @@ class FuenteDatosTuya_OGR(infoTuyaSmartLife, FuenteDatosVector):
             procesar_capa(in_layer, in_layer.GetName())
             self.multiLayers = False
         self.datasource = out_ds
+        self._invalidar_cache()
         return out_ds
@@ -0,0 +1,266 @@
+import ast
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from osgeo import gdal, gdal_array
+
+from .zonales import _resolver_dataset
+
+# Funciones de NumPy que pueden usarse en las expresiones
+FUNCIONES_CALCULADORA = {
+    nombre: getattr(np, nombre)
+    for nombre in (
+        'abs', 'sqrt', 'exp', 'log', 'log10', 'log1p', 'power',
+        'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'arctan2',
+        'floor', 'ceil', 'round', 'minimum', 'maximum', 'clip', 'where',
+    )
+}
+
+# Nodos del AST permitidos en las expresiones (sin atributos, índices,
+# lambdas ni llamadas a otra cosa que FUNCIONES_CALCULADORA)
+_NODOS_PERMITIDOS = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name,
+    ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd, ast.Invert, ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Operadores bit a bit, que en las expresiones son y/o/xor/no lógicos
+_OPERADORES_LOGICOS = (ast.BitAnd, ast.BitOr, ast.BitXor)
+
+# Nombre interno de la conversión a booleano de sus operandos
+_LOGICO = '_logico'
+
+# Opciones de creación por defecto de la salida en disco
+_OPCIONES_GTIFF = ['TILED=YES', 'COMPRESS=DEFLATE', 'BIGTIFF=IF_SAFER']
+
+
+def compilar_expresion(expresion, nombres):
+    """
+    Valida y compila una expresión de álgebra de bandas.
+
+    Solo se admiten operadores aritméticos, de comparación y bit a bit
+    (``&``, ``|``, ``^``, ``~`` como y/o/xor/no lógicos: sus operandos se
+    convierten a booleano, distinto de cero), constantes numéricas, los
+    nombres de banda indicados y las funciones de FUNCIONES_CALCULADORA.
+
+    :param expresion: p. ej. '(nir - red) / (nir + red)'
+    :param nombres: nombres de banda admitidos
+    :return: objeto código para ``eval``
+    """
+    try:
+        arbol = ast.parse(expresion, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Expresión no válida: {expresion} ({e.msg})")
+
+    nombres = set(nombres)
+    for nodo in ast.walk(arbol):
+        if not isinstance(nodo, _NODOS_PERMITIDOS):
+            raise ValueError(f"Elemento no permitido en la expresión: {type(nodo).__name__}")
+        if isinstance(nodo, ast.Constant) and not isinstance(nodo.value, (int, float)):
+            raise ValueError(f"Constante no permitida en la expresión: {nodo.value!r}")
+        if isinstance(nodo, ast.Call):
+            if not isinstance(nodo.func, ast.Name) or nodo.func.id not in FUNCIONES_CALCULADORA or nodo.keywords:
+                raise ValueError("Solo se admiten llamadas posicionales a las funciones de FUNCIONES_CALCULADORA")
+        elif isinstance(nodo, ast.Name) and nodo.id not in nombres and nodo.id not in FUNCIONES_CALCULADORA:
+            raise ValueError(f"Banda desconocida en la expresión: {nodo.id}")
+
+    arbol = ast.fix_missing_locations(_OperadoresLogicos().visit(arbol))
+    return compile(arbol, '<calculadora>', 'eval')
+
+
+class _OperadoresLogicos(ast.NodeTransformer):
+    """
+    Convierte a booleano (distinto de cero) los operandos de ``&``, ``|``,
+    ``^`` y ``~``: las bandas se leen como float64, que NumPy no admite en
+    operaciones bit a bit.
+    """
+
+    def _logico(self, nodo):
+        return ast.Call(func=ast.Name(id=_LOGICO, ctx=ast.Load()), args=[nodo], keywords=[])
+
+    def visit_BinOp(self, nodo):
+        self.generic_visit(nodo)
+        if isinstance(nodo.op, _OPERADORES_LOGICOS):
+            nodo.left, nodo.right = self._logico(nodo.left), self._logico(nodo.right)
+        return nodo
+
+    def visit_UnaryOp(self, nodo):
+        self.generic_visit(nodo)
+        if isinstance(nodo.op, ast.Invert):
+            nodo.operand = self._logico(nodo.operand)
+        return nodo
+
+
+def _a_logico(valor):
+    return np.asarray(valor) != 0
+
+
+def _nodata_tipo(nodata, tipo):
+    """
+    Valida que nodata cabe en el tipo GDAL de salida o, si es None, devuelve
+    el valor por defecto del tipo: -9999 en reales, el mínimo en enteros con
+    signo y el máximo en enteros sin signo.
+    """
+    dtype = np.dtype(gdal_array.GDALTypeCodeToNumericTypeCode(tipo))
+    if dtype.kind == 'f':
+        if nodata is None:
+            return -9999.0
+        if np.isfinite(nodata) and abs(nodata) > np.finfo(dtype).max:
+            raise ValueError(f"nodata={nodata} no cabe en el tipo {gdal.GetDataTypeName(tipo)}")
+        return float(nodata)
+    if dtype.kind not in 'iu':
+        raise ValueError(f"Tipo de salida no soportado: {gdal.GetDataTypeName(tipo)}")
+    limites = np.iinfo(dtype)
+    if nodata is None:
+        return int(limites.max if dtype.kind == 'u' else limites.min)
+    if float(nodata) != int(nodata) or not limites.min <= int(nodata) <= limites.max:
+        raise ValueError(
+            f"nodata={nodata} no cabe en el tipo {gdal.GetDataTypeName(tipo)} "
+            f"(enteros entre {limites.min} y {limites.max})"
+        )
+    return int(nodata)
+
+
+def calculadora_raster(expresion, bandas, fuente=None, salida='', formato='MEM',
+                       tipo=gdal.GDT_Float32, nodata=None, tamaño_bloque=1024,
+                       hilos=None, opciones_creacion=None):
+    """
+    Evalúa una expresión de álgebra de bandas (p. ej. un NDVI) bloque a bloque.
+
+    Las bandas de entrada se leen por ventanas alineadas con el bloque nativo
+    de la primera banda, la expresión se evalúa con NumPy en un pool de hilos
+    y cada bloque se escribe en la salida nada más calcularse, de modo que la
+    memoria usada depende del tamaño de bloque y del número de hilos, no del
+    tamaño del ráster. Los píxeles NoData (o no finitos) de cualquier entrada,
+    y los resultados no finitos (p. ej. divisiones por cero), se escriben
+    como ``nodata``.
+
+    :param expresion: expresión sobre los nombres de ``bandas`` (ver compilar_expresion)
+    :param bandas: dict nombre -> número de banda de ``fuente``, o nombre ->
+        (FuenteDatosRaster/gdal.Dataset, número de banda). Todas las entradas
+        deben compartir tamaño y geotransformación.
+    :param fuente: FuenteDatosRaster (ya leída) o gdal.Dataset por defecto
+    :param salida: ruta de salida (ignorada con formato 'MEM')
+    :param formato: 'MEM', 'GTiff' (teselado y comprimido) o 'COG'
+    :param tipo: tipo GDAL de la banda de salida
+    :param nodata: valor NoData de la salida; debe caber en ``tipo``. Por
+        defecto, -9999 en tipos reales, el mínimo del tipo en enteros con
+        signo y el máximo en enteros sin signo (255 en Byte)
+    :param tamaño_bloque: lado aproximado de la ventana de cálculo en píxeles
+    :param hilos: número de hilos (por defecto, el de ThreadPoolExecutor)
+    :param opciones_creacion: opciones de creación adicionales del driver
+    :return: gdal.Dataset de una banda con el resultado
+    """
+    if not bandas:
+        raise Exception("Debe indicar al menos una banda")
+    codigo = compilar_expresion(expresion, bandas)
+    nodata = _nodata_tipo(nodata, tipo)
+
+    entradas = {}
+    for nombre, valor in bandas.items():
+        if isinstance(valor, (tuple, list)):
+            ds_banda, num = _resolver_dataset(valor[0]), int(valor[1])
+        else:
+            if fuente is None:
+                raise Exception(f"La banda '{nombre}' necesita una fuente")
+            ds_banda, num = _resolver_dataset(fuente), int(valor)
+        if ds_banda.GetRasterBand(num) is None:
+            raise Exception(f"No existe la banda '{num}' ({nombre})")
+        entradas[nombre] = (ds_banda, num)
+
+    ds_ref, num_ref = next(iter(entradas.values()))
+    ancho, alto = ds_ref.RasterXSize, ds_ref.RasterYSize
+    gt = ds_ref.GetGeoTransform()
+    for nombre, (ds_banda, _) in entradas.items():
+        if (ds_banda.RasterXSize, ds_banda.RasterYSize) != (ancho, alto) or ds_banda.GetGeoTransform() != gt:
+            raise Exception(f"La banda '{nombre}' no comparte la rejilla de las demás entradas")
+
+    # Ventanas alineadas con el bloque nativo
+    nbx, nby = ds_ref.GetRasterBand(num_ref).GetBlockSize()
+    bx = max(nbx, (int(tamaño_bloque) // nbx) * nbx) if nbx < ancho else ancho
+    by = max(nby, (int(tamaño_bloque) // nby) * nby) if nby < alto else alto
+
+    # Destino: COG solo admite CreateCopy, así que se escribe primero un
+    # GTiff teselado temporal y después se convierte
+    formato = {'mem': 'MEM', 'gtiff': 'GTiff', 'cog': 'COG'}.get(str(formato).lower(), formato)
+    if formato == 'MEM':
+        ruta_trabajo = ''
+        driver = gdal.GetDriverByName('MEM')
+        opciones = []
+    else:
+        if not salida:
+            raise Exception(f"Debe indicar la ruta de salida para el formato {formato}")
+        ruta_trabajo = f"{salida}.tmp.tif" if formato == 'COG' else salida
+        driver = gdal.GetDriverByName('GTiff' if formato == 'COG' else formato)
+        opciones = list(_OPCIONES_GTIFF)
+        if formato != 'COG':
+            opciones += list(opciones_creacion or [])
+    if driver is None:
+        raise RuntimeError(f"El driver {formato} de GDAL no está disponible.")
+
+    ds_salida = driver.Create(ruta_trabajo, ancho, alto, 1, tipo, options=opciones)
+    ds_salida.SetGeoTransform(gt)
+    ds_salida.SetProjection(ds_ref.GetProjection())
+    banda_salida = ds_salida.GetRasterBand(1)
+    banda_salida.SetNoDataValue(nodata)
+
+    bloqueo_raster = threading.Lock()
+    bloqueo_salida = threading.Lock()
+    locales = threading.local()
+    nodatas = {n: ds.GetRasterBand(b).GetNoDataValue() for n, (ds, b) in entradas.items()}
+
+    def _leer(nombre, xoff, yoff, w, h):
+        # Manejador propio por hilo para datasets en disco; si no, bloqueo
+        ds_banda, num = entradas[nombre]
+        en_disco = ds_banda.GetDriver().ShortName != 'MEM' and bool(ds_banda.GetDescription())
+        if en_disco:
+            if not hasattr(locales, 'ds'):
+                locales.ds = {}
+            ruta = ds_banda.GetDescription()
+            if ruta not in locales.ds:
+                locales.ds[ruta] = gdal.Open(ruta)
+            return locales.ds[ruta].GetRasterBand(num).ReadAsArray(xoff, yoff, w, h)
+        with bloqueo_raster:
+            return ds_banda.GetRasterBand(num).ReadAsArray(xoff, yoff, w, h)
+
+    def _procesar(ventana):
+        xoff, yoff = ventana
+        w, h = min(bx, ancho - xoff), min(by, alto - yoff)
+        valores = {}
+        invalidos = np.zeros((h, w), dtype=bool)
+        for nombre in entradas:
+            datos = _leer(nombre, xoff, yoff, w, h).astype(np.float64)
+            invalidos |= ~np.isfinite(datos)
+            if nodatas[nombre] is not None:
+                invalidos |= datos == nodatas[nombre]
+            valores[nombre] = datos
+
+        with np.errstate(all='ignore'):
+            resultado = eval(codigo, {'__builtins__': {}},
+                             {**FUNCIONES_CALCULADORA, _LOGICO: _a_logico, **valores})
+        resultado = np.broadcast_to(np.asarray(resultado, dtype=np.float64), (h, w)).copy()
+        invalidos |= ~np.isfinite(resultado)
+        resultado[invalidos] = nodata
+
+        with bloqueo_salida:
+            banda_salida.WriteArray(resultado, xoff, yoff)
+
+    ventanas = [(x, y) for y in range(0, alto, by) for x in range(0, ancho, bx)]
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        # list() propaga las excepciones de los hilos
+        list(ejecutor.map(_procesar, ventanas))
+    banda_salida.FlushCache()
+
+    if formato != 'COG':
+        return ds_salida
+
+    ds_salida = None
+    try:
+        gdal.Translate(salida, ruta_trabajo, format='COG',
+                       creationOptions=['COMPRESS=DEFLATE'] + list(opciones_creacion or []))
+    finally:
+        gdal.GetDriverByName('GTiff').Delete(ruta_trabajo)
+    return gdal.Open(salida)
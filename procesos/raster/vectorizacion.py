@@ -0,0 +1,429 @@
+import os
+import uuid
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from osgeo import gdal, ogr, osr
+
+from conex.Vector_conex import FuenteDatosVector
+from .zonales import _resolver_dataset
+
+# Las teselas se vectorizan en coordenadas de píxel (enteras en los bordes),
+# de modo que los bordes comunes de teselas vecinas coinciden exactamente y
+# pueden coserse; después se pasan a coordenadas del ráster con la
+# geotransformación, operando directamente sobre el WKB con NumPy.
+
+
+def _afin_wkb(wkb, gt):
+    """Aplica la geotransformación gt a todas las coordenadas de un WKB."""
+    salida = bytearray(wkb)
+
+    def _coordenadas(pos, n, orden, dim):
+        tipo = np.dtype(orden + 'f8')
+        xy = np.frombuffer(salida, dtype=tipo, count=n * dim, offset=pos).reshape(n, dim).copy()
+        x = gt[0] + xy[:, 0] * gt[1] + xy[:, 1] * gt[2]
+        y = gt[3] + xy[:, 0] * gt[4] + xy[:, 1] * gt[5]
+        xy[:, 0], xy[:, 1] = x, y
+        fin = pos + n * dim * 8
+        salida[pos:fin] = xy.astype(tipo).tobytes()
+        return fin
+
+    def _geometria(pos):
+        orden = '<' if salida[pos] == 1 else '>'
+        tipo = struct.unpack_from(orden + 'I', salida, pos + 1)[0]
+        dim = 2 + bool(tipo & 0x80000000) + bool(tipo & 0x40000000)
+        tipo &= 0x0FFFFFFF
+        dim += {1: 1, 2: 1, 3: 2}.get(tipo // 1000, 0)
+        base = tipo % 1000
+        pos += 5
+        if base == 1:
+            return _coordenadas(pos, 1, orden, dim)
+        n = struct.unpack_from(orden + 'I', salida, pos)[0]
+        pos += 4
+        if base == 2:
+            return _coordenadas(pos, n, orden, dim)
+        if base == 3:
+            for _ in range(n):
+                puntos = struct.unpack_from(orden + 'I', salida, pos)[0]
+                pos = _coordenadas(pos + 4, puntos, orden, dim)
+            return pos
+        for _ in range(n):
+            pos = _geometria(pos)
+        return pos
+
+    _geometria(0)
+    return bytes(salida)
+
+
+def _teselas(ancho, alto, tamaño, solape=0):
+    """Ventanas (xoff, yoff, w, h) de lado tamaño (más solape por la derecha/abajo)."""
+    for yoff in range(0, alto, tamaño):
+        for xoff in range(0, ancho, tamaño):
+            yield xoff, yoff, min(tamaño + solape, ancho - xoff), min(tamaño + solape, alto - yoff)
+
+
+def _dataset_pixel(datos, xoff, yoff, nodata):
+    """Dataset MEM de una tesela con geotransformación en coordenadas de píxel."""
+    tipo = gdal.GDT_Float64 if np.issubdtype(datos.dtype, np.floating) else gdal.GDT_Int32
+    ds = gdal.GetDriverByName('MEM').Create('', datos.shape[1], datos.shape[0], 1, tipo)
+    ds.SetGeoTransform((xoff, 1.0, 0.0, yoff, 0.0, 1.0))
+    banda = ds.GetRasterBand(1)
+    banda.WriteArray(datos)
+    if nodata is not None:
+        banda.SetNoDataValue(float(nodata))
+    return ds
+
+
+def _tramos_costura(geom, bordes):
+    """
+    Lados de geom (en coordenadas de píxel) que están sobre alguno de los
+    bordes de costura de la tesela: lista de (eje, coordenada, inicio, fin),
+    con eje 'x' para los bordes verticales y 'y' para los horizontales.
+    """
+    minx_c, miny_c, maxx_c, maxy_c = bordes
+    verticales = {c for c in (minx_c, maxx_c) if c is not None}
+    horizontales = {c for c in (miny_c, maxy_c) if c is not None}
+    tramos = []
+    for i in range(geom.GetGeometryCount()):
+        puntos = geom.GetGeometryRef(i).GetPoints() or []
+        for p, q in zip(puntos, puntos[1:]):
+            if p[0] == q[0] and p[0] in verticales:
+                tramos.append(('x', p[0], min(p[1], q[1]), max(p[1], q[1])))
+            elif p[1] == q[1] and p[1] in horizontales:
+                tramos.append(('y', p[1], min(p[0], q[0]), max(p[0], q[0])))
+    return tramos
+
+
+def _grupos_costura(piezas, conectividad):
+    """
+    Agrupa las piezas de costura [(valor, wkb, tramos)] que forman un mismo
+    polígono: las del mismo valor cuyos tramos sobre una costura se solapan
+    (con conectividad 8 basta con que se toquen en un vértice). Devuelve
+    listas de índices de piezas.
+    """
+    padre = list(range(len(piezas)))
+
+    def _raiz(i):
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+
+    por_costura = {}
+    for i, (valor, _, tramos) in enumerate(piezas):
+        for eje, coordenada, inicio, fin in tramos:
+            por_costura.setdefault((eje, coordenada, valor), []).append((inicio, fin, i))
+
+    # Barrido por cada costura: un tramo se une al que llega más lejos de
+    # los anteriores si empieza antes de su final
+    for tramos in por_costura.values():
+        tramos.sort()
+        fin_max, actual = None, None
+        for inicio, fin, i in tramos:
+            if fin_max is not None and (inicio < fin_max or (conectividad == 8 and inicio == fin_max)):
+                padre[_raiz(i)] = _raiz(actual)
+            if fin_max is None or fin > fin_max:
+                fin_max, actual = fin, i
+
+    grupos = {}
+    for i in range(len(piezas)):
+        grupos.setdefault(_raiz(i), []).append(i)
+    return list(grupos.values())
+
+
+def _poligonizar_tesela(datos, xoff, yoff, nodata, gt, bordes, conectividad):
+    """
+    Poligoniza una tesela en un proceso del pool. Devuelve (interiores,
+    costura): las interiores son (valor, wkb) ya en coordenadas del ráster
+    y las que tocan una costura con otra tesela son (valor, wkb, tramos) en
+    coordenadas de píxel (ver ``_tramos_costura``).
+    """
+    gdal.UseExceptions()
+    ds = _dataset_pixel(datos, xoff, yoff, nodata)
+    banda = ds.GetRasterBand(1)
+
+    ds_ogr = ogr.GetDriverByName('MEMORY').CreateDataSource('tesela')
+    layer = ds_ogr.CreateLayer('tesela', None, ogr.wkbPolygon)
+    flotante = np.issubdtype(datos.dtype, np.floating)
+    layer.CreateField(ogr.FieldDefn('valor', ogr.OFTReal if flotante else ogr.OFTInteger64))
+    opciones = ['8CONNECTED=8'] if conectividad == 8 else []
+    poligonizar = gdal.FPolygonize if flotante else gdal.Polygonize
+    poligonizar(banda, banda.GetMaskBand() if nodata is not None else None, layer, 0, opciones)
+
+    minx_c, miny_c, maxx_c, maxy_c = bordes
+    interiores, costura = [], []
+    for feature in layer:
+        geom = feature.GetGeometryRef()
+        minx, maxx, miny, maxy = geom.GetEnvelope()
+        toca = (
+            (minx_c is not None and minx <= minx_c) or (maxx_c is not None and maxx >= maxx_c)
+            or (miny_c is not None and miny <= miny_c) or (maxy_c is not None and maxy >= maxy_c)
+        )
+        valor = feature.GetField(0)
+        if toca:
+            costura.append((valor, bytes(geom.ExportToWkb()), _tramos_costura(geom, bordes)))
+        else:
+            interiores.append((valor, _afin_wkb(geom.ExportToWkb(), gt)))
+    return interiores, costura
+
+
+def _curvas_tesela(datos, xoff, yoff, nodata, gt, equidistancia, base, niveles):
+    """
+    Genera las curvas de nivel de una tesela en un proceso del pool. Devuelve
+    una lista de (elevación, wkb) en coordenadas de píxel.
+    """
+    gdal.UseExceptions()
+    ds = _dataset_pixel(datos.astype(np.float64), xoff, yoff, nodata)
+    ds_ogr = ogr.GetDriverByName('MEMORY').CreateDataSource('tesela')
+    layer = ds_ogr.CreateLayer('tesela', None, ogr.wkbLineString)
+    layer.CreateField(ogr.FieldDefn('id', ogr.OFTInteger))
+    layer.CreateField(ogr.FieldDefn('elevacion', ogr.OFTReal))
+    gdal.ContourGenerate(
+        ds.GetRasterBand(1), float(equidistancia or 0), float(base), list(niveles or []),
+        int(nodata is not None), float(nodata) if nodata is not None else 0.0, layer, 0, 1,
+    )
+    return [(f.GetField(1), bytes(f.GetGeometryRef().ExportToWkb())) for f in layer]
+
+
+def _leer_teselas(ds, banda, ventanas):
+    """Genera (ventana, array) leyendo la banda ventana a ventana."""
+    band = ds.GetRasterBand(int(banda))
+    for xoff, yoff, w, h in ventanas:
+        yield (xoff, yoff, w, h), band.ReadAsArray(xoff, yoff, w, h)
+
+
+def _ejecutar(funcion, tareas, procesos):
+    """
+    Ejecuta funcion(*tarea) en un pool de procesos (o en este proceso si
+    procesos == 1), limitando las tareas en vuelo para acotar la memoria.
+    """
+    if procesos == 1:
+        for tarea in tareas:
+            yield funcion(*tarea)
+        return
+
+    limite = 2 * (procesos or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = []
+        for tarea in tareas:
+            en_vuelo.append(pool.submit(funcion, *tarea))
+            if len(en_vuelo) >= limite:
+                yield en_vuelo.pop(0).result()
+        for futuro in en_vuelo:
+            yield futuro.result()
+
+
+def _fuente_salida(nombre, geom_type, srs_wkt, campos):
+    """FuenteDatosVector con una capa en memoria vacía con los campos indicados."""
+    srs = None
+    if srs_wkt:
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(srs_wkt)
+    ds = ogr.GetDriverByName('MEMORY').CreateDataSource(nombre)
+    layer = ds.CreateLayer(nombre, srs, geom_type)
+    for campo, tipo in campos:
+        layer.CreateField(ogr.FieldDefn(campo, tipo))
+    fuente = FuenteDatosVector(f"{nombre}:{uuid.uuid4().hex}")
+    fuente.datasource = ds
+    return fuente, layer
+
+
+def _añadir(layer, valor, wkb):
+    feature = ogr.Feature(layer.GetLayerDefn())
+    feature.SetField(0, valor)
+    feature.SetGeometry(ogr.CreateGeometryFromWkb(wkb))
+    layer.CreateFeature(feature)
+
+
+def poligonizar(fuente_raster, banda=1, campo='valor', tamaño_tesela=2048,
+                procesos=None, conectividad=4, nombre='poligonos'):
+    """
+    Convierte una banda ráster (p. ej. una clasificación) en polígonos de
+    píxeles contiguos con el mismo valor, en paralelo por teselas.
+
+    Cada tesela se poligoniza (``gdal.Polygonize``/``FPolygonize``) en un
+    pool de procesos; los polígonos que tocan una costura entre teselas se
+    agrupan por los lados que comparten sobre la costura (con conectividad
+    8, también por un vértice) y se une cada grupo por separado, de modo que
+    el resultado es el mismo que el de poligonizar el ráster completo. Con
+    conectividad 8, un grupo unido solo en diagonal se guarda como un único
+    objeto MultiPolygon. Los píxeles NoData no generan polígonos.
+
+    :param fuente_raster: FuenteDatosRaster (ya leída) o gdal.Dataset
+    :param banda: número de la banda (1-indexada)
+    :param campo: nombre del campo con el valor del píxel
+    :param tamaño_tesela: lado de las teselas en píxeles
+    :param procesos: número de procesos (por defecto, los del sistema; 1 = sin pool)
+    :param conectividad: 4 u 8 (vecinos considerados contiguos)
+    :param nombre: nombre de la capa de salida
+    :return: FuenteDatosVector con la capa de polígonos en memoria
+    """
+    ds = _resolver_dataset(fuente_raster)
+    band = ds.GetRasterBand(int(banda))
+    if band is None:
+        raise Exception(f"No existe la banda '{banda}'")
+    if conectividad not in (4, 8):
+        raise ValueError("La conectividad debe ser 4 u 8")
+
+    ancho, alto = ds.RasterXSize, ds.RasterYSize
+    gt = ds.GetGeoTransform()
+    nodata = band.GetNoDataValue()
+    flotante = band.DataType in (gdal.GDT_Float32, gdal.GDT_Float64)
+    tamaño = int(tamaño_tesela)
+
+    def _tareas():
+        for (xoff, yoff, w, h), datos in _leer_teselas(ds, banda, _teselas(ancho, alto, tamaño)):
+            # Solo cuentan como costura los bordes interiores del ráster
+            bordes = (
+                xoff if xoff > 0 else None,
+                yoff if yoff > 0 else None,
+                xoff + w if xoff + w < ancho else None,
+                yoff + h if yoff + h < alto else None,
+            )
+            yield datos, xoff, yoff, nodata, gt, bordes, conectividad
+
+    geom_type = ogr.wkbPolygon if conectividad == 4 else ogr.wkbUnknown
+    fuente, layer = _fuente_salida(nombre, geom_type, ds.GetProjection(),
+                                   [(campo, ogr.OFTReal if flotante else ogr.OFTInteger64)])
+    piezas = []
+    for interiores, en_costura in _ejecutar(_poligonizar_tesela, _tareas(), procesos):
+        for valor, wkb in interiores:
+            _añadir(layer, valor, wkb)
+        piezas.extend(en_costura)
+
+    # Coser los polígonos partidos por las costuras, grupo a grupo
+    for grupo in _grupos_costura(piezas, conectividad):
+        valor = piezas[grupo[0]][0]
+        if len(grupo) == 1:
+            _añadir(layer, valor, _afin_wkb(piezas[grupo[0]][1], gt))
+            continue
+        multi = ogr.Geometry(ogr.wkbMultiPolygon)
+        for i in grupo:
+            multi.AddGeometry(ogr.CreateGeometryFromWkb(piezas[i][1]))
+        union = multi.UnionCascaded()
+        if conectividad == 8 or union.GetGeometryType() == ogr.wkbPolygon:
+            partes = [union]
+        else:
+            partes = [union.GetGeometryRef(i) for i in range(union.GetGeometryCount())]
+        for parte in partes:
+            _añadir(layer, valor, _afin_wkb(parte.ExportToWkb(), gt))
+
+    layer.ResetReading()
+    fuente._invalidar_cache()
+    return fuente
+
+
+def _unir_lineas(lineas):
+    """
+    Une líneas (listas de puntos) que comparten extremos exactos. Devuelve
+    la lista de líneas resultantes.
+    """
+    lineas = [list(l) for l in lineas]
+    vivas = set(range(len(lineas)))
+    extremos = {}
+    for i, linea in enumerate(lineas):
+        for punto in (linea[0], linea[-1]):
+            extremos.setdefault(punto, []).append(i)
+
+    def _vecina(i, punto):
+        for j in extremos.get(punto, []):
+            if j != i and j in vivas:
+                return j
+        return None
+
+    for i in range(len(lineas)):
+        if i not in vivas:
+            continue
+        cambiado = True
+        while cambiado:
+            cambiado = False
+            linea = lineas[i]
+            for extremo in (-1, 0):
+                if linea[0] == linea[-1] and len(linea) > 1:
+                    break
+                punto = linea[extremo]
+                j = _vecina(i, punto)
+                if j is None:
+                    continue
+                otra = lineas[j]
+                if extremo == -1:
+                    otra = otra if otra[0] == punto else otra[::-1]
+                    linea = linea + otra[1:]
+                else:
+                    otra = otra if otra[-1] == punto else otra[::-1]
+                    linea = otra[:-1] + linea
+                vivas.discard(j)
+                extremos[punto] = [k for k in extremos[punto] if k not in (i, j)]
+                nuevo = linea[-1] if extremo == -1 else linea[0]
+                extremos[nuevo] = [i if k == j else k for k in extremos.get(nuevo, [])]
+                lineas[i] = linea
+                cambiado = True
+                break
+    return [lineas[i] for i in sorted(vivas)]
+
+
+def curvas_nivel(fuente_raster, equidistancia=None, banda=1, base=0.0, niveles=None,
+                 campo='elevacion', tamaño_tesela=2048, procesos=None, nombre='curvas'):
+    """
+    Genera curvas de nivel de una banda (p. ej. un MDT) en paralelo por teselas.
+
+    Las teselas se solapan un píxel, de modo que los tramos de una misma
+    curva en teselas vecinas terminan en el mismo punto de la costura; esos
+    tramos se unen después por elevación para obtener líneas continuas.
+
+    :param fuente_raster: FuenteDatosRaster (ya leída) o gdal.Dataset
+    :param equidistancia: intervalo entre curvas (si no se indican niveles)
+    :param banda: número de la banda (1-indexada)
+    :param base: valor de referencia de las curvas
+    :param niveles: lista de elevaciones fijas (alternativa a equidistancia)
+    :param campo: nombre del campo con la elevación
+    :param tamaño_tesela: lado de las teselas en píxeles
+    :param procesos: número de procesos (por defecto, los del sistema; 1 = sin pool)
+    :param nombre: nombre de la capa de salida
+    :return: FuenteDatosVector con la capa de líneas en memoria
+    """
+    if not equidistancia and not niveles:
+        raise ValueError("Debe indicar equidistancia o niveles")
+    ds = _resolver_dataset(fuente_raster)
+    band = ds.GetRasterBand(int(banda))
+    if band is None:
+        raise Exception(f"No existe la banda '{banda}'")
+
+    ancho, alto = ds.RasterXSize, ds.RasterYSize
+    gt = ds.GetGeoTransform()
+    nodata = band.GetNoDataValue()
+    tamaño = int(tamaño_tesela)
+
+    def _tareas():
+        for (xoff, yoff, _, _), datos in _leer_teselas(ds, banda, _teselas(ancho, alto, tamaño, solape=1)):
+            yield datos, xoff, yoff, nodata, gt, equidistancia, base, niveles
+
+    fuente, layer = _fuente_salida(nombre, ogr.wkbLineString, ds.GetProjection(), [(campo, ogr.OFTReal)])
+
+    # Las costuras son las columnas/filas de centros de píxel compartidas
+    costuras_x = {xoff + 0.5 for xoff in range(tamaño, ancho, tamaño)}
+    costuras_y = {yoff + 0.5 for yoff in range(tamaño, alto, tamaño)}
+    en_costura = {}
+    for curvas in _ejecutar(_curvas_tesela, _tareas(), procesos):
+        for elevacion, wkb in curvas:
+            geom = ogr.CreateGeometryFromWkb(wkb)
+            puntos = [p[:2] for p in geom.GetPoints() or []]
+            if len(puntos) < 2:
+                continue
+            toca = any(p[0] in costuras_x or p[1] in costuras_y for p in (puntos[0], puntos[-1]))
+            if toca and puntos[0] != puntos[-1]:
+                en_costura.setdefault(elevacion, []).append(puntos)
+            else:
+                _añadir(layer, elevacion, _afin_wkb(wkb, gt))
+
+    for elevacion, lineas in en_costura.items():
+        for puntos in _unir_lineas(lineas):
+            linea = ogr.Geometry(ogr.wkbLineString)
+            for x, y in puntos:
+                linea.AddPoint_2D(x, y)
+            _añadir(layer, elevacion, _afin_wkb(linea.ExportToWkb(), gt))
+
+    layer.ResetReading()
+    fuente._invalidar_cache()
+    return fuente
@@ -0,0 +1,371 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from osgeo import gdal, ogr, osr
+
+# Estadísticas disponibles (además de los percentiles 'pNN')
+ESTADISTICAS_ZONALES = ('count', 'sum', 'mean', 'min', 'max')
+
+
+def _resolver_capa(fuente_vector, capa=None):
+    """Devuelve el ogr.Layer de una FuenteDatosVector (o el propio ogr.Layer)."""
+    if isinstance(fuente_vector, ogr.Layer):
+        return fuente_vector
+    if fuente_vector.datasource is None:
+        raise Exception("Primero debes llamar a leer() en la fuente vectorial")
+    return fuente_vector.datasource.GetLayer(fuente_vector.obtener_nombreCapa(capa))
+
+
+def _resolver_dataset(fuente_raster):
+    """Devuelve el gdal.Dataset de una FuenteDatosRaster (o el propio gdal.Dataset)."""
+    if isinstance(fuente_raster, gdal.Dataset):
+        return fuente_raster
+    if fuente_raster.datasource is None:
+        raise Exception("Primero debes llamar a leer() en la fuente ráster")
+    return fuente_raster.datasource
+
+
+def _reducir_bloque(zonas, valores):
+    """
+    Agrega los valores de un bloque por zona. Devuelve (zonas únicas,
+    recuento, suma, mínimo, máximo) ordenando una sola vez y reduciendo por
+    tramos con ``reduceat``.
+    """
+    orden = np.argsort(zonas, kind='stable')
+    zs = zonas[orden]
+    vs = valores[orden].astype(np.float64)
+    inicios = np.flatnonzero(np.r_[True, zs[1:] != zs[:-1]])
+    recuento = np.diff(np.r_[inicios, zs.size])
+    return (
+        zs[inicios],
+        recuento,
+        np.add.reduceat(vs, inicios),
+        np.minimum.reduceat(vs, inicios),
+        np.maximum.reduceat(vs, inicios),
+    )
+
+
+def _lotes_sin_solape(zonas, envolventes, xoff, yoff, w, h):
+    """
+    Reparte las zonas de un bloque en lotes cuyas envolventes en píxeles no
+    se solapan, de modo que cada lote se puede rasterizar en un único ráster
+    sin que una zona tape a otra. Se asigna cada zona al primer lote libre
+    (coloreado voraz) con una máscara de ocupación del bloque por lote.
+    """
+    lotes, ocupados = [], []
+    for zona in zonas:
+        c0, c1, f0, f1 = envolventes[zona]
+        ventana = (slice(max(f0 - yoff, 0), min(f1 - yoff, h - 1) + 1),
+                   slice(max(c0 - xoff, 0), min(c1 - xoff, w - 1) + 1))
+        for lote, ocupado in zip(lotes, ocupados):
+            if not ocupado[ventana].any():
+                break
+        else:
+            lote, ocupado = [], np.zeros((h, w), dtype=bool)
+            lotes.append(lote)
+            ocupados.append(ocupado)
+        lote.append(zona)
+        ocupado[ventana] = True
+    return lotes
+
+
+def _compactar_histograma(codigos, cuentas):
+    """Suma las cuentas de los códigos (zona * bins + clase) repetidos; devuelve códigos ordenados."""
+    codigos, inverso = np.unique(codigos, return_inverse=True)
+    return codigos, np.bincount(inverso, weights=cuentas).astype(np.int64)
+
+
+def _percentiles_histograma(codigos, cuentas, bins, n_zonas, vmin, vmax, percentiles):
+    """
+    Aproxima percentiles por zona a partir de un histograma disperso de
+    ancho fijo entre vmin y vmax (códigos ordenados zona * bins + clase, solo
+    las clases no vacías), interpolando dentro de cada clase.
+    """
+    ancho = (vmax - vmin) / bins if vmax > vmin else 0.0
+    resultado = {f'p{q:g}': np.full(n_zonas, np.nan) for q in percentiles}
+    if codigos.size == 0:
+        return resultado
+    zonas, clases = codigos // bins, codigos % bins
+    inicios = np.flatnonzero(np.r_[True, zonas[1:] != zonas[:-1]])
+    acumulado = np.cumsum(cuentas)
+    base = np.r_[0, acumulado[inicios[1:] - 1]]
+    total = np.add.reduceat(cuentas, inicios)
+    # Acumulado dentro de cada zona
+    en_zona = acumulado - np.repeat(base, np.diff(np.r_[inicios, codigos.size]))
+    por_entrada = np.repeat(np.arange(inicios.size), np.diff(np.r_[inicios, codigos.size]))
+    for q in percentiles:
+        objetivo = total * (q / 100.0)
+        # Primera clase cuyo acumulado alcanza el objetivo
+        antes = np.add.reduceat((en_zona < objetivo[por_entrada]).astype(np.int64), inicios)
+        pos = inicios + np.minimum(antes, np.diff(np.r_[inicios, codigos.size]) - 1)
+        previo = en_zona[pos] - cuentas[pos]
+        fraccion = (objetivo - previo) / cuentas[pos]
+        resultado[f'p{q:g}'][zonas[inicios] - 1] = vmin + (clases[pos] + fraccion) * ancho
+    return resultado
+
+
+def estadisticas_zonales(fuente_vector, fuente_raster, capa=None, banda=1,
+                         estadisticas=ESTADISTICAS_ZONALES, percentiles=None, bins=256,
+                         prefijo='', todos_pixeles=False, tamaño_bloque=1024,
+                         hilos=None, escribir=True):
+    """
+    Calcula estadísticas zonales de una banda ráster para cada polígono de una
+    capa vectorial y, opcionalmente, las escribe como atributos de la capa.
+
+    El ráster se procesa por bloques (ventanas alineadas con su tamaño de
+    bloque nativo), de modo que no necesita caber en memoria. Para cada bloque
+    se rasterizan solo los polígonos que lo cortan (indexados por bloque en
+    una única pasada sobre la capa) y las estadísticas se agregan con NumPy.
+    Los bloques se reparten entre varios hilos; el acceso a OGR se serializa
+    y la lectura del ráster usa un manejador por hilo si el dataset está en
+    disco. Los polígonos solapados se rasterizan en lotes sin solape dentro
+    de cada bloque, de modo que cada píxel cuenta para todas las zonas que lo
+    cubren. Los histogramas de los percentiles son dispersos (solo las
+    clases no vacías de cada zona), por lo que su memoria no crece con
+    n_zonas x bins.
+
+    :param fuente_vector: FuenteDatosVector (ya leída) u ogr.Layer de polígonos
+    :param fuente_raster: FuenteDatosRaster (ya leída) o gdal.Dataset
+    :param capa: nombre o índice de la capa (si fuente_vector es FuenteDatosVector)
+    :param banda: número de la banda (1-indexada)
+    :param estadisticas: estadísticas a calcular de ESTADISTICAS_ZONALES
+    :param percentiles: lista de percentiles (0-100), aproximados con un
+        histograma de ``bins`` clases por zona entre el mínimo y máximo de la banda
+    :param bins: número de clases del histograma para los percentiles
+    :param prefijo: prefijo de los campos de salida (p. ej. 'dem_')
+    :param todos_pixeles: si es True, cuenta todos los píxeles que toca el
+        polígono (ALL_TOUCHED) y no solo aquellos cuyo centro cae dentro
+    :param tamaño_bloque: lado aproximado de la ventana de lectura en píxeles
+    :param hilos: número de hilos (por defecto, el de ThreadPoolExecutor)
+    :param escribir: si es True, escribe los resultados como campos de la capa
+    :return: dict {'fid': array, estadística: array, ...} con una posición por polígono
+    """
+    layer = _resolver_capa(fuente_vector, capa)
+    ds = _resolver_dataset(fuente_raster)
+    band = ds.GetRasterBand(int(banda))
+    if band is None:
+        raise Exception(f"No existe la banda '{banda}'")
+
+    for e in estadisticas:
+        if e not in ESTADISTICAS_ZONALES:
+            raise ValueError(f"Estadística no soportada: {e}")
+    percentiles = list(percentiles or [])
+
+    ancho, alto = ds.RasterXSize, ds.RasterYSize
+    gt = ds.GetGeoTransform()
+    if gt[2] != 0 or gt[4] != 0:
+        raise Exception("Ráster con geotransformación rotada no soportado; remuestréalo antes a norte arriba (gdal.Warp)")
+    nodata = band.GetNoDataValue()
+
+    # Ventanas alineadas con el bloque nativo
+    nbx, nby = band.GetBlockSize()
+    bx = max(nbx, (int(tamaño_bloque) // nbx) * nbx) if nbx < ancho else ancho
+    by = max(nby, (int(tamaño_bloque) // nby) * nby) if nby < alto else alto
+
+    srs_raster = None
+    if ds.GetProjection():
+        srs_raster = osr.SpatialReference()
+        srs_raster.ImportFromWkt(ds.GetProjection())
+        srs_raster.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    srs_capa = layer.GetSpatialRef()
+    transform = None
+    if srs_capa is not None and srs_raster is not None and not srs_capa.IsSame(srs_raster):
+        srs_capa = srs_capa.Clone()
+        srs_capa.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        transform = osr.CoordinateTransformation(srs_capa, srs_raster)
+
+    # Una única pasada: FIDs de las zonas e índice bloque -> zonas
+    fids = []
+    envolventes = {}
+    por_bloque = {}
+    layer.ResetReading()
+    layer.SetIgnoredFields([layer.GetLayerDefn().GetFieldDefn(i).GetName()
+                            for i in range(layer.GetLayerDefn().GetFieldCount())])
+    try:
+        for feature in layer:
+            geom = feature.GetGeometryRef()
+            zona = len(fids)
+            fids.append(feature.GetFID())
+            if geom is None:
+                continue
+            if transform is not None:
+                geom = geom.Clone()
+                geom.Transform(transform)
+            minx, maxx, miny, maxy = geom.GetEnvelope()
+            # Envolvente en píxeles (ráster norte arriba)
+            c0 = int(math.floor((minx - gt[0]) / gt[1]))
+            c1 = int(math.floor((maxx - gt[0]) / gt[1]))
+            f0 = int(math.floor((maxy - gt[3]) / gt[5]))
+            f1 = int(math.floor((miny - gt[3]) / gt[5]))
+            c0, c1 = max(c0, 0), min(c1, ancho - 1)
+            f0, f1 = max(f0, 0), min(f1, alto - 1)
+            if c0 > c1 or f0 > f1:
+                continue
+            envolventes[zona] = (c0, c1, f0, f1)
+            for j in range(f0 // by, f1 // by + 1):
+                for i in range(c0 // bx, c1 // bx + 1):
+                    por_bloque.setdefault((i, j), []).append(zona)
+    finally:
+        layer.SetIgnoredFields([])
+        layer.ResetReading()
+
+    n = len(fids)
+    recuento = np.zeros(n + 1, dtype=np.int64)
+    suma = np.zeros(n + 1, dtype=np.float64)
+    minimo = np.full(n + 1, np.inf)
+    maximo = np.full(n + 1, -np.inf)
+    bins = int(bins)
+    # Histograma disperso: partes (códigos, cuentas) que se compactan al crecer
+    histograma = None
+    if percentiles:
+        # Rango exacto: con el de las vistas generales quedarían valores fuera
+        # de las clases extremas y percentiles fuera del mínimo/máximo de la zona
+        vmin, vmax = band.ComputeRasterMinMax(False)
+        histograma = {'codigos': np.zeros(0, np.int64), 'cuentas': np.zeros(0, np.int64), 'partes': [], 'n': 0}
+
+    bloqueo_ogr = threading.Lock()
+    bloqueo_acumulado = threading.Lock()
+    bloqueo_raster = threading.Lock()
+    locales = threading.local()
+    en_disco = ds.GetDriver().ShortName != 'MEM' and bool(ds.GetDescription())
+    driver_mem = gdal.GetDriverByName('MEM')
+    driver_ogr = ogr.GetDriverByName('MEMORY')
+
+    def _leer_bloque(xoff, yoff, w, h):
+        # Manejador propio por hilo para datasets en disco; si no, bloqueo
+        if en_disco:
+            if not hasattr(locales, 'banda'):
+                locales.ds = gdal.Open(ds.GetDescription())
+                locales.banda = locales.ds.GetRasterBand(int(banda))
+            return locales.banda.ReadAsArray(xoff, yoff, w, h)
+        with bloqueo_raster:
+            return band.ReadAsArray(xoff, yoff, w, h)
+
+    def _acumular(zonas, valores):
+        zu, c, s_, mn, mx = _reducir_bloque(zonas, valores)
+        clases = None
+        if histograma is not None:
+            escala = bins / (vmax - vmin) if vmax > vmin else 0.0
+            idx = np.clip(((valores - vmin) * escala).astype(np.int64), 0, bins - 1)
+            clases = np.unique(zonas.astype(np.int64) * bins + idx, return_counts=True)
+
+        with bloqueo_acumulado:
+            recuento[zu] += c
+            suma[zu] += s_
+            minimo[zu] = np.minimum(minimo[zu], mn)
+            maximo[zu] = np.maximum(maximo[zu], mx)
+            if clases is not None:
+                histograma['partes'].append(clases)
+                histograma['n'] += clases[0].size
+                if histograma['n'] > max(4 * histograma['codigos'].size, 1 << 20):
+                    _compactar()
+
+    def _compactar():
+        partes = histograma['partes']
+        histograma['codigos'], histograma['cuentas'] = _compactar_histograma(
+            np.concatenate([histograma['codigos']] + [p[0] for p in partes]),
+            np.concatenate([histograma['cuentas']] + [p[1] for p in partes]),
+        )
+        histograma['partes'], histograma['n'] = [], 0
+
+    def _procesar(clave):
+        xoff, yoff = clave[0] * bx, clave[1] * by
+        w, h = min(bx, ancho - xoff), min(by, alto - yoff)
+        lotes = _lotes_sin_solape(por_bloque[clave], envolventes, xoff, yoff, w, h)
+
+        valores_bloque = _leer_bloque(xoff, yoff, w, h).ravel()
+        validos_bloque = np.ones(valores_bloque.shape, dtype=bool)
+        if nodata is not None:
+            validos_bloque &= valores_bloque != nodata
+        if np.issubdtype(valores_bloque.dtype, np.floating):
+            validos_bloque &= np.isfinite(valores_bloque)
+        if not validos_bloque.any():
+            return
+
+        ds_bloque = driver_mem.Create('', w, h, 1, gdal.GDT_Int32)
+        ds_bloque.SetGeoTransform((gt[0] + xoff * gt[1], gt[1], 0.0, gt[3] + yoff * gt[5], 0.0, gt[5]))
+        if srs_raster is not None:
+            ds_bloque.SetProjection(srs_raster.ExportToWkt())
+        banda_zonas = ds_bloque.GetRasterBand(1)
+        opciones = ['ATTRIBUTE=zona'] + (['ALL_TOUCHED=TRUE'] if todos_pixeles else [])
+
+        for lote in lotes:
+            # Capa temporal con las zonas del lote, ya en el SRS del ráster
+            ds_zonas = driver_ogr.CreateDataSource('zonas')
+            capa_zonas = ds_zonas.CreateLayer('zonas', srs_raster, ogr.wkbUnknown)
+            capa_zonas.CreateField(ogr.FieldDefn('zona', ogr.OFTInteger))
+            defn = capa_zonas.GetLayerDefn()
+            with bloqueo_ogr:
+                for zona in lote:
+                    feature = layer.GetFeature(fids[zona])
+                    geom = feature.GetGeometryRef().Clone()
+                    if transform is not None:
+                        geom.Transform(transform)
+                    nueva = ogr.Feature(defn)
+                    nueva.SetGeometry(geom)
+                    nueva.SetField(0, zona + 1)
+                    capa_zonas.CreateFeature(nueva)
+
+            banda_zonas.Fill(0)
+            gdal.RasterizeLayer(ds_bloque, [1], capa_zonas, options=opciones)
+            zonas = banda_zonas.ReadAsArray().ravel()
+            validos = validos_bloque & (zonas > 0)
+            if validos.any():
+                _acumular(zonas[validos], valores_bloque[validos])
+
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        # list() propaga las excepciones de los hilos
+        list(ejecutor.map(_procesar, list(por_bloque)))
+
+    con_datos = recuento[1:] > 0
+    resultado = {'fid': np.asarray(fids, dtype=np.int64)}
+    calculadas = {
+        'count': recuento[1:],
+        'sum': suma[1:],
+        'mean': np.divide(suma[1:], recuento[1:], out=np.full(n, np.nan), where=con_datos),
+        'min': np.where(con_datos, minimo[1:], np.nan),
+        'max': np.where(con_datos, maximo[1:], np.nan),
+    }
+    for e in estadisticas:
+        resultado[e] = calculadas[e]
+    if percentiles:
+        _compactar()
+        for clave, valores in _percentiles_histograma(
+            histograma['codigos'], histograma['cuentas'], bins, n, vmin, vmax, percentiles
+        ).items():
+            # La interpolación dentro de la clase no puede salirse del rango real de la zona
+            resultado[clave] = np.clip(valores, minimo[1:], maximo[1:])
+
+    if escribir:
+        _escribir_resultados(layer, resultado, prefijo)
+        if not isinstance(fuente_vector, ogr.Layer):
+            fuente_vector._invalidar_cache(layer.GetName())
+
+    return resultado
+
+
+def _escribir_resultados(layer, resultado, prefijo=''):
+    """Crea (si no existen) los campos de resultado y los rellena por FID."""
+    nombres = [k for k in resultado if k != 'fid']
+    defn = layer.GetLayerDefn()
+    for nombre in nombres:
+        campo = prefijo + nombre.replace('.', '_')
+        if defn.GetFieldIndex(campo) == -1:
+            tipo = ogr.OFTInteger64 if nombre == 'count' else ogr.OFTReal
+            layer.CreateField(ogr.FieldDefn(campo, tipo))
+
+    indices = [defn.GetFieldIndex(prefijo + nombre.replace('.', '_')) for nombre in nombres]
+    for pos, fid in enumerate(resultado['fid']):
+        feature = layer.GetFeature(int(fid))
+        for nombre, idx in zip(nombres, indices):
+            valor = resultado[nombre][pos]
+            if nombre == 'count':
+                feature.SetField(idx, int(valor))
+            elif np.isnan(valor):
+                feature.SetFieldNull(idx)
+            else:
+                feature.SetField(idx, float(valor))
+        layer.SetFeature(feature)
+    layer.SyncToDisk()
@@ -10,6 +10,8 @@ Se saltan si faltan esas variables.
 
 Ejecutar:  pytest -m integration tests/integration/test_pg_integracion.py
 """
+import asyncio
+
 import pytest
 
 pytestmark = pytest.mark.integration
@@ -49,3 +51,17 @@ def test_query_postgis_buffer(pg_config):
         "SELECT ST_AsText(ST_Buffer(ST_SetSRID(ST_MakePoint(-3, 40), 4326), 0.01));"
     )
     assert resultado[0][0].upper().startswith("POLYGON")
+
+
+def test_query_async(pg_config):
+    pytest.importorskip("asyncpg")
+    from conex.PGAsync_conex import ConexPGAsync
+
+    async def _main():
+        async with ConexPGAsync(dataJSONcon=pg_config) as pg:
+            filas = await pg.query("SELECT generate_series(1, $1)", 5)
+            serie = [fila async for fila in pg.iterar("SELECT generate_series(1, $1)", 5, lote=2)]
+            return filas, serie
+
+    filas, serie = asyncio.run(_main())
+    assert filas == serie == [(i,) for i in range(1, 6)]
@@ -0,0 +1,127 @@
+"""
+Tests unitarios de ``conex.cache_utils``.
+
+Es lógica pura (biblioteca estándar): no requieren GDAL. La caché en disco se
+prueba sobre un SQLite temporal (fixture ``tmp_path`` de pytest).
+"""
+import sqlite3
+
+import pytest
+
+from conex.cache_utils import CacheLRU, CacheMBTiles, huella_fuente, id_fuente
+
+
+class TestHuellaFuente:
+    def test_cambia_al_modificar_archivo(self, tmp_path):
+        ruta = tmp_path / "datos.geojson"
+        ruta.write_text("a")
+        h1 = huella_fuente(str(ruta))
+        ruta.write_text("ab")
+        assert huella_fuente(str(ruta)) != h1
+
+    def test_valor_no_archivo_es_estable(self):
+        assert huella_fuente("POINT (1 2)") == huella_fuente("POINT (1 2)")
+        assert huella_fuente("POINT (1 2)") != huella_fuente("POINT (1 3)")
+
+
+class TestCacheLRU:
+    def test_guardar_y_obtener(self):
+        cache = CacheLRU(max_bytes=100)
+        cache.guardar("a", b"123")
+        assert cache.obtener("a") == b"123"
+        assert cache.obtener("b") is None
+        est = cache.estadisticas()
+        assert est["aciertos"] == 1 and est["fallos"] == 1
+        assert est["bytes"] == 3
+
+    def test_expulsa_menos_reciente_por_bytes(self):
+        cache = CacheLRU(max_bytes=10)
+        cache.guardar("a", b"x" * 4)
+        cache.guardar("b", b"x" * 4)
+        cache.obtener("a")  # "a" pasa a ser la más reciente
+        cache.guardar("c", b"x" * 4)
+        assert "a" in cache and "c" in cache
+        assert "b" not in cache
+        assert cache.estadisticas()["expulsiones"] == 1
+
+    def test_expulsa_por_numero_de_entradas(self):
+        cache = CacheLRU(max_entradas=2)
+        for clave in "abc":
+            cache.guardar(clave, clave)
+        assert len(cache) == 2
+        assert "a" not in cache
+
+    def test_valor_mayor_que_presupuesto_no_se_guarda(self):
+        cache = CacheLRU(max_bytes=2)
+        assert cache.guardar("a", b"xxx") is False
+        assert "a" not in cache
+
+    def test_invalidar_por_predicado(self):
+        cache = CacheLRU()
+        cache.guardar(("h1", "t1"), b"1")
+        cache.guardar(("h1", "t2"), b"2")
+        cache.guardar(("h2", "t1"), b"3")
+        assert cache.invalidar(predicado=lambda k: k[0] == "h1") == 2
+        assert len(cache) == 1
+        assert cache.estadisticas()["bytes"] == 1
+
+
+class TestCacheMBTiles:
+    def test_guardar_y_obtener(self, tmp_path):
+        cache = CacheMBTiles(str(tmp_path / "cache.mbtiles"))
+        cache.guardar("capa/1/0/0", 1, 0, 0, b"pbf", huella="h1")
+        assert cache.obtener("capa/1/0/0", "h1") == b"pbf"
+        # Otra huella de la fuente: la tesela no es válida.
+        assert cache.obtener("capa/1/0/0", "h2") is None
+
+    def test_esquema_mbtiles_en_tms(self, tmp_path):
+        ruta = str(tmp_path / "cache.mbtiles")
+        cache = CacheMBTiles(ruta)
+        cache.guardar("k", 2, 1, 0, b"pbf")
+        conn = sqlite3.connect(ruta)
+        fila = conn.execute("SELECT zoom_level, tile_column, tile_row FROM tiles").fetchone()
+        conn.close()
+        assert fila == (2, 1, 3)
+
+    def test_expulsion_por_max_teselas(self, tmp_path):
+        cache = CacheMBTiles(str(tmp_path / "cache.mbtiles"), max_teselas=2)
+        for i in range(3):
+            cache.guardar(f"k{i}", 3, i, 0, b"x")
+        assert len(cache) == 2
+        assert cache.obtener("k0") is None
+
+    def test_invalidar_por_huella(self, tmp_path):
+        cache = CacheMBTiles(str(tmp_path / "cache.mbtiles"))
+        cache.guardar("a", 0, 0, 0, b"x", huella="vieja")
+        cache.guardar("b", 0, 0, 0, b"x", huella="nueva")
+        assert cache.invalidar("nueva") == 1
+        assert cache.obtener("b") == b"x"
+
+    def test_existentes_por_lotes(self, tmp_path):
+        cache = CacheMBTiles(str(tmp_path / "cache.mbtiles"))
+        cache.guardar("a", 0, 0, 0, b"x", huella="h1")
+        cache.guardar("b", 0, 0, 0, b"x", huella="h2")
+        claves = ["a", "b"] + [f"k{i}" for i in range(1000)]
+        assert cache.existentes(claves) == {"a", "b"}
+        assert cache.existentes(claves, "h1") == {"a"}
+
+    def test_un_archivo_por_fuente(self, tmp_path):
+        ruta = str(tmp_path / "cache.mbtiles")
+        CacheMBTiles(ruta, fuente=id_fuente("a.tif")).guardar("k", 0, 0, 0, b"x", huella="h1")
+        # La misma fuente reabre el archivo; otra no puede invalidar sus teselas
+        assert CacheMBTiles(ruta, fuente=id_fuente("a.tif")).obtener("k", "h1") == b"x"
+        with pytest.raises(Exception, match="otra fuente"):
+            CacheMBTiles(ruta, fuente=id_fuente("b.tif"))
+
+
+class TestCacheLRUTTL:
+    def test_caduca_por_ttl(self):
+        ahora = [0.0]
+        cache = CacheLRU(ttl=10, reloj=lambda: ahora[0])
+        cache.guardar("a", b"1")
+        cache.guardar("b", b"2", ttl=100)
+        ahora[0] = 11
+        assert "a" not in cache
+        assert cache.obtener("a") is None and cache.obtener("b") == b"2"
+        est = cache.estadisticas()
+        assert est["caducadas"] == 1 and est["bytes"] == 1
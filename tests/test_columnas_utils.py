@@ -0,0 +1,84 @@
+"""
+Tests unitarios de ``conex.columnas_utils``.
+
+Prueban la conversión de lotes de filas (tuplas de psycopg2 y texto de COPY)
+a columnas NumPy sin base de datos: ``cursor.description`` se simula con
+tuplas (nombre, OID de tipo).
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import conex.columnas_utils as columnas_mod
+from conex.columnas_utils import AcumuladorColumnas, EscritorCopy, dtype_columna
+
+
+DESCRIPCION = [("id", 23), ("valor", 701), ("activo", 16), ("fecha", 1184), ("nombre", 25)]
+
+
+class TestAcumuladorColumnas:
+    def test_dtypes_por_tipo_pg(self):
+        assert dtype_columna(20) == "int64"
+        assert dtype_columna(1082) == "datetime64[D]"
+        assert dtype_columna(3802) == "object"  # jsonb
+
+    def test_filas_en_varios_lotes(self):
+        acumulador = AcumuladorColumnas(DESCRIPCION, capacidad=1)
+        madrid = timezone(timedelta(hours=2))
+        acumulador.añadir_filas([(1, 1.5, True, datetime(2024, 5, 1, 12, tzinfo=madrid), "a")])
+        acumulador.añadir_filas([(2, None, False, None, None), (3, 3.0, True, None, "c")])
+
+        columnas = acumulador.a_numpy()
+        assert columnas["id"].dtype == np.int32 and columnas["id"].tolist() == [1, 2, 3]
+        assert np.isnan(columnas["valor"][1])
+        assert columnas["activo"].dtype == bool
+        assert columnas["fecha"][0] == np.datetime64("2024-05-01T10:00:00")
+        assert np.isnat(columnas["fecha"][1])
+        assert columnas["nombre"].tolist() == ["a", None, "c"]
+
+    def test_enteros_y_booleanos_con_nulos(self):
+        acumulador = AcumuladorColumnas([("n", 20), ("b", 16)])
+        acumulador.añadir_filas([(1, True), (None, None)])
+
+        columnas = acumulador.a_numpy()
+        assert columnas["n"].dtype == np.float64 and np.isnan(columnas["n"][1])
+        assert columnas["b"].tolist() == [True, None]
+
+    def test_listas_y_nombres_repetidos(self):
+        acumulador = AcumuladorColumnas([("x", 1007), ("x", 1007)])
+        acumulador.añadir_filas([([1, 2], [3]), ([4, 5], [6])])
+
+        columnas = acumulador.a_numpy()
+        assert list(columnas) == ["x", "x_1"]
+        assert columnas["x"][0] == [1, 2]
+
+    def test_arrow_sin_pyarrow(self, monkeypatch):
+        monkeypatch.setattr(columnas_mod, "pyarrow", None)
+        with pytest.raises(ImportError, match="pyarrow"):
+            AcumuladorColumnas(DESCRIPCION).a_arrow()
+
+
+class TestEscritorCopy:
+    def test_flujo_partido_en_trozos(self):
+        acumulador = AcumuladorColumnas(DESCRIPCION + [("dia", 1082)])
+        escritor = EscritorCopy(acumulador, lote=2)
+        texto = (
+            "1\t1.5\tt\t2024-05-01 10:00:00+00\tcañón\t2024-05-01\n"
+            "2\t\\N\tf\t\\N\tcon\\ttab\\\\n\t\\N\n"
+            "3\tNaN\tt\t2024-05-02 00:00:00.25+00\t\\N\t2024-05-03\n"
+        ).encode("utf-8")
+        # Trozos arbitrarios: cortan líneas y el carácter multibyte 'ñ'
+        for i in range(0, len(texto), 7):
+            escritor.write(texto[i:i + 7])
+        escritor.cerrar()
+
+        columnas = acumulador.a_numpy()
+        assert columnas["id"].tolist() == [1, 2, 3]
+        assert np.isnan(columnas["valor"][1]) and np.isnan(columnas["valor"][2])
+        assert columnas["activo"].tolist() == [True, False, True]
+        assert columnas["fecha"][2] == np.datetime64("2024-05-02T00:00:00.250")
+        assert np.isnat(columnas["fecha"][1])
+        assert columnas["nombre"].tolist() == ["cañón", "con\ttab\\n", None]
+        assert columnas["dia"][2] == np.datetime64(date(2024, 5, 3))
@@ -9,6 +9,7 @@ expresión mediante un intérprete AST con lista blanca de nodos, eliminando el
 antiguo uso inseguro de ``eval``.
 """
 import copy
+import json
 
 import pytest
 
@@ -229,3 +230,10 @@ class TestAtributos:
         for f in resultado["features"]:
             assert "geometry" not in f
         assert len(resultado["features"]) == len(original["features"])
+
+    def test_geojson_bytes_con_precision(self, q):
+        q.geojson["features"][0]["geometry"]["coordinates"] = [1.23456789, 2.3456789]
+        fc = json.loads(q.geojson_bytes(precision=3, backend="json"))
+        assert fc["type"] == "FeatureCollection"
+        assert len(fc["features"]) == 3
+        assert fc["features"][0]["geometry"]["coordinates"] == [1.235, 2.346]
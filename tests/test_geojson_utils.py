@@ -0,0 +1,61 @@
+"""
+Tests unitarios de ``conex.geojson_utils``.
+
+Es lógica pura (biblioteca estándar): no requieren GDAL. El backend orjson
+solo se prueba si está instalado.
+"""
+import json
+
+import pytest
+
+from conex.geojson_utils import (
+    codificar_feature_collection,
+    redondear_coordenadas,
+    redondear_geometria,
+    serializar,
+)
+
+
+FEATURE = {
+    "type": "Feature",
+    "properties": {"nombre": "ñandú", "valor": 1},
+    "geometry": {"type": "LineString", "coordinates": [[-3.123456789, 40.987654321], [1, 2]]},
+}
+
+
+class TestRedondeo:
+    def test_coordenadas_anidadas(self):
+        assert redondear_coordenadas([[1.23456, 2], [3.5, 4.44444]], 2) == [[1.23, 2], [3.5, 4.44]]
+
+    def test_geometry_collection(self):
+        geom = {
+            "type": "GeometryCollection",
+            "geometries": [{"type": "Point", "coordinates": [1.23456, 2.34567]}],
+        }
+        assert redondear_geometria(geom, 1)["geometries"][0]["coordinates"] == [1.2, 2.3]
+
+    def test_no_modifica_original(self):
+        redondear_geometria(FEATURE["geometry"], 3)
+        assert FEATURE["geometry"]["coordinates"][0][0] == -3.123456789
+
+
+class TestSerializar:
+    def test_json_compacto_utf8(self):
+        datos = serializar({"a": [1, 2], "b": "ñ"}, backend="json")
+        assert datos == '{"a":[1,2],"b":"ñ"}'.encode("utf-8")
+
+    def test_orjson(self):
+        pytest.importorskip("orjson")
+        assert json.loads(serializar(FEATURE, backend="orjson")) == FEATURE
+
+
+class TestCodificarFeatureCollection:
+    def test_coleccion_valida_con_precision(self):
+        datos = codificar_feature_collection(iter([FEATURE, FEATURE]), precision=4, backend="json")
+        fc = json.loads(datos)
+        assert fc["type"] == "FeatureCollection" and len(fc["features"]) == 2
+        assert fc["features"][0]["geometry"]["coordinates"][0] == [-3.1235, 40.9877]
+        assert fc["features"][0]["properties"] == FEATURE["properties"]
+
+    def test_coleccion_vacia(self):
+        assert json.loads(codificar_feature_collection([])) == {"type": "FeatureCollection", "features": []}
@@ -0,0 +1,52 @@
+"""
+Tests unitarios de ``conex.indice_utils``.
+
+Es lógica pura (biblioteca estándar): no requieren GDAL. El índice se prueba
+sobre archivos y un SQLite temporales (fixture ``tmp_path`` de pytest).
+"""
+import os
+
+from conex.indice_utils import IndiceHuellas
+
+
+def _archivo(tmp_path, nombre, contenido="x"):
+    ruta = tmp_path / nombre
+    ruta.write_text(contenido)
+    return str(ruta)
+
+
+class TestIndiceHuellas:
+    def test_consulta_por_bbox(self, tmp_path):
+        a, b = _archivo(tmp_path, "a.tif"), _archivo(tmp_path, "b.tif")
+        indice = IndiceHuellas(str(tmp_path / "indice.sqlite"))
+        indice.actualizar([(a, [0, 0, 10, 10], {"bandas": 1}), (b, [20, 0, 30, 10], {})])
+        assert [r for r, _, _ in indice.consultar([5, 5, 6, 6])] == [a]
+        assert [r for r, _, _ in indice.consultar([9, 0, 21, 1])] == [a, b]
+        assert indice.consultar([40, 40, 50, 50]) == []
+        assert indice.consultar()[0][2] == {"bandas": 1}
+
+    def test_pendientes_incremental(self, tmp_path):
+        a, b = _archivo(tmp_path, "a.tif"), _archivo(tmp_path, "b.tif")
+        indice = IndiceHuellas()
+        assert indice.pendientes([a, b]) == ([a, b], [])
+        indice.actualizar([(a, [0, 0, 1, 1], {}), (b, [0, 0, 1, 1], {})])
+        assert indice.pendientes([a, b]) == ([], [])
+
+        with open(a, "w") as f:
+            f.write("modificado")
+        os.remove(b)
+        c = _archivo(tmp_path, "c.tif")
+        assert indice.pendientes([a, c]) == ([a, c], [b])
+
+    def test_version_y_persistencia(self, tmp_path):
+        a = _archivo(tmp_path, "a.tif")
+        ruta = str(tmp_path / "indice.sqlite")
+        indice = IndiceHuellas(ruta)
+        indice.actualizar()
+        assert indice.version == 0
+        indice.actualizar([(a, [0, 0, 1, 1], {})])
+        indice.actualizar(eliminar=[a])
+        assert indice.version == 2 and len(indice) == 0
+        indice.fijar_meta("srs", "WKT")
+        indice.cerrar()
+        assert IndiceHuellas(ruta).obtener_meta("srs") == "WKT"
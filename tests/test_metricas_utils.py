@@ -0,0 +1,77 @@
+"""
+Tests unitarios de ``conex.metricas_utils``.
+
+Es lógica pura (biblioteca estándar): huellas de SQL, histogramas de
+latencias y registro de consultas lentas, sin base de datos.
+"""
+from conex.metricas_utils import HistogramaLatencias, RegistroConsultas, es_solo_lectura, huella_sql
+
+
+class TestHuellaSQL:
+    def test_misma_huella_con_distintos_valores(self):
+        a = huella_sql("SELECT * FROM t WHERE id = 7 AND nombre = 'ana'  -- comentario")
+        b = huella_sql("select *\n  from t where id = 12 and nombre = 'o''brien';")
+        c = huella_sql("SELECT * FROM t WHERE id = %s AND nombre = %(nombre)s")
+        assert a == b == c
+        assert a[0] == "select * from t where id = ? and nombre = ?"
+
+    def test_listas_y_values_plegados(self):
+        assert huella_sql("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == huella_sql("SELECT 1 FROM t WHERE id IN (4)")
+        assert huella_sql("INSERT INTO t VALUES (1), (2)")[0] == "insert into t values (?)"
+
+    def test_identificadores_con_digitos(self):
+        assert huella_sql("SELECT col1 FROM t2")[0] == "select col1 from t2"
+
+    def test_solo_lectura(self):
+        assert es_solo_lectura(huella_sql("SELECT * FROM t")[0])
+        assert es_solo_lectura(huella_sql("WITH a AS (SELECT 1) SELECT * FROM a")[0])
+        assert not es_solo_lectura(huella_sql("WITH a AS (DELETE FROM t RETURNING *) SELECT * FROM a")[0])
+        assert not es_solo_lectura(huella_sql("UPDATE t SET v = 1")[0])
+
+
+class TestHistogramaLatencias:
+    def test_percentiles_y_cubetas(self):
+        histograma = HistogramaLatencias(ventana=100)
+        for ms in range(1, 101):
+            histograma.añadir(ms / 1000)
+
+        estadisticas = histograma.estadisticas()
+        assert estadisticas["n"] == 100
+        assert estadisticas["p50"] == 0.05 and estadisticas["p99"] == 0.099
+        assert estadisticas["histograma"]["<=0.01s"] == 10
+        assert estadisticas["histograma"]["+inf"] == 100
+
+    def test_ventana_deslizante(self):
+        histograma = HistogramaLatencias(ventana=2)
+        for segundos in (10, 1, 2):
+            histograma.añadir(segundos)
+        assert histograma.estadisticas()["max"] == 2
+
+
+class TestRegistroConsultas:
+    @staticmethod
+    def _medicion(total, huella="h1"):
+        return {"huella": huella, "sql": "select ?", "total": total, "ejecucion": total, "filas": 1}
+
+    def test_agrega_por_huella(self):
+        registro = RegistroConsultas()
+        registro.registrar(self._medicion(0.1))
+        registro.registrar(self._medicion(0.3))
+        registro.registrar(self._medicion(0.2, huella="h2"))
+
+        consultas = registro.estadisticas()["consultas"]
+        assert consultas["h1"]["llamadas"] == 2 and consultas["h1"]["filas"] == 2
+        assert abs(consultas["h1"]["segundos"] - 0.4) < 1e-9
+        assert consultas["h1"]["max"] == 0.3
+
+    def test_lentas_y_plan_reciente(self):
+        ahora = [0.0]
+        registro = RegistroConsultas(umbral_lento=0.5, reloj=lambda: ahora[0])
+        assert not registro.registrar(self._medicion(0.1))
+        assert registro.registrar(self._medicion(0.9))
+
+        registro.registrar_lenta(self._medicion(0.9), plan="Seq Scan on t")
+        assert registro.plan_reciente("h1", 60) == "Seq Scan on t"
+        ahora[0] = 120.0
+        assert registro.plan_reciente("h1", 60) is None
+        assert registro.estadisticas()["lentas"][0]["plan"] == "Seq Scan on t"
@@ -0,0 +1,67 @@
+"""
+Tests unitarios de ``FuenteDatosMosaico``.
+
+Requieren GDAL (paquete ``osgeo``) y NumPy. Si no están instalados, se saltan.
+Se construyen varios GeoTIFF contiguos en un directorio temporal.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("osgeo", reason="GDAL/OGR (osgeo) no instalado")
+np = pytest.importorskip("numpy")
+
+from osgeo import gdal, osr  # noqa: E402
+
+from conex.Mosaico_conex import NOMBRE_INDICE, FuenteDatosMosaico  # noqa: E402
+
+
+def _crear_tif(ruta, x0, valor):
+    """GeoTIFF 10x10 en EPSG:25830, píxel de 10 m, con esquina superior izquierda en (x0, 4474100)."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(25830)
+    ds = gdal.GetDriverByName("GTiff").Create(str(ruta), 10, 10, 1, gdal.GDT_Float32)
+    ds.SetGeoTransform((x0, 10, 0, 4474100, 0, -10))
+    ds.SetProjection(srs.ExportToWkt())
+    ds.GetRasterBand(1).WriteArray(np.full((10, 10), valor, dtype=np.float32))
+    ds = None
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    """Dos teselas contiguas (valores 1 y 2)."""
+    _crear_tif(tmp_path / "t1.tif", 440000, 1)
+    _crear_tif(tmp_path / "t2.tif", 440100, 2)
+    return tmp_path
+
+
+class TestMosaico:
+    def test_leer_mosaico_completo(self, directorio):
+        mosaico = FuenteDatosMosaico(str(directorio))
+        ds = mosaico.leer()
+        assert (ds.RasterXSize, ds.RasterYSize) == (20, 10)
+        assert os.path.exists(directorio / NOMBRE_INDICE)
+        assert len(mosaico.archivos()) == 2
+
+    def test_indexado_incremental(self, directorio):
+        mosaico = FuenteDatosMosaico(str(directorio))
+        assert mosaico.indexar()["indexados"] == 2
+        assert mosaico.indexar()["indexados"] == 0
+        _crear_tif(directorio / "t3.tif", 440200, 3)
+        os.remove(directorio / "t1.tif")
+        assert mosaico.indexar() == {"indexados": 1, "eliminados": 1, "total": 2}
+
+    def test_MRE_solo_archivos_que_intersecan(self, directorio):
+        mosaico = FuenteDatosMosaico(str(directorio))
+        mosaico.leer()
+        assert mosaico.archivos([440110, 4474010, 440190, 4474090], EPSG_MRE=25830) == [
+            str(directorio / "t2.tif")
+        ]
+        arrays = mosaico.MRE_datos(MRE=[440110, 4474010, 440190, 4474090], EPSG_MRE=25830)
+        assert np.all(arrays[0] == 2)
+
+    def test_muestrear(self, directorio):
+        mosaico = FuenteDatosMosaico(str(directorio))
+        mosaico.leer()
+        res = mosaico.muestrear([(440050, 4474050), (440150, 4474050), (0, 0)], EPSG_puntos=25830)
+        assert res[0, 0] == 1 and res[1, 0] == 2 and np.isnan(res[2, 0])
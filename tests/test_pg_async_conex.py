@@ -0,0 +1,165 @@
+"""
+Tests unitarios de ``conex.PGAsync_conex.ConexPGAsync``.
+
+Se sustituye el módulo ``asyncpg`` por un doble mínimo (pool, conexión,
+transacción y cursor) para probar la lógica sin una base de datos real ni
+asyncpg instalado. Las corrutinas se ejecutan con ``asyncio.run``.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import conex.PGAsync_conex as pg_async_mod
+from conex.PGAsync_conex import ConexPGAsync
+
+
+PARAMS = {
+    "IP": "127.0.0.1",
+    "port": "5432",
+    "user": "u",
+    "pass": "p",
+    "db": "postgis",
+}
+
+
+class _Contexto:
+    """Context manager asíncrono que registra entrada y salida."""
+
+    def __init__(self, valor, registro, nombre):
+        self.valor, self.registro, self.nombre = valor, registro, nombre
+
+    async def __aenter__(self):
+        self.registro.append(f"{self.nombre}+")
+        return self.valor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.registro.append(f"{self.nombre}-")
+
+
+class _Cursor:
+    def __init__(self, filas, registro):
+        self.filas, self.registro = list(filas), registro
+
+    async def fetch(self, n, timeout=None):
+        self.registro.append(("fetch", n, timeout))
+        lote, self.filas = self.filas[:n], self.filas[n:]
+        return lote
+
+
+class _Conexion:
+    def __init__(self, filas, registro, espera=0):
+        self.filas, self.registro, self.espera = filas, registro, espera
+
+    async def fetch(self, query, *args, timeout=None):
+        self.registro.append(("query", query, args, timeout))
+        if self.espera:
+            await asyncio.wait_for(asyncio.sleep(self.espera), timeout)
+        return self.filas
+
+    async def fetchval(self, query, timeout=None):
+        return 1
+
+    def transaction(self):
+        return _Contexto(None, self.registro, "transaccion")
+
+    async def cursor(self, query, *args, timeout=None):
+        self.registro.append(("cursor", query, args))
+        return _Cursor(self.filas, self.registro)
+
+
+class _Pool:
+    def __init__(self, conexion, registro):
+        self.conexion, self.registro = conexion, registro
+
+    def acquire(self, timeout=None):
+        return _Contexto(self.conexion, self.registro, "conexion")
+
+    async def close(self):
+        self.registro.append("cerrado")
+
+
+@pytest.fixture
+def asyncpg_falso(monkeypatch):
+    """Sustituye asyncpg; devuelve (registro, kwargs de create_pool, conexión)."""
+    registro, llamadas = [], []
+    conexion = _Conexion([(1, "a"), (2, "b"), (3, "c")], registro)
+
+    async def create_pool(**kwargs):
+        llamadas.append(kwargs)
+        return _Pool(conexion, registro)
+
+    monkeypatch.setattr(pg_async_mod, "asyncpg", SimpleNamespace(create_pool=create_pool))
+    return registro, llamadas, conexion
+
+
+class TestConexPGAsync:
+    def test_sin_asyncpg(self, monkeypatch):
+        monkeypatch.setattr(pg_async_mod, "asyncpg", None)
+        pg = ConexPGAsync(dataJSONcon=dict(PARAMS))
+        with pytest.raises(ImportError, match="asyncpg"):
+            asyncio.run(pg.query("SELECT 1"))
+
+    def test_pool_unico_y_parametros(self, asyncpg_falso):
+        registro, llamadas, _ = asyncpg_falso
+
+        async def _main():
+            pg = ConexPGAsync(dataJSONcon=dict(PARAMS), max_conexiones=4)
+            await asyncio.gather(pg.query("SELECT 1"), pg.query("SELECT 2"))
+            assert "comprobada" in await pg.conex2PG(check=True)
+            await pg.cerrar()
+
+        asyncio.run(_main())
+        assert len(llamadas) == 1
+        assert llamadas[0]["host"] == "127.0.0.1" and llamadas[0]["port"] == 5432
+        assert llamadas[0]["database"] == "postgis" and llamadas[0]["max_size"] == 4
+        assert registro[-1] == "cerrado"
+
+    def test_query_devuelve_tuplas_y_libera(self, asyncpg_falso):
+        registro, _, _ = asyncpg_falso
+
+        async def _main():
+            async with ConexPGAsync(dataJSONcon=dict(PARAMS), timeout=3) as pg:
+                return await pg.query("SELECT * FROM t WHERE id > $1", 0)
+
+        assert asyncio.run(_main()) == [(1, "a"), (2, "b"), (3, "c")]
+        assert ("query", "SELECT * FROM t WHERE id > $1", (0,), 3) in registro
+        assert registro.count("conexion+") == registro.count("conexion-")
+
+    def test_iterar_por_lotes(self, asyncpg_falso):
+        registro, _, _ = asyncpg_falso
+
+        async def _main():
+            pg = ConexPGAsync(dataJSONcon=dict(PARAMS))
+            return [fila async for fila in pg.iterar("SELECT * FROM t", lote=2)]
+
+        assert asyncio.run(_main()) == [(1, "a"), (2, "b"), (3, "c")]
+        assert [r for r in registro if isinstance(r, tuple) and r[0] == "fetch"] == [
+            ("fetch", 2, None), ("fetch", 2, None)
+        ]
+        assert registro[-2:] == ["transaccion-", "conexion-"]
+
+    def test_iterar_abandonado_libera_conexion(self, asyncpg_falso):
+        registro, _, _ = asyncpg_falso
+
+        async def _main():
+            pg = ConexPGAsync(dataJSONcon=dict(PARAMS))
+            filas = pg.iterar("SELECT * FROM t", lote=1)
+            primera = await filas.__anext__()
+            await filas.aclose()
+            return primera
+
+        assert asyncio.run(_main()) == (1, "a")
+        assert registro[-2:] == ["transaccion-", "conexion-"]
+
+    def test_timeout_cancela_y_libera(self, asyncpg_falso):
+        registro, _, conexion = asyncpg_falso
+        conexion.espera = 1
+
+        async def _main():
+            pg = ConexPGAsync(dataJSONcon=dict(PARAMS), timeout=0.01)
+            await pg.query("SELECT pg_sleep(1)")
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(_main())
+        assert registro[-1] == "conexion-"
@@ -114,3 +114,390 @@ class TestQueryPG:
 
         # No debe lanzar AttributeError por tratar un string como conexión.
         assert pg.queryPG("SELECT 1;") == [(1,)]
+
+
+class TestParametrosYPreparadas:
+    def test_query_con_parametros(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(7,)]
+
+        assert pg.queryPG("SELECT %s;", (7,)) == [(7,)]
+        cursor.execute.assert_called_once_with("SELECT %s;", (7,))
+
+    def test_query_sin_filas(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.description = None
+
+        assert pg.queryPG("INSERT INTO t VALUES (%s)", (1,)) == []
+        cursor.fetchall.assert_not_called()
+        connection.commit.assert_called_once()
+
+    def test_marcadores_a_posicionales(self):
+        from conex.PG_conex import _marcadores_a_posicionales
+
+        sql, n = _marcadores_a_posicionales("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s")
+        assert sql == "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2" and n == 2
+        with pytest.raises(Exception):
+            _marcadores_a_posicionales("SELECT %(id)s")
+
+    def test_preparada_se_reutiliza_por_conexion(self, conexion_mock):
+        _, connection, cursor, connect = conexion_mock
+        pg = ConexPG(dataJSONcon=dict(PARAMS), pool_max=2)
+        connection.closed = 0
+        cursor.fetchall.return_value = [(1,)]
+
+        pg.queryPG("SELECT * FROM t WHERE id = %s", (1,), preparar=True)
+        pg.queryPG("SELECT * FROM t WHERE id = %s", (2,), preparar=True)
+
+        sentencias = [c.args[0] for c in cursor.execute.call_args_list]
+        assert sum(s.startswith("PREPARE pyg_") for s in sentencias) == 1
+        assert sentencias[0].endswith("AS SELECT * FROM t WHERE id = $1")
+        assert sentencias[1].startswith("EXECUTE pyg_") and sentencias[1].endswith("(%s)")
+        assert cursor.execute.call_args_list[-1].args[1] == (2,)
+        # Con pool la conexión no se cierra: vuelve al pool
+        connect.assert_called_once()
+        connection.close.assert_not_called()
+
+    def test_preparada_numero_de_parametros(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        with pytest.raises(Exception, match="parámetros"):
+            pg.queryPG("SELECT %s, %s", (1,), preparar=True)
+        connection.close.assert_called_once()
+
+
+class _PoolFalso:
+    """Como ThreadedConnectionPool: getconn() no espera, lanza PoolError si está agotado."""
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        import threading
+
+        self.maxconn, self.en_uso, self.max_en_uso = maxconn, 0, 0
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        import time
+        import psycopg2.pool
+
+        with self._lock:
+            if self.en_uso >= self.maxconn:
+                raise psycopg2.pool.PoolError("connection pool exhausted")
+            self.en_uso += 1
+            self.max_en_uso = max(self.max_en_uso, self.en_uso)
+        connection = MagicMock(name="connection", closed=0)
+        connection.cursor.return_value.execute.side_effect = lambda *a: time.sleep(0.05)
+        connection.cursor.return_value.fetchall.return_value = [(1,)]
+        connection.cursor.return_value.__iter__.return_value = iter([(1,), (2,)])
+        return connection
+
+    def putconn(self, connection, close=False):
+        with self._lock:
+            self.en_uso -= 1
+
+    def closeall(self):
+        pass
+
+
+class TestPoolEspera:
+    @pytest.fixture
+    def pool_falso(self, monkeypatch):
+        import conex.PG_conex as pg_mod
+
+        pools = []
+        monkeypatch.setattr(
+            pg_mod.psycopg2.pool, "ThreadedConnectionPool",
+            lambda *a, **kw: pools.append(_PoolFalso(*a, **kw)) or pools[-1],
+        )
+        return pools
+
+    def test_mas_hilos_que_conexiones_esperan(self, pool_falso):
+        from concurrent.futures import ThreadPoolExecutor
+
+        pg = ConexPG(dataJSONcon=dict(PARAMS), pool_max=2)
+        with ThreadPoolExecutor(max_workers=3) as ejecutor:
+            resultados = list(ejecutor.map(lambda i: pg.queryPG("SELECT %s", (i,)), range(3)))
+
+        assert resultados == [[(1,)]] * 3
+        assert pool_falso[0].max_en_uso == 2 and pool_falso[0].en_uso == 0
+
+    def test_timeout_pool(self, pool_falso):
+        pg = ConexPG(dataJSONcon=dict(PARAMS), pool_max=1, timeout_pool=0.01)
+        filas = pg.iterarPG("SELECT 1")
+        next(filas)  # la iteración mantiene ocupada la única conexión
+        with pytest.raises(Exception, match="pool"):
+            pg.queryPG("SELECT 2")
+        filas.close()
+        assert pg.queryPG("SELECT 3") == [(1,)]
+
+
+class TestEjecutarLote:
+    def test_execute_values_para_values(self, conexion_mock, monkeypatch):
+        import conex.PG_conex as pg_mod
+
+        pg, connection, cursor, connect = conexion_mock
+        llamadas = []
+        monkeypatch.setattr(
+            pg_mod.psycopg2.extras, "execute_values",
+            lambda cur, sql, filas, **kw: llamadas.append((sql, filas, kw)) or [(1,), (2,)],
+        )
+
+        sql = "INSERT INTO t (id, v) VALUES %s ON CONFLICT (id) DO UPDATE SET v = EXCLUDED.v RETURNING id"
+        assert pg.ejecutar_lote(sql, iter([(1, "a"), (2, "b")]), tamaño_pagina=50, devolver=True) == [(1,), (2,)]
+        assert llamadas[0][1] == [(1, "a"), (2, "b")]
+        assert llamadas[0][2]["page_size"] == 50 and llamadas[0][2]["fetch"] is True
+        connection.commit.assert_called_once()
+        connection.close.assert_called_once()
+
+    def test_execute_batch_sin_values(self, conexion_mock, monkeypatch):
+        import conex.PG_conex as pg_mod
+
+        pg, connection, cursor, connect = conexion_mock
+        llamadas = []
+        monkeypatch.setattr(
+            pg_mod.psycopg2.extras, "execute_batch",
+            lambda cur, sql, filas, page_size: llamadas.append(page_size),
+        )
+
+        assert pg.ejecutar_lote("UPDATE t SET v = %s WHERE id = %s", [("a", 1)] * 3, tamaño_pagina=2) == 3
+        assert llamadas == [2]
+        with pytest.raises(Exception, match="VALUES"):
+            pg.ejecutar_lote("UPDATE t SET v = %s", [("a",)], devolver=True)
+
+
+def test_iterarPG_cursor_con_nombre(conexion_mock):
+    pg, connection, cursor, connect = conexion_mock
+    cursor.__iter__.return_value = iter([(1,), (2,)])
+
+    assert list(pg.iterarPG("SELECT id FROM t WHERE id > %s", (0,), lote=500)) == [(1,), (2,)]
+    assert connection.cursor.call_args.kwargs["name"].startswith("pyg_")
+    assert cursor.itersize == 500
+    connection.commit.assert_called_once()
+    connection.close.assert_called_once()
+
+
+class TestCacheConsultas:
+    def test_acierto_no_vuelve_al_servidor(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1, "a")]
+
+        primera = pg.queryPG("SELECT * FROM t WHERE id = %s", (1,), cache=True)
+        primera.append("mutada")
+        assert pg.queryPG("SELECT * FROM t WHERE id = %s", (1,), cache=True) == [(1, "a")]
+        pg.queryPG("SELECT * FROM t WHERE id = %s", (2,), cache=True)
+        assert connect.call_count == 2
+        assert pg.estadisticas_cache_consultas()["aciertos"] == 1
+
+    def test_escrituras_no_se_cachean(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1,)]
+
+        for _ in range(2):
+            pg.queryPG("INSERT INTO t VALUES (%s) RETURNING id", (1,), cache=True)
+            pg.queryPG("WITH n AS (DELETE FROM t RETURNING id) SELECT * FROM n", cache=True)
+        assert connect.call_count == 4
+
+    def test_ttl_por_consulta(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1,)]
+        pg.configurar_cache_consultas(ttl=60)
+        ahora = [0.0]
+        pg.cache_consultas._reloj = lambda: ahora[0]
+
+        pg.queryPG("SELECT 1", cache=True, ttl=1)
+        pg.queryPG("SELECT 2", cache=True)
+        ahora[0] = 5.0
+        pg.queryPG("SELECT 1", cache=True)
+        pg.queryPG("SELECT 2", cache=True)
+        assert connect.call_count == 3
+
+    def test_notificacion_invalida_solo_su_canal(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1,)]
+        avisos = []
+        pg._al_notificar = lambda canal, payload: avisos.append((canal, payload))
+
+        pg.queryPG("SELECT * FROM parcelas", cache=True, canales="parcelas")
+        pg.queryPG("SELECT * FROM usos", cache=True, canales=["usos"])
+        pg._notificacion("parcelas", "42")
+        pg.queryPG("SELECT * FROM parcelas", cache=True, canales="parcelas")
+        pg.queryPG("SELECT * FROM usos", cache=True, canales=["usos"])
+
+        assert connect.call_count == 3
+        assert avisos == [("parcelas", "42")]
+        assert pg.estadisticas_cache_consultas()["notificaciones"] == 1
+
+    def test_invalidacion_durante_la_consulta_no_cachea(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+
+        def _fetchall():
+            # Llega un NOTIFY mientras la consulta está en curso
+            pg._notificacion("parcelas")
+            return [(1,)]
+
+        cursor.fetchall.side_effect = _fetchall
+        pg.queryPG("SELECT * FROM parcelas", cache=True, canales="parcelas")
+        assert len(pg.cache_consultas) == 0
+
+    def test_escuchar_listen_y_notify(self, conexion_mock, monkeypatch):
+        import threading
+        from types import SimpleNamespace
+        import conex.PG_conex as pg_mod
+
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1,)]
+        connection.notifies = []
+        recibido = threading.Event()
+        listos = iter([False, True])
+
+        def _select(leer, escribir, error, timeout):
+            listo = next(listos, None)
+            if listo:
+                return leer, [], []
+            # Mientras se escucha, se cachea una consulta que depende del canal
+            if listo is False:
+                pg.queryPG("SELECT * FROM parcelas", cache=True, canales="parcelas")
+            recibido.wait(0.01)
+            return [], [], []
+
+        connection.poll.side_effect = lambda: connection.notifies.append(
+            SimpleNamespace(channel="parcelas", payload="")
+        )
+        monkeypatch.setattr(pg_mod.select, "select", _select)
+
+        pg.configurar_cache_consultas()
+        pg.escuchar("parcelas", al_notificar=lambda canal, payload: recibido.set(), intervalo=0.01)
+        assert recibido.wait(2)
+        pg.dejar_de_escuchar()
+
+        cursor.execute.assert_any_call('LISTEN "parcelas"')
+        assert connection.autocommit is True
+        assert len(pg.cache_consultas) == 0
+
+    def test_canal_no_valido(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        with pytest.raises(Exception, match="canal"):
+            pg.escuchar('parcelas"; DROP TABLE t; --')
+
+
+class TestColumnasPG:
+    DESCRIPCION = [("id", 23), ("valor", 701)]
+
+    def test_lotes_en_arrays(self, conexion_mock):
+        np = pytest.importorskip("numpy")
+        pg, connection, cursor, connect = conexion_mock
+        cursor.description = self.DESCRIPCION
+        cursor.fetchmany.side_effect = [[(1, 0.5), (2, None)], [(3, 1.5)]]
+
+        columnas = pg.columnasPG("SELECT id, valor FROM t", lote=2)
+        assert columnas["id"].tolist() == [1, 2, 3]
+        assert np.isnan(columnas["valor"][1])
+        assert connection.cursor.call_args.kwargs["name"].startswith("pyg_")
+        connection.close.assert_called_once()
+
+    def test_iterar_columnas(self, conexion_mock):
+        pytest.importorskip("numpy")
+        pg, connection, cursor, connect = conexion_mock
+        cursor.description = self.DESCRIPCION
+        cursor.fetchmany.side_effect = [[(1, 0.5), (2, 1.0)], []]
+
+        lotes = list(pg.iterar_columnasPG("SELECT id, valor FROM t", lote=2))
+        assert len(lotes) == 1 and lotes[0]["id"].tolist() == [1, 2]
+        # El lote final vacío no corta la iteración: la consulta termina bien
+        connection.commit.assert_called_once()
+        connection.rollback.assert_not_called()
+
+    def test_resultado_vacio(self, conexion_mock):
+        pytest.importorskip("numpy")
+        pg, connection, cursor, connect = conexion_mock
+        cursor.description = self.DESCRIPCION
+        cursor.fetchmany.side_effect = [[], []]
+
+        assert list(pg.iterar_columnasPG("SELECT id, valor FROM t", lote=2)) == []
+        assert pg.columnasPG("SELECT id, valor FROM t", lote=2)["id"].tolist() == []
+        assert connection.commit.call_count == 2
+        connection.rollback.assert_not_called()
+
+    def test_copy(self, conexion_mock):
+        pytest.importorskip("numpy")
+        pg, connection, cursor, connect = conexion_mock
+        cursor.description = self.DESCRIPCION
+        cursor.mogrify.return_value = b"SELECT id, valor FROM t WHERE id > 0"
+        cursor.copy_expert.side_effect = lambda sql, destino: destino.write(b"1\t0.5\n2\t\\N\n")
+
+        columnas = pg.columnasPG("SELECT id, valor FROM t WHERE id > %s;", (0,), copy=True)
+        assert columnas["id"].tolist() == [1, 2]
+        cursor.copy_expert.assert_called_once()
+        assert cursor.copy_expert.call_args.args[0] == "COPY (SELECT id, valor FROM t WHERE id > 0) TO STDOUT"
+        cursor.execute.assert_any_call("SET LOCAL DateStyle TO 'ISO, YMD'")
+        cursor.execute.assert_any_call("SET LOCAL IntervalStyle TO 'postgres'")
+        connection.commit.assert_called_once()
+
+    def test_formato_no_valido(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        with pytest.raises(Exception, match="Formato"):
+            pg.columnasPG("SELECT 1", formato="pandas")
+        connect.assert_not_called()
+
+
+class TestInstrumentacion:
+    def test_hook_y_estadisticas_por_huella(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1, "a")]
+        eventos = []
+        pg.configurar_instrumentacion()
+        pg.añadir_hook(eventos.append)
+
+        pg.queryPG("SELECT * FROM t WHERE id = %s", (1,))
+        pg.queryPG("SELECT * FROM t WHERE id = %s", (2,))
+
+        assert [e["metodo"] for e in eventos] == ["queryPG", "queryPG"]
+        assert eventos[0]["filas"] == 1 and eventos[0]["bytes"] > 0
+        assert eventos[0]["total"] >= eventos[0]["conexion"] + eventos[0]["ejecucion"]
+        (metricas,) = pg.estadisticas_consultas()["consultas"].values()
+        assert metricas["llamadas"] == 2 and metricas["sql"] == "select * from t where id = ?"
+
+    def test_sin_instrumentacion_no_mide(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        pg.queryPG("SELECT 1")
+        assert pg.estadisticas_consultas() == {}
+
+    def test_error_se_registra_y_propaga(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.execute.side_effect = RuntimeError("fallo")
+        pg.configurar_instrumentacion()
+
+        with pytest.raises(RuntimeError):
+            pg.queryPG("SELECT 1")
+        (metricas,) = pg.estadisticas_consultas()["consultas"].values()
+        assert metricas["errores"] == 1
+
+    def test_lenta_con_explain_una_vez(self, conexion_mock, caplog):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [("Seq Scan on t",)]
+        pg.configurar_instrumentacion(umbral_lento=0, explicar=True)
+
+        with caplog.at_level("WARNING", logger="conex.PG_conex"):
+            pg.queryPG("SELECT * FROM t WHERE id = %s", (1,))
+            pg.queryPG("SELECT * FROM t WHERE id = %s", (2,))
+            pg.queryPG("UPDATE t SET v = 1")
+
+        explains = [c for c in cursor.execute.call_args_list if c.args[0].startswith("EXPLAIN")]
+        assert len(explains) == 1
+        assert explains[0].args == ("EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM t WHERE id = %s", (1,))
+        lentas = pg.estadisticas_consultas()["lentas"]
+        assert [l["plan"] for l in lentas] == ["Seq Scan on t", None, None]
+        assert "Consulta lenta" in caplog.text
+
+    def test_iterarPG_cuenta_filas(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.__iter__.return_value = iter([(1,), (2,)])
+        eventos = []
+        pg.añadir_hook(eventos.append)
+
+        assert len(list(pg.iterarPG("SELECT id FROM t"))) == 2
+        assert eventos[0]["metodo"] == "iterarPG" and eventos[0]["filas"] == 2
+
+    def test_hook_con_error_no_rompe_la_consulta(self, conexion_mock):
+        pg, connection, cursor, connect = conexion_mock
+        cursor.fetchall.return_value = [(1,)]
+        pg.añadir_hook(lambda evento: 1 / 0)
+        assert pg.queryPG("SELECT 1") == [(1,)]
@@ -0,0 +1,160 @@
+"""
+Tests unitarios de ``conex.PostGIS_conex.FuenteDatosPostGIS``.
+
+Se usa una conexión falsa que responde a las consultas de metadatos y
+registra el SQL generado, de modo que se prueba la traducción de bbox,
+filtros y paginación a SQL sin un PostgreSQL real.
+"""
+import json
+
+import pytest
+
+from conex.PostGIS_conex import POOL_POR_DEFECTO, FuenteDatosPostGIS
+
+
+class ConexionFalsa:
+    """Responde a information_schema / geometry_columns / pg_index y registra el resto."""
+
+    def __init__(self, srid=25830, clave=("gid",), pool_max=4):
+        self.srid, self.clave, self.pool_max = srid, clave, pool_max
+        self.consultas = []
+
+    def queryPG(self, query, params=None, preparar=False):
+        if "ST_AsMVT" in query:
+            self.consultas.append((query, params, preparar))
+            return [(memoryview(b"\x1a\x00"),)]
+        if "information_schema.columns" in query:
+            return [("gid", "integer"), ("nombre", "text"), ("area", "double precision"), ("geom", "USER-DEFINED")]
+        if "geometry_columns" in query:
+            return [("geom", self.srid, "MULTIPOLYGON")]
+        if "pg_index" in query:
+            return [(c,) for c in self.clave]
+        self.consultas.append((query, params))
+        return [(json.dumps({"type": "FeatureCollection", "features": []}),)]
+
+
+@pytest.fixture
+def fuente():
+    fuente = FuenteDatosPostGIS("catastro.parcelas", conexion=ConexionFalsa())
+    fuente.leer()
+    return fuente
+
+
+class TestPostGIS:
+    def test_metadatos(self, fuente):
+        meta = fuente.datasource
+        assert meta["esquema"] == "catastro" and meta["tabla"] == "parcelas"
+        assert meta["campo_geometria"] == "geom" and meta["srid"] == 25830
+        assert meta["campo_id"] == "gid" and list(meta["columnas"]) == ["gid", "nombre", "area"]
+        assert fuente.obtener_atributos() == {
+            "gid": {"type": "integer"}, "nombre": {"type": "string"}, "area": {"type": "number"}
+        }
+
+    def test_bbox_con_indice(self, fuente):
+        capa = fuente.MRE_datos(capaSalida="recorte", MRE=[-3.8, 40.3, -3.6, 40.5], EPSG_MRE=4326)
+        sql, params = fuente._consulta(capa, "*")
+        assert '"geom" && ST_Transform(ST_Segmentize(ST_MakeEnvelope(%s, %s, %s, %s, %s), %s::float8), 25830)' in sql
+        assert params[:5] == (-3.8, 40.3, -3.6, 40.5, 4326)
+        assert params[5] == pytest.approx(0.2 / 32)
+        assert sql.endswith('ORDER BY "gid"')
+        # La capa original no se modifica
+        assert fuente._consulta("parcelas", "*")[1] == ()
+
+    def test_bbox_mundial_en_3857(self):
+        fuente = FuenteDatosPostGIS("parcelas", conexion=ConexionFalsa(srid=3857))
+        fuente.leer()
+        capa = fuente.MRE_datos(capaSalida="mundo")
+        assert fuente._consulta(capa, "*")[1] == ()
+        capa = fuente.MRE_datos(capaSalida="norte", MRE=[-10, 0, 10, 90])
+        sql, params = fuente._consulta(capa, "*")
+        assert params == (-10.0, 0.0, 10.0, pytest.approx(85.0511287798066), 4326)
+        # De 4326 a 3857 los lados siguen rectos: sin densificar
+        assert "ST_Segmentize" not in sql
+
+    def test_filtro_dict_y_por_id(self, fuente):
+        fuente.leer(filtro={"nombre": ["a", "b"], "area": None})
+        capa = fuente.obtener_objeto_porID(capaSalida="uno", valorID=7)
+        sql, params = fuente._consulta(capa, "*")
+        assert '"nombre" = ANY(%s) AND "area" IS NULL AND "gid" = %s' in sql
+        assert params == (["a", "b"], 7)
+        with pytest.raises(Exception, match="columnas"):
+            fuente.leer(filtro={"inexistente": 1})
+
+    def test_filtro_sql_con_like(self, fuente):
+        fuente.leer(filtro="nombre LIKE 'Mad%'")
+        sql, params = fuente._consulta("parcelas", "*")
+        assert "(nombre LIKE 'Mad%%')" in sql
+        # Así lo formatea psycopg2 con los parámetros
+        assert (sql % params).endswith("WHERE (nombre LIKE 'Mad%') ORDER BY \"gid\"")
+
+        fuente.leer(filtro=("nombre LIKE %s", ["Mad%"]))
+        sql, params = fuente._consulta("parcelas", "*")
+        assert "(nombre LIKE %s)" in sql and params == ("Mad%",)
+
+    def test_paginacion_por_clave(self, fuente):
+        capa = fuente.leer_pagina(limit=50, despues=1200, bbox=[0, 0, 1, 1], EPSG_MRE=25830)
+        sql, params = fuente._consulta(capa, "*")
+        assert sql.endswith('WHERE "geom" && ST_MakeEnvelope(%s, %s, %s, %s, %s) AND "gid" > %s ORDER BY "gid" LIMIT %s')
+        assert params == (0.0, 0.0, 1.0, 1.0, 25830, 1200, 50)
+
+    def test_paginacion_sin_clave(self):
+        fuente = FuenteDatosPostGIS("parcelas", conexion=ConexionFalsa(clave=()))
+        fuente.leer()
+        with pytest.raises(Exception, match="clave primaria"):
+            fuente.leer_pagina(limit=10)
+
+    def test_exportar_geojson_en_servidor(self, fuente):
+        resultado = fuente.exportar(propiedades=["nombre"], precision=6)
+        assert resultado == {"type": "FeatureCollection", "features": []}
+        sql, _ = fuente.conexion.consultas[-1]
+        assert "ST_AsGeoJSON(ST_Transform(t.__geom, 4326), 6)" in sql
+        assert 'SELECT "nombre", "gid" AS __id, "geom" AS __geom FROM "catastro"."parcelas"' in sql
+        assert "ORDER BY t.__id" in sql
+
+        assert fuente.exportar(sin_geometria=True, como_bytes=True).startswith(b"{")
+        assert "'geometry', NULL" in fuente.conexion.consultas[-1][0]
+
+    def test_srid_de_entrada(self):
+        fuente = FuenteDatosPostGIS("parcelas", conexion=ConexionFalsa(srid=0))
+        fuente.leer(EPSG_Entrada=25830, bbox=[0, 0, 1, 1], EPSG_MRE=25830)
+        sql, _ = fuente._sql_geojson("parcelas")
+        assert "ST_SetSRID(\"geom\", 25830) AS __geom" in sql
+        assert "ST_SetSRID(ST_MakeEnvelope(%s, %s, %s, %s, %s), 0)" in sql
+
+
+class TestTeselaMVT:
+    def test_consulta_unica_preparada(self, fuente):
+        datos = fuente.tesela_mvt(14, 8023, 6177, columnas=["nombre"])
+        assert datos == b"\x1a\x00"
+        sql, params, preparar = fuente.conexion.consultas[-1]
+        assert preparar is True
+        assert "ST_AsMVTGeom(ST_Transform(\"geom\", 3857), ST_TileEnvelope(%s, %s, %s), %s, %s, true)" in sql
+        assert '"geom" && ST_Transform(ST_Segmentize(ST_Expand(ST_TileEnvelope(%s, %s, %s), %s), %s::float8), 25830)' in sql
+        assert "ST_AsMVT(mvtgeom.*, %s, %s, '__geom', '__id')" in sql
+        assert params[:5] == (14, 8023, 6177, 4096, 64) and params[-2:] == ("parcelas", 4096)
+
+    def test_sin_pool_no_prepara(self):
+        fuente = FuenteDatosPostGIS("parcelas", conexion=ConexionFalsa(pool_max=0))
+        fuente.leer()
+        fuente.tesela_mvt(14, 8023, 6177)
+        assert fuente.conexion.consultas[-1][2] is False
+
+    def test_conexion_propia_con_pool(self):
+        fuente = FuenteDatosPostGIS("parcelas", conexion={"host": "localhost", "dbname": "gis"})
+        assert fuente.conexion.pool_max == POOL_POR_DEFECTO
+
+    def test_cache_ttl_y_metricas(self, fuente):
+        fuente.configurar_cache_teselas(ttl=None)
+        fuente.tesela_mvt(14, 8023, 6177)
+        fuente.tesela_mvt(14, 8023, 6177)
+        est = fuente.estadisticas_teselas()
+        assert est["consultas"] == 1 and est["aciertos"] == 1 and est["ratio_aciertos"] == 0.5
+        assert est["ultimo_ms"] is not None and est["tiempo_max_ms"] >= est["tiempo_medio_ms"]
+
+    def test_invalidar_por_bbox(self, fuente):
+        fuente.tesela_mvt(14, 8023, 6177)
+        fuente.tesela_mvt(1, 1, 1)
+        # La tesela de zoom 1 (1, 1) cubre el SE: Madrid solo interseca la de zoom 14
+        assert fuente.invalidar_cache_teselas([-170, 60, -169, 61]) == 0
+        assert fuente.invalidar_cache_teselas([-3.71, 40.41, -3.70, 40.42]) == 1
+        assert fuente.invalidar_cache_teselas() == 1
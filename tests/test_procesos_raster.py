@@ -0,0 +1,193 @@
+"""
+Tests unitarios de ``procesos.raster`` (estadísticas zonales, calculadora y vectorización).
+
+Requieren GDAL (paquete ``osgeo``) y NumPy. Si no están instalados, se saltan.
+Se construyen un ráster y una capa de polígonos en memoria.
+"""
+import pytest
+
+pytest.importorskip("osgeo", reason="GDAL/OGR (osgeo) no instalado")
+np = pytest.importorskip("numpy")
+
+from osgeo import gdal, ogr, osr  # noqa: E402
+
+from procesos.raster.calculadora import calculadora_raster, compilar_expresion  # noqa: E402
+from procesos.raster.vectorizacion import curvas_nivel, poligonizar  # noqa: E402
+from procesos.raster.zonales import estadisticas_zonales  # noqa: E402
+
+
+@pytest.fixture
+def raster():
+    """Ráster 10x10 en EPSG:25830 con valores 0..99 y píxel de 10 m."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(25830)
+    ds = gdal.GetDriverByName("MEM").Create("", 10, 10, 1, gdal.GDT_Float32)
+    ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+    ds.SetProjection(srs.ExportToWkt())
+    ds.GetRasterBand(1).WriteArray(np.arange(100, dtype=np.float32).reshape(10, 10))
+    return ds
+
+
+@pytest.fixture
+def capa_zonas():
+    """Dos cuadrados: la fila superior izquierda (2x2 píxeles) y el resto fuera."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(25830)
+    ds = ogr.GetDriverByName("Memory").CreateDataSource("zonas")
+    layer = ds.CreateLayer("zonas", srs=srs, geom_type=ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("nombre", ogr.OFTString))
+    for nombre, wkt in [
+        ("dentro", "POLYGON ((440000 4474100, 440020 4474100, 440020 4474080, 440000 4474080, 440000 4474100))"),
+        ("fuera", "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))"),
+    ]:
+        feat = ogr.Feature(layer.GetLayerDefn())
+        feat.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        feat.SetField("nombre", nombre)
+        layer.CreateFeature(feat)
+    yield ds, layer
+
+
+class TestEstadisticasZonales:
+    def test_estadisticas_basicas(self, raster, capa_zonas):
+        _, layer = capa_zonas
+        res = estadisticas_zonales(layer, raster, tamaño_bloque=4, hilos=2, escribir=False)
+        # Píxeles 0, 1, 10 y 11
+        assert res["count"].tolist() == [4, 0]
+        assert res["sum"][0] == 22
+        assert res["mean"][0] == pytest.approx(5.5)
+        assert res["min"][0] == 0 and res["max"][0] == 11
+        assert np.isnan(res["mean"][1])
+
+    def test_escribe_atributos_y_percentiles(self, raster, capa_zonas):
+        _, layer = capa_zonas
+        estadisticas_zonales(layer, raster, estadisticas=("mean",), percentiles=[50], prefijo="z_")
+        layer.ResetReading()
+        feat = layer.GetNextFeature()
+        assert feat.GetField("z_mean") == pytest.approx(5.5)
+        assert 0 <= feat.GetField("z_p50") <= 11
+
+    def test_poligonos_solapados_cuentan_en_todas_las_zonas(self, raster):
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(25830)
+        ds = ogr.GetDriverByName("Memory").CreateDataSource("solapes")
+        layer = ds.CreateLayer("solapes", srs=srs, geom_type=ogr.wkbPolygon)
+        for wkt in [
+            # 2x2 píxeles arriba a la izquierda (0, 1, 10, 11)
+            "POLYGON ((440000 4474100, 440020 4474100, 440020 4474080, 440000 4474080, 440000 4474100))",
+            # 3x1 píxeles de la fila superior (0, 1, 2), solapado con el anterior
+            "POLYGON ((440000 4474100, 440030 4474100, 440030 4474090, 440000 4474090, 440000 4474100))",
+        ]:
+            feat = ogr.Feature(layer.GetLayerDefn())
+            feat.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+            layer.CreateFeature(feat)
+
+        res = estadisticas_zonales(layer, raster, percentiles=[100], bins=100, escribir=False)
+        assert res["count"].tolist() == [4, 3]
+        assert res["sum"].tolist() == [22, 3]
+        assert res["p100"][1] == pytest.approx(2, abs=1)
+
+    def test_percentiles_dentro_del_rango_de_la_zona(self, raster, capa_zonas):
+        _, layer = capa_zonas
+        res = estadisticas_zonales(layer, raster, percentiles=[0, 50, 100], bins=7, escribir=False)
+        assert res["p0"][0] == 0 and res["p100"][0] == 11
+        assert 0 <= res["p50"][0] <= 11
+        assert np.isnan(res["p50"][1])
+
+    def test_raster_rotado(self, raster, capa_zonas):
+        _, layer = capa_zonas
+        raster.SetGeoTransform((440000, 10, 1, 4474100, 1, -10))
+        with pytest.raises(Exception, match="rotada"):
+            estadisticas_zonales(layer, raster, escribir=False)
+
+
+@pytest.fixture
+def raster_bandas():
+    """Ráster 10x10 de dos bandas (rojo = 1, infrarrojo = 3) con NoData 0 en el rojo."""
+    ds = gdal.GetDriverByName("MEM").Create("", 10, 10, 2, gdal.GDT_Float32)
+    ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+    rojo = np.ones((10, 10), dtype=np.float32)
+    rojo[0, 0] = 0
+    ds.GetRasterBand(1).WriteArray(rojo)
+    ds.GetRasterBand(1).SetNoDataValue(0)
+    ds.GetRasterBand(2).WriteArray(np.full((10, 10), 3, dtype=np.float32))
+    return ds
+
+
+class TestCalculadora:
+    def test_ndvi_por_bloques_con_nodata(self, raster_bandas):
+        res = calculadora_raster("(nir - red) / (nir + red)", {"red": 1, "nir": 2},
+                                 fuente=raster_bandas, tamaño_bloque=3, hilos=3)
+        datos = res.GetRasterBand(1).ReadAsArray()
+        assert res.GetRasterBand(1).GetNoDataValue() == -9999
+        assert datos[0, 0] == -9999
+        assert datos[5, 5] == pytest.approx(0.5)
+
+    def test_salida_gtiff(self, raster_bandas, tmp_path):
+        ruta = str(tmp_path / "ndvi.tif")
+        res = calculadora_raster("where(red > 0, nir * 2, 0)", {"red": 1, "nir": (raster_bandas, 2)},
+                                 fuente=raster_bandas, salida=ruta, formato="GTiff")
+        res = None
+        assert gdal.Open(ruta).GetRasterBand(1).ReadAsArray()[9, 9] == 6
+
+    def test_operadores_logicos(self, raster_bandas):
+        res = calculadora_raster("(red > 0) & ~(nir < 1) | (nir & red)", {"red": 1, "nir": 2},
+                                 fuente=raster_bandas, tipo=gdal.GDT_Byte)
+        banda = res.GetRasterBand(1)
+        datos = banda.ReadAsArray()
+        assert banda.GetNoDataValue() == 255
+        assert datos[0, 0] == 255 and datos[5, 5] == 1
+
+    def test_nodata_fuera_del_tipo(self, raster_bandas):
+        with pytest.raises(ValueError, match="no cabe"):
+            calculadora_raster("red", {"red": 1}, fuente=raster_bandas, tipo=gdal.GDT_Byte, nodata=-9999)
+
+    def test_expresion_no_permitida(self):
+        with pytest.raises(ValueError):
+            compilar_expresion("__import__('os').system('true')", ["red"])
+        with pytest.raises(ValueError):
+            compilar_expresion("red + verde", ["red"])
+
+
+@pytest.fixture
+def raster_clases():
+    """Ráster 10x10 de enteros: columnas 0-4 con clase 1 y 5-9 con clase 2."""
+    ds = gdal.GetDriverByName("MEM").Create("", 10, 10, 1, gdal.GDT_Byte)
+    ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+    datos = np.ones((10, 10), dtype=np.uint8)
+    datos[:, 5:] = 2
+    ds.GetRasterBand(1).WriteArray(datos)
+    return ds
+
+
+class TestVectorizacion:
+    @pytest.mark.parametrize("procesos", [1, 2])
+    def test_poligonizar_cose_teselas(self, raster_clases, procesos):
+        fuente = poligonizar(raster_clases, tamaño_tesela=3, procesos=procesos)
+        layer = fuente.datasource.GetLayer(0)
+        areas = {f.GetField("valor"): f.GetGeometryRef().GetArea() for f in layer}
+        assert layer.GetFeatureCount() == 2
+        assert areas == {1: pytest.approx(5000), 2: pytest.approx(5000)}
+
+    @pytest.mark.parametrize("conectividad, esperados", [(4, 2), (8, 1)])
+    def test_poligonizar_diagonal_en_costura(self, conectividad, esperados):
+        # Dos píxeles de clase 1 que solo se tocan en diagonal sobre la costura x=3
+        ds = gdal.GetDriverByName("MEM").Create("", 6, 6, 1, gdal.GDT_Byte)
+        ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+        ds.GetRasterBand(1).SetNoDataValue(0)
+        datos = np.zeros((6, 6), dtype=np.uint8)
+        datos[1, 2] = datos[2, 3] = 1
+        ds.GetRasterBand(1).WriteArray(datos)
+        fuente = poligonizar(ds, tamaño_tesela=3, procesos=1, conectividad=conectividad)
+        layer = fuente.datasource.GetLayer(0)
+        assert layer.GetFeatureCount() == esperados
+        assert sum(f.GetGeometryRef().GetArea() for f in layer) == pytest.approx(200)
+
+    def test_curvas_nivel_continuas(self):
+        ds = gdal.GetDriverByName("MEM").Create("", 10, 10, 1, gdal.GDT_Float32)
+        ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+        ds.GetRasterBand(1).WriteArray(np.tile(np.arange(10, dtype=np.float32) * 10, (10, 1)))
+        fuente = curvas_nivel(ds, equidistancia=25, tamaño_tesela=3, procesos=1)
+        layer = fuente.datasource.GetLayer(0)
+        curvas = sorted((f.GetField("elevacion"), f.GetGeometryRef().Length()) for f in layer)
+        assert [c[0] for c in curvas] == [25, 50, 75]
+        assert all(c[1] == pytest.approx(90) for c in curvas)
@@ -0,0 +1,248 @@
+"""
+Tests unitarios de ``FuenteDatosRaster`` (estadísticas, teselas y muestreo).
+
+Requieren GDAL (paquete ``osgeo``) y NumPy. Si no están instalados, se saltan.
+Se construye un GeoTIFF pequeño en un directorio temporal.
+"""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("osgeo", reason="GDAL/OGR (osgeo) no instalado")
+np = pytest.importorskip("numpy")
+
+from osgeo import gdal, ogr, osr  # noqa: E402
+
+from conex.Raster_conex import FuenteDatosRaster, _percentiles_histograma  # noqa: E402
+from conex.teselas_utils import teselas_en_bbox  # noqa: E402
+
+
+@pytest.fixture
+def ruta_tif(tmp_path):
+    """GeoTIFF 10x10 en EPSG:25830 con valores 0..99."""
+    ruta = str(tmp_path / "valores.tif")
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(25830)
+    ds = gdal.GetDriverByName("GTiff").Create(ruta, 10, 10, 1, gdal.GDT_Float32)
+    ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+    ds.SetProjection(srs.ExportToWkt())
+    ds.GetRasterBand(1).WriteArray(np.arange(100, dtype=np.float32).reshape(10, 10))
+    ds = None
+    return ruta
+
+
+class TestEstadisticas:
+    def test_exacto_con_histograma_y_percentiles(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        st = fuente.estadisticas(1, modo="exacto", histograma=True, bins=10, percentiles=[50])
+        assert st["min"] == 0 and st["max"] == 99
+        assert st["mean"] == pytest.approx(49.5)
+        assert sum(st["histograma"]["conteos"]) == 100
+        assert st["percentiles"]["p50"] == pytest.approx(49.5, abs=10)
+
+    def test_json_en_cache_y_recarga(self, ruta_tif, tmp_path):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        st = fuente.estadisticas(1, modo="exacto")
+        # Por defecto no se escribe nada junto a los datos
+        assert not os.path.exists(ruta_tif + ".estadisticas.json")
+
+        ruta_json = str(tmp_path / "cache" / "estadisticas.json")
+        os.makedirs(os.path.dirname(ruta_json))
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.ruta_estadisticas = ruta_json
+        fuente.leer()
+        fuente.estadisticas(1, modo="exacto")
+        with open(ruta_json, encoding="utf-8") as f:
+            assert len(json.load(f)["entradas"]) == 1
+
+        otra = FuenteDatosRaster(ruta_tif)
+        otra.ruta_estadisticas = ruta_json
+        otra.leer()
+        assert otra.estadisticas(1, modo="exacto") == st
+
+    def test_entradas_acotadas(self, ruta_tif, monkeypatch):
+        monkeypatch.setattr("conex.Raster_conex.MAX_ENTRADAS_ESTADISTICAS", 2)
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        for bins in (4, 8, 16):
+            fuente.estadisticas(1, modo="exacto", histograma=True, bins=bins)
+        assert len(fuente._cache_estadisticas()) == 2
+
+    def test_recorte_no_reutiliza_cache(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        completo = fuente.estadisticas(1, modo="exacto")
+        fuente.MRE_datos(MRE=[440000, 4474050, 440050, 4474100], EPSG_MRE=25830)
+        recorte = fuente.estadisticas(1, modo="exacto")
+        assert recorte["max"] < completo["max"]
+
+    def test_muestreo(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        st = fuente.estadisticas(1, modo="muestreo", fraccion=0.25, percentiles=[0, 100])
+        assert st["n_muestras"] == 25
+        assert 0 <= st["min"] <= st["max"] <= 99
+        assert st["percentiles"]["p0"] == st["min"] and st["percentiles"]["p100"] == st["max"]
+
+    def test_modo_no_soportado(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        with pytest.raises(ValueError):
+            fuente.estadisticas(1, modo="otro")
+
+
+class TestTeselas:
+    def _tesela(self, fuente, z=14):
+        return next(teselas_en_bbox(fuente._MRE_3857(), z))
+
+    def test_png_y_cache_memoria(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        z, x, y = self._tesela(fuente)
+        datos = fuente.tesela(z, x, y)
+        assert datos.startswith(b"\x89PNG")
+        assert fuente.tesela(z, x, y) == datos
+        assert fuente.cache_teselas.aciertos == 1
+
+    def test_cache_mbtiles_entre_instancias(self, ruta_tif, tmp_path, monkeypatch):
+        ruta_mbtiles = str(tmp_path / "teselas.mbtiles")
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        fuente.configurar_cache_teselas(ruta_mbtiles=ruta_mbtiles)
+        z, x, y = self._tesela(fuente)
+        datos = fuente.tesela(z, x, y, formato="jpeg", tamaño=512)
+
+        otra = FuenteDatosRaster(ruta_tif)
+        otra.leer()
+        otra.configurar_cache_teselas(ruta_mbtiles=ruta_mbtiles)
+        monkeypatch.setattr(otra, "_generar_tesela", lambda *a: pytest.fail("no debe regenerar"))
+        assert otra.tesela(z, x, y, formato="jpeg", tamaño=512) == datos
+
+    def test_sembrar_omite_cacheadas(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        generadas = fuente.sembrar_teselas(range(10, 13), procesos=1)
+        assert generadas >= 3
+        assert fuente.sembrar_teselas(range(10, 13), procesos=1) == 0
+
+    def test_opciones_no_validas(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        with pytest.raises(ValueError):
+            fuente.tesela(0, 0, 0, formato="gif")
+        with pytest.raises(ValueError):
+            fuente.tesela(0, 0, 0, tamaño=300)
+
+
+class TestMuestrear:
+    def test_cercano_y_fuera(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        res = fuente.muestrear([(440005, 4474095), (440015, 4474085), (0, 0)], EPSG_puntos=25830)
+        assert res.shape == (3, 1)
+        assert res[0, 0] == 0 and res[1, 0] == 11
+        assert np.isnan(res[2, 0])
+
+    def test_bilineal(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        res = fuente.muestrear([(440010, 4474090)], EPSG_puntos="EPSG:25830", interpolacion="bilinear")
+        assert res[0, 0] == pytest.approx(5.5)
+
+    def test_geojson_en_wgs84(self, ruta_tif):
+        srs_utm = osr.SpatialReference()
+        srs_utm.ImportFromEPSG(25830)
+        srs_geo = osr.SpatialReference()
+        srs_geo.ImportFromEPSG(4326)
+        srs_geo.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        lon, lat, _ = osr.CoordinateTransformation(srs_utm, srs_geo).TransformPoint(440015, 4474085)
+        geojson = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": {}, "geometry": {"type": "Point", "coordinates": [lon, lat]}},
+                {"type": "Feature", "properties": {}, "geometry": None},
+            ],
+        }
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        res = fuente.muestrear(geojson)
+        assert res[0, 0] == 11 and np.isnan(res[1, 0])
+
+    def test_capa_ogr(self, ruta_tif):
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(25830)
+        ds = ogr.GetDriverByName("Memory").CreateDataSource("puntos")
+        layer = ds.CreateLayer("puntos", srs=srs, geom_type=ogr.wkbPoint)
+        feat = ogr.Feature(layer.GetLayerDefn())
+        feat.SetGeometry(ogr.CreateGeometryFromWkt("POINT (440095 4474005)"))
+        layer.CreateFeature(feat)
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.leer()
+        assert fuente.muestrear(layer)[0, 0] == 99
+
+
+class TestAlmacenTrabajo:
+    def test_envi_en_disco_y_limpieza(self, ruta_tif, tmp_path):
+        trabajo = tmp_path / "trabajo"
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.configurar_almacen("envi", directorio=str(trabajo), umbral_bytes=0)
+        fuente.leer(banda=1)
+        primero = fuente.datasource.GetDescription()
+        assert fuente.datasource.GetDriver().ShortName == "ENVI" and os.path.exists(primero)
+
+        banda = fuente.datasource.GetRasterBand(1)
+        arrays = fuente.MRE_datos(MRE=[440000, 4474050, 440050, 4474100], EPSG_MRE=25830)
+        assert arrays[0].tolist() == np.arange(100).reshape(10, 10)[:5, :5].tolist()
+        # La banda obtenida antes del recorte sigue leyendo su archivo
+        assert os.path.exists(primero)
+        assert banda.ReadAsArray().tolist() == np.arange(100).reshape(10, 10).tolist()
+        assert len(list(trabajo.glob("*.img"))) == 2
+
+        fuente.cerrar()
+        assert fuente.datasource is None
+        assert list(trabajo.glob("*.img")) == []
+
+    def test_MRE_en_disco_no_lee_las_bandas(self, ruta_tif, tmp_path, monkeypatch):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.configurar_almacen("gtiff", directorio=str(tmp_path), umbral_bytes=0)
+        fuente.leer()
+
+        # La copia lee por franjas (con ventana); una lectura sin ventana es la banda entera
+        completas = []
+        leer_array = gdal.Band.ReadAsArray
+
+        def _registrar(banda, *args, **kwargs):
+            if not args and not kwargs:
+                completas.append(banda)
+            return leer_array(banda, *args, **kwargs)
+
+        monkeypatch.setattr(gdal.Band, "ReadAsArray", _registrar)
+        bandas = fuente.MRE_datos(MRE=[440000, 4474050, 440050, 4474100], EPSG_MRE=25830, arrays=False)
+        assert completas == []
+        assert all(isinstance(b, gdal.Band) for b in bandas)
+        assert (bandas[0].XSize, bandas[0].YSize) == (5, 5)
+
+    def test_gtiff_redimensionar(self, ruta_tif, tmp_path):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.configurar_almacen("gtiff", directorio=str(tmp_path), umbral_bytes=0)
+        fuente.leer()
+        fuente.redimensionar(5, 5)
+        ds = fuente.datasource
+        assert ds.GetDriver().ShortName == "GTiff" and (ds.RasterXSize, ds.RasterYSize) == (5, 5)
+        assert ds.GetGeoTransform()[1] == 20
+
+    def test_umbral_mantiene_memoria(self, ruta_tif):
+        fuente = FuenteDatosRaster(ruta_tif)
+        fuente.configurar_almacen("gtiff")
+        fuente.leer(banda=1)
+        assert fuente.datasource.GetDriver().ShortName == "MEM"
+        with pytest.raises(Exception, match="no soportado"):
+            fuente.configurar_almacen("zarr")
+
+
+def test_percentiles_histograma():
+    res = _percentiles_histograma([1, 1, 1, 1], 0.0, 4.0, [50])
+    assert res["p50"] == pytest.approx(2.0)
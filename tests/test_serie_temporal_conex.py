@@ -0,0 +1,84 @@
+"""
+Tests unitarios de ``FuenteDatosSerieTemporal``.
+
+Requieren GDAL (paquete ``osgeo``) y NumPy. Si no están instalados, se saltan.
+Se construye una serie de tres GeoTIFF diarios en un directorio temporal.
+"""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("osgeo", reason="GDAL/OGR (osgeo) no instalado")
+np = pytest.importorskip("numpy")
+
+from osgeo import gdal, osr  # noqa: E402
+
+from conex.SerieTemporal_conex import FuenteDatosSerieTemporal  # noqa: E402
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    """Cortes 20240101..20240103 de 10x10 en EPSG:25830 con valor = día; NoData 0 en (0, 0)."""
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(25830)
+    for dia in (1, 2, 3):
+        ds = gdal.GetDriverByName("GTiff").Create(str(tmp_path / f"ndvi_2024010{dia}.tif"), 10, 10, 1, gdal.GDT_Float32)
+        ds.SetGeoTransform((440000, 10, 0, 4474100, 0, -10))
+        ds.SetProjection(srs.ExportToWkt())
+        datos = np.full((10, 10), dia, dtype=np.float32)
+        datos[0, 0] = 0
+        ds.GetRasterBand(1).WriteArray(datos)
+        ds.GetRasterBand(1).SetNoDataValue(0)
+        ds = None
+    return tmp_path
+
+
+class TestSerieTemporal:
+    def test_leer_es_perezoso(self, directorio):
+        serie = FuenteDatosSerieTemporal(str(directorio))
+        instantes = serie.leer()
+        assert instantes == [datetime(2024, 1, d) for d in (1, 2, 3)]
+        assert len(serie._fuentes) == 1
+
+    def test_cortes_abiertos_acotados(self, directorio):
+        serie = FuenteDatosSerieTemporal(str(directorio), hilos=1, max_abiertos=2)
+        serie.leer()
+        primera = serie._fuentes[next(iter(serie._fuentes))]
+        _, cubo, _ = serie.cubo()
+        assert cubo.shape == (3, 10, 10)
+        assert len(serie._fuentes) == 2 and primera.datasource is None
+
+        serie.cerrar()
+        assert len(serie._fuentes) == 0
+        assert serie.cubo(inicio="2024-01-03")[1][0, 5, 5] == 3
+
+    def test_cubo_por_bbox_e_intervalo(self, directorio):
+        serie = FuenteDatosSerieTemporal(str(directorio), hilos=2)
+        serie.leer()
+        instantes, cubo, gt = serie.cubo([440000, 4474080, 440020, 4474100], EPSG_MRE=25830, inicio="2024-01-02")
+        assert instantes == [datetime(2024, 1, 2), datetime(2024, 1, 3)]
+        assert cubo.shape == (2, 2, 2)
+        assert np.isnan(cubo[0, 0, 0]) and cubo[1, 1, 1] == 3
+        assert gt[0] == 440000 and gt[3] == 4474100
+
+    def test_serie_puntos(self, directorio):
+        serie = FuenteDatosSerieTemporal(str(directorio))
+        serie.leer()
+        instantes, valores = serie.serie_puntos([(440055, 4474055)], EPSG_puntos=25830, fin="2024-01-02")
+        assert valores.tolist() == [[1.0], [2.0]]
+
+    def test_serie_puntos_iterable_de_un_solo_uso(self, directorio):
+        serie = FuenteDatosSerieTemporal(str(directorio), hilos=3)
+        serie.leer()
+        puntos = (p for p in [(440055, 4474055), (440055, 4474055)])
+        _, valores = serie.serie_puntos(puntos, EPSG_puntos=25830)
+        assert valores.tolist() == [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]]
+
+    def test_coveragejson_eje_temporal(self, directorio):
+        serie = FuenteDatosSerieTemporal(str(directorio))
+        serie.leer()
+        cj = serie.exportar_coveragejson([440000, 4474080, 440020, 4474100], EPSG_MRE=25830)
+        assert cj["domain"]["axes"]["t"]["values"][0] == "2024-01-01T00:00:00"
+        rango = cj["ranges"]["band_1"]
+        assert rango["shape"] == [3, 2, 2] and rango["axisNames"] == ["t", "y", "x"]
+        assert rango["values"][0] is None and rango["values"][-1] == 3
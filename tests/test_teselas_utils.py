@@ -0,0 +1,41 @@
+"""
+Tests unitarios de ``conex.teselas_utils`` (teselado WebMercator).
+
+Es lógica pura: no requieren GDAL.
+"""
+import pytest
+
+from conex.teselas_utils import (
+    ORIGEN_3857,
+    limites_tesela_3857,
+    lonlat_a_3857,
+    teselas_en_bbox,
+    validar_tesela,
+)
+
+
+def test_tesela_cero_cubre_el_mundo():
+    assert limites_tesela_3857(0, 0, 0) == pytest.approx(
+        [-ORIGEN_3857, -ORIGEN_3857, ORIGEN_3857, ORIGEN_3857]
+    )
+
+
+def test_tesela_zoom_1_arriba_izquierda():
+    minx, miny, maxx, maxy = limites_tesela_3857(1, 0, 0)
+    assert (minx, maxy) == pytest.approx((-ORIGEN_3857, ORIGEN_3857))
+    assert (maxx, miny) == pytest.approx((0.0, 0.0))
+
+
+def test_validar_tesela_fuera_de_rango():
+    with pytest.raises(ValueError):
+        validar_tesela(1, 2, 0)
+
+
+def test_lonlat_a_3857_origen():
+    assert lonlat_a_3857(0, 0) == pytest.approx((0.0, 0.0), abs=1e-6)
+
+
+def test_teselas_en_bbox():
+    x, y = lonlat_a_3857(-3.7, 40.4)
+    teselas = list(teselas_en_bbox([x, y, x, y], 5))
+    assert teselas == [(5, 15, 12)]
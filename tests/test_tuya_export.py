@@ -139,6 +139,13 @@ class TestFuenteDatosTuya:
             assert feat["geometry"]["type"] == "Point"
             assert feat["geometry"]["coordinates"][0] != 0
 
+    def test_exportar_geojson_como_bytes(self, params_tuya_tmp, tuya_devices_con_coordenadas):
+        fuente = FuenteDatosTuya(str(params_tuya_tmp), str(tuya_devices_con_coordenadas))
+        fuente.leer(capa="wsdcg")
+        datos = fuente.exportar_geojson(precision=3, como_bytes=True)
+        assert isinstance(datos, bytes)
+        assert json.loads(datos) == fuente.exportar_geojson(precision=3)
+
     def test_exportar_geojson_con_indice(self, params_tuya_tmp, tuya_devices_con_coordenadas):
         fuente = FuenteDatosTuya(str(params_tuya_tmp), str(tuya_devices_con_coordenadas))
         fuente.leer(capa=0)
@@ -207,6 +214,12 @@ class TestFuenteDatosTuyaSQLITE:
         geojson = fuente.exportar_geojson(capa="wsdcg")
         assert len(geojson["features"]) == 2
 
+    def test_exportar_geojson_como_bytes(self, params_tuya_tmp, tuya_devices_sqlite):
+        fuente = FuenteDatosTuya_SQLITE(str(params_tuya_tmp), str(tuya_devices_sqlite))
+        datos = fuente.exportar_geojson(capa="wsdcg", como_bytes=True)
+        assert datos.startswith(b'{"type":"FeatureCollection"')
+        assert json.loads(datos) == fuente.exportar_geojson(capa="wsdcg")
+
     def test_exportar_geojson_capa_inexistente(self, params_tuya_tmp, tuya_devices_sqlite):
         fuente = FuenteDatosTuya_SQLITE(str(params_tuya_tmp), str(tuya_devices_sqlite))
         with pytest.raises(Exception, match="No existe la tabla"):
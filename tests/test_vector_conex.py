@@ -94,6 +94,342 @@ class TestExportarGeoJSON:
         assert 35 < coords[1] < 44
 
 
+class TestLeerConFiltros:
+    def test_filtro_atributos(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        ds = fuente.leer(filtro="nombre = 'dos'")
+        assert ds.GetLayerByIndex(0).GetFeatureCount() == 1
+
+    def test_columnas_y_max_features(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        ds = fuente.leer(columnas=["valor"], max_features=1)
+        capa = ds.GetLayerByIndex(0)
+        assert capa.GetFeatureCount() == 1
+        assert capa.GetLayerDefn().GetFieldCount() == 1
+        assert capa.GetLayerDefn().GetFieldDefn(0).GetName() == "valor"
+
+    def test_url_wfs_sustituye_max_features(self):
+        from conex.Vector_conex import _url_wfs
+
+        url = _url_wfs(
+            "http://srv/ows?service=WFS&version=1.0.0&request=GetFeature"
+            "&typeName=a:b&maxFeatures=50",
+            5,
+        )
+        assert "maxFeatures=50" not in url
+        assert "MAXFEATURES=5" in url
+        assert "typeName=a:b" in url
+
+
+class TestLeerPagina:
+    def test_pagina_respeta_offset_y_limit(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        ds = fuente.leer_pagina(offset=1, limit=1)
+        capa = ds.GetLayerByIndex(0)
+        assert capa.GetFeatureCount() == 1
+        capa.ResetReading()
+        assert next(iter(capa)).GetField("nombre") == "dos"
+
+    def test_pagina_gpkg_por_rango_de_fid(self, tmp_path):
+        ruta = str(tmp_path / "puntos.gpkg")
+        ds = ogr.GetDriverByName("GPKG").CreateDataSource(ruta)
+        capa = ds.CreateLayer("puntos", geom_type=ogr.wkbPoint)
+        capa.CreateField(ogr.FieldDefn("n", ogr.OFTInteger))
+        for n in range(6):
+            feat = ogr.Feature(capa.GetLayerDefn())
+            feat.SetField("n", n)
+            feat.SetGeometry(ogr.CreateGeometryFromWkt(f"POINT ({n} 0)"))
+            capa.CreateFeature(feat)
+        capa.DeleteFeature(2)
+        ds = None
+
+        fuente = FuenteDatosVector(ruta)
+        paginas = [
+            sorted(f.GetField("n") for f in fuente.leer_pagina(offset=o, limit=2).GetLayerByIndex(0))
+            for o in (0, 2, 4)
+        ]
+        assert paginas == [[0, 1], [3, 4], [5]]
+
+    def test_pagina_con_filtro_y_propiedades(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        ds = fuente.leer_pagina(filtro="valor > 10", propiedades=["nombre"])
+        capa = ds.GetLayerByIndex(0)
+        defn = capa.GetLayerDefn()
+        assert [defn.GetFieldDefn(i).GetName() for i in range(defn.GetFieldCount())] == ["nombre"]
+        assert capa.GetFeatureCount() == 1
+
+    def test_filtro_sobre_campo_no_pedido(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        ds = fuente.leer(filtro="nombre = 'dos'", columnas=["valor"])
+        capa = ds.GetLayerByIndex(0)
+        defn = capa.GetLayerDefn()
+        assert [defn.GetFieldDefn(i).GetName() for i in range(defn.GetFieldCount())] == ["valor"]
+        assert [f.GetField("valor") for f in capa] == [20]
+
+    def test_campos_filtro_ignora_literales(self):
+        from conex.Vector_conex import _campos_filtro
+
+        usados = _campos_filtro("valor > 10 AND \"Nombre\" = 'otro campo'")
+        assert {"valor", "nombre"} <= usados
+        assert "otro" not in usados
+
+    def test_pagina_con_bbox(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        # bbox en EPSG:3857 alrededor de Madrid (-3.7, 40.4).
+        ds = fuente.leer_pagina(bbox=[-500000, 4800000, -300000, 5000000], EPSG_MRE=3857)
+        assert ds.GetLayerByIndex(0).GetFeatureCount() == 1
+
+    def test_propiedad_inexistente_lanza(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        with pytest.raises(Exception):
+            fuente.leer_pagina(propiedades=["no_existe"])
+
+
+class TestExportarProyeccion:
+    def test_exportar_solo_propiedades(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        salida = fuente.exportar(outputFormat="application/json", propiedades=["nombre"])
+        assert all(set(f["properties"]) == {"nombre"} for f in salida["features"])
+
+    def test_exportar_sin_geometria_no_modifica_datasource(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        salida = fuente.exportar(outputFormat="application/json", sin_geometria=True)
+        assert all(f.get("geometry") is None for f in salida["features"])
+        # La capa conserva sus geometrías y vuelve a leer todos los campos.
+        completa = fuente.exportar(outputFormat="application/json")
+        assert all(f["geometry"] is not None for f in completa["features"])
+        assert set(completa["features"][0]["properties"]) == {"nombre", "valor"}
+
+    def test_exportar_id_fuera_de_propiedades(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        fuente.crear_ID(nombreCampo="ID_OGR")
+        salida = fuente.exportar(outputFormat="application/json", ID="ID_OGR", propiedades=["nombre"])
+        assert sorted(f["id"] for f in salida["features"]) == [0, 1]
+        assert "ID_OGR" not in salida["features"][0]["properties"]
+
+    def test_proyeccion_en_capa_memory(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        # leer() copia a una capa MEMORY, que no admite OLCIgnoreFields
+        assert fuente.datasource.GetDriver().GetName() in ("Memory", "MEM")
+        salida = fuente.exportar(outputFormat="application/json", propiedades=["valor"], sin_geometria=True)
+        assert [list(f["properties"]) for f in salida["features"]] == [["valor"], ["valor"]]
+        assert all(f["geometry"] is None for f in salida["features"])
+
+    def test_obtener_atributos_con_propiedades(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        (campos,) = fuente.obtener_atributos(propiedades=["valor"]).values()
+        assert list(campos) == ["valor"]
+
+
+class TestExportarPerfiles:
+    def _requiere_driver(self, nombre):
+        if ogr.GetDriverByName(nombre) is None:
+            pytest.skip(f"Driver {nombre} de GDAL no disponible")
+
+    def test_exportar_flatgeobuf(self):
+        self._requiere_driver("FlatGeobuf")
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        blob = fuente.exportar(EPSG_Salida=3857, outputFormat="FlatGeobuf")
+        assert blob[:3] == b"fgb"
+
+    def test_exportar_geoparquet(self):
+        self._requiere_driver("Parquet")
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        blob = fuente.exportar(outputFormat="GeoParquet")
+        assert blob[:4] == b"PAR1" and blob[-4:] == b"PAR1"
+
+
+class TestTeselaMVT:
+    @pytest.fixture(autouse=True)
+    def requiere_driver_mvt(self):
+        if ogr.GetDriverByName("MVT") is None:
+            pytest.skip("Driver MVT de GDAL no disponible")
+
+    def test_tesela_con_objetos(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        # Tesela z=5 que contiene Madrid (-3.7, 40.4)
+        datos = fuente.tesela_mvt(5, 15, 12)
+        assert isinstance(datos, bytes) and len(datos) > 0
+
+    def test_tesela_vacia(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        assert fuente.tesela_mvt(5, 0, 0) == b""
+
+    def test_tesela_se_sirve_desde_cache(self, tmp_path):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        fuente.configurar_cache_teselas(ruta_mbtiles=str(tmp_path / "cache.mbtiles"))
+        primera = fuente.tesela_mvt(5, 15, 12)
+        segunda = fuente.tesela_mvt(5, 15, 12)
+        assert primera == segunda
+        assert fuente.cache_teselas.estadisticas()["aciertos"] == 1
+        assert len(fuente.cache_teselas_disco) == 1
+
+
+class TestExportarCompacto:
+    def test_precision_redondea_coordenadas(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        geojson = fuente.exportar(precision=0)
+        assert geojson["features"][0]["geometry"]["coordinates"] == [-4.0, 40.0]
+
+    def test_como_bytes(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        datos = fuente.exportar(como_bytes=True, precision=1, ID="valor", propiedades=["nombre"])
+        assert isinstance(datos, bytes)
+        fc = json.loads(datos)
+        assert len(fc["features"]) == 2
+        assert fc["features"][0]["geometry"]["coordinates"] == [-3.7, 40.4]
+        assert fc["features"][0]["id"] == 10
+
+
+GEOJSON_LINEA = json.dumps(
+    {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"nombre": "linea"},
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": [[-3.0 + i * 0.001, 40.0 + (i % 2) * 0.0001] for i in range(500)],
+                },
+            }
+        ],
+    }
+)
+
+
+class TestGeneralizar:
+    def _vertices(self, geojson):
+        return len(geojson["features"][0]["geometry"]["coordinates"])
+
+    def test_niveles_por_defecto(self):
+        fuente = FuenteDatosVector(GEOJSON_LINEA)
+        fuente.leer()
+        niveles = fuente.generalizar()
+        assert len(niveles) == 6 and niveles == sorted(niveles)
+
+    def test_exportar_con_escala_reduce_vertices(self):
+        fuente = FuenteDatosVector(GEOJSON_LINEA)
+        fuente.leer()
+        completo = fuente.exportar()
+        generalizado = fuente.exportar(escala=1000000)
+        assert self._vertices(generalizado) < self._vertices(completo) == 500
+
+    def test_tolerancia_menor_que_los_niveles_devuelve_original(self):
+        fuente = FuenteDatosVector(GEOJSON_LINEA)
+        fuente.leer()
+        fuente.generalizar(tolerancias=[0.01])
+        assert self._vertices(fuente.exportar(tolerancia=0.001)) == 500
+
+    def test_puntos_no_se_generalizan(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        assert fuente.generalizar() == []
+
+    def test_modificar_capa_invalida_niveles(self):
+        fuente = FuenteDatosVector(GEOJSON_LINEA)
+        fuente.leer()
+        fuente.generalizar(tolerancias=[0.01])
+        capa = fuente.obtener_nombreCapa()
+        fuente.crear_ID()
+        assert capa not in fuente._generalizaciones
+
+
+class TestMetadatos:
+    def test_metadatos_capa(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        meta = fuente.obtener_metadatos(0)
+        assert meta["n_objetos"] == 2
+        assert meta["tipo_geometria"] == "Point"
+        assert meta["MRE"] == pytest.approx([-3.7, 40.4, 2.1, 41.4])
+        assert set(meta["atributos"]) == {"nombre", "valor"}
+
+    def test_crear_id_invalida_esquema(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        assert "ID_OGR" not in fuente.obtener_atributos(0)
+        fuente.crear_ID()
+        assert "ID_OGR" in fuente.obtener_atributos(0)
+
+    def test_guardar_y_cargar(self, tmp_path):
+        ruta = str(tmp_path / "metadatos.json")
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        fuente.obtener_metadatos()
+        fuente.guardar_metadatos(ruta)
+
+        otra = FuenteDatosVector(GEOJSON_PUNTOS)
+        otra.leer()
+        assert otra.cargar_metadatos(ruta) is True
+        assert otra._metadatos == fuente._metadatos
+
+    def test_cargar_con_otra_lectura_se_ignora(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        fuente.obtener_metadatos()
+        datos = fuente.guardar_metadatos()
+
+        otra = FuenteDatosVector(GEOJSON_PUNTOS)
+        otra.leer(filtro="valor > 10")
+        assert otra.cargar_metadatos(datos) is False
+
+
+class TestCacheSQL:
+    SQL = "SELECT nombre FROM {capa} WHERE valor > 15"
+
+    def _fuente(self):
+        fuente = FuenteDatosVector(GEOJSON_PUNTOS)
+        fuente.leer()
+        return fuente, fuente.obtener_nombreCapa()
+
+    def test_consulta_repetida_se_sirve_desde_cache(self):
+        fuente, capa = self._fuente()
+        sql = self.SQL.format(capa=capa)
+        primera = fuente.ejecutar_sql(sql, "resultado")
+        assert primera.GetFeatureCount() == 1
+        fuente.ejecutar_sql(sql, "resultado")
+        assert fuente.cache_sql.estadisticas()["aciertos"] == 1
+
+    def test_modificar_capa_invalida_resultado(self):
+        fuente, capa = self._fuente()
+        sql = self.SQL.format(capa=capa)
+        fuente.consultar_sql(sql)
+        fuente.crear_ID(capa)
+        fuente.consultar_sql(sql)
+        assert fuente.cache_sql.estadisticas()["aciertos"] == 0
+
+    def test_filtro_espacial(self):
+        fuente, capa = self._fuente()
+        resultado = fuente.consultar_sql(f"SELECT * FROM {capa}", MRE=[-5, 39, -2, 41])
+        assert resultado.datasource.GetLayerByIndex(0).GetFeatureCount() == 1
+
+    def test_dialecto_sqlite(self):
+        fuente, capa = self._fuente()
+        resultado = fuente.consultar_sql(f'SELECT nombre FROM "{capa}" ORDER BY valor DESC', dialect="SQLITE")
+        capa_resultado = resultado.datasource.GetLayerByIndex(0)
+        assert capa_resultado.GetNextFeature().GetField("nombre") == "dos"
+
+    def test_resultado_sobrevive_al_desalojo_de_la_cache(self):
+        fuente, capa = self._fuente()
+        resultado = fuente.consultar_sql(self.SQL.format(capa=capa))
+        fuente.invalidar_cache_sql()
+        capa_resultado = resultado.datasource.GetLayerByIndex(0)
+        assert [f.GetField("nombre") for f in capa_resultado] == ["dos"]
+
+
 class TestCrearID:
     def test_crear_id_secuencial(self):
         fuente = FuenteDatosVector(GEOJSON_PUNTOS)